@@ -0,0 +1,50 @@
+"""
+Saved Excel/CSV column mappings per party (local SQLite).
+A mapping is {voucher item field: supplier's column header text}; see utils/sheet_import.py.
+"""
+import json
+from datetime import datetime
+from database.db import get_connection
+
+
+def get_column_mapping(party_key):
+    """Return the saved mapping dict for a party, or None."""
+    if not party_key:
+        return None
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT mapping_json FROM column_mappings WHERE party_key=?", (party_key,))
+        row = cur.fetchone()
+        return json.loads(row[0]) if row and row[0] else None
+    except Exception as e:
+        print(f"Error reading column mapping: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def save_column_mapping(party_key, party_name, mapping):
+    """
+    Insert or replace the mapping for a party.
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO column_mappings (party_key, party_name, mapping_json, updated_at)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(party_key) DO UPDATE SET
+                party_name=excluded.party_name,
+                mapping_json=excluded.mapping_json,
+                updated_at=excluded.updated_at
+        """, (party_key, party_name, json.dumps(mapping), datetime.now().isoformat(timespec="seconds")))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Error saving column mapping: {e}")
+        return False
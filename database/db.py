@@ -37,6 +37,12 @@ def create_tables():
     except sqlite3.OperationalError:
         pass # Column likely already exists
 
+    # Try to add hsn column if it doesn't exist (migration for existing DB)
+    try:
+        cur.execute("ALTER TABLE purchase_items ADD COLUMN hsn TEXT")
+    except sqlite3.OperationalError:
+        pass # Column likely already exists
+
     # Purchase Vouchers (Header)
     cur.execute("""
     CREATE TABLE IF NOT EXISTS purchase_vouchers (
@@ -49,6 +55,13 @@ def create_tables():
     )
     """)
 
+    # Try to add grand_total / saved_at columns if they don't exist (migration for existing DB)
+    for column in ("grand_total REAL", "saved_at TEXT"):
+        try:
+            cur.execute(f"ALTER TABLE purchase_vouchers ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass # Column likely already exists
+
     # Bill Sundry
     cur.execute("""
     CREATE TABLE IF NOT EXISTS bill_sundry (
@@ -60,6 +73,41 @@ def create_tables():
     )
     """)
 
+    # Try to add nature column if it doesn't exist (migration for existing DB)
+    try:
+        cur.execute("ALTER TABLE bill_sundry ADD COLUMN nature TEXT")
+    except sqlite3.OperationalError:
+        pass # Column likely already exists
+
+    # Lines are always read by voucher; vouchers are looked up by party and date
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchase_items_voucher_id ON purchase_items (voucher_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bill_sundry_voucher_id ON bill_sundry (voucher_id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchase_vouchers_party_date ON purchase_vouchers (party_name, date)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_purchase_vouchers_date ON purchase_vouchers (date)")
+
+    # FULL-TEXT SEARCH over saved purchase lines (rowid = purchase_items.id, see database/voucher_search.py)
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name='purchase_search'")
+    if cur.fetchone() is None:
+        try:
+            cur.execute("""
+            CREATE VIRTUAL TABLE purchase_search USING fts5(
+                item_name, hsn, party_name, voucher_no, prefix='2 3'
+            )
+            """)
+            # Every indexed word, so partial words can be expanded to whole ones when searching
+            cur.execute("CREATE TABLE IF NOT EXISTS purchase_search_terms (term TEXT PRIMARY KEY) WITHOUT ROWID")
+            # Index lines saved before the search table existed
+            cur.execute("""
+            INSERT INTO purchase_search (rowid, item_name, hsn, party_name, voucher_no)
+            SELECT i.id, i.item_name, i.hsn, v.party_name, v.voucher_no
+            FROM purchase_items i JOIN purchase_vouchers v ON v.id = i.voucher_id
+            """)
+            cur.execute("CREATE VIRTUAL TABLE temp.purchase_search_vocab USING fts5vocab(main, purchase_search, 'row')")
+            cur.execute("INSERT OR IGNORE INTO purchase_search_terms (term) SELECT term FROM temp.purchase_search_vocab")
+            cur.execute("DROP TABLE temp.purchase_search_vocab")
+        except sqlite3.OperationalError as e:
+            print(f"Voucher search is unavailable (SQLite without FTS5): {e}")
+
     # SQL CONFIG TABLE (legacy SQL Server - kept for compatibility)
     cur.execute("""
     CREATE TABLE IF NOT EXISTS sql_config (
@@ -109,6 +157,137 @@ def create_tables():
     )
     """)
 
+    # INVOICE TEMPLATES TABLE (per-party PDF layouts learned from confirmed imports)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS invoice_templates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        party_key TEXT UNIQUE,
+        party_name TEXT,
+        gstin TEXT,
+        template_json TEXT,
+        hits INTEGER DEFAULT 0,
+        misses INTEGER DEFAULT 0,
+        updated_at TEXT
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_invoice_templates_gstin ON invoice_templates (gstin)")
+
+    # COLUMN MAPPINGS TABLE (per-party Excel/CSV item column mapping)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS column_mappings (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        party_key TEXT UNIQUE,
+        party_name TEXT,
+        mapping_json TEXT,
+        updated_at TEXT
+    )
+    """)
+
+    # OCR CACHE TABLE (text of scanned PDF pages, keyed by a hash of the page image)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS ocr_cache (
+        page_hash TEXT PRIMARY KEY,
+        text TEXT,
+        created_at TEXT
+    )
+    """)
+
+    # DRAFT JOURNAL TABLE (append-only autosave of open voucher windows, see database/draft_journal.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS draft_journal (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        draft_id TEXT,
+        payload TEXT,
+        created_at TEXT
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_draft_journal_draft_id ON draft_journal (draft_id, id)")
+
+    # UPLOAD OUTBOX TABLE (voucher XML queued for delivery to BUSY, see database/upload_outbox.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS upload_outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        voucher_id INTEGER,
+        idem_key TEXT UNIQUE,
+        voucher_no TEXT,
+        party_name TEXT,
+        xml TEXT,
+        status TEXT,
+        attempts INTEGER DEFAULT 0,
+        next_attempt_at REAL DEFAULT 0,
+        last_error TEXT,
+        vch_code TEXT,
+        created_at TEXT,
+        updated_at TEXT
+    )
+    """)
+    # revision: saves of the same local voucher (1, 2, ...); modify_vch_code: existing BUSY voucher to modify
+    for column in ("revision INTEGER DEFAULT 1", "modify_vch_code TEXT"):
+        try:
+            cur.execute(f"ALTER TABLE upload_outbox ADD COLUMN {column}")
+        except sqlite3.OperationalError:
+            pass # Column likely already exists
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_upload_outbox_status ON upload_outbox (status, next_attempt_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_upload_outbox_voucher_id ON upload_outbox (voucher_id)")
+
+    # PURCHASE ROLLUPS (per-rate purchase totals kept up to date on save, see database/purchase_rollups.py)
+    # Each voucher's contribution, so a re-save can take the old one back out
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS purchase_rollup_voucher (
+        voucher_id INTEGER,
+        tax_rate REAL,
+        day TEXT,
+        party_name TEXT,
+        taxable REAL,
+        tax REAL,
+        PRIMARY KEY (voucher_id, tax_rate)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS purchase_rollup_daily (
+        day TEXT,
+        tax_rate REAL,
+        vouchers INTEGER,
+        taxable REAL,
+        tax REAL,
+        PRIMARY KEY (day, tax_rate)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS purchase_rollup_monthly (
+        month TEXT,
+        tax_rate REAL,
+        vouchers INTEGER,
+        taxable REAL,
+        tax REAL,
+        PRIMARY KEY (month, tax_rate)
+    )
+    """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS purchase_rollup_party (
+        month TEXT,
+        party_name TEXT,
+        tax_rate REAL,
+        vouchers INTEGER,
+        taxable REAL,
+        tax REAL,
+        PRIMARY KEY (month, party_name, tax_rate)
+    )
+    """)
+
+    # INVOICE FINGERPRINTS TABLE (duplicate invoice detection, see database/invoice_fingerprints.py)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS invoice_fingerprints (
+        fingerprint TEXT,
+        kind TEXT,
+        voucher_id INTEGER,
+        source_name TEXT,
+        created_at TEXT,
+        PRIMARY KEY (fingerprint, voucher_id)
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_invoice_fingerprints_voucher_id ON invoice_fingerprints (voucher_id)")
+
     conn.commit()
     conn.close()
 
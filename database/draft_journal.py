@@ -0,0 +1,215 @@
+"""
+Crash-safe autosave for open purchase voucher windows (local SQLite).
+
+Every add / edit / insert / delete in a voucher window appends one small
+record to draft_journal, so the cost of an action doesn't grow with the size
+of the voucher. Every JOURNAL_COMPACT_EVERY records the draft is compacted: a
+snapshot of the whole voucher replaces the records before it. Saving the
+voucher deletes its draft until the next edit, a window that is closed
+normally discards its draft, and a normal exit discards them all; drafts
+still present at the next launch are left over from a crash and are
+replayed to restore the windows.
+
+Records are JSON objects:
+    {"op": "snapshot", "state": {...}}                  whole voucher
+    {"op": "header", "key": "party_name", "value": ...}
+    {"op": "item_add" | "bs_add", "row": {...}}
+    {"op": "item_set" | "item_insert" | "bs_insert", "index": n, "row": {...}}
+    {"op": "item_delete" | "bs_delete", "index": n}
+
+The voucher state uses the load_voucher / parse_with_openai schema, so a
+replayed draft can be passed to open_purchase_voucher(initial_data=...).
+"""
+import json
+import uuid
+from datetime import datetime
+from database.db import get_connection
+
+# Records per draft between snapshots
+JOURNAL_COMPACT_EVERY = 200
+
+
+def empty_draft():
+    return {"items": [], "bill_sundry": []}
+
+
+def apply_record(state, record):
+    """Apply one journal record to a voucher state dict (in place)."""
+    op = record["op"]
+    if op == "snapshot":
+        state.clear()
+        state.update(empty_draft())
+        state.update(record["state"])
+        return
+    if op == "header":
+        state[record["key"]] = record["value"]
+        return
+
+    rows = state["items"] if op.startswith("item_") else state["bill_sundry"]
+    action = op.split("_", 1)[1]
+    index = record.get("index")
+    if action == "add":
+        rows.append(record["row"])
+    elif action == "insert":
+        rows.insert(index, record["row"])
+    elif action == "set" and 0 <= index < len(rows):
+        rows[index] = record["row"]
+    elif action == "delete" and 0 <= index < len(rows):
+        del rows[index]
+
+
+class DraftJournal:
+    """
+    Append-only journal of one voucher window.
+
+    Nothing is written until the first record, so opening and closing an
+    empty window leaves no draft behind. Each record is committed on its own
+    (WAL mode, synchronous=NORMAL): it survives the application crashing.
+    """
+
+    def __init__(self, draft_id=None, state=None):
+        self.draft_id = draft_id or uuid.uuid4().hex
+        self.state = state if state is not None else empty_draft()
+        self.pending = 0
+        # Saved with no edits since: nothing in the journal until the next record
+        self.saved = False
+        self.conn = None
+
+    def _connection(self):
+        if self.conn is None:
+            self.conn = get_connection()
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        return self.conn
+
+    def _append(self, record):
+        conn = self._connection()
+        cur = conn.execute(
+            "INSERT INTO draft_journal (draft_id, payload, created_at) VALUES (?, ?, ?)",
+            (self.draft_id, json.dumps(record), datetime.now().isoformat(timespec="seconds")),
+        )
+        return cur.lastrowid
+
+    def record(self, op, **fields):
+        """Journal one action, e.g. record("item_set", index=3, row={...})."""
+        record = dict(fields, op=op)
+        try:
+            apply_record(self.state, record)
+            if self.saved:
+                # The draft was deleted on save: start it again from the whole voucher
+                self.compact()
+                return
+            self._append(record)
+            self.conn.commit()
+            self.pending += 1
+            if self.pending >= JOURNAL_COMPACT_EVERY:
+                self.compact()
+        except Exception as e:
+            print(f"Draft journal error: {e}")
+
+    def snapshot(self, state):
+        """Replace the journal with the whole voucher (after imports and bulk recalculations)."""
+        self.state = state
+        self.compact()
+
+    def compact(self):
+        """Write a snapshot of the current state and drop the records before it, in one transaction."""
+        try:
+            conn = self._connection()
+            with conn:
+                snapshot_id = self._append({"op": "snapshot", "state": self.state})
+                conn.execute("DELETE FROM draft_journal WHERE draft_id=? AND id<?", (self.draft_id, snapshot_id))
+            self.pending = 0
+            self.saved = False
+        except Exception as e:
+            print(f"Draft journal compaction error: {e}")
+
+    def mark_saved(self, state):
+        """The voucher was saved as it stands: delete the draft (it comes back with the next edit)."""
+        self.state = state
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM draft_journal WHERE draft_id=?", (self.draft_id,))
+            self.pending = 0
+            self.saved = True
+        except Exception as e:
+            print(f"Draft journal error: {e}")
+
+    def discard(self):
+        """Delete the draft (the window was closed normally)."""
+        discard_draft(self.draft_id)
+        self.close()
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def list_drafts():
+    """
+    Drafts left in the journal (windows that were not closed normally).
+
+    Returns:
+        list of dicts: {'draft_id', 'updated_at', 'records'}
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT draft_id, MAX(created_at), COUNT(*)
+            FROM draft_journal GROUP BY draft_id ORDER BY MIN(id)
+        """)
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error listing drafts: {e}")
+        return []
+    finally:
+        conn.close()
+    return [{'draft_id': r[0], 'updated_at': r[1], 'records': r[2]} for r in rows]
+
+
+def load_draft(draft_id):
+    """Replay a draft's journal (one query). Returns the voucher state dict, or None."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT payload FROM draft_journal WHERE draft_id=? ORDER BY id", (draft_id,))
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error loading draft: {e}")
+        return None
+    finally:
+        conn.close()
+    if not rows:
+        return None
+
+    state = empty_draft()
+    for (payload,) in rows:
+        try:
+            apply_record(state, json.loads(payload))
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            print(f"Skipping unreadable draft record: {e}")
+    return state
+
+
+def discard_draft(draft_id):
+    try:
+        conn = get_connection()
+        conn.execute("DELETE FROM draft_journal WHERE draft_id=?", (draft_id,))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error discarding draft: {e}")
+
+
+def discard_all_drafts():
+    """Delete every draft (normal exit: the open windows' drafts are not crash leftovers)."""
+    try:
+        conn = get_connection()
+        conn.execute("DELETE FROM draft_journal")
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error discarding drafts: {e}")
@@ -0,0 +1,181 @@
+"""
+Fingerprints of imported and saved supplier invoices (local SQLite), used to
+warn before the same invoice is imported or saved twice.
+
+Two kinds of fingerprint point at a saved voucher:
+  - 'file':    SHA-256 of the source PDF's bytes (catches re-importing the same file
+               before anything is read or sent to the AI); for a PDF holding several
+               invoices, one per invoice (the file's hash and the invoice's place in it)
+  - 'invoice': hash of the normalized party, voucher no, date and grand total
+               (catches the same invoice arriving as a different file, or typed in again)
+
+Both are looked up through the table's primary key, so a check is one indexed
+query however many vouchers are stored.
+"""
+import hashlib
+import re
+from datetime import datetime
+from database.db import get_connection
+from utils.invoice_templates import normalize_date, to_number
+
+KIND_FILE = "file"
+KIND_INVOICE = "invoice"
+
+FILE_HASH_CHUNK = 1024 * 1024
+# Legal-form words suppliers write inconsistently ("ABC Traders Pvt. Ltd." vs "M/s ABC Traders")
+PARTY_NOISE_WORDS = {"ms", "pvt", "private", "ltd", "limited", "llp"}
+
+
+def file_fingerprint(path):
+    """SHA-256 of a file's contents (read in chunks), or None if it can't be read."""
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(FILE_HASH_CHUNK), b""):
+                digest.update(chunk)
+    except OSError as e:
+        print(f"Error hashing {path}: {e}")
+        return None
+    return digest.hexdigest()
+
+
+def segment_fingerprint(file_hash, segment):
+    """
+    File fingerprint of one invoice of a split PDF (segment: its 1-based place in the
+    file), so saving one invoice doesn't mark the file's other invoices as saved.
+    """
+    if not file_hash:
+        return None
+    return hashlib.sha256(f"{file_hash}#{segment}".encode("utf-8")).hexdigest()
+
+
+def normalize_party(name):
+    words = re.findall(r"[a-z0-9]+", (name or "").lower().replace("m/s", "ms"))
+    return "".join(w for w in words if w not in PARTY_NOISE_WORDS)
+
+
+def normalize_voucher_no(voucher_no):
+    # 'INV/0042', 'inv-42' and 'INV 42' are the same number
+    parts = re.findall(r"[A-Z]+|[0-9]+", str(voucher_no or "").upper())
+    return "".join((p.lstrip("0") or "0") if p.isdigit() else p for p in parts)
+
+
+def invoice_fingerprint(party_name, voucher_no, date, grand_total):
+    """
+    Fingerprint of an invoice's identifying header fields.
+
+    The grand total is compared to the whole rupee, so a round-off line doesn't
+    hide a duplicate.
+
+    Returns:
+        str, or None when the party or voucher number is missing
+    """
+    party = normalize_party(party_name)
+    number = normalize_voucher_no(voucher_no)
+    if not party or not number:
+        return None
+    day = normalize_date(str(date or "")) or str(date or "").strip()
+    total = to_number(grand_total if grand_total not in (None, "") else 0) or 0.0
+    key = f"{party}|{number}|{day}|{int(round(abs(total)))}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+
+def voucher_fingerprint(voucher):
+    """invoice_fingerprint() of a voucher dict (parse_with_openai / save_voucher schema)."""
+    return invoice_fingerprint(voucher.get("party_name"), voucher.get("voucher_no"),
+                               voucher.get("date"), voucher.get("grand_total"))
+
+
+def find_duplicates(invoice_fp=None, file_hash=None, exclude_voucher_id=None):
+    """
+    Saved vouchers matching either fingerprint.
+
+    Args:
+        exclude_voucher_id: the voucher being re-saved (it doesn't duplicate itself)
+
+    Returns:
+        list of dicts: {'kind', 'voucher_id', 'source_name', 'date', 'voucher_no', 'party_name', 'grand_total'}
+    """
+    fingerprints = [fp for fp in (invoice_fp, file_hash) if fp]
+    if not fingerprints:
+        return []
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT f.kind, f.voucher_id, f.source_name, v.date, v.voucher_no, v.party_name, v.grand_total
+            FROM invoice_fingerprints f JOIN purchase_vouchers v ON v.id = f.voucher_id
+            WHERE f.fingerprint IN ({', '.join('?' * len(fingerprints))}) AND f.voucher_id IS NOT ?
+            ORDER BY f.voucher_id, f.kind
+        """, fingerprints + [exclude_voucher_id])
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error checking invoice fingerprints: {e}")
+        return []
+    finally:
+        conn.close()
+    return [
+        {'kind': r[0], 'voucher_id': r[1], 'source_name': r[2] or "", 'date': r[3] or "",
+         'voucher_no': r[4] or "", 'party_name': r[5] or "", 'grand_total': r[6] or 0}
+        for r in rows
+    ]
+
+
+def record_fingerprints(voucher_id, invoice_fp=None, file_hash=None, source_name=""):
+    """
+    Point the fingerprints at a saved voucher. The invoice fingerprint replaces the
+    voucher's previous one (its header may have been edited); file hashes accumulate.
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    now = datetime.now().isoformat(timespec="seconds")
+    conn = get_connection()
+    try:
+        with conn:
+            conn.execute("DELETE FROM invoice_fingerprints WHERE voucher_id=? AND kind=?", (voucher_id, KIND_INVOICE))
+            if invoice_fp:
+                conn.execute("""
+                    INSERT OR REPLACE INTO invoice_fingerprints (fingerprint, kind, voucher_id, source_name, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (invoice_fp, KIND_INVOICE, voucher_id, "", now))
+            if file_hash:
+                conn.execute("""
+                    INSERT OR IGNORE INTO invoice_fingerprints (fingerprint, kind, voucher_id, source_name, created_at)
+                    VALUES (?, ?, ?, ?, ?)
+                """, (file_hash, KIND_FILE, voucher_id, source_name or "", now))
+        return True
+    except Exception as e:
+        print(f"Error saving invoice fingerprints: {e}")
+        return False
+    finally:
+        conn.close()
+
+
+def backfill_invoice_fingerprints():
+    """
+    Fingerprint saved vouchers that don't have one yet (saved before duplicate checks existed).
+
+    Returns:
+        int: number of vouchers fingerprinted
+    """
+    conn = get_connection()
+    try:
+        with conn:
+            rows = conn.execute("""
+                SELECT id, party_name, voucher_no, date, grand_total FROM purchase_vouchers v
+                WHERE NOT EXISTS (SELECT 1 FROM invoice_fingerprints f WHERE f.voucher_id = v.id AND f.kind = ?)
+            """, (KIND_INVOICE,)).fetchall()
+            now = datetime.now().isoformat(timespec="seconds")
+            entries = [(fp, KIND_INVOICE, r[0], "", now) for r in rows
+                       for fp in [invoice_fingerprint(r[1], r[2], r[3], r[4])] if fp]
+            conn.executemany("""
+                INSERT OR IGNORE INTO invoice_fingerprints (fingerprint, kind, voucher_id, source_name, created_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, entries)
+        return len(entries)
+    except Exception as e:
+        print(f"Error fingerprinting saved vouchers: {e}")
+        return 0
+    finally:
+        conn.close()
@@ -0,0 +1,86 @@
+"""
+Storage for per-party invoice layout templates (local SQLite).
+Templates are learned from confirmed imports by utils/invoice_templates.py.
+"""
+import json
+from datetime import datetime
+from database.db import get_connection
+
+
+def get_invoice_templates():
+    """
+    Return all stored templates.
+
+    Returns:
+        list of dicts: {'id', 'party_key', 'party_name', 'gstin', 'template', 'hits', 'misses'}
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, party_key, party_name, gstin, template_json, hits, misses
+            FROM invoice_templates
+        """)
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error reading invoice templates: {e}")
+        return []
+    finally:
+        conn.close()
+
+    templates = []
+    for row in rows:
+        try:
+            template = json.loads(row[4]) if row[4] else {}
+        except json.JSONDecodeError:
+            continue
+        templates.append({
+            'id': row[0],
+            'party_key': row[1],
+            'party_name': row[2],
+            'gstin': row[3],
+            'template': template,
+            'hits': row[5] or 0,
+            'misses': row[6] or 0,
+        })
+    return templates
+
+
+def save_invoice_template(party_key, party_name, gstin, template):
+    """
+    Insert or replace the template for a party.
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO invoice_templates (party_key, party_name, gstin, template_json, updated_at)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(party_key) DO UPDATE SET
+                party_name=excluded.party_name,
+                gstin=excluded.gstin,
+                template_json=excluded.template_json,
+                updated_at=excluded.updated_at
+        """, (party_key, party_name, gstin, json.dumps(template), datetime.now().isoformat(timespec="seconds")))
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Error saving invoice template: {e}")
+        return False
+
+
+def record_template_result(template_id, success):
+    """Increment the hit or miss counter of a template."""
+    column = "hits" if success else "misses"
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(f"UPDATE invoice_templates SET {column} = COALESCE({column}, 0) + 1 WHERE id=?", (template_id,))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error updating invoice template stats: {e}")
@@ -0,0 +1,57 @@
+"""
+Cache of OCR text for scanned PDF pages (local SQLite), keyed by page hash.
+Filled by utils/ocr_utils.py so re-importing the same scan skips Tesseract.
+"""
+from datetime import datetime
+from database.db import get_connection
+
+
+def get_cached_ocr_text(page_hashes):
+    """
+    Look up OCR text for several pages in one query.
+
+    Returns:
+        dict: {page_hash: text} for the hashes found in the cache
+    """
+    page_hashes = list(page_hashes)
+    if not page_hashes:
+        return {}
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        placeholders = ",".join("?" * len(page_hashes))
+        cur.execute(f"SELECT page_hash, text FROM ocr_cache WHERE page_hash IN ({placeholders})", page_hashes)
+        return dict(cur.fetchall())
+    except Exception as e:
+        print(f"Error reading OCR cache: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def save_ocr_text(results):
+    """
+    Store OCR text for pages.
+
+    Args:
+        results: dict {page_hash: text}
+
+    Returns:
+        bool: True if successful, False otherwise
+    """
+    if not results:
+        return True
+    try:
+        conn = get_connection()
+        cur = conn.cursor()
+        now = datetime.now().isoformat(timespec="seconds")
+        cur.executemany(
+            "REPLACE INTO ocr_cache (page_hash, text, created_at) VALUES (?, ?, ?)",
+            [(page_hash, text, now) for page_hash, text in results.items()]
+        )
+        conn.commit()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Error saving OCR cache: {e}")
+        return False
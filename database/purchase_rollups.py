@@ -0,0 +1,184 @@
+"""
+Purchase totals per tax rate, kept up to date as vouchers are saved (local SQLite):
+
+    purchase_rollup_daily    (day, tax_rate)
+    purchase_rollup_monthly  (month, tax_rate)
+    purchase_rollup_party    (month, party_name, tax_rate)
+
+save_voucher calls apply_voucher_rollups() inside its transaction. Each
+voucher's own per-rate figures are kept in purchase_rollup_voucher, so a
+re-save subtracts exactly what the earlier save added before adding the new
+figures. Taxable value and tax are grouped as calculate_multirate_tax groups
+them (item amounts plus their share of non-GST bill sundries).
+
+Reports read only the rollup tables, so their cost depends on the date range
+asked for, not on how many lines are stored.
+"""
+import re
+from database.db import get_connection, get_setting
+from utils.calculation import tax_rate_from_category, tax_rate_summary
+from utils.json_repair import to_float
+from utils.setting_keys import SETTING_ROLLUP_VERSION
+
+# Bump when the figures are computed differently; stale rollups are rebuilt on startup
+ROLLUP_VERSION = "1"
+
+GRAIN_DAILY = "daily"
+GRAIN_MONTHLY = "monthly"
+GRAIN_PARTY = "party"
+GRAINS = (GRAIN_DAILY, GRAIN_MONTHLY, GRAIN_PARTY)
+
+_DAY_RE = re.compile(r"^\d{4}-\d{2}-\d{2}$")
+
+
+def voucher_rate_rows(voucher):
+    """
+    A voucher's per-rate figures.
+
+    Args:
+        voucher: dict in the save_voucher schema
+
+    Returns:
+        list of dicts [{'rate', 'taxable', 'tax'}, ...]
+    """
+    items = [{'amount': to_float(item.get("amount")), 'tax_rate': tax_rate_from_category(item.get("tax_category"))}
+             for item in voucher.get("items") or []]
+    # Tax lines are what is being computed; the rest (freight, discount...) is spread over the items
+    bill_sundries = [{'amount': to_float(bs.get("amount")), 'nature': bs.get("nature") or "Additive"}
+                     for bs in voucher.get("bill_sundry") or [] if "GST" not in str(bs.get("name") or "")]
+    return tax_rate_summary(items, bill_sundries, voucher.get("purchase_type") or "")
+
+
+def _add(cur, day, party_name, rows, sign):
+    """Add (sign=1) or remove (sign=-1) one voucher's rows from the rollup tables."""
+    month = day[:7]
+    for row in rows:
+        rate, taxable, tax = row["rate"], sign * row["taxable"], sign * row["tax"]
+        for table, keys, values in (
+            ("purchase_rollup_daily", ("day",), (day,)),
+            ("purchase_rollup_monthly", ("month",), (month,)),
+            ("purchase_rollup_party", ("month", "party_name"), (month, party_name)),
+        ):
+            key_columns = ", ".join(keys + ("tax_rate",))
+            cur.execute(f"""
+                INSERT INTO {table} ({key_columns}, vouchers, taxable, tax) VALUES ({', '.join('?' * (len(keys) + 4))})
+                ON CONFLICT ({key_columns}) DO UPDATE SET
+                    vouchers = vouchers + excluded.vouchers,
+                    taxable = taxable + excluded.taxable,
+                    tax = tax + excluded.tax
+            """, values + (rate, sign, taxable, tax))
+            if sign < 0:
+                where = " AND ".join(f"{k}=?" for k in keys + ("tax_rate",))
+                cur.execute(f"DELETE FROM {table} WHERE {where} AND vouchers <= 0", values + (rate,))
+
+
+def apply_voucher_rollups(cur, voucher_id, voucher):
+    """
+    Replace a voucher's contribution to the rollups (call inside the save transaction).
+
+    Args:
+        voucher: the voucher as saved (date already YYYY-MM-DD)
+    """
+    cur.execute("SELECT day, party_name, tax_rate, taxable, tax FROM purchase_rollup_voucher WHERE voucher_id=?",
+                (voucher_id,))
+    old = cur.fetchall()
+    if old:
+        _add(cur, old[0][0], old[0][1], [{"rate": r[2], "taxable": r[3], "tax": r[4]} for r in old], -1)
+        cur.execute("DELETE FROM purchase_rollup_voucher WHERE voucher_id=?", (voucher_id,))
+
+    day = voucher.get("date") or ""
+    if not _DAY_RE.match(day):
+        day = ""  # undated / unreadable date: reported under a blank day
+    party_name = voucher.get("party_name") or ""
+    rows = voucher_rate_rows(voucher)
+    _add(cur, day, party_name, rows, 1)
+    cur.executemany("""
+        INSERT INTO purchase_rollup_voucher (voucher_id, tax_rate, day, party_name, taxable, tax)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, [(voucher_id, r["rate"], day, party_name, r["taxable"], r["tax"]) for r in rows])
+
+
+def rebuild_purchase_rollups():
+    """
+    Recompute all rollups from the stored vouchers (first run, or after ROLLUP_VERSION changes).
+
+    Returns:
+        int: number of vouchers processed, or None on error
+    """
+    from database.vouchers import load_vouchers
+
+    vouchers = load_vouchers()
+    conn = get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            for table in ("purchase_rollup_voucher", "purchase_rollup_daily", "purchase_rollup_monthly",
+                          "purchase_rollup_party"):
+                cur.execute(f"DELETE FROM {table}")
+            for voucher in vouchers:
+                apply_voucher_rollups(cur, voucher["id"], voucher)
+            cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", (SETTING_ROLLUP_VERSION, ROLLUP_VERSION))
+        return len(vouchers)
+    except Exception as e:
+        print(f"Error rebuilding purchase rollups: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def ensure_purchase_rollups():
+    """Rebuild the rollups if they were built by another version (or never)."""
+    if get_setting(SETTING_ROLLUP_VERSION) != ROLLUP_VERSION:
+        count = rebuild_purchase_rollups()
+        if count is not None:
+            print(f"Purchase rollups rebuilt from {count} voucher(s).")
+
+
+def purchase_report(grain, date_from, date_to, party_name=None):
+    """
+    Purchase summary by tax rate from the rollup tables.
+
+    Args:
+        grain: 'daily', 'monthly' or 'party'
+        date_from, date_to: YYYY-MM-DD, inclusive (monthly and party-wise use whole months)
+        party_name: party-wise only - restrict to one party
+
+    Returns:
+        list of dicts: {'period' (day / month / party), 'tax_rate', 'vouchers', 'taxable', 'tax'},
+        ordered by period and rate
+    """
+    if grain == GRAIN_DAILY:
+        sql = """
+            SELECT day, tax_rate, vouchers, taxable, tax FROM purchase_rollup_daily
+            WHERE day BETWEEN ? AND ? ORDER BY day, tax_rate
+        """
+        params = [date_from, date_to]
+    elif grain == GRAIN_MONTHLY:
+        sql = """
+            SELECT month, tax_rate, vouchers, taxable, tax FROM purchase_rollup_monthly
+            WHERE month BETWEEN ? AND ? ORDER BY month, tax_rate
+        """
+        params = [date_from[:7], date_to[:7]]
+    elif grain == GRAIN_PARTY:
+        party_filter = "AND party_name=?" if party_name else ""
+        sql = f"""
+            SELECT party_name, tax_rate, SUM(vouchers), SUM(taxable), SUM(tax) FROM purchase_rollup_party
+            WHERE month BETWEEN ? AND ? {party_filter}
+            GROUP BY party_name, tax_rate ORDER BY party_name, tax_rate
+        """
+        params = [date_from[:7], date_to[:7]] + ([party_name] if party_name else [])
+    else:
+        raise ValueError(f"Unknown report grain: {grain}")
+
+    conn = get_connection()
+    try:
+        rows = conn.execute(sql, params).fetchall()
+    except Exception as e:
+        print(f"Error reading purchase report: {e}")
+        return []
+    finally:
+        conn.close()
+    return [
+        {'period': r[0], 'tax_rate': r[1], 'vouchers': r[2], 'taxable': round(r[3], 2), 'tax': round(r[4], 2)}
+        for r in rows
+    ]
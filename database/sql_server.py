@@ -2,9 +2,18 @@
 SQL Server database access via pyodbc.
 Fetches party/item/bill-sundry data from BUSY SQL Server tables.
 """
-import pyodbc
 import re
-from database.db import get_connection
+import time
+import uuid
+from datetime import datetime
+from database.db import get_connection, get_setting
+from utils.json_repair import to_float
+from utils.setting_keys import SETTING_SQL_STAGING_SCHEMA
+
+try:
+    import pyodbc
+except ImportError:
+    pyodbc = None
 
 # ---------------------------------------------------------------------------
 # Config helpers (stored in local SQLite)
@@ -46,7 +55,7 @@ def get_sql_connection(db_override=None):
     Returns None if config is missing or connection fails.
     """
     cfg = get_sql_config()
-    if not cfg or not all([cfg[0], cfg[2], cfg[3]]):
+    if pyodbc is None or not cfg or not all([cfg[0], cfg[2], cfg[3]]):
         return None
 
     username, password, database_name, server_name = cfg
@@ -79,6 +88,8 @@ def get_sql_connection(db_override=None):
 
 def test_sql_connection(username, password, database_name, server_name):
     """Test SQL Server connection. Returns (ok: bool, message: str)."""
+    if pyodbc is None:
+        return False, "pyodbc is not installed"
     try:
         conn_str = (
             f"DRIVER={{ODBC Driver 17 for SQL Server}};"
@@ -290,3 +301,396 @@ def get_all_item_names():
         return []
     finally:
         conn.close()
+
+
+def get_party_name_by_gstin(gstin):
+    """
+    Find the party (master1, mastertype=2) registered with a GSTIN.
+    Busy keeps the GSTIN in MasterAddressInfo.GSTNo.
+    Returns the party name or None.
+    """
+    conn = get_sql_connection()
+    if not conn or not gstin:
+        return None
+
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            """
+            SELECT TOP 1 m.Name FROM master1 m
+            JOIN MasterAddressInfo a ON a.MasterCode = m.Code
+            WHERE m.mastertype=2 AND a.GSTNo=?
+            """,
+            (gstin.strip().upper(),)
+        )
+        row = cur.fetchone()
+        return row[0] if row and row[0] else None
+    except Exception as e:
+        print(f"SQL party by GSTIN error: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Item purchase info (last rate, last supplier, stock) from BUSY transactions
+# ---------------------------------------------------------------------------
+
+# Tran2 holds BUSY's voucher lines: RecType 2 = item line, VchType 2 = Purchase,
+# MasterCode1 = item, CM1 = party account, Value1 = quantity (signed: inward
+# positive), D1 = rate.
+BUSY_VCH_TYPE_PURCHASE = 2
+BUSY_REC_TYPE_ITEM = 2
+
+# {items} is a query returning the item codes (column ItemCode) to report on
+ITEM_INFO_SQL = """
+WITH items AS ({items}),
+last_purchase AS (
+    SELECT t.MasterCode1 AS ItemCode, t.D1 AS Rate, t.Date, t.CM1 AS PartyCode,
+           ROW_NUMBER() OVER (PARTITION BY t.MasterCode1 ORDER BY t.Date DESC, t.VchCode DESC) AS rn
+    FROM Tran2 t JOIN items i ON i.ItemCode = t.MasterCode1
+    WHERE t.RecType = ? AND t.VchType = ?
+),
+stock AS (
+    SELECT t.MasterCode1 AS ItemCode, SUM(t.Value1) AS Qty
+    FROM Tran2 t JOIN items i ON i.ItemCode = t.MasterCode1
+    WHERE t.RecType = ?
+    GROUP BY t.MasterCode1
+)
+SELECT m.Name, lp.Rate, lp.Date, p.Name, s.Qty
+FROM items i
+JOIN master1 m ON m.Code = i.ItemCode
+LEFT JOIN last_purchase lp ON lp.ItemCode = i.ItemCode AND lp.rn = 1
+LEFT JOIN master1 p ON p.Code = lp.PartyCode
+LEFT JOIN stock s ON s.ItemCode = i.ItemCode
+"""
+
+
+def _fetch_item_info(items_sql, items_params):
+    conn = get_sql_connection()
+    if not conn:
+        return {}
+    try:
+        cur = conn.cursor()
+        cur.execute(ITEM_INFO_SQL.format(items=items_sql),
+                    list(items_params) + [BUSY_REC_TYPE_ITEM, BUSY_VCH_TYPE_PURCHASE, BUSY_REC_TYPE_ITEM])
+        info = {}
+        for name, rate, date, supplier, qty in cur.fetchall():
+            if name:
+                info[name] = {
+                    "last_rate": to_float(rate) if rate is not None else None,
+                    "last_date": date.strftime("%d-%m-%Y") if hasattr(date, "strftime") else (date or ""),
+                    "last_supplier": supplier or "",
+                    "stock": to_float(qty) if qty is not None else 0.0,
+                }
+        return info
+    except Exception as e:
+        print(f"SQL item info error: {e}")
+        return {}
+    finally:
+        conn.close()
+
+
+def get_item_purchase_info(item_names):
+    """
+    Last purchase rate/date/supplier and current stock for several items in one query.
+
+    Returns:
+        dict {item name: {'last_rate', 'last_date', 'last_supplier', 'stock'}} for the
+        items found in BUSY (last_rate is None for items never purchased)
+    """
+    names = sorted({n for n in item_names if n})
+    if not names:
+        return {}
+    placeholders = ", ".join("?" * len(names))
+    return _fetch_item_info(f"SELECT Code AS ItemCode FROM master1 WHERE mastertype=6 AND Name IN ({placeholders})", names)
+
+
+def get_party_item_purchase_info(party_name, limit=50):
+    """
+    get_item_purchase_info() for the items most often bought from a party
+    (by number of purchase lines), in one query.
+    """
+    if not party_name:
+        return {}
+    return _fetch_item_info("""
+        SELECT TOP (?) t.MasterCode1 AS ItemCode
+        FROM Tran2 t JOIN master1 p ON p.Code = t.CM1
+        WHERE p.mastertype=2 AND p.Name=? AND t.RecType = ? AND t.VchType = ?
+        GROUP BY t.MasterCode1
+        ORDER BY COUNT(*) DESC
+    """, (limit, party_name, BUSY_REC_TYPE_ITEM, BUSY_VCH_TYPE_PURCHASE))
+
+
+# ---------------------------------------------------------------------------
+# Existing BUSY purchase vouchers (open for edit)
+# ---------------------------------------------------------------------------
+
+# Tran1 holds the voucher header: MasterCode1 = party, MasterCode2 = purchase
+# type, VchSeriesCode = series, VchAmtBaseCur = voucher total. Tran3 holds the
+# bill sundries: BSCode = bill sundry, D1 = percentage, Value1 = amount.
+# Amounts and quantities are signed by direction, so they are read as ABS().
+BUSY_VOUCHER_HEADER_SQL = """
+SELECT t.VchCode, t.Date, s.Name, t.VchNo, st.Name, p.Name, t.VchAmtBaseCur
+FROM Tran1 t
+LEFT JOIN master1 p ON p.Code = t.MasterCode1
+LEFT JOIN master1 st ON st.Code = t.MasterCode2
+LEFT JOIN master1 s ON s.Code = t.VchSeriesCode
+WHERE t.VchType = ? AND t.VchNo = ? {filters}
+ORDER BY t.Date DESC, t.VchCode DESC
+"""
+
+# Item lines and bill sundries of one voucher in one result, names resolved
+# in the same statement: kind 0 = item (item, tax category, unit), 1 = bill sundry
+BUSY_VOUCHER_LINES_SQL = """
+SELECT 0, t.SrNo, i.Name, tc.Name, u.Name, ABS(t.Value1), t.D1, ABS(t.Value3), NULL
+FROM Tran2 t
+JOIN master1 i ON i.Code = t.MasterCode1
+LEFT JOIN master1 u ON u.Code = i.CM1
+LEFT JOIN master1 tc ON tc.Code = i.CM8
+WHERE t.VchCode = ? AND t.RecType = ?
+UNION ALL
+SELECT 1, b.SrNo, m.Name, NULL, NULL, NULL, b.D1, ABS(b.Value1), m.I1
+FROM Tran3 b
+JOIN master1 m ON m.Code = b.BSCode
+WHERE b.VchCode = ?
+ORDER BY 1, 2
+"""
+
+
+def load_busy_purchase_voucher(voucher_no, voucher_date=None, series=None, conn=None):
+    """
+    Read a purchase voucher already in BUSY, to open it in the purchase voucher window.
+
+    Two queries whatever the voucher's size: the header, then all item lines and
+    bill sundries with their master names joined in.
+
+    Args:
+        voucher_no: BUSY voucher number
+        voucher_date: YYYY-MM-DD, to pick between vouchers with the same number
+                      (default: the latest)
+        series: series name (default: any)
+        conn: open DB-API connection (default: get_sql_connection())
+
+    Returns:
+        dict in the parse_with_openai schema plus 'busy_vch_code' (the VchCode a save of
+        it must modify), or an error message (str)
+    """
+    if not voucher_no or not str(voucher_no).strip():
+        return "Enter the voucher number."
+    filters, params = "", [BUSY_VCH_TYPE_PURCHASE, str(voucher_no).strip()]
+    if voucher_date:
+        try:
+            params.append(datetime.strptime(voucher_date, "%Y-%m-%d").date())
+        except ValueError:
+            return f"Invalid date: {voucher_date}"
+        filters += "AND t.Date = ? "
+    if series:
+        filters += "AND s.Name = ? "
+        params.append(series)
+
+    own_conn = conn is None
+    conn = conn or get_sql_connection()
+    if not conn:
+        return "SQL Server is not configured or not reachable."
+    try:
+        cur = conn.cursor()
+        cur.execute(BUSY_VOUCHER_HEADER_SQL.format(filters=filters), params)
+        header = cur.fetchone()
+        if not header:
+            return f"Purchase voucher {voucher_no} was not found in BUSY."
+        vch_code, date, series_name, vch_no, purchase_type, party_name, total = header
+        cur.execute(BUSY_VOUCHER_LINES_SQL, (vch_code, BUSY_REC_TYPE_ITEM, vch_code))
+        lines = cur.fetchall()
+    except Exception as e:
+        print(f"SQL load voucher error: {e}")
+        return f"Could not read the voucher from BUSY: {e}"
+    finally:
+        if own_conn:
+            conn.close()
+
+    items, bill_sundry = [], []
+    for kind, _, name, tax_category, unit, qty, rate, amount, bs_i1 in lines:
+        if kind == 0:
+            rate = to_float(rate)
+            items.append({
+                "item_name": name or "", "tax_category": tax_category or "", "hsn": "", "qty": to_float(qty),
+                "unit": unit or "", "list_price": rate, "discount": "", "price": rate, "amount": to_float(amount),
+            })
+        else:
+            bill_sundry.append({
+                "name": name or "", "percentage": to_float(rate), "amount": to_float(amount),
+                # Same rule as get_bill_sundry_info: I1 = 0 means Subtractive
+                "nature": "Subtractive" if bs_i1 == 0 else "Additive",
+            })
+    return {
+        "busy_vch_code": str(vch_code),
+        "date": date.strftime("%d-%m-%Y") if hasattr(date, "strftime") else (parse_smart_date(date)[1] or date or ""),
+        "series": series_name or "",
+        "voucher_no": vch_no or "",
+        "purchase_type": purchase_type or "",
+        "party_name": party_name or "",
+        "grand_total": to_float(total),
+        "items": items,
+        "bill_sundry": bill_sundry,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Staging bulk write (finished vouchers, for sites without the BUSY COM path)
+# ---------------------------------------------------------------------------
+
+STAGING_SCHEMA = "staging"
+# Rows per executemany call: fast_executemany sends each call as one parameter array
+STAGING_CHUNK_ROWS = 1000
+# Voucher ids per DELETE statement (SQL Server allows 2100 parameters)
+STAGING_DELETE_CHUNK = 1000
+
+STAGING_TABLES = {
+    "PurchaseVoucher": [
+        ("BatchId", "UNIQUEIDENTIFIER NOT NULL"), ("LocalVoucherId", "INT NOT NULL"), ("VchDate", "DATE NULL"),
+        ("Series", "NVARCHAR(50)"), ("VchNo", "NVARCHAR(50)"), ("PurchaseType", "NVARCHAR(50)"),
+        ("PartyName", "NVARCHAR(200)"), ("GrandTotal", "DECIMAL(18, 2)"), ("StagedAt", "DATETIME2"),
+    ],
+    "PurchaseVoucherItem": [
+        ("BatchId", "UNIQUEIDENTIFIER NOT NULL"), ("LocalVoucherId", "INT NOT NULL"), ("SrNo", "INT"),
+        ("ItemName", "NVARCHAR(200)"), ("TaxCategory", "NVARCHAR(50)"), ("HSN", "NVARCHAR(20)"),
+        ("Qty", "DECIMAL(18, 3)"), ("Unit", "NVARCHAR(20)"), ("ListPrice", "DECIMAL(18, 2)"),
+        ("Discount", "NVARCHAR(50)"), ("Price", "DECIMAL(18, 2)"), ("Amount", "DECIMAL(18, 2)"),
+    ],
+    "PurchaseVoucherBillSundry": [
+        ("BatchId", "UNIQUEIDENTIFIER NOT NULL"), ("LocalVoucherId", "INT NOT NULL"), ("SrNo", "INT"),
+        ("Name", "NVARCHAR(100)"), ("Percentage", "DECIMAL(9, 3)"), ("Amount", "DECIMAL(18, 2)"),
+        ("Nature", "NVARCHAR(20)"),
+    ],
+}
+
+
+def get_staging_schema():
+    """Staging schema name from Settings; only plain identifiers are accepted."""
+    schema = (get_setting(SETTING_SQL_STAGING_SCHEMA, STAGING_SCHEMA) or STAGING_SCHEMA).strip()
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]{0,127}", schema):
+        raise ValueError(f"Invalid staging schema name: {schema!r}")
+    return schema
+
+
+def create_staging_tables(conn, schema):
+    """Create the staging schema and tables if they don't exist."""
+    cur = conn.cursor()
+    cur.execute(f"IF SCHEMA_ID('{schema}') IS NULL EXEC('CREATE SCHEMA [{schema}]')")
+    for table, columns in STAGING_TABLES.items():
+        column_sql = ", ".join(f"[{name}] {sql_type}" for name, sql_type in columns)
+        cur.execute(f"IF OBJECT_ID('[{schema}].[{table}]', 'U') IS NULL CREATE TABLE [{schema}].[{table}] ({column_sql})")
+        cur.execute(f"""
+            IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name='IX_{table}_LocalVoucherId'
+                           AND object_id=OBJECT_ID('[{schema}].[{table}]'))
+            CREATE INDEX [IX_{table}_LocalVoucherId] ON [{schema}].[{table}] ([LocalVoucherId])
+        """)
+
+
+def _staging_date(value):
+    for fmt in ("%Y-%m-%d", "%d-%m-%Y"):
+        try:
+            return datetime.strptime(value or "", fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def voucher_staging_rows(vouchers, batch_id, staged_at):
+    """
+    Flatten vouchers (database.vouchers.load_vouchers schema) into staging rows.
+    Values are coerced to one type per column, as fast_executemany binds the
+    whole parameter array with the types of the first row.
+
+    Returns:
+        {table: list of row tuples in STAGING_TABLES column order}
+    """
+    rows = {table: [] for table in STAGING_TABLES}
+    for v in vouchers:
+        voucher_id = int(v["id"])
+        rows["PurchaseVoucher"].append((
+            batch_id, voucher_id, _staging_date(v.get("date")), str(v.get("series") or ""),
+            str(v.get("voucher_no") or ""), str(v.get("purchase_type") or ""), str(v.get("party_name") or ""),
+            to_float(v.get("grand_total")), staged_at,
+        ))
+        for sr_no, item in enumerate(v.get("items") or [], start=1):
+            rows["PurchaseVoucherItem"].append((
+                batch_id, voucher_id, sr_no, str(item.get("item_name") or ""), str(item.get("tax_category") or ""),
+                str(item.get("hsn") or ""), to_float(item.get("qty")), str(item.get("unit") or ""),
+                to_float(item.get("list_price")), str(item.get("discount") or ""), to_float(item.get("price")),
+                to_float(item.get("amount")),
+            ))
+        for sr_no, bs in enumerate(v.get("bill_sundry") or [], start=1):
+            rows["PurchaseVoucherBillSundry"].append((
+                batch_id, voucher_id, sr_no, str(bs.get("name") or ""), to_float(bs.get("percentage")),
+                to_float(bs.get("amount")), str(bs.get("nature") or ""),
+            ))
+    return rows
+
+
+def write_vouchers_to_staging(vouchers, conn=None, schema=None, chunk_size=STAGING_CHUNK_ROWS, create_tables=True):
+    """
+    Bulk-insert finished vouchers into the staging tables in one transaction.
+
+    Rows already staged for the same local vouchers are replaced, so a day's
+    job can be re-run. Inserts use fast_executemany in chunks of chunk_size
+    rows (one round trip per chunk instead of per row).
+
+    Args:
+        vouchers: list of voucher dicts with 'id' (see database.vouchers.load_vouchers)
+        conn: open DB-API connection (default: get_sql_connection())
+        schema: staging schema (default: get_staging_schema())
+
+    Returns:
+        (success: bool, message: str, stats: {'batch_id', 'rows', 'seconds'})
+    """
+    stats = {"batch_id": None, "rows": 0, "seconds": 0.0}
+    if not vouchers:
+        return True, "No vouchers to stage.", stats
+    try:
+        schema = schema or get_staging_schema()
+    except ValueError as e:
+        return False, str(e), stats
+    own_conn = conn is None
+    conn = conn or get_sql_connection()
+    if not conn:
+        return False, "SQL Server is not configured or not reachable.", stats
+
+    start = time.perf_counter()
+    batch_id = str(uuid.uuid4()).upper()
+    rows = voucher_staging_rows(vouchers, batch_id, datetime.now())
+    voucher_ids = [int(v["id"]) for v in vouchers]
+    try:
+        conn.autocommit = False
+        if create_tables:
+            create_staging_tables(conn, schema)
+        cur = conn.cursor()
+        cur.fast_executemany = True
+        for table in STAGING_TABLES:
+            for i in range(0, len(voucher_ids), STAGING_DELETE_CHUNK):
+                chunk = voucher_ids[i:i + STAGING_DELETE_CHUNK]
+                cur.execute(f"DELETE FROM [{schema}].[{table}] WHERE [LocalVoucherId] IN ({', '.join('?' * len(chunk))})",
+                            chunk)
+        for table, columns in STAGING_TABLES.items():
+            sql = (f"INSERT INTO [{schema}].[{table}] ({', '.join(f'[{name}]' for name, _ in columns)}) "
+                   f"VALUES ({', '.join('?' * len(columns))})")
+            table_rows = rows[table]
+            for i in range(0, len(table_rows), chunk_size):
+                cur.executemany(sql, table_rows[i:i + chunk_size])
+        conn.commit()
+    except Exception as e:
+        try:
+            conn.rollback()
+        except Exception:
+            pass
+        print(f"SQL staging write error: {e}")
+        return False, f"Staging write failed (nothing was written): {e}", stats
+    finally:
+        if own_conn:
+            conn.close()
+
+    stats["batch_id"] = batch_id
+    stats["rows"] = sum(len(table_rows) for table_rows in rows.values())
+    stats["seconds"] = time.perf_counter() - start
+    return True, f"Staged {len(vouchers)} voucher(s), {stats['rows']} rows, batch {batch_id}.", stats
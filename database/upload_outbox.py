@@ -0,0 +1,214 @@
+"""
+Outbox of voucher XML waiting to be delivered to BUSY (local SQLite).
+
+Saving a voucher enqueues its XML here; utils/upload_worker.py delivers the
+queue in batches from a background thread. Each save of a local voucher is a
+new revision; its entry carries an idempotency key (a hash of the local
+voucher id, the revision and the XML), so re-sending after a timeout or a
+crash can't create a second voucher in BUSY, and saving an unchanged voucher
+again doesn't queue it twice.
+
+A voucher has at most one entry waiting: a newer revision replaces a pending
+or failed one. Once a revision has been sent, later revisions are delivered
+as a modification of that BUSY voucher (its VchCode), never as a second add;
+they wait while an earlier revision is still being sent.
+
+Statuses: pending -> sending -> sent | failed (pending again while retries remain).
+"""
+import hashlib
+import time
+from datetime import datetime
+from database.db import get_connection
+
+STATUS_PENDING = "pending"
+STATUS_SENDING = "sending"
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+
+OUTBOX_COLUMNS = ("id", "voucher_id", "idem_key", "voucher_no", "party_name", "xml", "status",
+                  "attempts", "next_attempt_at", "last_error", "vch_code", "revision", "modify_vch_code")
+
+
+def _now():
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def idempotency_key(voucher_id, revision, xml):
+    return hashlib.sha256(f"{voucher_id}\n{revision}\n{xml}".encode("utf-8")).hexdigest()[:32]
+
+
+def enqueue_voucher(voucher_id, voucher_no, party_name, xml, modify_vch_code=None):
+    """
+    Queue a save of a voucher for upload, as its next revision.
+
+    No-op if the latest revision has the same XML (a failed one is retried);
+    otherwise a pending or failed earlier revision is replaced.
+
+    Args:
+        modify_vch_code: VchCode of the BUSY voucher this one was opened from; it is
+                         modified instead of adding a new voucher (kept for later revisions)
+
+    Returns:
+        str: the idempotency key, or None if it could not be stored
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            latest = conn.execute("""
+                SELECT id, idem_key, xml, status, revision, modify_vch_code FROM upload_outbox
+                WHERE voucher_id=? ORDER BY id DESC LIMIT 1
+            """, (voucher_id,)).fetchone()
+            if latest and latest[2] == xml:
+                # Saving an unchanged voucher again retries it if BUSY rejected it before
+                conn.execute("UPDATE upload_outbox SET status=?, attempts=0, next_attempt_at=0 WHERE id=? AND status=?",
+                             (STATUS_PENDING, latest[0], STATUS_FAILED))
+                key = latest[1]
+            else:
+                revision = (latest[4] or 1) + 1 if latest else 1
+                modify_vch_code = modify_vch_code or (latest[5] if latest else None)
+                key = idempotency_key(voucher_id, revision, xml)
+                conn.execute("DELETE FROM upload_outbox WHERE voucher_id=? AND status IN (?, ?)",
+                             (voucher_id, STATUS_PENDING, STATUS_FAILED))
+                conn.execute("""
+                    INSERT OR IGNORE INTO upload_outbox
+                        (voucher_id, idem_key, revision, modify_vch_code, voucher_no, party_name, xml, status,
+                         attempts, next_attempt_at, created_at, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, 0, ?, ?)
+                """, (voucher_id, key, revision, modify_vch_code, voucher_no, party_name, xml, STATUS_PENDING,
+                      _now(), _now()))
+        conn.close()
+        return key
+    except Exception as e:
+        print(f"Error queueing voucher for upload: {e}")
+        return None
+
+
+def claim_outbox_batch(limit):
+    """
+    Take up to limit due entries (oldest first) and mark them as sending.
+
+    An entry waits while an earlier revision of its voucher is being sent. If an
+    earlier revision was sent, modify_vch_code is set to its VchCode.
+
+    Returns:
+        list of dicts with OUTBOX_COLUMNS keys
+    """
+    columns = ", ".join(f"o.{c}" for c in OUTBOX_COLUMNS if c != "modify_vch_code")
+    conn = get_connection()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        cur = conn.execute(f"""
+            SELECT {columns}, COALESCE(o.modify_vch_code, (
+                SELECT s.vch_code FROM upload_outbox s
+                WHERE s.voucher_id = o.voucher_id AND s.status = ? AND s.vch_code IS NOT NULL
+                ORDER BY s.id DESC LIMIT 1))
+            FROM upload_outbox o
+            WHERE o.status=? AND o.next_attempt_at<=? AND NOT EXISTS (
+                SELECT 1 FROM upload_outbox b WHERE b.voucher_id = o.voucher_id AND b.status = ? AND b.id < o.id)
+            ORDER BY o.id LIMIT ?
+        """, (STATUS_SENT, STATUS_PENDING, time.time(), STATUS_SENDING, limit))
+        rows = [dict(zip(OUTBOX_COLUMNS, r)) for r in cur.fetchall()]
+        conn.executemany("UPDATE upload_outbox SET status=?, updated_at=? WHERE id=?",
+                         [(STATUS_SENDING, _now(), row["id"]) for row in rows])
+        conn.commit()
+        return rows
+    except Exception as e:
+        conn.rollback()
+        print(f"Error reading upload outbox: {e}")
+        return []
+    finally:
+        conn.close()
+
+
+def next_outbox_due():
+    """Seconds until the next pending entry is due (0 if one is due now), or None if nothing is pending."""
+    conn = get_connection()
+    try:
+        row = conn.execute("SELECT MIN(next_attempt_at) FROM upload_outbox WHERE status=?", (STATUS_PENDING,)).fetchone()
+    except Exception as e:
+        print(f"Error reading upload outbox: {e}")
+        return None
+    finally:
+        conn.close()
+    if not row or row[0] is None:
+        return None
+    return max(0.0, row[0] - time.time())
+
+
+def update_outbox_entries(updates):
+    """
+    Record delivery outcomes in one transaction.
+
+    Args:
+        updates: list of dicts {'id', 'status', 'attempts', 'next_attempt_at', 'last_error', 'vch_code'}
+    """
+    try:
+        conn = get_connection()
+        with conn:
+            conn.executemany("""
+                UPDATE upload_outbox
+                SET status=?, attempts=?, next_attempt_at=?, last_error=?, vch_code=?, updated_at=?
+                WHERE id=?
+            """, [(u["status"], u["attempts"], u["next_attempt_at"], u["last_error"], u["vch_code"], _now(), u["id"])
+                  for u in updates])
+            # A revision saved while this one was being sent supersedes it if it didn't get through
+            conn.execute("""
+                DELETE FROM upload_outbox WHERE status IN (?, ?) AND EXISTS (
+                    SELECT 1 FROM upload_outbox n WHERE n.voucher_id = upload_outbox.voucher_id AND n.id > upload_outbox.id)
+            """, (STATUS_PENDING, STATUS_FAILED))
+        conn.close()
+    except Exception as e:
+        print(f"Error updating upload outbox: {e}")
+
+
+def recover_outbox():
+    """Put entries left 'sending' by a crash back in the queue (their keys make the resend safe)."""
+    try:
+        conn = get_connection()
+        conn.execute("UPDATE upload_outbox SET status=?, next_attempt_at=0 WHERE status=?", (STATUS_PENDING, STATUS_SENDING))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error recovering upload outbox: {e}")
+
+
+def retry_failed_uploads(voucher_id=None):
+    """Queue failed entries (all, or one voucher's) again."""
+    try:
+        conn = get_connection()
+        if voucher_id is None:
+            conn.execute("UPDATE upload_outbox SET status=?, attempts=0, next_attempt_at=0 WHERE status=?",
+                         (STATUS_PENDING, STATUS_FAILED))
+        else:
+            conn.execute("UPDATE upload_outbox SET status=?, attempts=0, next_attempt_at=0 WHERE status=? AND voucher_id=?",
+                         (STATUS_PENDING, STATUS_FAILED, voucher_id))
+        conn.commit()
+        conn.close()
+    except Exception as e:
+        print(f"Error retrying uploads: {e}")
+
+
+def get_upload_statuses(voucher_ids):
+    """
+    Latest upload entry per local voucher (one query).
+
+    Returns:
+        {voucher_id: {'status', 'attempts', 'last_error', 'vch_code'}}
+    """
+    voucher_ids = [v for v in voucher_ids if v is not None]
+    if not voucher_ids:
+        return {}
+    placeholders = ", ".join("?" * len(voucher_ids))
+    conn = get_connection()
+    try:
+        cur = conn.execute(f"""
+            SELECT voucher_id, status, attempts, last_error, vch_code FROM upload_outbox
+            WHERE id IN (SELECT MAX(id) FROM upload_outbox WHERE voucher_id IN ({placeholders}) GROUP BY voucher_id)
+        """, voucher_ids)
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error reading upload status: {e}")
+        return {}
+    finally:
+        conn.close()
+    return {r[0]: {'status': r[1], 'attempts': r[2] or 0, 'last_error': r[3], 'vch_code': r[4]} for r in rows}
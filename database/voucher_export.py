@@ -0,0 +1,158 @@
+"""
+Export of stored vouchers (local SQLite) to CSV or Parquet for audits.
+
+Rows are read with a single query per export and fetched chunk_size rows at
+a time from the open cursor (SQLite steps through the date index and the
+voucher_id index, so nothing is sorted or buffered up front), and each chunk
+is written before the next is fetched. Memory stays at about one chunk
+however many years of lines are exported.
+
+Two row kinds: 'items' (one row per item line, with its voucher header) and
+'bill_sundry' (one row per bill sundry line, with its voucher header).
+Parquet needs pyarrow; each chunk becomes one compressed row group.
+"""
+import csv
+import os
+import time
+from database.db import get_connection
+from database.vouchers import BILL_SUNDRY_COLUMNS, ITEM_COLUMNS
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+EXPORT_ITEMS = "items"
+EXPORT_BILL_SUNDRY = "bill_sundry"
+EXPORT_KINDS = (EXPORT_ITEMS, EXPORT_BILL_SUNDRY)
+EXPORT_FORMATS = ("csv", "parquet")
+
+EXPORT_CHUNK_SIZE = 20000
+PARQUET_COMPRESSION = "zstd"
+
+HEADER_COLUMNS = ("voucher_id", "date", "series", "voucher_no", "purchase_type", "party_name", "grand_total")
+LINE_TABLES = {EXPORT_ITEMS: ("purchase_items", ITEM_COLUMNS), EXPORT_BILL_SUNDRY: ("bill_sundry", BILL_SUNDRY_COLUMNS)}
+# Numeric columns; everything else is exported as text
+REAL_COLUMNS = {"grand_total", "qty", "list_price", "discount", "price", "amount", "percentage"}
+
+
+def export_columns(kind):
+    return HEADER_COLUMNS + LINE_TABLES[kind][1]
+
+
+def iter_export_chunks(kind=EXPORT_ITEMS, date_from=None, date_to=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Yield lists of up to chunk_size row tuples (export_columns(kind) order), by date,
+    voucher and line order.
+
+    Args:
+        date_from, date_to: YYYY-MM-DD range (inclusive); default everything
+    """
+    table, line_columns = LINE_TABLES[kind]
+    conn = get_connection()
+    try:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT v.id, v.date, v.series, v.voucher_no, v.purchase_type, v.party_name, v.grand_total,
+                   {', '.join('l.' + c for c in line_columns)}
+            FROM purchase_vouchers v JOIN {table} l ON l.voucher_id = v.id
+            WHERE v.date >= ? AND v.date <= ?
+            ORDER BY v.date, v.id, l.id
+        """, (date_from or "", date_to or "9999-12-31"))
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+    finally:
+        conn.close()
+
+
+def _clean_rows(rows, columns):
+    # Line values are stored as the UI entered them (often text); coerce numeric columns
+    real = [i for i, c in enumerate(columns) if c in REAL_COLUMNS]
+    cleaned = []
+    for row in rows:
+        row = list(row)
+        for i in real:
+            value = row[i]
+            if not isinstance(value, float):
+                try:
+                    row[i] = float(value) if value not in (None, "") else None
+                except (TypeError, ValueError):
+                    row[i] = None
+        cleaned.append(row)
+    return cleaned
+
+
+def _write_csv(path, columns, chunks):
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for chunk in chunks:
+            writer.writerows(chunk)
+            rows += len(chunk)
+    return rows
+
+
+def _write_parquet(path, columns, chunks):
+    schema = pa.schema([
+        (c, pa.int64() if c == "voucher_id" else pa.float64() if c in REAL_COLUMNS else pa.string())
+        for c in columns
+    ])
+    rows = 0
+    with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+        for chunk in chunks:
+            chunk = _clean_rows(chunk, columns)
+            arrays = []
+            for i, field in enumerate(schema):
+                values = [r[i] for r in chunk]
+                if pa.types.is_string(field.type):
+                    values = [None if v is None else str(v) for v in values]
+                arrays.append(pa.array(values, type=field.type))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+            rows += len(chunk)
+    return rows
+
+
+def export_vouchers(path, fmt=None, kind=EXPORT_ITEMS, date_from=None, date_to=None, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Stream stored voucher lines to a CSV or Parquet file.
+
+    Args:
+        path: output file
+        fmt: 'csv' or 'parquet' (default: from the file extension)
+        kind: 'items' or 'bill_sundry'
+        date_from, date_to: YYYY-MM-DD range (inclusive); default everything
+
+    Returns:
+        (success: bool, message: str, stats: {'rows', 'seconds', 'bytes'})
+    """
+    stats = {"rows": 0, "seconds": 0.0, "bytes": 0}
+    fmt = fmt or ("parquet" if path.lower().endswith(".parquet") else "csv")
+    if fmt not in EXPORT_FORMATS:
+        return False, f"Unknown export format: {fmt}", stats
+    if kind not in EXPORT_KINDS:
+        return False, f"Unknown export kind: {kind}", stats
+    if fmt == "parquet" and pq is None:
+        return False, "pyarrow is not installed; Parquet export isn't available (CSV still works).", stats
+
+    columns = export_columns(kind)
+    chunks = iter_export_chunks(kind, date_from, date_to, chunk_size)
+    start = time.perf_counter()
+    try:
+        if fmt == "csv":
+            stats["rows"] = _write_csv(path, columns, chunks)
+        else:
+            stats["rows"] = _write_parquet(path, columns, chunks)
+    except Exception as e:
+        print(f"Error exporting vouchers: {e}")
+        return False, f"Export failed: {e}", stats
+    finally:
+        chunks.close()
+    stats["seconds"] = time.perf_counter() - start
+    stats["bytes"] = os.path.getsize(path)
+    return True, f"Exported {stats['rows']} {kind} row(s) to {path}.", stats
@@ -0,0 +1,156 @@
+"""
+Full-text search over saved purchase lines (local SQLite FTS5).
+
+purchase_search holds one row per purchase_items row (same rowid) with the
+item name, HSN and the voucher's party and number. save_voucher keeps it in
+step inside the voucher's own transaction.
+
+Results are pages of lines, newest saved first, fetched with keyset
+pagination on the rowid: a page after (or before) a given line costs the
+same however deep the user has scrolled, and FTS5 walks its index in rowid
+order, so a page never sorts the whole match set.
+
+Partial words: 2-3 letter prefixes use FTS5's prefix indexes. Other partial
+words are expanded to the whole indexed words they start (from
+purchase_search_terms) and matched exactly: a plain FTS5 prefix query on a
+word found in most lines (a party's "Traders") builds its full match list
+before returning the first page.
+"""
+import re
+from database.db import get_connection
+
+SEARCH_PAGE_SIZE = 200
+# Prefix lengths with an FTS5 prefix index (prefix='2 3' in create_tables)
+INDEXED_PREFIXES = (2, 3)
+# A partial word starting more whole words than this is searched as a prefix
+MAX_TERM_EXPANSION = 32
+
+RESULT_COLUMNS = ("line_id", "voucher_id", "date", "voucher_no", "party_name",
+                  "item_name", "hsn", "qty", "unit", "price", "amount")
+
+_available = None
+
+
+def search_available():
+    """True if the FTS5 search table exists (SQLite builds without FTS5 can't create it)."""
+    global _available
+    if _available is None:
+        conn = get_connection()
+        try:
+            _available = conn.execute("SELECT 1 FROM sqlite_master WHERE name='purchase_search'").fetchone() is not None
+        finally:
+            conn.close()
+    return _available
+
+
+def search_words(text):
+    """Words as the FTS5 unicode61 tokenizer sees them (lower case, split on anything but letters and digits)."""
+    return re.findall(r"[^\W_]+", (text or "").lower())
+
+
+def build_match_query(words, conn):
+    """
+    FTS5 query for what the user typed: every word must match the start of a
+    word in the item name, HSN, party or voucher number ('bear 62' finds
+    'BALL BEARING 6204').
+
+    Returns:
+        str, or None if some word starts no indexed word (nothing can match)
+    """
+    parts = []
+    for word in words:
+        if len(word) in INDEXED_PREFIXES:
+            parts.append(f'"{word}"*')
+            continue
+        terms = [row[0] for row in conn.execute(
+            "SELECT term FROM purchase_search_terms WHERE term >= ? AND term < ? LIMIT ?",
+            (word, word + "\U0010ffff", MAX_TERM_EXPANSION + 1))]
+        if not terms:
+            return None
+        if len(terms) > MAX_TERM_EXPANSION:
+            parts.append(f'"{word}"*')
+        else:
+            parts.append("(" + " OR ".join(f'"{term}"' for term in terms) + ")")
+    return " AND ".join(parts)
+
+
+def index_voucher_lines(cur, voucher_id):
+    """Add a voucher's lines to the search index (call after inserting them, in the same transaction)."""
+    if not search_available():
+        return
+    cur.execute("""
+        INSERT INTO purchase_search (rowid, item_name, hsn, party_name, voucher_no)
+        SELECT i.id, i.item_name, i.hsn, v.party_name, v.voucher_no
+        FROM purchase_items i JOIN purchase_vouchers v ON v.id = i.voucher_id
+        WHERE i.voucher_id=?
+    """, (voucher_id,))
+    cur.execute("""
+        SELECT i.item_name, i.hsn, v.party_name, v.voucher_no
+        FROM purchase_items i JOIN purchase_vouchers v ON v.id = i.voucher_id
+        WHERE i.voucher_id=?
+    """, (voucher_id,))
+    terms = {word for row in cur.fetchall() for value in row for word in search_words(str(value or ""))}
+    cur.executemany("INSERT OR IGNORE INTO purchase_search_terms (term) VALUES (?)", [(t,) for t in terms])
+
+
+def unindex_voucher_lines(cur, voucher_id):
+    """Drop a voucher's lines from the search index (call before deleting them)."""
+    if search_available():
+        cur.execute("DELETE FROM purchase_search WHERE rowid IN (SELECT id FROM purchase_items WHERE voucher_id=?)",
+                    (voucher_id,))
+
+
+def search_purchase_lines(text, before_id=None, after_id=None, limit=SEARCH_PAGE_SIZE):
+    """
+    One page of matching purchase lines, newest saved first.
+
+    Args:
+        text: What the user typed; empty lists all lines
+        before_id: Line id of the last row shown - returns the next (older) page
+        after_id: Line id of the first row shown - returns the previous (newer) page
+
+    Returns:
+        list of dicts with RESULT_COLUMNS keys ([] if nothing matches or search is unavailable)
+    """
+    words = search_words(text)
+    if words and not search_available():
+        return []
+    newer = after_id is not None
+    conn = get_connection()
+    try:
+        conditions = []
+        params = []
+        if words:
+            query = build_match_query(words, conn)
+            if query is None:
+                return []
+            source = "purchase_search s JOIN purchase_items i ON i.id = s.rowid"
+            key = "s.rowid"
+            conditions.append("purchase_search MATCH ?")
+            params.append(query)
+        else:
+            source = "purchase_items i"
+            key = "i.id"
+        if newer:
+            conditions.append(f"{key} > ?")
+            params.append(after_id)
+        elif before_id is not None:
+            conditions.append(f"{key} < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        rows = conn.execute(f"""
+            SELECT i.id, i.voucher_id, v.date, v.voucher_no, v.party_name,
+                   i.item_name, i.hsn, i.qty, i.unit, i.price, i.amount
+            FROM {source} JOIN purchase_vouchers v ON v.id = i.voucher_id
+            {where}
+            ORDER BY {key} {'ASC' if newer else 'DESC'} LIMIT ?
+        """, params + [limit]).fetchall()
+    except Exception as e:
+        print(f"Error searching vouchers: {e}")
+        return []
+    finally:
+        conn.close()
+    if newer:
+        rows.reverse()
+    return [dict(zip(RESULT_COLUMNS, row)) for row in rows]
@@ -0,0 +1,231 @@
+"""
+Local storage of saved purchase vouchers (SQLite): purchase_vouchers (header),
+purchase_items and bill_sundry (lines, by voucher_id).
+
+A voucher is written in one transaction - header, then all lines with
+executemany, then its search index rows (database/voucher_search.py) and
+purchase rollups (database/purchase_rollups.py) - and read back with one
+query per table. Vouchers use the
+parse_with_openai schema ('items' / 'bill_sundry'), so a stored voucher can be
+passed straight to open_purchase_voucher(initial_data=...).
+"""
+from datetime import datetime
+from database.db import get_connection
+from database.purchase_rollups import apply_voucher_rollups
+from database.voucher_search import index_voucher_lines, unindex_voucher_lines
+from utils.invoice_templates import normalize_date
+
+ITEM_COLUMNS = ("item_name", "tax_category", "hsn", "qty", "unit", "list_price", "discount", "price", "amount")
+BILL_SUNDRY_COLUMNS = ("name", "percentage", "amount", "nature")
+
+
+def _item_row(voucher_id, item):
+    return (voucher_id,) + tuple(item.get(column, "") for column in ITEM_COLUMNS)
+
+
+def _bill_sundry_row(voucher_id, bs):
+    return (voucher_id, bs.get("name", ""), bs.get("percentage", 0), bs.get("amount", 0), bs.get("nature", ""))
+
+
+def save_voucher(voucher, voucher_id=None):
+    """
+    Insert a voucher, or replace the stored voucher_id, in a single transaction.
+
+    Args:
+        voucher: dict with 'date', 'series', 'voucher_no', 'purchase_type', 'party_name',
+                 'grand_total', 'items' and 'bill_sundry' (parse_with_openai schema; bill
+                 sundries may carry 'nature')
+        voucher_id: id returned by an earlier save of the same voucher
+
+    Returns:
+        int: the voucher id, or None if the save failed
+    """
+    header = (
+        # Stored as YYYY-MM-DD so the date index serves range queries
+        normalize_date(voucher.get("date")) or voucher.get("date", ""),
+        voucher.get("series", ""),
+        voucher.get("voucher_no", ""),
+        voucher.get("purchase_type", ""),
+        voucher.get("party_name", ""),
+        voucher.get("grand_total", 0),
+        datetime.now().isoformat(timespec="seconds"),
+    )
+    conn = get_connection()
+    try:
+        with conn:
+            cur = conn.cursor()
+            if voucher_id is not None:
+                cur.execute("""
+                    UPDATE purchase_vouchers
+                    SET date=?, series=?, voucher_no=?, purchase_type=?, party_name=?, grand_total=?, saved_at=?
+                    WHERE id=?
+                """, header + (voucher_id,))
+                if cur.rowcount:
+                    unindex_voucher_lines(cur, voucher_id)
+                    cur.execute("DELETE FROM purchase_items WHERE voucher_id=?", (voucher_id,))
+                    cur.execute("DELETE FROM bill_sundry WHERE voucher_id=?", (voucher_id,))
+                else:
+                    voucher_id = None
+            if voucher_id is None:
+                cur.execute("""
+                    INSERT INTO purchase_vouchers (date, series, voucher_no, purchase_type, party_name, grand_total, saved_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, header)
+                voucher_id = cur.lastrowid
+
+            cur.executemany("""
+                INSERT INTO purchase_items (voucher_id, item_name, tax_category, hsn, qty, unit, list_price, discount, price, amount)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [_item_row(voucher_id, item) for item in voucher.get("items") or []])
+            index_voucher_lines(cur, voucher_id)
+            apply_voucher_rollups(cur, voucher_id, dict(voucher, date=header[0]))
+            cur.executemany("""
+                INSERT INTO bill_sundry (voucher_id, name, percentage, amount, nature)
+                VALUES (?, ?, ?, ?, ?)
+            """, [_bill_sundry_row(voucher_id, bs) for bs in voucher.get("bill_sundry") or []])
+        return voucher_id
+    except Exception as e:
+        print(f"Error saving voucher: {e}")
+        return None
+    finally:
+        conn.close()
+
+
+def load_voucher(voucher_id):
+    """
+    Read a stored voucher back (one query per table).
+
+    Returns:
+        dict in the save_voucher schema plus 'id', or None if it doesn't exist
+    """
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("""
+            SELECT id, date, series, voucher_no, purchase_type, party_name, grand_total
+            FROM purchase_vouchers WHERE id=?
+        """, (voucher_id,))
+        row = cur.fetchone()
+        if not row:
+            return None
+        cur.execute(f"SELECT {', '.join(ITEM_COLUMNS)} FROM purchase_items WHERE voucher_id=? ORDER BY id", (voucher_id,))
+        items = [dict(zip(ITEM_COLUMNS, r)) for r in cur.fetchall()]
+        cur.execute(f"SELECT {', '.join(BILL_SUNDRY_COLUMNS)} FROM bill_sundry WHERE voucher_id=? ORDER BY id", (voucher_id,))
+        bill_sundry = [dict(zip(BILL_SUNDRY_COLUMNS, r)) for r in cur.fetchall()]
+    except Exception as e:
+        print(f"Error loading voucher: {e}")
+        return None
+    finally:
+        conn.close()
+
+    return {
+        'id': row[0],
+        'date': row[1] or "",
+        'series': row[2] or "",
+        'voucher_no': row[3] or "",
+        'purchase_type': row[4] or "",
+        'party_name': row[5] or "",
+        'grand_total': row[6] or 0,
+        'items': items,
+        'bill_sundry': bill_sundry,
+    }
+
+
+def list_vouchers(party_name=None, date_from=None, date_to=None, limit=100):
+    """
+    Newest stored vouchers, optionally for one party and/or a date range (YYYY-MM-DD).
+
+    Returns:
+        list of dicts: {'id', 'date', 'voucher_no', 'party_name', 'grand_total'}
+    """
+    conditions = []
+    params = []
+    if party_name:
+        conditions.append("party_name=?")
+        params.append(party_name)
+    if date_from:
+        conditions.append("date>=?")
+        params.append(date_from)
+    if date_to:
+        conditions.append("date<=?")
+        params.append(date_to)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT id, date, voucher_no, party_name, grand_total
+            FROM purchase_vouchers {where}
+            ORDER BY date DESC, id DESC LIMIT ?
+        """, params + [limit])
+        rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error listing vouchers: {e}")
+        return []
+    finally:
+        conn.close()
+    return [
+        {'id': r[0], 'date': r[1], 'voucher_no': r[2], 'party_name': r[3], 'grand_total': r[4] or 0}
+        for r in rows
+    ]
+
+
+def load_vouchers(date_from=None, date_to=None, voucher_ids=None):
+    """
+    Read many stored vouchers at once (one query per table), e.g. a day's vouchers
+    for the SQL Server staging job.
+
+    Args:
+        date_from, date_to: YYYY-MM-DD range (inclusive), or
+        voucher_ids: explicit ids
+
+    Returns:
+        list of voucher dicts (load_voucher schema), ordered by date and id
+    """
+    if voucher_ids is not None:
+        voucher_ids = list(voucher_ids)
+        if not voucher_ids:
+            return []
+        where = f"id IN ({', '.join('?' * len(voucher_ids))})"
+        params = voucher_ids
+    else:
+        where = "date>=? AND date<=?"
+        params = [date_from or "", date_to or "9999-12-31"]
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute(f"""
+            SELECT id, date, series, voucher_no, purchase_type, party_name, grand_total
+            FROM purchase_vouchers WHERE {where} ORDER BY date, id
+        """, params)
+        headers = cur.fetchall()
+        cur.execute(f"""
+            SELECT voucher_id, {', '.join(ITEM_COLUMNS)} FROM purchase_items
+            WHERE voucher_id IN (SELECT id FROM purchase_vouchers WHERE {where}) ORDER BY id
+        """, params)
+        item_rows = cur.fetchall()
+        cur.execute(f"""
+            SELECT voucher_id, {', '.join(BILL_SUNDRY_COLUMNS)} FROM bill_sundry
+            WHERE voucher_id IN (SELECT id FROM purchase_vouchers WHERE {where}) ORDER BY id
+        """, params)
+        bs_rows = cur.fetchall()
+    except Exception as e:
+        print(f"Error loading vouchers: {e}")
+        return []
+    finally:
+        conn.close()
+
+    vouchers = {}
+    for row in headers:
+        vouchers[row[0]] = {
+            'id': row[0], 'date': row[1] or "", 'series': row[2] or "", 'voucher_no': row[3] or "",
+            'purchase_type': row[4] or "", 'party_name': row[5] or "", 'grand_total': row[6] or 0,
+            'items': [], 'bill_sundry': [],
+        }
+    for row in item_rows:
+        vouchers[row[0]]['items'].append(dict(zip(ITEM_COLUMNS, row[1:])))
+    for row in bs_rows:
+        vouchers[row[0]]['bill_sundry'].append(dict(zip(BILL_SUNDRY_COLUMNS, row[1:])))
+    return list(vouchers.values())
@@ -1,5 +1,6 @@
 import sys
 import os
+import multiprocessing
 import tkinter as tk
 from ui.main_window import MainWindow
 
@@ -14,4 +15,6 @@ def main():
     root.mainloop()
 
 if __name__ == "__main__":
+    # Needed for the OCR worker processes in the frozen (PyInstaller) build
+    multiprocessing.freeze_support()
     main()
@@ -0,0 +1,8 @@
+import os
+import tempfile
+
+import database.db as db
+
+# Some modules create their tables on import (ui.api_config); tests never touch the working copy's mini_b.db
+_tmp = tempfile.TemporaryDirectory()
+db.DB_NAME = os.path.join(_tmp.name, "test.db")
@@ -0,0 +1,33 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import database.db as db
+
+
+class TempDatabaseTestCase(unittest.TestCase):
+    """Runs each test against a fresh local database (create_tables) in a temporary directory."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patch = mock.patch.object(db, "DB_NAME", os.path.join(tmp.name, "test.db"))
+        patch.start()
+        self.addCleanup(patch.stop)
+        db.create_tables()
+
+
+def sample_voucher(voucher_no="INV-1", date="2024-04-05", party_name="ACME SUPPLIES", items=None, bill_sundry=None):
+    """A voucher in the save_voucher schema; items are (item_name, qty, price) tuples."""
+    items = [("Bolt M8", 10, 20.0), ("Nut M8", 20, 5.0)] if items is None else items
+    rows = [{"item_name": name, "tax_category": "GST 18%", "hsn": "7318", "qty": qty, "unit": "PCS",
+             "list_price": price, "discount": "", "price": price, "amount": round(qty * price, 2)}
+            for name, qty, price in items]
+    bill_sundry = [{"name": "Freight", "percentage": 0, "amount": 50.0, "nature": "Additive"}] \
+        if bill_sundry is None else bill_sundry
+    return {
+        "date": date, "series": "Main", "voucher_no": voucher_no, "purchase_type": "Local-MultiRate",
+        "party_name": party_name, "items": rows, "bill_sundry": bill_sundry,
+        "grand_total": sum(r["amount"] for r in rows) + sum(bs["amount"] for bs in bill_sundry),
+    }
@@ -0,0 +1,84 @@
+import contextlib
+import io
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import utils.ai_utils as ai_utils
+
+
+class FakeClient:
+    """Answers each chat completion with the next canned response."""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.prompts = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model, messages, extra_headers=None):
+        self.prompts.append(messages[-1]["content"])
+        content = self.responses.pop(0)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+def invoice_text(voucher_no, length=200):
+    return f"Invoice No: {voucher_no}\n" + "Bolt M8 10 20.00 200.00\n" * (length // 24)
+
+
+def parsed(invoice_id, voucher_no):
+    return {"invoice_id": invoice_id, "voucher_no": voucher_no, "party_name": "ACME",
+            "items": [{"item_name": "Bolt M8", "qty": 10, "price": 20, "amount": 200}], "bill_sundry": []}
+
+
+class PackBatchesTest(unittest.TestCase):
+    def test_short_texts_share_batches_long_texts_go_alone(self):
+        texts = ["a" * 100, "b" * 3000, "c" * 100, "d" * 100]
+        self.assertEqual(ai_utils.pack_batches(texts), [[1], [0, 2, 3]])
+
+    def test_batches_respect_invoice_and_character_limits(self):
+        self.assertEqual(ai_utils.pack_batches(["x" * 10] * 5, max_invoices=2), [[0, 1], [2, 3], [4]])
+        self.assertEqual(ai_utils.pack_batches(["x" * 600] * 4, limit=1000, max_chars=1300), [[0, 1], [2, 3]])
+
+
+class RequestInvoiceBatchTest(unittest.TestCase):
+    def request(self, invoices, entries):
+        client = FakeClient([json.dumps({"invoices": invoices})])
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ai_utils.request_invoice_batch(client, entries)
+
+    def test_response_is_split_per_invoice(self):
+        entries = [("INV1", invoice_text("A-1")), ("INV2", invoice_text("B-2"))]
+        results = self.request([parsed("INV2", "B-2"), parsed("INV1", "A-1")], entries)
+        self.assertEqual(results["INV1"]["voucher_no"], "A-1")
+        self.assertEqual(results["INV2"]["voucher_no"], "B-2")
+        self.assertNotIn("invoice_id", results["INV1"])
+
+    def test_swapped_duplicated_and_unknown_ids_are_dropped(self):
+        entries = [("INV1", invoice_text("A-1")), ("INV2", invoice_text("B-2")), ("INV3", invoice_text("C-3"))]
+        results = self.request([parsed("INV1", "B-2"), parsed("INV2", "B-2"), parsed("INV2", "B-2"),
+                                parsed("INV3", "C-3"), parsed("INV9", "Z-9")], entries)
+        self.assertEqual(list(results), ["INV3"])
+
+
+class ParseInvoicesBatchedTest(unittest.TestCase):
+    def test_invoices_missing_from_a_batch_are_parsed_individually(self):
+        texts = [invoice_text("A-1"), invoice_text("B-2"), invoice_text("C-3")]
+        client = FakeClient([json.dumps({"invoices": [parsed("INV1", "A-1"), parsed("INV3", "C-3")]})])
+        individual = []
+
+        def fake_single(text, **kwargs):
+            individual.append(text)
+            return {"voucher_no": "B-2", "items": []}
+
+        with mock.patch.object(ai_utils, "get_ai_client", lambda *args: client), \
+                mock.patch.object(ai_utils, "parse_with_openai", fake_single), \
+                contextlib.redirect_stdout(io.StringIO()):
+            results = ai_utils.parse_invoices_batched(texts, api_key="key")
+        self.assertEqual([r["voucher_no"] for r in results], ["A-1", "B-2", "C-3"])
+        self.assertEqual(individual, [texts[1]])
+        self.assertEqual(len(client.prompts), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+import utils.ai_utils as ai_utils
+from utils.invoice_validation import validate_invoice
+
+TIERS = [
+    {"model": "fast", "input_cost": 0.1, "output_cost": 0.4},
+    {"model": "strong", "input_cost": 2.0, "output_cost": 8.0},
+]
+
+
+def invoice(amount=200.0, grand_total=250.0):
+    return {
+        "party_name": "ACME SUPPLIES", "voucher_no": "INV-1", "date": "2024-04-05",
+        "items": [{"item_name": "Bolt M8", "qty": 10, "price": 20, "amount": amount, "tax_category": "GST 18%"}],
+        "bill_sundry": [{"name": "Freight", "amount": 50}],
+        "grand_total": grand_total,
+    }
+
+
+class ValidateInvoiceTest(unittest.TestCase):
+    def test_consistent_invoice_passes(self):
+        self.assertEqual(validate_invoice(invoice()), [])
+
+    def test_amount_with_tax_included_passes(self):
+        self.assertEqual(validate_invoice(invoice(amount=236.0, grand_total=286.0)), [])
+
+    def test_line_and_total_mismatches_are_reported(self):
+        problems = validate_invoice(invoice(amount=150.0))
+        self.assertTrue(any("qty x price" in p for p in problems))
+        self.assertTrue(any("do not add up" in p for p in problems))
+
+    def test_missing_header_fields(self):
+        data = invoice()
+        data["voucher_no"] = ""
+        self.assertEqual(validate_invoice(data), ["missing voucher_no"])
+        self.assertEqual(validate_invoice(data, require_header=False), [])
+
+
+class ParseWithCascadeTest(unittest.TestCase):
+    def setUp(self):
+        patch = mock.patch.dict(ai_utils.cascade_stats, clear=True)
+        patch.start()
+        self.addCleanup(patch.stop)
+
+    def cascade(self, answers):
+        calls = []
+
+        def fake_request(client, text, model):
+            calls.append(model)
+            answer = answers[model]
+            if isinstance(answer, Exception):
+                raise answer
+            return answer, None
+
+        with mock.patch.object(ai_utils, "request_invoice", fake_request), \
+                contextlib.redirect_stdout(io.StringIO()):
+            return ai_utils.parse_with_cascade("invoice text", tiers=TIERS, api_key="key"), calls
+
+    def test_valid_answer_from_the_first_tier_stops_the_cascade(self):
+        data, calls = self.cascade({"fast": invoice(), "strong": invoice()})
+        self.assertEqual(data, invoice())
+        self.assertEqual(calls, ["fast"])
+        self.assertEqual(ai_utils.cascade_stats["fast"]["accepted"], 1)
+
+    def test_invalid_answer_escalates(self):
+        data, calls = self.cascade({"fast": invoice(amount=150.0), "strong": invoice()})
+        self.assertEqual(data, invoice())
+        self.assertEqual(calls, ["fast", "strong"])
+        self.assertEqual(ai_utils.cascade_stats["fast"]["accepted"], 0)
+
+    def test_strongest_answer_is_kept_when_every_tier_fails_validation(self):
+        data, _ = self.cascade({"fast": invoice(amount=150.0), "strong": invoice(amount=160.0)})
+        self.assertEqual(data, invoice(amount=160.0))
+
+    def test_error_on_every_tier_returns_the_last_error(self):
+        data, _ = self.cascade({"fast": ValueError("down"), "strong": ValueError("still down")})
+        self.assertIsInstance(data, str)
+        self.assertIn("still down", data)
+        self.assertEqual(ai_utils.cascade_stats["strong"]["errors"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
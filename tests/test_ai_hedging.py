@@ -0,0 +1,58 @@
+import asyncio
+import importlib
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import database.db as db
+
+ai_utils = None
+_tmp = tempfile.TemporaryDirectory()
+
+
+def setUpModule():
+    # ui.api_config creates its tables on import: keep them out of the working copy's database
+    global ai_utils
+    with mock.patch.object(db, "DB_NAME", os.path.join(_tmp.name, "test.db")):
+        ai_utils = importlib.import_module("utils.ai_utils")
+
+
+def tearDownModule():
+    _tmp.cleanup()
+
+
+async def fake_request(client, text, model):
+    start = time.perf_counter()
+    await asyncio.sleep(0.3 if model == "slow" else 0.01)
+    return {"model": model}, time.perf_counter() - start
+
+
+class HedgedRequestTest(unittest.TestCase):
+    def setUp(self):
+        self.histograms = {"primary": ai_utils.LatencyHistogram(), "hedged": ai_utils.LatencyHistogram()}
+        patches = [
+            mock.patch.object(ai_utils, "_request_invoice_async", fake_request),
+            mock.patch.dict(ai_utils.latency_histograms, self.histograms),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_cancelled_primary_is_recorded_as_a_lower_bound(self):
+        data = ai_utils.run_async(ai_utils._hedged("text", "key", None, "slow", "fast", 0.05))
+        self.assertEqual(data, {"model": "fast"})
+        primary = ai_utils.latency_histograms["primary"]
+        self.assertEqual(len(primary), 1)
+        # At least the hedge delay plus the hedge's own latency
+        self.assertGreaterEqual(primary.percentile(0.5), 0.06)
+
+    def test_primary_win_records_its_latency(self):
+        data = ai_utils.run_async(ai_utils._hedged("text", "key", None, "fast", "slow", 0.05))
+        self.assertEqual(data, {"model": "fast"})
+        self.assertLess(ai_utils.latency_histograms["primary"].percentile(0.5), 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
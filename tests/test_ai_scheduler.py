@@ -0,0 +1,101 @@
+import contextlib
+import io
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import utils.ai_utils as ai_utils
+from utils.json_repair import InvoiceDecodeError
+
+
+def status_error(code):
+    error = ai_utils.APIStatusError.__new__(ai_utils.APIStatusError)
+    error.status_code = code
+    return error
+
+
+class TokenBucketTest(unittest.TestCase):
+    def test_burst_then_waits_for_refill(self):
+        bucket = ai_utils.TokenBucket(rate=20, capacity=2)
+        self.assertEqual(bucket.acquire(), 0.0)
+        self.assertEqual(bucket.acquire(), 0.0)
+        start = time.monotonic()
+        self.assertGreater(bucket.acquire(), 0.0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.04)
+
+    def test_request_larger_than_capacity_is_capped(self):
+        bucket = ai_utils.TokenBucket(rate=1000, capacity=5)
+        bucket.acquire(50)
+        self.assertLess(bucket._tokens, 1)
+
+
+class RetryPolicyTest(unittest.TestCase):
+    def test_retryable_errors(self):
+        self.assertTrue(ai_utils.is_retryable_error(status_error(429)))
+        self.assertTrue(ai_utils.is_retryable_error(status_error(503)))
+        self.assertTrue(ai_utils.is_retryable_error(InvoiceDecodeError("bad json")))
+        self.assertFalse(ai_utils.is_retryable_error(status_error(400)))
+        self.assertFalse(ai_utils.is_retryable_error(ValueError("bad request")))
+
+    def test_backoff_honours_retry_after_and_caps_jitter(self):
+        scheduler = ai_utils.AIRequestScheduler(api_key="key", base_delay=1.0, max_delay=5.0)
+        self.addCleanup(scheduler.shutdown)
+        retry_after = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "3"}))
+        self.assertEqual(scheduler._backoff(0, retry_after), 3.0)
+        self.assertEqual(scheduler._backoff(0, SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "60"}))), 5.0)
+        for attempt in range(6):
+            self.assertLessEqual(scheduler._backoff(attempt, ValueError()), min(5.0, 2 ** attempt))
+
+
+class SchedulerRunTest(unittest.TestCase):
+    def run_batch(self, responses, texts, **options):
+        calls = []
+
+        def fake_request(client, text, model):
+            calls.append(text)
+            response = responses[text].pop(0)
+            if isinstance(response, Exception):
+                raise response
+            return response
+
+        scheduler = ai_utils.AIRequestScheduler(api_key="key", base_delay=0.001, max_delay=0.01, **options)
+        self.addCleanup(scheduler.shutdown)
+        with mock.patch.object(ai_utils, "request_invoice_json", fake_request), \
+                contextlib.redirect_stdout(io.StringIO()):
+            return scheduler.run_batch(texts), calls
+
+    def test_transient_failure_is_retried(self):
+        results, calls = self.run_batch({"a": [InvoiceDecodeError("cut off"), {"voucher_no": "A"}]}, ["a"])
+        self.assertEqual(results[0]["data"], {"voucher_no": "A"})
+        self.assertIsNone(results[0]["error"])
+        self.assertEqual(results[0]["attempts"], 2)
+        self.assertEqual(calls, ["a", "a"])
+
+    def test_permanent_failure_is_not_retried(self):
+        results, calls = self.run_batch({"a": [ValueError("rejected")]}, ["a"])
+        self.assertIsNone(results[0]["data"])
+        self.assertIn("rejected", results[0]["error"])
+        self.assertEqual(results[0]["attempts"], 1)
+
+    def test_retries_stop_at_max_retries(self):
+        results, calls = self.run_batch({"a": [InvoiceDecodeError("cut off")] * 3}, ["a"], max_retries=2)
+        self.assertEqual(results[0]["attempts"], 3)
+        self.assertIsNotNone(results[0]["error"])
+
+    def test_results_keep_input_order(self):
+        responses = {text: [{"voucher_no": text}] for text in "abcdef"}
+        results, _ = self.run_batch(responses, list("abcdef"), max_concurrency=3, requests_per_minute=6000)
+        self.assertEqual([r["data"]["voucher_no"] for r in results], list("abcdef"))
+
+    def test_requests_are_paced_by_the_request_bucket(self):
+        responses = {text: [{"voucher_no": text}] for text in "abcde"}
+        start = time.perf_counter()
+        # 20 requests/s with no burst beyond one in flight: four waits of 50 ms
+        results, _ = self.run_batch(responses, list("abcde"), max_concurrency=1, requests_per_minute=1200)
+        self.assertGreaterEqual(time.perf_counter() - start, 0.18)
+        self.assertGreater(sum(r["wait_s"] for r in results), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import contextlib
+import io
+import unittest
+
+from database.sql_server import load_busy_purchase_voucher
+from tools.bench_busy_voucher_load import RoundTripConnection, busy_standin, load_per_line
+
+LINE_FIELDS = ("item_name", "unit", "tax_category", "qty", "price", "amount")
+
+
+class BusyVoucherLoadTest(unittest.TestCase):
+    def setUp(self):
+        self.db = busy_standin(lines=25, bill_sundries=3, n_items=200)
+        self.addCleanup(self.db.close)
+        self.conn = RoundTripConnection(self.db, 0)
+
+    def load(self, *args, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return load_busy_purchase_voucher(*args, conn=self.conn, **kwargs)
+
+    def test_voucher_loads_in_two_queries(self):
+        voucher = self.load("PB-101")
+        self.assertEqual(self.conn.round_trips, 2)
+        self.assertEqual(voucher["busy_vch_code"], "7")
+        self.assertEqual((voucher["date"], voucher["series"], voucher["party_name"], voucher["purchase_type"]),
+                         ("05-04-2024", "Main", "Gupta Traders", "Local-MultiRate"))
+
+    def test_lines_match_per_line_lookups(self):
+        voucher = self.load("PB-101")
+        expected = load_per_line(RoundTripConnection(self.db, 0))
+        self.assertEqual([tuple(item[f] for f in LINE_FIELDS) for item in voucher["items"]],
+                         [tuple(item[f] for f in LINE_FIELDS) for item in expected["items"]])
+        self.assertEqual(voucher["bill_sundry"], expected["bill_sundry"])
+
+    def test_bill_sundry_nature_follows_i1(self):
+        bill_sundry = self.load("PB-101")["bill_sundry"]
+        self.assertEqual([(bs["name"], bs["nature"], bs["amount"]) for bs in bill_sundry],
+                         [("Freight", "Additive", 25.0), ("Discount", "Subtractive", 50.0),
+                          ("Freight", "Additive", 75.0)])
+
+    def test_date_and_series_filters(self):
+        self.assertEqual(self.load("PB-101", "2024-04-05", "Main")["busy_vch_code"], "7")
+        self.assertIn("was not found", self.load("PB-101", "2024-04-06"))
+        self.assertIn("was not found", self.load("PB-101", series="Branch"))
+        self.assertEqual(self.load("PB-101", "05-04-2024"), "Invalid date: 05-04-2024")
+
+    def test_missing_voucher_number(self):
+        self.assertEqual(self.load("  "), "Enter the voucher number.")
+        self.assertIn("was not found", self.load("PB-999"))
+
+
+if __name__ == "__main__":
+    unittest.main()
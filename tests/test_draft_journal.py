@@ -0,0 +1,86 @@
+import unittest
+from unittest import mock
+
+import database.draft_journal as draft_journal
+from database.draft_journal import DraftJournal, apply_record, discard_all_drafts, list_drafts, load_draft
+from tests.support import TempDatabaseTestCase
+
+
+def row(name):
+    return {"item_name": name, "qty": 1}
+
+
+class ApplyRecordTest(unittest.TestCase):
+    def test_row_operations(self):
+        state = {"items": [], "bill_sundry": []}
+        for record in [
+            {"op": "item_add", "row": row("A")},
+            {"op": "item_add", "row": row("C")},
+            {"op": "item_insert", "index": 1, "row": row("B")},
+            {"op": "item_set", "index": 2, "row": row("D")},
+            {"op": "item_delete", "index": 0},
+            {"op": "item_delete", "index": 9},
+            {"op": "bs_add", "row": {"name": "Freight"}},
+            {"op": "header", "key": "party_name", "value": "ACME"},
+        ]:
+            apply_record(state, record)
+        self.assertEqual([r["item_name"] for r in state["items"]], ["B", "D"])
+        self.assertEqual(state["bill_sundry"], [{"name": "Freight"}])
+        self.assertEqual(state["party_name"], "ACME")
+
+    def test_snapshot_replaces_everything(self):
+        state = {"items": [row("A")], "bill_sundry": [], "party_name": "ACME"}
+        apply_record(state, {"op": "snapshot", "state": {"voucher_no": "INV-1", "items": [row("B")]}})
+        self.assertEqual(state, {"items": [row("B")], "bill_sundry": [], "voucher_no": "INV-1"})
+
+
+class DraftJournalTest(TempDatabaseTestCase):
+    def journal(self):
+        journal = DraftJournal()
+        self.addCleanup(journal.close)
+        return journal
+
+    def test_empty_window_leaves_no_draft(self):
+        self.journal()
+        self.assertEqual(list_drafts(), [])
+
+    def test_draft_replays_to_the_window_state(self):
+        journal = self.journal()
+        journal.record("header", key="party_name", value="ACME")
+        journal.record("item_add", row=row("A"))
+        journal.record("item_add", row=row("B"))
+        journal.record("item_delete", index=0)
+        self.assertEqual(load_draft(journal.draft_id), journal.state)
+        self.assertEqual(list_drafts()[0]["records"], 4)
+
+    def test_compaction_keeps_one_snapshot(self):
+        journal = self.journal()
+        with mock.patch.object(draft_journal, "JOURNAL_COMPACT_EVERY", 3):
+            for name in "ABCDE":
+                journal.record("item_add", row=row(name))
+        self.assertEqual(list_drafts()[0]["records"], 3)   # snapshot after C, then D and E
+        self.assertEqual([r["item_name"] for r in load_draft(journal.draft_id)["items"]], list("ABCDE"))
+
+    def test_saved_voucher_has_no_draft_until_the_next_edit(self):
+        journal = self.journal()
+        journal.record("item_add", row=row("A"))
+        journal.mark_saved({"items": [row("A")], "bill_sundry": [], "voucher_no": "INV-1"})
+        self.assertEqual(list_drafts(), [])
+        journal.record("item_add", row=row("B"))
+        # The draft starts again from the whole voucher, not just the edit
+        self.assertEqual(load_draft(journal.draft_id),
+                         {"items": [row("A"), row("B")], "bill_sundry": [], "voucher_no": "INV-1"})
+
+    def test_discard(self):
+        kept, closed = self.journal(), self.journal()
+        kept.record("item_add", row=row("A"))
+        closed.record("item_add", row=row("B"))
+        closed.discard()
+        self.assertEqual([d["draft_id"] for d in list_drafts()], [kept.draft_id])
+        discard_all_drafts()
+        self.assertEqual(list_drafts(), [])
+        self.assertIsNone(load_draft(kept.draft_id))
+
+
+if __name__ == "__main__":
+    unittest.main()
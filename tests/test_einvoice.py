@@ -0,0 +1,105 @@
+import base64
+import json
+import os
+import tempfile
+import unittest
+
+from database.invoice_templates import save_invoice_template
+from tests.support import TempDatabaseTestCase
+from utils.einvoice import (apply_einvoice_header, decode_jwt_payload, einvoice_header_fields, einvoice_to_invoice,
+                            load_einvoice_json, parse_einvoice_qr)
+
+SELLER = "27ABCDE1234F1Z5"
+BUYER_LOCAL = "27ZZZZZ9999Z1Z5"
+BUYER_OTHER_STATE = "29ZZZZZ9999Z1Z5"
+
+
+def jwt(claims):
+    def part(obj):
+        return base64.urlsafe_b64encode(json.dumps(obj).encode()).decode().rstrip("=")
+    return f"{part({'alg': 'RS256'})}.{part(claims)}.c2lnbmF0dXJl"
+
+
+def qr_token(buyer=BUYER_LOCAL):
+    data = {"SellerGstin": SELLER, "BuyerGstin": buyer, "DocNo": "INV/101", "DocDt": "05/04/2024",
+            "TotInvVal": 1180, "ItemCnt": 2, "MainHsnCode": "7318", "Irn": "a" * 64}
+    return jwt({"data": json.dumps(data), "iss": "NIC"})
+
+
+DOCUMENT = {
+    "DocDtls": {"Typ": "INV", "No": "INV/101", "Dt": "05/04/2024"},
+    "SellerDtls": {"Gstin": SELLER, "LglNm": "Acme Supplies Pvt Ltd", "TrdNm": "Acme Supplies"},
+    "BuyerDtls": {"Gstin": BUYER_OTHER_STATE, "Pos": "29"},
+    "ItemList": [
+        {"PrdDesc": "Bolt M8", "HsnCd": "7318", "Qty": 10, "Unit": "NOS", "UnitPrice": 20, "TotAmt": 200,
+         "Discount": 20, "AssAmt": 180, "GstRt": 18},
+        {"PrdDesc": "Nut M8", "HsnCd": "7318", "Qty": 20, "Unit": "NOS", "UnitPrice": 10, "TotAmt": 200,
+         "Discount": 0, "AssAmt": 200, "GstRt": 18},
+    ],
+    "ValDtls": {"AssVal": 380, "IgstVal": 68.4, "RndOffAmt": -0.4, "TotInvVal": 448},
+}
+
+
+class EInvoiceQrTest(TempDatabaseTestCase):
+    def test_qr_payload_is_decoded(self):
+        qr = parse_einvoice_qr(qr_token())
+        self.assertEqual(qr["seller_gstin"], SELLER)
+        self.assertEqual(qr["voucher_no"], "INV/101")
+        self.assertEqual(qr["date"], "2024-04-05")
+        self.assertEqual(qr["grand_total"], 1180.0)
+        self.assertEqual(qr["item_count"], 2)
+
+    def test_other_qr_codes_are_ignored(self):
+        self.assertIsNone(parse_einvoice_qr("upi://pay?pa=acme@bank"))
+        self.assertIsNone(parse_einvoice_qr(jwt({"sub": "someone"})))
+        self.assertIsNone(decode_jwt_payload("a.!!!.c"))
+
+    def test_header_fields_take_the_party_from_a_learned_template(self):
+        save_invoice_template("acme supplies", "ACME SUPPLIES", SELLER, {})
+        fields = einvoice_header_fields(parse_einvoice_qr(qr_token()))
+        self.assertEqual(fields["party_name"], "ACME SUPPLIES")
+        self.assertEqual(fields["purchase_type"], "Local-MultiRate")
+        self.assertEqual(einvoice_header_fields(parse_einvoice_qr(qr_token(BUYER_OTHER_STATE)))["purchase_type"],
+                         "Central-MultiRate")
+
+    def test_qr_header_overrides_parse_but_keeps_its_purchase_type_variant(self):
+        data = {"voucher_no": "INV-1O1", "date": "2024-05-04", "purchase_type": "Local-ItemWise", "items": []}
+        apply_einvoice_header(data, parse_einvoice_qr(qr_token(BUYER_OTHER_STATE)))
+        self.assertEqual(data["voucher_no"], "INV/101")
+        self.assertEqual(data["date"], "2024-04-05")
+        self.assertEqual(data["purchase_type"], "Central-ItemWise")
+
+
+class EInvoiceJsonTest(TempDatabaseTestCase):
+    def test_document_maps_to_a_voucher(self):
+        invoice = einvoice_to_invoice(DOCUMENT)
+        self.assertEqual(invoice["party_name"], "Acme Supplies")
+        self.assertEqual(invoice["purchase_type"], "Central-MultiRate")
+        bolt = invoice["items"][0]
+        self.assertEqual((bolt["qty"], bolt["price"], bolt["amount"], bolt["discount"]), (10, 18.0, 180.0, 10.0))
+        self.assertEqual(invoice["bill_sundry"], [{"name": "IGST", "percentage": 0, "amount": 68.4},
+                                                  {"name": "Round Off", "percentage": 0, "amount": -0.4}])
+        self.assertEqual(invoice["grand_total"], 448.0)
+
+    def test_irp_responses_with_signed_invoices_are_read(self):
+        path = os.path.join(self.tmp_dir(), "einvoice.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump([{"Status": 1, "Data": json.dumps({"SignedInvoice": jwt({"data": json.dumps(DOCUMENT)})})},
+                       DOCUMENT], f)
+        invoices = load_einvoice_json(path)
+        self.assertEqual([i["voucher_no"] for i in invoices], ["INV/101", "INV/101"])
+
+    def test_file_without_invoices_is_an_error(self):
+        path = os.path.join(self.tmp_dir(), "other.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"hello": "world"}, f)
+        self.assertIsInstance(load_einvoice_json(path), str)
+
+    def tmp_dir(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        return tmp.name
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from database.invoice_fingerprints import (KIND_FILE, KIND_INVOICE, backfill_invoice_fingerprints,
+                                           file_fingerprint, find_duplicates, invoice_fingerprint,
+                                           record_fingerprints, segment_fingerprint, voucher_fingerprint)
+from database.vouchers import save_voucher
+from tests.support import TempDatabaseTestCase, sample_voucher
+
+
+class InvoiceFingerprintTest(unittest.TestCase):
+    def test_header_variants_share_a_fingerprint(self):
+        fp = invoice_fingerprint("ACME Traders Pvt. Ltd.", "INV/0042", "05-04-2024", 1180.4)
+        self.assertEqual(invoice_fingerprint("M/s Acme Traders", "inv-42", "2024-04-05", "1180"), fp)
+        self.assertNotEqual(invoice_fingerprint("ACME Traders", "INV-43", "2024-04-05", 1180), fp)
+        self.assertNotEqual(invoice_fingerprint("ACME Traders", "INV-42", "2024-04-05", 1181), fp)
+
+    def test_missing_party_or_number(self):
+        self.assertIsNone(invoice_fingerprint("", "INV-1", "2024-04-05", 100))
+        self.assertIsNone(invoice_fingerprint("ACME", None, "2024-04-05", 100))
+
+    def test_each_segment_of_a_file_has_its_own_fingerprint(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "invoices.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4 two invoices")
+            file_hash = file_fingerprint(path)
+            self.assertIsNone(file_fingerprint(os.path.join(tmp, "missing.pdf")))
+        first, second = segment_fingerprint(file_hash, 1), segment_fingerprint(file_hash, 2)
+        self.assertNotEqual(first, second)
+        self.assertNotIn(file_hash, (first, second))
+        self.assertEqual(segment_fingerprint(file_hash, 1), first)
+        self.assertIsNone(segment_fingerprint(None, 1))
+
+
+class DuplicateLookupTest(TempDatabaseTestCase):
+    def test_saved_invoice_is_found_by_either_fingerprint(self):
+        voucher = sample_voucher()
+        voucher_id = save_voucher(voucher)
+        self.assertTrue(record_fingerprints(voucher_id, voucher_fingerprint(voucher), "filehash", "acme.pdf"))
+
+        by_invoice = find_duplicates(voucher_fingerprint(voucher))
+        self.assertEqual([(d["kind"], d["voucher_id"]) for d in by_invoice], [(KIND_INVOICE, voucher_id)])
+        by_file = find_duplicates(file_hash="filehash")
+        self.assertEqual([(d["kind"], d["source_name"]) for d in by_file], [(KIND_FILE, "acme.pdf")])
+        # A voucher being re-saved doesn't duplicate itself
+        self.assertEqual(find_duplicates(voucher_fingerprint(voucher), "filehash", exclude_voucher_id=voucher_id), [])
+        self.assertEqual(find_duplicates(), [])
+
+    def test_edited_header_replaces_the_invoice_fingerprint(self):
+        voucher = sample_voucher()
+        voucher_id = save_voucher(voucher)
+        record_fingerprints(voucher_id, voucher_fingerprint(voucher), "filehash")
+        edited = dict(voucher, voucher_no="INV-2")
+        record_fingerprints(voucher_id, voucher_fingerprint(edited))
+        self.assertEqual(find_duplicates(voucher_fingerprint(voucher)), [])
+        self.assertEqual(len(find_duplicates(voucher_fingerprint(edited))), 1)
+        # File hashes accumulate
+        self.assertEqual(len(find_duplicates(file_hash="filehash")), 1)
+
+    def test_backfill_fingerprints_vouchers_saved_without_one(self):
+        old = sample_voucher("INV-1")
+        old_id = save_voucher(old)
+        recorded = sample_voucher("INV-2")
+        record_fingerprints(save_voucher(recorded), voucher_fingerprint(recorded))
+        self.assertEqual(backfill_invoice_fingerprints(), 1)
+        self.assertEqual([d["voucher_id"] for d in find_duplicates(voucher_fingerprint(old))], [old_id])
+        self.assertEqual(backfill_invoice_fingerprints(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
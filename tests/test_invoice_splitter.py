@@ -0,0 +1,53 @@
+import contextlib
+import io
+import unittest
+
+from utils.invoice_splitter import split_invoice_pages
+
+
+def page(invoice_no, lines, footer):
+    return "\n".join(["ACME SUPPLIES PVT LTD", "12 Market Road, Pune", f"Invoice No: {invoice_no}  Date: 05-04-2024"]
+                     + lines + [footer])
+
+
+class SplitInvoicePagesTest(unittest.TestCase):
+    def split(self, pages):
+        with contextlib.redirect_stdout(io.StringIO()) as out:
+            groups = split_invoice_pages(pages)
+        return groups, out.getvalue()
+
+    def test_carried_forward_subtotal_keeps_continuation_page(self):
+        pages = [
+            page("INV-101", ["Bolt M8 10 20.00 200.00", "Nut M8 20 20.00 400.00"], "Total c/f 600.00"),
+            page("INV-101", ["Total b/f 600.00", "Washer 10 30.00 300.00"], "Grand Total 900.00"),
+        ]
+        groups, out = self.split(pages)
+        self.assertEqual(groups, [pages])
+        self.assertNotIn("Skipping", out)
+
+    def test_repeated_copy_is_dropped(self):
+        original = page("INV-7", ["Original for Recipient", "Bolt M8 10 20.00 200.00"], "Grand Total 200.00")
+        duplicate = page("INV-7", ["Duplicate for Transporter", "Bolt M8 10 20.00 200.00"], "Grand Total 200.00")
+        groups, out = self.split([original, duplicate])
+        self.assertEqual(groups, [[original]])
+        self.assertIn("Skipping repeated copy of invoice INV-7", out)
+
+    def test_repeated_copy_of_carried_forward_invoice_is_dropped(self):
+        def copy(marker):
+            return [
+                page("INV-101", [marker, "Bolt M8 10 20.00 200.00"], "Total c/f 200.00"),
+                page("INV-101", [marker, "Total b/f 200.00", "Washer 10 30.00 300.00"], "Grand Total 500.00"),
+            ]
+        original, duplicate = copy("Original for Recipient"), copy("Duplicate for Transporter")
+        groups, _ = self.split(original + duplicate)
+        self.assertEqual(groups, [original])
+
+    def test_different_invoices_are_split(self):
+        first = page("INV-1", ["Bolt M8 10 20.00 200.00"], "Grand Total 200.00")
+        second = page("INV-2", ["Nut M8 10 20.00 200.00"], "Grand Total 200.00")
+        groups, _ = self.split([first, second])
+        self.assertEqual(groups, [[first], [second]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import database.db as db
+from utils.invoice_templates import (apply_template, find_template, learn_template, save_learned_template,
+                                     validate_template_result)
+
+SUPPLIER_GSTIN = "27ABCDE1234F1Z5"
+BUYER_GSTIN = "27ZZZZZ9999Z1Z5"
+
+
+def invoice(invoice_no, rows, sub_total, supplier="ACME SUPPLIES PVT LTD", supplier_gstin=SUPPLIER_GSTIN):
+    return "\n".join([
+        supplier,
+        f"GSTIN: {supplier_gstin}",
+        "Buyer: MINI B TRADERS",
+        f"GSTIN: {BUYER_GSTIN}",
+        f"Invoice No: {invoice_no}  Date: 05-04-2024",
+        "Sr Item HSN Qty Unit Rate Amount",
+    ] + rows + [f"Sub Total {sub_total}", "Freight 50.00", "Grand Total 650.00"])
+
+
+FIRST = invoice("INV-101", ["1 Bolt M8 7318 10 Nos 20.00 200.00", "2 Nut M8 7318 20 Nos 20.00 400.00"], "600.00")
+CONFIRMED = {
+    "party_name": "ACME SUPPLIES PVT LTD",
+    "voucher_no": "INV-101",
+    "date": "2024-04-05",
+    "purchase_type": "Local-MultiRate",
+    "items": [
+        {"item_name": "Bolt M8", "hsn": "7318", "qty": 10, "unit": "Nos", "price": 20.0, "amount": 200.0},
+        {"item_name": "Nut M8", "hsn": "7318", "qty": 20, "unit": "Nos", "price": 20.0, "amount": 400.0},
+    ],
+    "bill_sundry": [{"name": "Freight", "percentage": 0, "amount": 50.0}],
+    "grand_total": 650.0,
+}
+
+
+class InvoiceTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.template = learn_template(FIRST, CONFIRMED)
+        self.assertIsNotNone(self.template)
+
+    def test_template_parses_next_invoice_with_shorter_item_names(self):
+        second = invoice("INV-102", ["1 Washer 7318 10 Nos 20.00 200.00", "2 Bolt M8 7318 20 Nos 20.00 400.00"],
+                         "600.00")
+        data = apply_template(self.template, second)
+        self.assertEqual([item["item_name"] for item in data["items"]], ["Washer", "Bolt M8"])
+        self.assertEqual(data["voucher_no"], "INV-102")
+        self.assertEqual(validate_template_result(data), (True, "ok"))
+
+    def test_missed_row_fails_validation(self):
+        # The third row has no rate column, so the template can't read it
+        second = invoice("INV-103", ["1 Washer 7318 10 Nos 20.00 200.00", "2 Bolt M8 7318 20 Nos 20.00 400.00",
+                                     "3 Spring Washer 7318 5 Nos 50.00"], "650.00")
+        data = apply_template(self.template, second)
+        self.assertEqual(len(data["items"]), 2)
+        ok, reason = validate_template_result(data)
+        self.assertFalse(ok)
+        self.assertIn("sub total", reason)
+
+    def test_template_keyed_on_supplier_gstin_only(self):
+        self.assertEqual(self.template["gstin"], SUPPLIER_GSTIN)
+        # The party's name is printed without its GSTIN: the buyer's GSTIN must not be learned
+        text = FIRST.replace(f"GSTIN: {SUPPLIER_GSTIN}\n", "")
+        self.assertIsNone(learn_template(text, CONFIRMED)["gstin"])
+
+
+class FindTemplateTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_name = db.DB_NAME
+        db.DB_NAME = os.path.join(self.tmp.name, "test.db")
+        db.create_tables()
+
+    def tearDown(self):
+        db.DB_NAME = self.db_name
+        self.tmp.cleanup()
+
+    def test_buyer_gstin_does_not_match_another_suppliers_template(self):
+        self.assertTrue(save_learned_template(FIRST, CONFIRMED))
+        other = invoice("B-9", ["1 Pipe 7306 2 Mtr 50.00 100.00"], "100.00", supplier="GUPTA TRADERS",
+                        supplier_gstin="27PQRST5678K1Z2")
+        with contextlib.redirect_stdout(io.StringIO()):
+            self.assertIsNone(find_template(other))
+            self.assertEqual(find_template(invoice("INV-104", [], "0.00"))["party_name"], "ACME SUPPLIES PVT LTD")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import threading
+import unittest
+from unittest import mock
+
+import utils.item_info_cache as item_info_cache
+from utils.item_info_cache import ItemInfoCache
+
+
+class RecordingLoader:
+    """Item loader that records its calls and can be held until release()."""
+
+    def __init__(self, known):
+        self.known = known
+        self.calls = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def __call__(self, names):
+        self.calls.append(sorted(names))
+        self.gate.wait(5)
+        return {name: self.known[name] for name in names if name in self.known}
+
+
+class ItemInfoCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.loader = RecordingLoader({"Bolt M8": {"last_rate": 20.0}, "Nut M8": {"last_rate": 5.0}})
+        self.party_loader = mock.Mock(return_value={"Washer": {"last_rate": 1.0}})
+        self.cache = ItemInfoCache(self.loader, self.party_loader, ttl=60, max_items=3)
+
+    def prefetch(self, names):
+        done = threading.Event()
+        started = self.cache.prefetch_items(names, done.set)
+        if started:
+            self.assertTrue(done.wait(5))
+        return started
+
+    def test_items_load_in_one_query_and_unknown_items_are_cached(self):
+        self.assertEqual(self.cache.get("Bolt M8"), (False, None))
+        self.assertTrue(self.prefetch(["Bolt M8", " nut m8 ", "Gasket", ""]))
+        self.assertEqual(len(self.loader.calls), 1)
+        self.assertEqual(self.cache.get("BOLT M8"), (True, {"last_rate": 20.0}))
+        self.assertEqual(self.cache.get("Gasket"), (True, None))
+        # Everything asked for is cached now
+        self.assertFalse(self.prefetch(["Bolt M8", "Gasket"]))
+        self.assertEqual(len(self.loader.calls), 1)
+
+    def test_entries_expire_after_the_ttl(self):
+        with mock.patch.object(item_info_cache.time, "monotonic", return_value=1000.0):
+            self.prefetch(["Bolt M8"])
+        with mock.patch.object(item_info_cache.time, "monotonic", return_value=1059.0):
+            self.assertTrue(self.cache.get("Bolt M8")[0])
+        with mock.patch.object(item_info_cache.time, "monotonic", return_value=1061.0):
+            self.assertEqual(self.cache.get("Bolt M8"), (False, None))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.prefetch(["Bolt M8"])
+        self.prefetch(["Nut M8"])
+        self.prefetch(["Gasket"])
+        self.cache.get("Bolt M8")
+        self.prefetch(["Spring"])
+        self.assertFalse(self.cache.get("Nut M8")[0])
+        self.assertTrue(self.cache.get("Bolt M8")[0])
+        self.assertTrue(self.cache.get("Spring")[0])
+
+    def test_item_already_loading_is_not_requested_again(self):
+        self.loader.gate.clear()
+        done = threading.Event()
+        self.assertTrue(self.cache.prefetch_items(["Bolt M8"], done.set))
+        self.assertFalse(self.cache.prefetch_items(["Bolt M8"]))
+        self.loader.gate.set()
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.loader.calls, [["Bolt M8"]])
+
+    def test_party_prefetch_runs_once_per_ttl(self):
+        done = threading.Event()
+        self.assertTrue(self.cache.prefetch_party("ACME", done.set))
+        self.assertTrue(done.wait(5))
+        self.assertEqual(self.cache.get("washer"), (True, {"last_rate": 1.0}))
+        self.assertFalse(self.cache.prefetch_party("acme"))
+        self.assertFalse(self.cache.prefetch_party(""))
+        self.party_loader.assert_called_once_with("ACME")
+
+    def test_failed_load_can_be_retried(self):
+        self.loader.known = None
+        done = threading.Event()
+        with mock.patch("builtins.print"):
+            self.assertTrue(self.cache.prefetch_items(["Bolt M8"], done.set))
+            self.assertTrue(done.wait(5))
+        self.assertFalse(self.cache.get("Bolt M8")[0])
+        self.loader.known = {"Bolt M8": {"last_rate": 20.0}}
+        self.assertTrue(self.prefetch(["Bolt M8"]))
+        self.assertTrue(self.cache.get("Bolt M8")[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,18 @@
+import unittest
+
+from utils.json_repair import repair_json
+
+
+class RepairJsonTest(unittest.TestCase):
+    def test_fenced_valid_json_is_not_a_repair(self):
+        for content in ('```json\n{"items": []}\n```', '```\n{"items": []}\n```', '{"items": []}'):
+            self.assertEqual(repair_json(content), ({"items": []}, False))
+
+    def test_broken_json_is_a_repair(self):
+        self.assertEqual(repair_json('```json\n{"items": [1, 2,]}\n```'), ({"items": [1, 2]}, True))
+        self.assertEqual(repair_json('Here it is: {"items": []}'), ({"items": []}, True))
+        self.assertEqual(repair_json('```json\n{"items": [1, 2'), ({"items": [1, 2]}, True))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,36 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from tools.sample_pdfs import invoice_lines, write_pdf
+from utils.pdf_utils import extract_pages_from_pdf
+
+
+class ExtractPagesTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "invoice.pdf")
+        write_pdf(self.path, [invoice_lines("INV-1"), invoice_lines("INV-1")])
+
+    def extract(self, memory_limit_mb):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return extract_pages_from_pdf(self.path, memory_limit_mb=memory_limit_mb, backend="pdfplumber", ocr=False)
+
+    def test_pages_are_read(self):
+        pages = self.extract(0)
+        self.assertEqual(len(pages), 2)
+        self.assertIn("INV-1", pages[0])
+
+    def test_memory_limit_is_reported_as_such(self):
+        # Any process is over 1 MB, so extraction stops after the first page
+        error = self.extract(1)
+        self.assertIsInstance(error, str)
+        self.assertIn("memory limit", error)
+        self.assertNotIn("OCR", error)
+
+
+if __name__ == "__main__":
+    unittest.main()
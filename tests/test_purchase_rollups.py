@@ -0,0 +1,77 @@
+import contextlib
+import io
+import unittest
+
+from database.db import get_connection, get_setting
+from database.purchase_rollups import (GRAIN_DAILY, GRAIN_MONTHLY, GRAIN_PARTY, ROLLUP_VERSION, purchase_report,
+                                       rebuild_purchase_rollups, voucher_rate_rows)
+from database.vouchers import save_voucher
+from tests.support import TempDatabaseTestCase, sample_voucher
+from utils.setting_keys import SETTING_ROLLUP_VERSION
+
+
+def report(grain, party_name=None):
+    return [(r["period"], r["tax_rate"], r["vouchers"], r["taxable"], r["tax"])
+            for r in purchase_report(grain, "2024-04-01", "2024-05-31", party_name)]
+
+
+class VoucherRateRowsTest(unittest.TestCase):
+    def test_non_gst_bill_sundries_are_spread_over_the_items(self):
+        self.assertEqual(voucher_rate_rows(sample_voucher()), [{"rate": 18.0, "taxable": 350.0, "tax": 63.0}])
+
+    def test_gst_lines_are_not_taxable_value(self):
+        voucher = sample_voucher(bill_sundry=[{"name": "CGST", "percentage": 9, "amount": 27.0, "nature": "Additive"}])
+        self.assertEqual(voucher_rate_rows(voucher), [{"rate": 18.0, "taxable": 300.0, "tax": 54.0}])
+
+
+class PurchaseRollupTest(TempDatabaseTestCase):
+    def test_saves_add_up_per_day_month_and_party(self):
+        save_voucher(sample_voucher("INV-1", "2024-04-05"))
+        save_voucher(sample_voucher("INV-2", "2024-04-05", "GUPTA TRADERS"))
+        save_voucher(sample_voucher("INV-3", "2024-05-02"))
+        self.assertEqual(report(GRAIN_DAILY), [("2024-04-05", 18.0, 2, 700.0, 126.0),
+                                               ("2024-05-02", 18.0, 1, 350.0, 63.0)])
+        self.assertEqual(report(GRAIN_MONTHLY), [("2024-04", 18.0, 2, 700.0, 126.0),
+                                                 ("2024-05", 18.0, 1, 350.0, 63.0)])
+        self.assertEqual(report(GRAIN_PARTY), [("ACME SUPPLIES", 18.0, 2, 700.0, 126.0),
+                                               ("GUPTA TRADERS", 18.0, 1, 350.0, 63.0)])
+        self.assertEqual(report(GRAIN_PARTY, "GUPTA TRADERS"), [("GUPTA TRADERS", 18.0, 1, 350.0, 63.0)])
+
+    def test_resave_replaces_the_earlier_figures(self):
+        voucher_id = save_voucher(sample_voucher("INV-1", "2024-04-05"))
+        save_voucher(sample_voucher("INV-2", "2024-04-05"))
+        # Moved to another day and party, with one line at 5%
+        edited = sample_voucher("INV-1", "2024-05-02", "GUPTA TRADERS", bill_sundry=[])
+        edited["items"][1]["tax_category"] = "GST 5%"
+        save_voucher(edited, voucher_id)
+        self.assertEqual(report(GRAIN_DAILY), [("2024-04-05", 18.0, 1, 350.0, 63.0),
+                                               ("2024-05-02", 5.0, 1, 100.0, 5.0),
+                                               ("2024-05-02", 18.0, 1, 200.0, 36.0)])
+        self.assertEqual(report(GRAIN_PARTY), [("ACME SUPPLIES", 18.0, 1, 350.0, 63.0),
+                                               ("GUPTA TRADERS", 5.0, 1, 100.0, 5.0),
+                                               ("GUPTA TRADERS", 18.0, 1, 200.0, 36.0)])
+        # Saving the same voucher again changes nothing
+        save_voucher(edited, voucher_id)
+        self.assertEqual(len(report(GRAIN_DAILY)), 3)
+        self.assertEqual(report(GRAIN_MONTHLY)[0], ("2024-04", 18.0, 1, 350.0, 63.0))
+
+    def test_rebuild_matches_incremental_rollups(self):
+        voucher_id = save_voucher(sample_voucher("INV-1", "2024-04-05"))
+        save_voucher(sample_voucher("INV-2", "2024-05-02", "GUPTA TRADERS"))
+        save_voucher(sample_voucher("INV-1", "2024-04-06"), voucher_id)
+        expected = {grain: report(grain) for grain in (GRAIN_DAILY, GRAIN_MONTHLY, GRAIN_PARTY)}
+        conn = get_connection()
+        with conn:
+            conn.execute("UPDATE purchase_rollup_daily SET taxable = 0")
+        conn.close()
+        self.assertEqual(rebuild_purchase_rollups(), 2)
+        self.assertEqual({grain: report(grain) for grain in expected}, expected)
+        self.assertEqual(get_setting(SETTING_ROLLUP_VERSION), ROLLUP_VERSION)
+
+    def test_unknown_grain(self):
+        with self.assertRaises(ValueError), contextlib.redirect_stdout(io.StringIO()):
+            purchase_report("weekly", "2024-04-01", "2024-04-30")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+from database.column_mappings import get_column_mapping, save_column_mapping
+from tests.support import TempDatabaseTestCase
+from utils.sheet_import import (SheetImportError, detect_columns, match_master_items, read_sheet_header,
+                                read_sheet_items)
+
+
+class SheetImportTest(unittest.TestCase):
+    def write(self, name, text):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        path = os.path.join(tmp.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        return path
+
+    def test_header_names_are_recognised(self):
+        columns = detect_columns(["Sr", "Item Description", "HSN/SAC", "Qty.", "UOM", "Rate", "Disc %", "Amount"])
+        self.assertEqual(columns, {"item_name": 1, "hsn": 2, "qty": 3, "unit": 4, "list_price": 5, "discount": 6,
+                                   "amount": 7})
+
+    def test_rows_below_title_lines_become_items(self):
+        path = self.write("items.csv", "\n".join([
+            "ACME SUPPLIES PVT LTD,,,,",
+            "Price list April 2024,,,,",
+            "Item,HSN,Qty,Rate,Disc %",
+            "Bolt M8,7318,10,100,10",
+            "Nut M8,7318,20,50,",
+            ",,,,",
+            "Total,,30,,",
+        ]))
+        items, info = read_sheet_items(path, is_simple_discount=True)
+        self.assertEqual([i["item_name"] for i in items], ["Bolt M8", "Nut M8"])
+        self.assertEqual((items[0]["price"], items[0]["amount"]), (90.0, 900.0))
+        self.assertEqual((items[1]["price"], items[1]["amount"]), (50.0, 1000.0))
+        self.assertEqual(info["skipped"], 2)
+        self.assertEqual(info["mapping"], {"item_name": "Item", "hsn": "HSN", "qty": "Qty", "list_price": "Rate",
+                                           "discount": "Disc %"})
+
+    def test_saved_mapping_reads_unrecognised_headers(self):
+        path = self.write("items.csv", "Artikel;Menge;Betrag\nBolt M8;10;200\n")
+        with self.assertRaises(SheetImportError):
+            read_sheet_items(path)
+        mapping = {"item_name": "Artikel", "qty": "Menge", "amount": "Betrag"}
+        items, _ = read_sheet_items(path, mapping)
+        self.assertEqual((items[0]["item_name"], items[0]["qty"], items[0]["price"]), ("Bolt M8", 10.0, 20.0))
+        header, columns = read_sheet_header(path, mapping)
+        self.assertEqual((header, columns), (["Artikel", "Menge", "Betrag"], {"item_name": 0, "qty": 1, "amount": 2}))
+
+    def test_unsupported_file_type(self):
+        with self.assertRaises(SheetImportError):
+            read_sheet_items(self.write("items.pdf", ""))
+
+    def test_master_spelling_replaces_matching_names(self):
+        items = [{"item_name": "bolt  m8"}, {"item_name": "Washer"}]
+        self.assertEqual(match_master_items(items, ["BOLT M8", "NUT M8"]), [1])
+        self.assertEqual(items[0]["item_name"], "BOLT M8")
+
+
+class ColumnMappingStoreTest(TempDatabaseTestCase):
+    def test_mapping_is_saved_per_party_and_replaced(self):
+        self.assertIsNone(get_column_mapping("acme"))
+        self.assertTrue(save_column_mapping("acme", "ACME", {"item_name": "Item", "qty": "Qty"}))
+        self.assertTrue(save_column_mapping("acme", "ACME", {"item_name": "Description", "qty": "Qty"}))
+        self.assertEqual(get_column_mapping("acme"), {"item_name": "Description", "qty": "Qty"})
+        self.assertIsNone(get_column_mapping("gupta"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import contextlib
+import io
+import unittest
+from datetime import date, datetime
+from unittest import mock
+
+import database.sql_server as sql_server
+from tests.support import sample_voucher
+from tools.bench_sql_staging import RoundTripConnection
+
+
+def staged_vouchers():
+    first = dict(sample_voucher("INV-1"), id=1)
+    second = dict(sample_voucher("INV-2", date="06-04-2024", items=[("Washer", 5, 2.5)]), id=2)
+    # Amounts typed into the grid arrive as text
+    second["items"][0].update(qty="5", amount="12.50")
+    return [first, second]
+
+
+class FailingConnection(RoundTripConnection):
+    """Fails on the item insert, after the voucher headers are written."""
+
+    def cursor(self):
+        cur = super().cursor()
+        executemany = cur.executemany
+
+        def failing_executemany(sql, rows):
+            if "PurchaseVoucherItem" in sql:
+                raise RuntimeError("connection reset")
+            return executemany(sql, rows)
+
+        cur.executemany = failing_executemany
+        return cur
+
+
+class StagingRowsTest(unittest.TestCase):
+    def test_rows_are_flattened_and_coerced(self):
+        staged_at = datetime(2024, 4, 7, 10, 0)
+        rows = sql_server.voucher_staging_rows(staged_vouchers(), "BATCH", staged_at)
+        self.assertEqual([row[2] for row in rows["PurchaseVoucher"]], [date(2024, 4, 5), date(2024, 4, 6)])
+        self.assertEqual(rows["PurchaseVoucher"][0][-1], staged_at)
+        items = rows["PurchaseVoucherItem"]
+        self.assertEqual([(row[1], row[2], row[3]) for row in items],
+                         [(1, 1, "Bolt M8"), (1, 2, "Nut M8"), (2, 1, "Washer")])
+        self.assertEqual(items[2][6], 5.0)
+        self.assertEqual(items[2][11], 12.5)
+        self.assertEqual(len(rows["PurchaseVoucherBillSundry"]), 2)
+
+    def test_invalid_schema_name_is_rejected(self):
+        with mock.patch.object(sql_server, "get_setting", return_value="staging; DROP TABLE x"):
+            with self.assertRaises(ValueError):
+                sql_server.get_staging_schema()
+            ok, message, _ = sql_server.write_vouchers_to_staging(staged_vouchers())
+        self.assertFalse(ok)
+        self.assertIn("Invalid staging schema", message)
+
+
+class WriteStagingTest(unittest.TestCase):
+    def write(self, conn, vouchers, **kwargs):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return sql_server.write_vouchers_to_staging(vouchers, conn=conn, schema="staging",
+                                                        create_tables=False, **kwargs)
+
+    def count(self, conn, table):
+        return conn.sqlite.execute(f"SELECT COUNT(*) FROM staging.[{table}]").fetchone()[0]
+
+    def test_empty_input_is_a_no_op(self):
+        ok, message, stats = sql_server.write_vouchers_to_staging([])
+        self.assertTrue(ok)
+        self.assertEqual(stats["rows"], 0)
+
+    def test_chunked_insert_writes_every_row(self):
+        conn = RoundTripConnection(0)
+        self.addCleanup(conn.close)
+        ok, message, stats = self.write(conn, staged_vouchers(), chunk_size=2)
+        self.assertTrue(ok, message)
+        self.assertEqual(stats["rows"], 2 + 3 + 2)
+        self.assertEqual(self.count(conn, "PurchaseVoucherItem"), 3)
+        self.assertEqual(self.count(conn, "PurchaseVoucherBillSundry"), 2)
+
+    def test_rerun_replaces_earlier_rows(self):
+        conn = RoundTripConnection(0)
+        self.addCleanup(conn.close)
+        vouchers = staged_vouchers()
+        self.assertTrue(self.write(conn, vouchers)[0])
+        vouchers[0]["items"] = vouchers[0]["items"][:1]
+        ok, _, stats = self.write(conn, vouchers)
+        self.assertTrue(ok)
+        self.assertEqual(self.count(conn, "PurchaseVoucher"), 2)
+        self.assertEqual(self.count(conn, "PurchaseVoucherItem"), 2)
+        batches = conn.sqlite.execute("SELECT DISTINCT BatchId FROM staging.PurchaseVoucher").fetchall()
+        self.assertEqual(batches, [(stats["batch_id"],)])
+
+    def test_failed_write_rolls_back(self):
+        conn = FailingConnection(0)
+        self.addCleanup(conn.close)
+        ok, message, stats = self.write(conn, staged_vouchers())
+        self.assertFalse(ok)
+        self.assertIn("nothing was written", message)
+        self.assertIsNone(stats["batch_id"])
+        self.assertEqual(self.count(conn, "PurchaseVoucher"), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+
+from utils.text_compaction import compact_invoice_text, page_has_item_table
+
+HEADER = ["ACME SUPPLIES PVT LTD", "Invoice No: INV-101 Date: 05-04-2024"]
+
+
+class CompactInvoiceTextTest(unittest.TestCase):
+    def test_whole_number_continuation_page_is_kept(self):
+        page2 = "\n".join(HEADER + ["Washer 10 30 300", "Nut M8 20 20 400", "Bolt M8 5 40 200", "Page 2 of 2"])
+        self.assertTrue(page_has_item_table(page2))
+        page1 = "\n".join(HEADER + ["Item Qty Rate Amount", "Pipe 2 50 100", "Page 1 of 2"])
+        text, stats = compact_invoice_text([page1, page2])
+        self.assertEqual(stats["pages_out"], 2)
+        self.assertIn("Washer 10 30 300", text)
+
+    def test_identical_item_lines_on_different_pages_are_kept(self):
+        line = "Bolt M8 10 20 200"
+        page1 = "\n".join(HEADER + ["Item Qty Rate Amount", line, "Nut M8 20 20 400"])
+        page2 = "\n".join(HEADER + [line, "Washer 10 30 300", "Grand Total 1100"])
+        text, _ = compact_invoice_text([page1, page2])
+        self.assertEqual(text.splitlines().count(line), 2)
+        # Repeated headers still appear once
+        self.assertEqual(text.splitlines().count(HEADER[1]), 1)
+
+    def test_repeated_header_lines_with_numbers_appear_once(self):
+        header = HEADER + ["Plot 12, MIDC Road, Pune 411001", "Phone: 020 2345 6789"]
+        page1 = "\n".join(header + ["Item Qty Rate Amount", "Bolt M8 10 20 200", "Nut M8 20 20 400"])
+        page2 = "\n".join(header + ["Washer 10 30 300", "Grand Total 900"])
+        lines = compact_invoice_text([page1, page2])[0].splitlines()
+        self.assertEqual(lines.count("Plot 12, MIDC Road, Pune 411001"), 1)
+        self.assertEqual(lines.count("Phone: 020 2345 6789"), 1)
+        self.assertIn("Washer 10 30 300", lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
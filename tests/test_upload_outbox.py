@@ -0,0 +1,89 @@
+import unittest
+
+from database.db import get_connection
+from database.upload_outbox import (STATUS_FAILED, STATUS_PENDING, STATUS_SENDING, STATUS_SENT, claim_outbox_batch,
+                                    enqueue_voucher, get_upload_statuses, recover_outbox, update_outbox_entries)
+from tests.support import TempDatabaseTestCase
+from utils.upload_worker import build_batch_xml, parse_batch_result
+
+
+def finish(entry, status, vch_code=None):
+    update_outbox_entries([{"id": entry["id"], "status": status, "attempts": 1, "next_attempt_at": 0,
+                            "last_error": None if status == STATUS_SENT else "rejected", "vch_code": vch_code}])
+
+
+def entries(voucher_id):
+    conn = get_connection()
+    try:
+        return conn.execute("SELECT revision, status FROM upload_outbox WHERE voucher_id=? ORDER BY id",
+                            (voucher_id,)).fetchall()
+    finally:
+        conn.close()
+
+
+class UploadOutboxTest(TempDatabaseTestCase):
+    def test_unchanged_save_is_queued_once(self):
+        key = enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        self.assertEqual(enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>"), key)
+        self.assertEqual(entries(1), [(1, STATUS_PENDING)])
+
+    def test_new_revision_replaces_a_pending_one(self):
+        first = enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        second = enqueue_voucher(1, "INV-1", "ACME", "<v>2</v>")
+        self.assertNotEqual(first, second)
+        self.assertEqual(entries(1), [(2, STATUS_PENDING)])
+
+    def test_unchanged_save_retries_a_failed_upload(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        finish(claim_outbox_batch(10)[0], STATUS_FAILED)
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        self.assertEqual(entries(1), [(1, STATUS_PENDING)])
+
+    def test_revision_after_a_sent_one_modifies_the_busy_voucher(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        finish(claim_outbox_batch(10)[0], STATUS_SENT, vch_code="77")
+        enqueue_voucher(1, "INV-1", "ACME", "<v>2</v>")
+        batch = claim_outbox_batch(10)
+        self.assertEqual([(e["revision"], e["modify_vch_code"]) for e in batch], [(2, "77")])
+        self.assertIn('Action="Modify" VchCode="77"', build_batch_xml(batch))
+
+    def test_revision_waits_while_the_previous_one_is_being_sent(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        enqueue_voucher(2, "INV-2", "ACME", "<v>1</v>")
+        sending = claim_outbox_batch(1)[0]
+        enqueue_voucher(1, "INV-1", "ACME", "<v>2</v>")
+        self.assertEqual([e["voucher_id"] for e in claim_outbox_batch(10)], [2])
+        finish(sending, STATUS_SENT, vch_code="77")
+        self.assertEqual([(e["revision"], e["modify_vch_code"]) for e in claim_outbox_batch(10)], [(2, "77")])
+
+    def test_newer_revision_supersedes_a_failed_send(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        sending = claim_outbox_batch(10)[0]
+        enqueue_voucher(1, "INV-1", "ACME", "<v>2</v>")
+        finish(sending, STATUS_FAILED)
+        self.assertEqual(entries(1), [(2, STATUS_PENDING)])
+        self.assertEqual(claim_outbox_batch(10)[0]["modify_vch_code"], None)
+
+    def test_voucher_opened_from_busy_is_modified_from_the_first_revision(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>", modify_vch_code="501")
+        enqueue_voucher(1, "INV-1", "ACME", "<v>2</v>")
+        self.assertEqual(claim_outbox_batch(10)[0]["modify_vch_code"], "501")
+
+    def test_crash_while_sending_requeues(self):
+        enqueue_voucher(1, "INV-1", "ACME", "<v>1</v>")
+        claim_outbox_batch(10)
+        self.assertEqual(get_upload_statuses([1])[1]["status"], STATUS_SENDING)
+        recover_outbox()
+        self.assertEqual(get_upload_statuses([1, None]), {1: {"status": STATUS_PENDING, "attempts": 0,
+                                                              "last_error": None, "vch_code": None}})
+
+
+class BatchResultTest(unittest.TestCase):
+    def test_result_per_key(self):
+        body = ('<VoucherBatchResult><Voucher Key="a" Status="Saved" VchCode="9"/>'
+                '<Voucher Key="b" Status="Error" Message="Unknown party"/></VoucherBatchResult>')
+        self.assertEqual(parse_batch_result(body), {"a": (True, "9", ""), "b": (False, None, "Unknown party")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import database.voucher_export as voucher_export
+from database.voucher_export import EXPORT_BILL_SUNDRY, export_columns, export_vouchers, iter_export_chunks
+from database.vouchers import save_voucher
+from tests.support import TempDatabaseTestCase, sample_voucher
+
+
+class VoucherExportTest(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = tmp.name
+        self.april = save_voucher(sample_voucher("INV-1", "2024-04-05"))
+        self.march = save_voucher(sample_voucher("INV-2", "2024-03-31", items=[("Washer", 100, 1.0)]))
+        self.may = save_voucher(sample_voucher("INV-3", "2024-05-01"))
+
+    def test_chunks_come_in_date_and_line_order(self):
+        chunks = list(iter_export_chunks(chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        rows = [row for chunk in chunks for row in chunk]
+        name = export_columns("items").index("item_name")
+        self.assertEqual([(row[0], row[name]) for row in rows],
+                         [(self.march, "Washer"), (self.april, "Bolt M8"), (self.april, "Nut M8"),
+                          (self.may, "Bolt M8"), (self.may, "Nut M8")])
+
+    def test_csv_export_of_a_date_range(self):
+        path = os.path.join(self.dir, "april.csv")
+        ok, message, stats = export_vouchers(path, date_from="2024-04-01", date_to="2024-04-30", chunk_size=1)
+        self.assertTrue(ok, message)
+        self.assertEqual(stats["rows"], 2)
+        self.assertEqual(stats["bytes"], os.path.getsize(path))
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual(list(rows[0]), list(export_columns("items")))
+        self.assertEqual([(r["voucher_no"], r["item_name"], r["amount"]) for r in rows],
+                         [("INV-1", "Bolt M8", "200.0"), ("INV-1", "Nut M8", "100.0")])
+
+    def test_bill_sundry_export(self):
+        path = os.path.join(self.dir, "bill_sundry.csv")
+        ok, _, stats = export_vouchers(path, kind=EXPORT_BILL_SUNDRY)
+        self.assertTrue(ok)
+        self.assertEqual(stats["rows"], 3)
+
+    def test_unknown_format_and_kind(self):
+        self.assertFalse(export_vouchers(os.path.join(self.dir, "out.csv"), fmt="xlsx")[0])
+        self.assertFalse(export_vouchers(os.path.join(self.dir, "out.csv"), kind="payments")[0])
+
+    @unittest.skipIf(voucher_export.pq is None, "pyarrow is not installed")
+    def test_parquet_export_writes_one_row_group_per_chunk(self):
+        path = os.path.join(self.dir, "vouchers.parquet")
+        ok, message, stats = export_vouchers(path, chunk_size=2)
+        self.assertTrue(ok, message)
+        parquet = voucher_export.pq.ParquetFile(path)
+        self.assertEqual(parquet.metadata.num_rows, 5)
+        self.assertEqual(parquet.num_row_groups, 3)
+        table = parquet.read()
+        self.assertEqual(table.column("qty").to_pylist(), [100.0, 10.0, 20.0, 10.0, 20.0])
+        self.assertEqual(table.column("voucher_id").to_pylist()[0], self.march)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+from unittest import mock
+
+import database.voucher_search as voucher_search
+from database.db import get_connection
+from database.voucher_search import build_match_query, search_purchase_lines, search_words
+from database.vouchers import save_voucher
+from tests.support import TempDatabaseTestCase, sample_voucher
+
+
+class VoucherSearchTest(TempDatabaseTestCase):
+    def setUp(self):
+        super().setUp()
+        patch = mock.patch.object(voucher_search, "_available", None)
+        patch.start()
+        self.addCleanup(patch.stop)
+        if not voucher_search.search_available():
+            self.skipTest("SQLite is built without FTS5")
+
+    def save_lines(self, count):
+        voucher = sample_voucher(items=[(f"BALL BEARING 62{n:02d}", 1, 10.0) for n in range(count)], bill_sundry=[])
+        save_voucher(voucher)
+
+    def test_pages_walk_older_and_back_to_newer(self):
+        self.save_lines(5)
+        first = search_purchase_lines("bearing", limit=2)
+        self.assertEqual([r["item_name"] for r in first], ["BALL BEARING 6204", "BALL BEARING 6203"])
+        second = search_purchase_lines("bearing", before_id=first[-1]["line_id"], limit=2)
+        self.assertEqual([r["item_name"] for r in second], ["BALL BEARING 6202", "BALL BEARING 6201"])
+        last = search_purchase_lines("bearing", before_id=second[-1]["line_id"], limit=2)
+        self.assertEqual([r["item_name"] for r in last], ["BALL BEARING 6200"])
+        self.assertEqual(search_purchase_lines("bearing", before_id=last[-1]["line_id"], limit=2), [])
+        # Paging back returns the previous page in the same newest-first order
+        self.assertEqual(search_purchase_lines("bearing", after_id=second[0]["line_id"], limit=2), first)
+
+    def test_empty_text_pages_every_line(self):
+        self.save_lines(3)
+        page = search_purchase_lines("", limit=2)
+        self.assertEqual(len(page), 2)
+        self.assertEqual(len(search_purchase_lines("", before_id=page[-1]["line_id"], limit=2)), 1)
+
+    def test_every_word_must_match_the_start_of_a_word(self):
+        self.save_lines(3)
+        save_voucher(sample_voucher("INV-2", party_name="GUPTA TRADERS", items=[("PVC PIPE", 2, 50.0)]))
+        self.assertEqual([r["item_name"] for r in search_purchase_lines("bear 6201")], ["BALL BEARING 6201"])
+        self.assertEqual([r["party_name"] for r in search_purchase_lines("gupt")], ["GUPTA TRADERS"])
+        self.assertEqual(search_purchase_lines("earing"), [])
+        self.assertEqual(search_purchase_lines("pipe bearing"), [])
+
+    def test_partial_words_expand_to_indexed_terms(self):
+        self.save_lines(1)
+        conn = get_connection()
+        try:
+            self.assertEqual(build_match_query(["bea"], conn), '"bea"*')
+            self.assertEqual(build_match_query(["bear"], conn), '("bearing")')
+            self.assertIsNone(build_match_query(["zzzz"], conn))
+        finally:
+            conn.close()
+
+    def test_resaved_voucher_is_reindexed(self):
+        voucher_id = save_voucher(sample_voucher(items=[("BALL BEARING 6204", 1, 10.0)]))
+        save_voucher(sample_voucher(items=[("PVC PIPE", 1, 10.0)]), voucher_id)
+        self.assertEqual(search_purchase_lines("bearing"), [])
+        self.assertEqual(len(search_purchase_lines("pipe")), 1)
+
+    def test_search_words(self):
+        self.assertEqual(search_words("Ball-Bearing 6204_ZZ"), ["ball", "bearing", "6204", "zz"])
+
+
+if __name__ == "__main__":
+    unittest.main()
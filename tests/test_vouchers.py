@@ -0,0 +1,51 @@
+import unittest
+
+from database.vouchers import list_vouchers, load_voucher, load_vouchers, save_voucher
+from tests.support import TempDatabaseTestCase, sample_voucher
+
+
+class VoucherStoreTest(TempDatabaseTestCase):
+    def test_saved_voucher_reads_back(self):
+        voucher = sample_voucher(date="05-04-2024")
+        voucher_id = save_voucher(voucher)
+        stored = load_voucher(voucher_id)
+        self.assertEqual(stored["id"], voucher_id)
+        self.assertEqual(stored["date"], "2024-04-05")
+        self.assertEqual(stored["items"], voucher["items"])
+        self.assertEqual(stored["bill_sundry"], voucher["bill_sundry"])
+        self.assertEqual(stored["grand_total"], voucher["grand_total"])
+
+    def test_resave_replaces_the_stored_lines(self):
+        voucher_id = save_voucher(sample_voucher())
+        edited = sample_voucher(items=[("Washer", 100, 1.0)], bill_sundry=[])
+        self.assertEqual(save_voucher(edited, voucher_id), voucher_id)
+        stored = load_voucher(voucher_id)
+        self.assertEqual([i["item_name"] for i in stored["items"]], ["Washer"])
+        self.assertEqual(stored["bill_sundry"], [])
+        self.assertEqual(len(list_vouchers()), 1)
+
+    def test_resave_of_a_deleted_voucher_inserts_it_again(self):
+        self.assertEqual(save_voucher(sample_voucher(), voucher_id=41), 1)
+
+    def test_missing_voucher(self):
+        self.assertIsNone(load_voucher(99))
+
+    def test_list_filters_and_orders_newest_first(self):
+        ids = [save_voucher(sample_voucher(f"INV-{n}", date, party))
+               for n, (date, party) in enumerate([("2024-04-01", "ACME"), ("2024-04-03", "GUPTA"),
+                                                  ("2024-04-02", "ACME"), ("2024-05-01", "ACME")])]
+        self.assertEqual([v["id"] for v in list_vouchers()], [ids[3], ids[1], ids[2], ids[0]])
+        self.assertEqual([v["id"] for v in list_vouchers(party_name="ACME", date_to="2024-04-30")], [ids[2], ids[0]])
+        self.assertEqual([v["id"] for v in list_vouchers(limit=1)], [ids[3]])
+
+    def test_load_many_by_range_or_ids(self):
+        ids = [save_voucher(sample_voucher(f"INV-{n}", f"2024-04-0{n}")) for n in (3, 1, 2)]
+        vouchers = load_vouchers("2024-04-01", "2024-04-02")
+        self.assertEqual([v["voucher_no"] for v in vouchers], ["INV-1", "INV-2"])
+        self.assertEqual(len(vouchers[0]["items"]), 2)
+        self.assertEqual([v["id"] for v in load_vouchers(voucher_ids=[ids[0]])], [ids[0]])
+        self.assertEqual(load_vouchers(voucher_ids=[]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
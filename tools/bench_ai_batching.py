@@ -0,0 +1,70 @@
+"""
+Compare throughput of one request per invoice vs several short invoices packed
+into one request (parse_invoices_batched) against the stub endpoint.
+
+The stub charges a fixed latency per request plus a per-character generation
+time, so batching saves the per-request overhead but not the output time.
+
+Usage:
+    python -m tools.bench_ai_batching --invoices 24 --latency 0.3 --char-latency 0.0002
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from tools.llm_stub_server import start_stub_server
+from utils.ai_utils import get_ai_client, parse_invoices_batched, parse_with_openai, reset_ai_client
+
+STUB_KEY = "stub-key"
+
+
+def build_texts(n):
+    return [
+        f"Acme Traders\nInvoice No: INV-{100 + i} Date: 05/04/2024\n"
+        f"1 Philips 9W Bulb 8539 10 PCS 50.00 500.00\n2 Havells Fan 8414 2 NOS 1200.00 2400.00\n"
+        f"Freight 100.00\nTotal 3000.00\n"
+        for i in range(n)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=24)
+    parser.add_argument("--latency", type=float, default=0.3, help="fixed seconds per request")
+    parser.add_argument("--char-latency", type=float, default=0.0002, help="seconds per output character")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, char_latency=args.char_latency)
+    reset_ai_client()
+    get_ai_client(STUB_KEY, base_url)
+    texts = build_texts(args.invoices)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            requests_before = server.stats["requests"]
+            start = time.perf_counter()
+            single = [parse_with_openai(text, api_key=STUB_KEY, base_url=base_url) for text in texts]
+            single_s = time.perf_counter() - start
+            single_requests = server.stats["requests"] - requests_before
+
+            requests_before = server.stats["requests"]
+            start = time.perf_counter()
+            batched = parse_invoices_batched(texts, api_key=STUB_KEY, base_url=base_url)
+            batched_s = time.perf_counter() - start
+            batched_requests = server.stats["requests"] - requests_before
+    finally:
+        server.shutdown()
+
+    for text, data in zip(texts, batched):
+        assert isinstance(data, dict), data
+        assert data["voucher_no"] in text, "batched result merged into the wrong invoice"
+    assert all(isinstance(d, dict) for d in single)
+
+    print(f"invoices={args.invoices}  latency={args.latency}s/request  {args.char_latency * 1000:.2f} ms/char")
+    print(f"one per invoice: {single_requests:3d} requests  {single_s:6.2f}s  {args.invoices / single_s:6.2f} invoices/s")
+    print(f"batched        : {batched_requests:3d} requests  {batched_s:6.2f}s  {args.invoices / batched_s:6.2f} invoices/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compare the model cascade with always using the strong model, against the stub
+endpoint. The fast tier answers quickly but fails validation on a share of
+invoices, which then escalate.
+
+Usage:
+    python -m tools.bench_ai_cascade --invoices 40 --fast-bad-rate 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+from tools.llm_stub_server import start_stub_server
+from utils.ai_utils import MODEL_TIERS, cascade_stats, get_cascade_report, parse_with_cascade, reset_ai_client
+
+STUB_KEY = "stub-key"
+SAMPLE_TEXT = "Invoice No: INV-101 Date: 05/04/2024\n1 Philips 9W Bulb 8539 10 PCS 50.00 500.00\n" * 20
+
+
+def run(label, tiers, base_url, n):
+    cascade_stats.clear()
+    latencies = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(n):
+            start = time.perf_counter()
+            result = parse_with_cascade(SAMPLE_TEXT, tiers=tiers, api_key=STUB_KEY, base_url=base_url)
+            assert isinstance(result, dict), result
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(f"{label}: median={statistics.median(latencies) * 1000:.0f} ms  "
+          f"p95={latencies[int(len(latencies) * 0.95) - 1] * 1000:.0f} ms  "
+          f"cost=${sum(s['cost'] for s in cascade_stats.values()):.4f}")
+    print("  " + get_cascade_report().replace("\n", "\n  "))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=40)
+    parser.add_argument("--fast-latency", type=float, default=0.05)
+    parser.add_argument("--fast-bad-rate", type=float, default=0.2)
+    parser.add_argument("--strong-latency", type=float, default=0.3)
+    args = parser.parse_args()
+
+    fast, strong = MODEL_TIERS[0], MODEL_TIERS[-1]
+    server, base_url = start_stub_server(model_profiles={
+        fast["model"]: {"latency": args.fast_latency, "bad_rate": args.fast_bad_rate},
+        strong["model"]: {"latency": args.strong_latency},
+    })
+    reset_ai_client()
+    try:
+        run("strong model only", [strong], base_url, args.invoices)
+        run("cascade fast -> strong", [fast, strong], base_url, args.invoices)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark AI client reuse against the local stub endpoint.
+
+Compares:
+    - a new OpenAI client per call (previous behaviour)
+    - the shared keep-alive client (parse_with_openai)
+    - the async variant with concurrent requests (parse_with_openai_async)
+
+Usage:
+    python -m tools.bench_ai_client --requests 50 --latency 0.05 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import statistics
+import time
+
+from openai import OpenAI
+from tools.llm_stub_server import start_stub_server
+from utils.ai_utils import (
+    DEFAULT_MODEL, EXTRA_HEADERS, build_messages, decode_ai_content,
+    parse_with_openai, parse_with_openai_async, reset_ai_client,
+)
+
+STUB_KEY = "stub-key"
+SAMPLE_TEXT = "Invoice No: INV-101 Date: 05/04/2024\n1 Philips 9W Bulb 8539 10 PCS 50.00 500.00\n" * 20
+
+
+def _report(label, latencies, elapsed, server, connections_before):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1] if latencies else 0
+    print(
+        f"{label:<28} n={len(latencies):<4} mean={statistics.mean(latencies) * 1000:7.1f} ms  "
+        f"p50={statistics.median(latencies) * 1000:7.1f} ms  p95={p95 * 1000:7.1f} ms  "
+        f"throughput={len(latencies) / elapsed:7.1f} req/s  "
+        f"connections={server.stats['connections'] - connections_before}"
+    )
+
+
+def bench_new_client_per_call(base_url, n):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        client = OpenAI(base_url=base_url, api_key=STUB_KEY)
+        response = client.chat.completions.create(
+            model=DEFAULT_MODEL, messages=build_messages(SAMPLE_TEXT), extra_headers=EXTRA_HEADERS
+        )
+        decode_ai_content(response.choices[0].message.content)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_shared_client(base_url, n):
+    latencies = []
+    for _ in range(n):
+        start = time.perf_counter()
+        result = parse_with_openai(SAMPLE_TEXT, api_key=STUB_KEY, base_url=base_url)
+        assert isinstance(result, dict), result
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+async def bench_async(base_url, n, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            start = time.perf_counter()
+            result = await parse_with_openai_async(SAMPLE_TEXT, api_key=STUB_KEY, base_url=base_url)
+            assert isinstance(result, dict), result
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one() for _ in range(n)))
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.05, help="simulated model latency (s)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency)
+    reset_ai_client()
+    try:
+        runs = [
+            ("new client per call", lambda: bench_new_client_per_call(base_url, args.requests)),
+            ("shared keep-alive client", lambda: bench_shared_client(base_url, args.requests)),
+            (f"async x{args.concurrency}", lambda: asyncio.run(bench_async(base_url, args.requests, args.concurrency))),
+        ]
+        for label, run in runs:
+            connections_before = server.stats["connections"]
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                latencies = run()
+            _report(label, latencies, time.perf_counter() - start, server, connections_before)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
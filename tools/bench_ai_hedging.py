@@ -0,0 +1,63 @@
+"""
+Measure how request hedging cuts tail latency, against the stub endpoint with
+an injected share of slow responses.
+
+Usage:
+    python -m tools.bench_ai_hedging --invoices 100 --slow-rate 0.05 --slow-latency 2
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from tools.llm_stub_server import start_stub_server
+from utils.ai_utils import (
+    hedge_stats, latency_histograms, parse_with_openai, parse_with_openai_hedged, reset_ai_client,
+)
+
+STUB_KEY = "stub-key"
+SAMPLE_TEXT = "Invoice No: INV-101 Date: 05/04/2024\n1 Philips 9W Bulb 8539 10 PCS 50.00 500.00\n" * 20
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda p: samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+    return f"p50={pick(0.5):7.1f} ms  p95={pick(0.95):7.1f} ms  p99={pick(0.99):7.1f} ms  max={samples[-1] * 1000:7.1f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.05)
+    parser.add_argument("--slow-rate", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(latency=args.latency, latency_jitter=args.latency_jitter,
+                                         slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    reset_ai_client()
+    try:
+        for label, hedge in (("no hedging", False), ("hedged", True)):
+            requests_before = server.stats["requests"]
+            latencies = []
+            with contextlib.redirect_stdout(io.StringIO()):
+                for _ in range(args.invoices):
+                    start = time.perf_counter()
+                    if hedge:
+                        result = parse_with_openai_hedged(SAMPLE_TEXT, api_key=STUB_KEY, base_url=base_url)
+                    else:
+                        result = parse_with_openai(SAMPLE_TEXT, api_key=STUB_KEY, base_url=base_url)
+                    assert isinstance(result, dict), result
+                    latencies.append(time.perf_counter() - start)
+            print(f"{label:<11} {percentiles(latencies)}  requests={server.stats['requests'] - requests_before}")
+        print(f"hedge stats: {hedge_stats}")
+        print("primary latency histogram:")
+        print(latency_histograms["primary"].format())
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
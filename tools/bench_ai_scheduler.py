@@ -0,0 +1,65 @@
+"""
+Exercise AIRequestScheduler against the stub endpoint with injected latency,
+random 429/5xx errors and a server-side rate limit.
+
+Usage:
+    python -m tools.bench_ai_scheduler --invoices 40 --rpm 300 --error-rate 0.2 --rate-limit 5
+"""
+
+import argparse
+import contextlib
+import io
+import statistics
+import time
+
+from tools.llm_stub_server import start_stub_server
+from utils.ai_utils import AIRequestScheduler, reset_ai_client
+
+STUB_KEY = "stub-key"
+SAMPLE_TEXT = "Invoice No: INV-101 Date: 05/04/2024\n1 Philips 9W Bulb 8539 10 PCS 50.00 500.00\n" * 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=40)
+    parser.add_argument("--rpm", type=int, default=300, help="scheduler requests per minute")
+    parser.add_argument("--tpm", type=int, default=1000000, help="scheduler tokens per minute")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--latency-jitter", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--rate-limit", type=int, default=5, help="stub requests per second before 429")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        latency=args.latency, latency_jitter=args.latency_jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit,
+    )
+    reset_ai_client()
+    scheduler = AIRequestScheduler(
+        api_key=STUB_KEY, base_url=base_url, requests_per_minute=args.rpm, tokens_per_minute=args.tpm,
+        max_concurrency=args.concurrency, base_delay=0.2, max_delay=2.0,
+    )
+    try:
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = scheduler.run_batch([SAMPLE_TEXT] * args.invoices)
+        elapsed = time.perf_counter() - start
+    finally:
+        scheduler.shutdown()
+        server.shutdown()
+
+    ok = [r for r in results if r["data"] is not None]
+    attempts = sum(r["attempts"] for r in results)
+    request_times = sorted(t for r in results for t in r["request_s"])
+    totals = sorted(r["elapsed_s"] for r in results)
+    print(f"invoices={args.invoices} ok={len(ok)} failed={len(results) - len(ok)} "
+          f"attempts={attempts} server_errors={server.stats['errors']}")
+    print(f"wall={elapsed:.2f}s throughput={len(ok) / elapsed:.2f} invoices/s")
+    print(f"per-attempt p50={statistics.median(request_times) * 1000:.1f} ms  "
+          f"per-invoice p50={statistics.median(totals) * 1000:.1f} ms  "
+          f"max={totals[-1] * 1000:.1f} ms  mean wait={statistics.mean(r['wait_s'] for r in results):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmark time-to-first-row for streaming vs blocking AI parsing.
+
+The stub endpoint streams a large invoice (default 150 lines) in small deltas
+with a delay between them, roughly like a model generating tokens.
+
+Usage:
+    python -m tools.bench_ai_streaming --items 150 --chunk-delay 0.002
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from tools.llm_stub_server import SAMPLE_INVOICE, start_stub_server
+from utils.ai_utils import parse_with_openai_stream, reset_ai_client
+
+STUB_KEY = "stub-key"
+
+
+def build_invoice(n_items):
+    invoice = dict(SAMPLE_INVOICE)
+    template = SAMPLE_INVOICE["items"][0]
+    invoice["items"] = [dict(template, item_name=f"Item {i + 1}") for i in range(n_items)]
+    return invoice
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=150)
+    parser.add_argument("--chunk-size", type=int, default=16)
+    parser.add_argument("--chunk-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(
+        invoice=build_invoice(args.items), chunk_size=args.chunk_size, chunk_delay=args.chunk_delay
+    )
+    reset_ai_client()
+    try:
+        first_row = {}
+        rows = []
+
+        def on_event(kind, key, value):
+            if kind == "items":
+                rows.append(value)
+                first_row.setdefault("at", time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = parse_with_openai_stream("stub", on_event, api_key=STUB_KEY, base_url=base_url)
+        stream_total = time.perf_counter() - start
+        assert isinstance(result, dict), result
+        assert len(rows) == args.items, (len(rows), args.items)
+
+        print(f"items={args.items}  deltas of {args.chunk_size} chars every {args.chunk_delay * 1000:.1f} ms")
+        print(f"streaming: time-to-first-row={first_row['at'] * 1000:8.1f} ms  total={stream_total * 1000:8.1f} ms")
+        # Without streaming, fill_voucher_data only runs once the whole completion has arrived
+        print(f"blocking : time-to-first-row={stream_total * 1000:8.1f} ms  (same generation, rows shown at the end)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
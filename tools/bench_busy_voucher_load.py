@@ -0,0 +1,140 @@
+"""
+Opening an existing BUSY purchase voucher (load_busy_purchase_voucher) against
+a local stand-in for BUSY's tables, vs reading the lines and resolving each
+item's name, unit and tax category and each bill sundry's nature with its own
+lookups (as the per-item autofill queries do).
+
+The stand-in is SQLite with BUSY's master1 / Tran1 / Tran2 / Tran3 columns
+behind a DB-API wrapper that charges one network round trip per statement.
+
+Usage:
+    python -m tools.bench_busy_voucher_load --lines 500 --rtt-ms 1
+"""
+
+import argparse
+import random
+import sqlite3
+import time
+
+from database.sql_server import BUSY_REC_TYPE_ITEM, BUSY_VCH_TYPE_PURCHASE, load_busy_purchase_voucher
+
+
+class RoundTripCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.sqlite.cursor()
+
+    def execute(self, sql, params=()):
+        self.conn.wait()
+        self.cursor.execute(sql, params)
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+
+class RoundTripConnection:
+    """SQLite connection that sleeps rtt seconds per statement."""
+
+    def __init__(self, sqlite, rtt):
+        self.sqlite = sqlite
+        self.rtt = rtt
+        self.round_trips = 0
+
+    def wait(self):
+        self.round_trips += 1
+        if self.rtt:
+            time.sleep(self.rtt)
+
+    def cursor(self):
+        return RoundTripCursor(self)
+
+    def close(self):
+        pass
+
+
+def busy_standin(lines, bill_sundries, n_items=5000):
+    rng = random.Random(9)
+    db = sqlite3.connect(":memory:")
+    db.executescript("""
+        CREATE TABLE master1 (Code INTEGER PRIMARY KEY, MasterType INTEGER, Name TEXT, CM1 INTEGER, CM8 INTEGER, I1 INTEGER);
+        CREATE TABLE Tran1 (VchCode INTEGER PRIMARY KEY, VchType INTEGER, Date TEXT, VchNo TEXT, VchSeriesCode INTEGER,
+                            MasterCode1 INTEGER, MasterCode2 INTEGER, VchAmtBaseCur REAL);
+        CREATE TABLE Tran2 (VchCode INTEGER, SrNo INTEGER, RecType INTEGER, VchType INTEGER, Date TEXT,
+                            MasterCode1 INTEGER, CM1 INTEGER, Value1 REAL, Value3 REAL, D1 REAL);
+        CREATE TABLE Tran3 (VchCode INTEGER, SrNo INTEGER, BSCode INTEGER, Value1 REAL, D1 REAL);
+        CREATE INDEX IX_Tran1 ON Tran1 (VchType, VchNo);
+        CREATE INDEX IX_Tran2 ON Tran2 (VchCode, RecType);
+        CREATE INDEX IX_Tran3 ON Tran3 (VchCode);
+        CREATE INDEX IX_master1 ON master1 (MasterType, Name);
+    """)
+    masters = [(1, 8, "PCS", None, None, None), (2, 8, "MTR", None, None, None),
+               (11, 25, "GST 18%", None, None, None), (12, 25, "GST 12%", None, None, None),
+               (21, 2, "Gupta Traders", None, None, None), (22, 13, "Local-MultiRate", None, None, None),
+               (23, 7, "Main", None, None, None), (31, 9, "Freight", None, None, 1), (32, 9, "Discount", None, None, 0)]
+    masters += [(1000 + i, 6, f"ITEM {i:05d}", rng.choice((1, 2)), rng.choice((11, 12)), None) for i in range(n_items)]
+    db.executemany("INSERT INTO master1 VALUES (?, ?, ?, ?, ?, ?)", masters)
+    db.execute("INSERT INTO Tran1 VALUES (7, ?, '2024-04-05', 'PB-101', 23, 21, 22, 0)", (BUSY_VCH_TYPE_PURCHASE,))
+    db.executemany("INSERT INTO Tran2 VALUES (7, ?, ?, ?, '2024-04-05', ?, 21, ?, ?, ?)", [
+        (sr, BUSY_REC_TYPE_ITEM, BUSY_VCH_TYPE_PURCHASE, 1000 + rng.randrange(n_items), q, q * 50.0, 50.0)
+        for sr, q in ((sr, rng.randrange(1, 20)) for sr in range(1, lines + 1))
+    ])
+    db.executemany("INSERT INTO Tran3 VALUES (7, ?, ?, ?, 0)",
+                   [(sr, 31 if sr % 2 else 32, -25.0 * sr) for sr in range(1, bill_sundries + 1)])
+    return db
+
+
+def load_per_line(conn):
+    """Header and line codes, then master lookups one line at a time."""
+    cur = conn.cursor()
+    cur.execute("SELECT VchCode, Date, VchNo, MasterCode1 FROM Tran1 WHERE VchType=? AND VchNo=?",
+                (BUSY_VCH_TYPE_PURCHASE, "PB-101"))
+    vch_code, date, vch_no, party_code = cur.fetchone()
+    cur.execute("SELECT Name FROM master1 WHERE Code=?", (party_code,))
+    party = cur.fetchone()[0]
+    cur.execute("SELECT MasterCode1, Value1, D1, Value3 FROM Tran2 WHERE VchCode=? AND RecType=? ORDER BY SrNo",
+                (vch_code, BUSY_REC_TYPE_ITEM))
+    items = []
+    for item_code, qty, rate, amount in cur.fetchall():
+        cur.execute("SELECT Name, CM1, CM8 FROM master1 WHERE Code=?", (item_code,))
+        name, unit_code, tax_code = cur.fetchone()
+        cur.execute("SELECT Name FROM master1 WHERE Code=?", (unit_code,))
+        unit = cur.fetchone()[0]
+        cur.execute("SELECT Name FROM master1 WHERE Code=?", (tax_code,))
+        tax_category = cur.fetchone()[0]
+        items.append({"item_name": name, "unit": unit, "tax_category": tax_category, "qty": abs(qty),
+                      "price": rate, "amount": abs(amount)})
+    cur.execute("SELECT BSCode, D1, Value1 FROM Tran3 WHERE VchCode=? ORDER BY SrNo", (vch_code,))
+    bill_sundry = []
+    for bs_code, pct, amount in cur.fetchall():
+        cur.execute("SELECT Name, I1 FROM master1 WHERE Code=?", (bs_code,))
+        name, i1 = cur.fetchone()
+        bill_sundry.append({"name": name, "percentage": pct, "amount": abs(amount),
+                            "nature": "Subtractive" if i1 == 0 else "Additive"})
+    return {"date": date, "voucher_no": vch_no, "party_name": party, "items": items, "bill_sundry": bill_sundry}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=500)
+    parser.add_argument("--bill-sundries", type=int, default=4)
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="round trip to SQL Server")
+    args = parser.parse_args()
+
+    db = busy_standin(args.lines, args.bill_sundries)
+    print(f"{args.lines} item lines, {args.bill_sundries} bill sundries, {args.rtt_ms} ms round trip")
+    for label, load in (("per-line lookups", load_per_line),
+                        ("set-based load", lambda conn: load_busy_purchase_voucher("PB-101", conn=conn))):
+        conn = RoundTripConnection(db, args.rtt_ms / 1000)
+        start = time.perf_counter()
+        voucher = load(conn)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{label:18s} {elapsed:9.1f} ms  {conn.round_trips:5d} round trips  "
+              f"{len(voucher['items'])} items, {len(voucher['bill_sundry'])} bill sundries")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Autosave overhead per voucher edit: the append-only draft journal vs writing
+the whole voucher after every action, while keying a large voucher. Also
+times restoring (replaying) the draft.
+
+Uses a temporary database.
+
+Usage:
+    python -m tools.bench_draft_journal --lines 200 --edits 200
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import database.db as db
+from database.draft_journal import DraftJournal, apply_record, load_draft
+
+
+def sample_item(i):
+    return {"item_name": f"Item {i}", "tax_category": "18", "hsn": "8481", "qty": 2, "unit": "PCS",
+            "list_price": 50, "discount": "5", "price": 47.5, "amount": 95.0}
+
+
+def key_voucher(journal, lines, edits, autosave):
+    """Add lines, then edit / insert / delete rows; autosave(journal, op, fields) after each action."""
+    timings = []
+
+    def act(op, **fields):
+        start = time.perf_counter()
+        autosave(journal, op, fields)
+        timings.append(time.perf_counter() - start)
+
+    for i in range(lines):
+        act("item_add", row=sample_item(i))
+    for i in range(edits):
+        index = (i * 37) % lines
+        if i % 4 == 0:
+            act("item_insert", index=index, row=sample_item(1000 + i))
+        elif i % 4 == 1:
+            act("item_delete", index=index)
+        else:
+            act("item_set", index=index, row=dict(sample_item(index), qty=3))
+    return timings
+
+
+def journaled(journal, op, fields):
+    journal.record(op, **fields)
+
+
+def full_rewrite(journal, op, fields):
+    # Naive autosave: apply the action, then store the whole voucher
+    state = journal.state
+    apply_record(state, dict(fields, op=op))
+    journal.snapshot(state)
+
+
+def report(label, timings):
+    timings = sorted(timings)
+    mean_ms = sum(timings) / len(timings) * 1000
+    p99_ms = timings[int(len(timings) * 0.99) - 1] * 1000
+    print(f"{label:14}: mean {mean_ms:6.3f} ms  p99 {p99_ms:6.3f} ms  per action")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--lines", type=int, default=200)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+
+        journal = DraftJournal()
+        report("journal", key_voucher(journal, args.lines, args.edits, journaled))
+        start = time.perf_counter()
+        state = load_draft(journal.draft_id)
+        restore_ms = (time.perf_counter() - start) * 1000
+        assert state["items"] == journal.state["items"]
+        journal.close()
+
+        naive = DraftJournal()
+        report("full rewrite", key_voucher(naive, args.lines, args.edits, full_rewrite))
+        naive.close()
+
+        print(f"restore       : {restore_ms:6.2f} ms for {len(state['items'])} lines")
+
+
+if __name__ == "__main__":
+    main()
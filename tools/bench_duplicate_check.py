@@ -0,0 +1,78 @@
+"""
+Duplicate invoice check (database/invoice_fingerprints.py) against a large
+voucher history: one fingerprint lookup through the index vs normalizing and
+comparing every saved voucher header.
+
+Uses a temporary database.
+
+Usage:
+    python -m tools.bench_duplicate_check --vouchers 100000 --checks 200
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database.db as db
+from database.invoice_fingerprints import (
+    backfill_invoice_fingerprints, find_duplicates, invoice_fingerprint, voucher_fingerprint,
+)
+
+
+def fill(n_vouchers):
+    conn = db.get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT INTO purchase_vouchers (date, series, voucher_no, purchase_type, party_name, grand_total, saved_at)
+            VALUES (?, 'Main', ?, 'Local-MultiRate', ?, ?, '')
+        """, [(f"2024-{1 + n % 12:02d}-{1 + n % 28:02d}", f"INV/{n:05d}", f"Party {n % 500} Pvt Ltd", 1000 + n % 9000)
+              for n in range(n_vouchers)])
+    conn.close()
+
+
+def scan_duplicates(voucher):
+    """Without the index: normalize every stored header and compare."""
+    target = voucher_fingerprint(voucher)
+    conn = db.get_connection()
+    rows = conn.execute("SELECT id, party_name, voucher_no, date, grand_total FROM purchase_vouchers").fetchall()
+    conn.close()
+    return [r[0] for r in rows if invoice_fingerprint(r[1], r[2], r[3], r[4]) == target]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        fill(args.vouchers)
+        start = time.perf_counter()
+        backfill_invoice_fingerprints()
+        print(f"{args.vouchers} vouchers fingerprinted in {time.perf_counter() - start:.2f}s")
+
+        # Half re-typed copies of saved invoices (different punctuation / legal form), half new
+        checks = []
+        for i in range(args.checks):
+            n = random.randrange(args.vouchers)
+            checks.append({"party_name": f"M/s PARTY {n % 500}", "voucher_no": f"inv-{n}" if i % 2 else f"NEW-{n}",
+                           "date": f"{1 + n % 28:02d}-{1 + n % 12:02d}-2024", "grand_total": 1000 + n % 9000})
+
+        start = time.perf_counter()
+        found = sum(1 for v in checks if find_duplicates(voucher_fingerprint(v)))
+        indexed = (time.perf_counter() - start) / len(checks)
+        scans = checks[:max(1, len(checks) // 20)]
+        start = time.perf_counter()
+        for v in scans:
+            scan_duplicates(v)
+        scanned = (time.perf_counter() - start) / len(scans)
+        print(f"indexed lookup: {indexed * 1000:8.3f} ms per check ({found}/{len(checks)} flagged as duplicates)")
+        print(f"full scan     : {scanned * 1000:8.3f} ms per check")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Multi-invoice PDF: one prompt for the whole PDF vs split_invoice_pages and
+concurrent per-invoice requests (AIRequestScheduler) against the stub endpoint.
+
+The stub charges per output character, so the whole-PDF answer (all invoices'
+items in one completion) costs the sum of the per-invoice answers, generated
+serially. Invoices past the 10,000-character prompt cut are reported as lost.
+
+Usage:
+    python -m tools.bench_invoice_split --invoices 10 --items 20
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from tools.llm_stub_server import SAMPLE_INVOICE, start_stub_server
+from tools.sample_pdfs import invoice_lines, write_pdf
+from utils.ai_utils import AIRequestScheduler, parse_with_openai, reset_ai_client
+from utils.invoice_splitter import split_invoice_pages
+from utils.pdf_utils import extract_pages_from_pdf
+
+STUB_KEY = "stub-key"
+PROMPT_CHARS = 10000  # build_invoice_prompt truncates the text here
+
+
+def stub_invoice(n_items):
+    template = SAMPLE_INVOICE["items"][0]
+    return dict(SAMPLE_INVOICE, items=[dict(template, item_name=f"Item {i + 1}") for i in range(n_items)])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--invoices", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20, help="items per invoice")
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--char-latency", type=float, default=0.0005)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "multi.pdf")
+        write_pdf(pdf_path, [invoice_lines(f"M-{i + 1}", n_items=args.items) for i in range(args.invoices)])
+        with contextlib.redirect_stdout(io.StringIO()):
+            pages = extract_pages_from_pdf(pdf_path, memory_limit_mb=0)
+            invoices = split_invoice_pages(pages)
+
+    found = ["\n".join(group) for group in invoices]
+    correct = sum(1 for i, text in enumerate(found) if f"M-{i + 1} " in text)
+    whole_text = "\n".join(pages)
+    # An invoice survives the prompt cut only if its last line (the total) is inside it
+    ends = [whole_text.find(f"M-{i + 1} ") + len(text) for i, text in enumerate(found)]
+    in_prompt = sum(1 for end in ends if end <= PROMPT_CHARS)
+    print(f"{args.invoices} invoices x {args.items} items, {len(whole_text)} characters")
+    print(f"splitter: {len(invoices)} invoices found, {correct} correctly bounded")
+
+    whole_server, whole_url = start_stub_server(latency=args.latency, char_latency=args.char_latency,
+                                                invoice=stub_invoice(args.items * args.invoices))
+    split_server, split_url = start_stub_server(latency=args.latency, char_latency=args.char_latency,
+                                                invoice=stub_invoice(args.items))
+    reset_ai_client()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            parse_with_openai(whole_text, api_key=STUB_KEY, base_url=whole_url)
+            whole_s = time.perf_counter() - start
+
+            scheduler = AIRequestScheduler(api_key=STUB_KEY, base_url=split_url, requests_per_minute=600,
+                                           tokens_per_minute=10 ** 7, max_concurrency=args.concurrency)
+            start = time.perf_counter()
+            results = scheduler.run_batch(found)
+            split_s = time.perf_counter() - start
+            scheduler.shutdown()
+    finally:
+        whole_server.shutdown()
+        split_server.shutdown()
+
+    ok = sum(1 for r in results if r["data"] is not None)
+    print(f"whole PDF, one request : {whole_s:6.2f}s  1 voucher, "
+          f"{args.invoices - in_prompt} of {args.invoices} invoices cut off by the prompt limit")
+    print(f"split, {args.concurrency} concurrent    : {split_s:6.2f}s  {ok} vouchers")
+
+
+if __name__ == "__main__":
+    main()
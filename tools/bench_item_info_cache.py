@@ -0,0 +1,98 @@
+"""
+Item Info panel lookups (utils/item_info_cache.py) against a stand-in for the
+BUSY queries with network latency: time the UI thread spends per item
+selection with a blocking query per selection vs the prefetching cache.
+
+Each simulated voucher picks a party, then selects items, mostly from that
+party's usual items.
+
+Usage:
+    python -m tools.bench_item_info_cache --vouchers 50 --lines 15 --latency-ms 40
+"""
+
+import argparse
+import random
+import time
+
+from utils.item_info_cache import ItemInfoCache, PARTY_PREFETCH_ITEMS
+
+
+def make_loaders(latency, n_items, n_parties):
+    rng = random.Random(3)
+    usual = {f"Party {p}": rng.sample(range(n_items), PARTY_PREFETCH_ITEMS) for p in range(n_parties)}
+
+    def info(i):
+        return {"last_rate": 10.0 + i, "last_date": "05-04-2024", "last_supplier": "Party 1", "stock": i % 40}
+
+    def item_loader(names):
+        time.sleep(latency)
+        return {name: info(int(name.split()[-1])) for name in names}
+
+    def party_loader(party):
+        time.sleep(latency * 2)  # the ranking query is heavier
+        return {f"Item {i}": info(i) for i in usual[party]}
+
+    return usual, item_loader, party_loader
+
+
+def simulate(args, usual, on_party, select):
+    """Returns the seconds each select(item) call took."""
+    rng = random.Random(11)
+    blocked = []
+    for _ in range(args.vouchers):
+        party = f"Party {rng.randrange(args.parties)}"
+        on_party(party)
+        for _ in range(args.lines):
+            if rng.random() < args.usual_share:
+                item = f"Item {rng.choice(usual[party])}"
+            else:
+                item = f"Item {rng.randrange(args.items)}"
+            start = time.perf_counter()
+            select(item)
+            blocked.append(time.perf_counter() - start)
+            time.sleep(args.think_ms / 1000)
+    return blocked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=50)
+    parser.add_argument("--lines", type=int, default=15)
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--parties", type=int, default=30)
+    parser.add_argument("--usual-share", type=float, default=0.8, help="share of lines from the party's usual items")
+    parser.add_argument("--latency-ms", type=float, default=40.0, help="round trip to SQL Server")
+    parser.add_argument("--think-ms", type=float, default=5.0, help="operator time between selections")
+    args = parser.parse_args()
+
+    usual, item_loader, party_loader = make_loaders(args.latency_ms / 1000, args.items, args.parties)
+
+    # Blocking: one query per selection on the UI thread
+    blocking = simulate(args, usual, lambda party: None, lambda item: item_loader([item]))
+
+    # Cache: party prefetched when chosen, misses fetched in the background
+    cache = ItemInfoCache(item_loader=item_loader, party_loader=party_loader)
+    hits = [0]
+
+    def on_party(party):
+        cache.prefetch_party(party)
+        time.sleep(args.think_ms * 20 / 1000)  # header entry before the first line
+
+    def select(item):
+        found, _ = cache.get(item)
+        if found:
+            hits[0] += 1
+        else:
+            cache.prefetch_items([item])
+
+    cached = simulate(args, usual, on_party, select)
+
+    n = len(blocking)
+    print(f"{n} item selections, {args.latency_ms} ms SQL round trip")
+    print(f"blocking query : {sum(blocking) / n * 1000:7.2f} ms per selection on the UI thread")
+    print(f"prefetch cache : {sum(cached) / n * 1000:7.3f} ms per selection on the UI thread, "
+          f"{hits[0] / n:.0%} shown immediately")
+
+
+if __name__ == "__main__":
+    main()
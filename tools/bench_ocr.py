@@ -0,0 +1,66 @@
+"""
+OCR throughput on a generated scanned invoice PDF: one worker process vs the
+default pool size, then a second import served from the OCR cache.
+
+Needs Tesseract installed (and pytesseract). Uses a temporary database so the
+real mini_b.db cache is not touched.
+
+Usage:
+    python -m tools.bench_ocr --pages 8 --dpi 200
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+
+import database.db as db
+import utils.ocr_utils as ocr_utils
+from tools.sample_pdfs import invoice_lines, write_scanned_pdf
+
+
+def run(pdf_path, pages, workers):
+    ocr_utils.shutdown_ocr_pool()
+    ocr_utils.OCR_MAX_WORKERS = workers
+    with contextlib.redirect_stdout(io.StringIO()):
+        text, stats = ocr_utils.ocr_scanned_pages(pdf_path, pages)
+    return text, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--dpi", type=int, default=200, help="resolution of the simulated scan")
+    args = parser.parse_args()
+
+    if not ocr_utils.ocr_available():
+        print("OCR is not available: install Tesseract and pytesseract first.")
+        return
+
+    default_workers = ocr_utils.OCR_MAX_WORKERS
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        pdf_path = os.path.join(tmp, "scan.pdf")
+        write_scanned_pdf(pdf_path, [invoice_lines(f"SC-{i}") for i in range(args.pages)], dpi=args.dpi)
+        empty = [""] * args.pages
+        try:
+            for workers in sorted({1, default_workers}):
+                conn = db.get_connection()
+                conn.execute("DELETE FROM ocr_cache")
+                conn.commit()
+                conn.close()
+                text, stats = run(pdf_path, empty, workers)
+                print(f"cold, {workers} worker(s): {stats['pages_per_s']:6.2f} pages/s  "
+                      f"({stats['ocr']} pages in {stats['seconds']:.1f}s, {stats['failed']} failed)")
+            _, stats = run(pdf_path, empty, default_workers)
+            print(f"cached          : {stats['pages_per_s']:6.0f} pages/s  ({stats['cached']} cache hits)")
+            found = sum(1 for i, page in enumerate(text) if f"SC-{i}" in page)
+            print(f"invoice numbers recognised on {found}/{args.pages} pages")
+        finally:
+            ocr_utils.shutdown_ocr_pool()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare the PDF text backends of utils.pdf_utils on a corpus of invoices:
+speed (pages/s) and fidelity against pdfplumber, the reference.
+
+Fidelity is the difflib similarity of the normalised page text, plus the share
+of the reference's priced rows (lines with two or more amounts) that come out
+intact on one line - the property the AI parser and templates depend on.
+
+Usage:
+    python -m tools.bench_pdf_backends                 # generated corpus (simple + column-drawn)
+    python -m tools.bench_pdf_backends --corpus invoices/
+"""
+
+import argparse
+import contextlib
+import difflib
+import glob
+import io
+import os
+import tempfile
+import time
+
+from tools.sample_pdfs import invoice_lines, write_pdf
+from utils.pdf_utils import available_pdf_backends, extract_pages_from_pdf
+from utils.text_compaction import AMOUNT_TOKEN
+
+
+def build_corpus(directory, n_files, pages_per_file):
+    paths = []
+    for i in range(n_files):
+        path = os.path.join(directory, f"invoice_{i}.pdf")
+        pages = [invoice_lines(f"INV-{i}-{p}", n_items=30) for p in range(pages_per_file)]
+        # Every third file draws its table column by column (a "complex" layout)
+        write_pdf(path, pages, columns=(i % 3 == 2))
+        paths.append(path)
+    return paths
+
+
+def normalise(text):
+    return [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+
+
+def priced_rows(lines):
+    return {line for line in lines if sum(1 for token in line.split() if AMOUNT_TOKEN.match(token)) >= 2}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="directory of PDFs (default: generate one)")
+    parser.add_argument("--files", type=int, default=12)
+    parser.add_argument("--pages", type=int, default=3)
+    args = parser.parse_args()
+
+    tmp_dir = None
+    if args.corpus:
+        paths = sorted(glob.glob(os.path.join(args.corpus, "*.pdf")))
+    else:
+        tmp_dir = tempfile.TemporaryDirectory()
+        paths = build_corpus(tmp_dir.name, args.files, args.pages)
+
+    backends = ["pdfplumber"] + [b for b in available_pdf_backends() if b != "pdfplumber"]
+    results = {}
+    try:
+        for backend in backends:
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                results[backend] = [extract_pages_from_pdf(path, memory_limit_mb=0, backend=backend) for path in paths]
+            results[backend + ":time"] = time.perf_counter() - start
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+    reference = results["pdfplumber"]
+    total_pages = sum(len(pages or []) for pages in reference)
+    print(f"{len(paths)} files, {total_pages} pages")
+    print(f"{'backend':12s} {'pages/s':>9s} {'speedup':>8s} {'similarity':>11s} {'rows intact':>12s}")
+    for backend in backends:
+        elapsed = results[backend + ":time"]
+        similarity, rows_ref, rows_kept = [], 0, 0
+        for ref_pages, pages in zip(reference, results[backend]):
+            for ref, page in zip(ref_pages or [], pages or []):
+                ref_lines, lines = normalise(ref), normalise(page)
+                similarity.append(difflib.SequenceMatcher(None, "\n".join(ref_lines), "\n".join(lines)).ratio())
+                expected = priced_rows(ref_lines)
+                rows_ref += len(expected)
+                rows_kept += len(expected & priced_rows(lines))
+        print(f"{backend:12s} {total_pages / elapsed:9.1f} {results['pdfplumber:time'] / elapsed:7.1f}x "
+              f"{sum(similarity) / max(1, len(similarity)):10.1%} {rows_kept / max(1, rows_ref):11.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Peak RSS of PDF text extraction on a long statement: the old whole-document
+pdfplumber loop vs the streaming iter_pdf_pages extractor, reported for each
+available backend (streaming-pdfplumber is the like-for-like comparison).
+
+Each mode runs in its own subprocess so peaks don't mix.
+
+Usage:
+    python -m tools.bench_pdf_memory --pages 300
+    python -m tools.bench_pdf_memory --pdf statement.pdf
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from tools.sample_pdfs import write_statement_pdf
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def run_worker(mode, pdf_path, limit):
+    import pdfplumber
+    from utils.pdf_utils import iter_pdf_pages
+
+    start = time.perf_counter()
+    if mode == "eager":
+        # Previous extract_text_from_pdf: every page object stays alive until the with-block exits
+        text = ""
+        with pdfplumber.open(pdf_path) as pdf:
+            for page in pdf.pages:
+                text += (page.extract_text() or "") + "\n"
+        chars = len(text)
+    else:
+        backend = mode.split("-", 1)[1]
+        chars = sum(len(text) + 1 for text in iter_pdf_pages(pdf_path, memory_limit_mb=limit, backend=backend))
+    print(f"{mode:21s} chars={chars:9d}  time={time.perf_counter() - start:6.2f}s  peak RSS={peak_rss_mb():7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=300)
+    parser.add_argument("--pdf", help="existing PDF to measure instead of a generated statement")
+    parser.add_argument("--limit", type=int, default=0, help="memory ceiling (MB) for the streaming run")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.pdf, args.limit)
+        return
+
+    pdf_path = args.pdf
+    tmp_dir = None
+    if not pdf_path:
+        tmp_dir = tempfile.TemporaryDirectory()
+        pdf_path = os.path.join(tmp_dir.name, "statement.pdf")
+        write_statement_pdf(pdf_path, args.pages)
+        print(f"generated {args.pages}-page statement ({os.path.getsize(pdf_path) / 1024:.0f} KB)")
+    try:
+        from utils.pdf_utils import available_pdf_backends
+        for mode in ["eager"] + [f"streaming-{backend}" for backend in available_pdf_backends()]:
+            subprocess.run([sys.executable, "-m", "tools.bench_pdf_memory", "--worker", mode,
+                            "--pdf", pdf_path, "--limit", str(args.limit)], check=True)
+    finally:
+        if tmp_dir:
+            tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
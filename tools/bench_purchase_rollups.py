@@ -0,0 +1,96 @@
+"""
+Purchase reports from the rollup tables (database/purchase_rollups.py) vs
+recomputing them from the stored lines, as the voucher history grows. Also
+reports what maintaining the rollups adds to each save.
+
+Uses a temporary database.
+
+Usage:
+    python -m tools.bench_purchase_rollups --sizes 2000 20000 --lines 10
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import tempfile
+import time
+
+import database.db as db
+from database.purchase_rollups import purchase_report, voucher_rate_rows
+from database.vouchers import load_vouchers, save_voucher
+
+RATES = ("0", "5", "12", "18", "28")
+
+
+def sample_voucher(rng, n, lines):
+    # Spread over ten years, newest last
+    day = 1 + n % 28
+    month = 1 + (n // 28) % 12
+    year = 2015 + (n // 336) % 10
+    return {
+        "date": f"{year}-{month:02d}-{day:02d}", "series": "Main", "voucher_no": f"INV-{n}",
+        "purchase_type": rng.choice(("Local-MultiRate", "Central-MultiRate")), "party_name": f"Party {n % 200}",
+        "grand_total": 0,
+        "items": [{"item_name": f"Item {i}", "tax_category": f"GST {rng.choice(RATES)}%", "qty": 2,
+                   "price": 50, "amount": round(rng.uniform(10, 5000), 2)} for i in range(lines)],
+        "bill_sundry": [{"name": "Freight", "percentage": 0, "amount": 50, "nature": "Additive"}],
+    }
+
+
+def scan_report(date_from, date_to, key):
+    """The same summary recomputed from every stored line in the range."""
+    totals = {}
+    for voucher in load_vouchers(date_from=date_from, date_to=date_to):
+        for row in voucher_rate_rows(voucher):
+            entry = totals.setdefault((key(voucher), row["rate"]), [0.0, 0.0])
+            entry[0] += row["taxable"]
+            entry[1] += row["tax"]
+    return totals
+
+
+def timed(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--lines", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        saved = 0
+        for size in sorted(args.sizes):
+            start, before = time.perf_counter(), saved
+            with contextlib.redirect_stdout(io.StringIO()):
+                while saved < size:
+                    save_voucher(sample_voucher(rng, saved, args.lines))
+                    saved += 1
+            save_ms = (time.perf_counter() - start) * 1000 / max(1, saved - before)
+            print(f"{size} vouchers ({size * args.lines} lines), {save_ms:.2f} ms per save incl. rollups")
+
+            cases = [
+                ("monthly, all history", lambda: purchase_report("monthly", "2000-01-01", "2099-12-31"),
+                 lambda: scan_report("2000-01-01", "2099-12-31", lambda v: v["date"][:7])),
+                ("party-wise, all history", lambda: purchase_report("party", "2000-01-01", "2099-12-31"),
+                 lambda: scan_report("2000-01-01", "2099-12-31", lambda v: v["party_name"])),
+                ("daily, one month", lambda: purchase_report("daily", "2015-03-01", "2015-03-31"),
+                 lambda: scan_report("2015-03-01", "2015-03-31", lambda v: v["date"])),
+            ]
+            for label, rollup, scan in cases:
+                print(f"  {label:24} rollups {timed(rollup):8.2f} ms   scan lines {timed(scan, repeat=1):9.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
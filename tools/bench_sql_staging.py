@@ -0,0 +1,119 @@
+"""
+Staging bulk write (write_vouchers_to_staging) against a local SQL stand-in.
+
+The stand-in is SQLite (the staging schema is an attached database) behind a
+DB-API wrapper that charges one network round trip per statement, as a
+SQL Server connection does. Plain executemany costs one round trip per row;
+with fast_executemany pyodbc sends each executemany call as one parameter
+array, so it costs one round trip per chunk.
+
+Usage:
+    python -m tools.bench_sql_staging --vouchers 500 --lines 40 --rtt-ms 0.5
+"""
+
+import argparse
+import contextlib
+import io
+import sqlite3
+import time
+
+from database.sql_server import STAGING_TABLES, write_vouchers_to_staging
+
+SQLITE_TYPES = {"INT": "INTEGER", "DATE": "TEXT", "DATETIME2": "TEXT", "UNIQUEIDENTIFIER": "TEXT"}
+
+
+class RoundTripCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cursor = conn.sqlite.cursor()
+        self.fast_executemany = False
+
+    def execute(self, sql, params=()):
+        self.conn.wait(1)
+        return self.cursor.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        rows = list(rows)
+        fast = self.fast_executemany and self.conn.fast_available
+        self.conn.wait(1 if fast else len(rows))
+        return self.cursor.executemany(sql, rows)
+
+
+class RoundTripConnection:
+    """SQLite connection that sleeps rtt seconds per simulated round trip."""
+
+    def __init__(self, rtt, fast_available=True):
+        self.sqlite = sqlite3.connect(":memory:", isolation_level="DEFERRED")
+        self.sqlite.execute("ATTACH DATABASE ':memory:' AS staging")
+        self.rtt = rtt
+        self.fast_available = fast_available
+        self.round_trips = 0
+        self.autocommit = True
+        for table, columns in STAGING_TABLES.items():
+            column_sql = ", ".join(f"[{name}] {SQLITE_TYPES.get(sql_type.split()[0], sql_type.split(' NOT')[0])}"
+                                   for name, sql_type in columns)
+            self.sqlite.execute(f"CREATE TABLE staging.[{table}] ({column_sql})")
+            self.sqlite.execute(f"CREATE INDEX staging.IX_{table} ON [{table}] (LocalVoucherId)")
+
+    def wait(self, round_trips):
+        self.round_trips += round_trips
+        if self.rtt:
+            time.sleep(self.rtt * round_trips)
+
+    def cursor(self):
+        return RoundTripCursor(self)
+
+    def commit(self):
+        self.wait(1)
+        self.sqlite.commit()
+
+    def rollback(self):
+        self.sqlite.rollback()
+
+    def close(self):
+        self.sqlite.close()
+
+
+def sample_vouchers(n_vouchers, lines):
+    return [{
+        "id": n, "date": "2024-04-05", "series": "Main", "voucher_no": f"INV-{n}", "purchase_type": "Local-MultiRate",
+        "party_name": f"Party {n % 50}", "grand_total": 4000.0,
+        "items": [{"item_name": f"Item {i}", "tax_category": "18", "hsn": "8481", "qty": 2, "unit": "PCS",
+                   "list_price": 50, "discount": "5", "price": 47.5, "amount": 95.0} for i in range(lines)],
+        "bill_sundry": [{"name": "CGST", "percentage": 9, "amount": 171, "nature": "Additive"},
+                        {"name": "SGST", "percentage": 9, "amount": 171, "nature": "Additive"}],
+    } for n in range(1, n_vouchers + 1)]
+
+
+def run(label, vouchers, rtt, fast, chunk_size):
+    conn = RoundTripConnection(rtt, fast_available=fast)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        ok, message, stats = write_vouchers_to_staging(vouchers, conn=conn, schema="staging",
+                                                       chunk_size=chunk_size, create_tables=False)
+        elapsed = time.perf_counter() - start
+    assert ok, message
+    staged = conn.sqlite.execute("SELECT COUNT(*) FROM staging.PurchaseVoucherItem").fetchone()[0]
+    conn.close()
+    print(f"{label:28}: {elapsed:7.2f}s  {stats['rows'] / elapsed:9.0f} rows/s  "
+          f"{conn.round_trips:6d} round trips  ({staged} item rows staged)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=500)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--rtt-ms", type=float, default=0.5, help="simulated round trip to SQL Server")
+    args = parser.parse_args()
+
+    vouchers = sample_vouchers(args.vouchers, args.lines)
+    rows = args.vouchers * (args.lines + 3)
+    print(f"{args.vouchers} vouchers, {rows} rows, {args.rtt_ms} ms round trip")
+    rtt = args.rtt_ms / 1000
+    run("row by row (executemany)", vouchers, rtt, fast=False, chunk_size=1000)
+    for chunk_size in (100, 1000, 5000):
+        run(f"fast_executemany, chunk {chunk_size}", vouchers, rtt, fast=True, chunk_size=chunk_size)
+
+
+if __name__ == "__main__":
+    main()
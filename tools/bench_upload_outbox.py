@@ -0,0 +1,95 @@
+"""
+Upload outbox throughput and failure handling against the stand-in BUSY
+endpoint: one voucher per request vs batched delivery, with injected 503s
+(some after the batch was already saved) and rejected vouchers.
+
+Uses a temporary database; retry backoff is shortened for the run.
+
+Usage:
+    python -m tools.bench_upload_outbox --vouchers 300 --error-rate 0.2
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+import database.db as db
+import utils.upload_worker as upload_worker
+from database.upload_outbox import enqueue_voucher
+from tools.busy_stub_server import start_busy_stub
+from utils.busy_utils import build_purchase_voucher_xml
+
+
+def sample_voucher(n):
+    return {
+        "date": "05-04-2024", "series": "Main", "voucher_no": f"INV-{n}", "purchase_type": "Local-MultiRate",
+        "party_name": f"Party {n % 50}",
+        "items": [{"item_name": f"Item {i}", "unit_name": "PCS", "qty": "2", "list_price": "50",
+                   "compound_discount": "", "price": "50", "amt": "100", "tax_category": "18"} for i in range(20)],
+        "bill_sundries": [{"name": "CGST", "percent_val": "9", "amount": "180"}],
+    }
+
+
+def outbox_counts():
+    conn = db.get_connection()
+    rows = conn.execute("SELECT status, COUNT(*) FROM upload_outbox GROUP BY status").fetchall()
+    conn.close()
+    return dict(rows)
+
+
+def run(n_vouchers, batch_size, args):
+    conn = db.get_connection()
+    conn.execute("DELETE FROM upload_outbox")
+    conn.commit()
+    conn.close()
+    for n in range(n_vouchers):
+        voucher = sample_voucher(n)
+        enqueue_voucher(n + 1, voucher["voucher_no"], voucher["party_name"], build_purchase_voucher_xml(voucher))
+
+    server, url = start_busy_stub(latency=args.latency, voucher_latency=args.voucher_latency,
+                                  error_rate=args.error_rate, reject_rate=args.reject_rate, drop_after_save=True)
+    worker = upload_worker.UploadWorker(config_loader=lambda: (url, "", ""), batch_size=batch_size)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        worker.start()
+        while True:
+            counts = outbox_counts()
+            if not counts.get("pending") and not counts.get("sending"):
+                break
+            time.sleep(0.02)
+        elapsed = time.perf_counter() - start
+        worker.stop()
+    server.shutdown()
+
+    stats = server.stats
+    print(f"batch {batch_size:3d}: {elapsed:6.2f}s  {n_vouchers / elapsed:7.1f} vouchers/s  "
+          f"{stats['requests']} requests ({stats['errors']} failed)  "
+          f"sent {counts.get('sent', 0)}, rejected {counts.get('failed', 0)}, "
+          f"resent-after-save {stats['duplicates']}, saved in BUSY {len(server.saved)}")
+    assert len(server.saved) == counts.get("sent", 0), "a voucher was saved twice or lost"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.02, help="endpoint seconds per request")
+    parser.add_argument("--voucher-latency", type=float, default=0.002, help="endpoint seconds per voucher")
+    parser.add_argument("--error-rate", type=float, default=0.2)
+    parser.add_argument("--reject-rate", type=float, default=0.02)
+    args = parser.parse_args()
+
+    upload_worker.OUTBOX_BASE_BACKOFF_S = 0.05
+    upload_worker.OUTBOX_MAX_BACKOFF_S = 0.5
+    upload_worker.OUTBOX_MAX_ATTEMPTS = 20
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        for batch_size in (1, upload_worker.OUTBOX_BATCH_SIZE):
+            run(args.vouchers, batch_size, args)
+
+
+if __name__ == "__main__":
+    main()
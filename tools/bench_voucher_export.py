@@ -0,0 +1,103 @@
+"""
+Voucher export (database/voucher_export.py): throughput and peak RSS of the
+streaming CSV / Parquet export vs loading every voucher first
+(load_vouchers) and writing the CSV from memory.
+
+Each mode runs in its own subprocess so peaks don't mix. Uses a temporary
+database.
+
+Usage:
+    python -m tools.bench_voucher_export --vouchers 20000 --lines 50
+"""
+
+import argparse
+import csv
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import database.db as db
+from database.voucher_export import EXPORT_ITEMS, export_columns, export_vouchers, pq
+from tools.export_vouchers import peak_rss_mb
+
+ITEMS = ["BALL VALVE", "GATE VALVE", "CPVC PIPE", "UPVC ELBOW", "GI TEE", "SS FLANGE", "BRASS UNION", "PTFE TAPE"]
+
+
+def fill(n_vouchers, lines):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT INTO purchase_vouchers (id, date, series, voucher_no, purchase_type, party_name, grand_total, saved_at)
+            VALUES (?, ?, 'Main', ?, 'Local-MultiRate', ?, 0, '')
+        """, [(v, f"{2018 + v % 7}-{1 + v % 12:02d}-{1 + v % 28:02d}", f"INV/{v:06d}", f"Party {v % 800}")
+              for v in range(1, n_vouchers + 1)])
+        conn.executemany("""
+            INSERT INTO purchase_items (voucher_id, item_name, tax_category, hsn, qty, unit, list_price, discount, price, amount)
+            VALUES (?, ?, 'GST 18%', ?, ?, 'PCS', 50, '', 50, ?)
+        """, ((v, f"{rng.choice(ITEMS)} {rng.randrange(1000)}", str(8400 + rng.randrange(200)), q, q * 50)
+              for v in range(1, n_vouchers + 1) for q in [rng.randrange(1, 20) for _ in range(lines)]))
+    conn.close()
+
+
+def run_worker(mode, db_path, out_dir):
+    db.DB_NAME = db_path
+    if mode == "materialized":
+        from database.vouchers import load_vouchers
+
+        start = time.perf_counter()
+        path = os.path.join(out_dir, "materialized.csv")
+        vouchers = load_vouchers()
+        rows = 0
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(export_columns(EXPORT_ITEMS))
+            for v in vouchers:
+                header = (v["id"], v["date"], v["series"], v["voucher_no"], v["purchase_type"], v["party_name"],
+                          v["grand_total"])
+                for item in v["items"]:
+                    writer.writerow(header + tuple(item.values()))
+                    rows += 1
+        seconds = time.perf_counter() - start
+    else:
+        path = os.path.join(out_dir, "stream.csv" if mode == "stream-csv" else "stream.parquet")
+        ok, message, stats = export_vouchers(path, "csv" if mode == "stream-csv" else "parquet")
+        if not ok:
+            print(f"{mode:14s} {message}")
+            return
+        rows, seconds = stats["rows"], stats["seconds"]
+    print(f"{mode:14s} rows={rows:9d}  time={seconds:6.2f}s  {rows / seconds:10,.0f} rows/s  "
+          f"file={os.path.getsize(path) / (1024 * 1024):7.1f} MB  peak RSS={peak_rss_mb():7.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=20000)
+    parser.add_argument("--lines", type=int, default=50)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.db, args.out)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        fill(args.vouchers, args.lines)
+        print(f"{args.vouchers} vouchers, {args.vouchers * args.lines} item lines")
+        modes = ["materialized", "stream-csv"] + (["stream-parquet"] if pq is not None else [])
+        if pq is None:
+            print("(pyarrow not installed: Parquet skipped)")
+        for mode in modes:
+            subprocess.run([sys.executable, "-m", "tools.bench_voucher_export", "--worker", mode,
+                            "--db", db.DB_NAME, "--out", tmp], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Voucher history search (database/voucher_search.py) over a large local
+history: first page and deep pages for rare and common terms, compared with
+a LIKE scan and with OFFSET paging.
+
+Uses a temporary database.
+
+Usage:
+    python -m tools.bench_voucher_search --vouchers 25000 --lines 40
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database.db as db
+from database.voucher_search import SEARCH_PAGE_SIZE, build_match_query, search_purchase_lines, search_words
+
+WORDS = ["BALL", "BEARING", "VALVE", "GATE", "PIPE", "ELBOW", "TEE", "FLANGE", "BOLT", "NUT", "WASHER", "GASKET",
+         "CPVC", "UPVC", "GI", "SS", "BRASS", "COUPLER", "REDUCER", "UNION", "SOCKET", "CLAMP", "TAPE", "SEAL"]
+
+
+def fill(n_vouchers, lines):
+    rng = random.Random(7)
+    conn = db.get_connection()
+    with conn:
+        conn.executemany("""
+            INSERT INTO purchase_vouchers (id, date, series, voucher_no, purchase_type, party_name, grand_total, saved_at)
+            VALUES (?, ?, 'Main', ?, 'Local-MultiRate', ?, 0, '')
+        """, [(v, f"2024-{1 + v % 12:02d}-{1 + v % 28:02d}", f"INV/{v:06d}", f"{rng.choice(WORDS).title()} Traders {v % 800}")
+              for v in range(1, n_vouchers + 1)])
+        conn.executemany("""
+            INSERT INTO purchase_items (voucher_id, item_name, tax_category, hsn, qty, unit, list_price, discount, price, amount)
+            VALUES (?, ?, '18', ?, 2, 'PCS', 50, '', 50, 100)
+        """, ((v, f"{rng.choice(WORDS)} {rng.choice(WORDS)} {rng.randrange(100000)}", str(8400 + rng.randrange(200)))
+              for v in range(1, n_vouchers + 1) for _ in range(lines)))
+        conn.execute("""
+            INSERT INTO purchase_search (rowid, item_name, hsn, party_name, voucher_no)
+            SELECT i.id, i.item_name, i.hsn, v.party_name, v.voucher_no
+            FROM purchase_items i JOIN purchase_vouchers v ON v.id = i.voucher_id
+        """)
+        conn.execute("CREATE VIRTUAL TABLE temp.vocab USING fts5vocab(main, purchase_search, 'row')")
+        conn.execute("INSERT OR IGNORE INTO purchase_search_terms (term) SELECT term FROM temp.vocab")
+    conn.close()
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000, result
+
+
+def like_scan(text):
+    conn = db.get_connection()
+    pattern = f"%{text}%"
+    rows = conn.execute("""
+        SELECT i.id FROM purchase_items i JOIN purchase_vouchers v ON v.id = i.voucher_id
+        WHERE i.item_name LIKE ? OR i.hsn LIKE ? OR v.party_name LIKE ? OR v.voucher_no LIKE ?
+        ORDER BY i.id DESC LIMIT ?
+    """, (pattern, pattern, pattern, pattern, SEARCH_PAGE_SIZE)).fetchall()
+    conn.close()
+    return rows
+
+
+def offset_page(text, page):
+    conn = db.get_connection()
+    query = build_match_query(search_words(text), conn)
+    rows = conn.execute("""
+        SELECT s.rowid FROM purchase_search s JOIN purchase_items i ON i.id = s.rowid
+        JOIN purchase_vouchers v ON v.id = i.voucher_id
+        WHERE purchase_search MATCH ? ORDER BY s.rowid DESC LIMIT ? OFFSET ?
+    """, (query, SEARCH_PAGE_SIZE, page * SEARCH_PAGE_SIZE)).fetchall()
+    conn.close()
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=25000)
+    parser.add_argument("--lines", type=int, default=40)
+    parser.add_argument("--deep", type=int, default=50, help="page number for the deep-page test")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+        start = time.perf_counter()
+        fill(args.vouchers, args.lines)
+        print(f"{args.vouchers * args.lines} lines in {args.vouchers} vouchers, "
+              f"built in {time.perf_counter() - start:.1f}s")
+
+        for text in ("bearing", "bear valv", "8421", "inv 001234", "gate traders 17", "zzz"):
+            ms, rows = timed(lambda: search_purchase_lines(text))
+            like_ms, _ = timed(lambda: like_scan(text.split()[0]), repeat=1)
+            print(f"{text!r:20} first page {ms:7.2f} ms ({len(rows):3d} rows)   LIKE scan {like_ms:8.1f} ms")
+
+        text = "bearing"
+        rows = search_purchase_lines(text)
+        for _ in range(args.deep - 1):
+            rows = search_purchase_lines(text, before_id=rows[-1]["line_id"]) or rows
+        ms, _ = timed(lambda: search_purchase_lines(text, before_id=rows[-1]["line_id"]))
+        offset_ms, _ = timed(lambda: offset_page(text, args.deep))
+        back_ms, _ = timed(lambda: search_purchase_lines(text, after_id=rows[0]["line_id"]))
+        print(f"page {args.deep} of {text!r}: keyset {ms:.2f} ms (back one page {back_ms:.2f} ms), "
+              f"OFFSET {offset_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Local voucher store at scale: fill a temporary database with many vouchers,
+then time saving one more voucher and reloading random vouchers, with the
+voucher_id / party / date indexes and without them.
+
+Usage:
+    python -m tools.bench_voucher_store --vouchers 10000 --lines 30
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import database.db as db
+from database.vouchers import list_vouchers, load_voucher, save_voucher
+
+INDEXES = ("idx_purchase_items_voucher_id", "idx_bill_sundry_voucher_id",
+           "idx_purchase_vouchers_party_date", "idx_purchase_vouchers_date")
+
+
+def sample_voucher(n, lines):
+    return {
+        "date": f"2024-{n % 12 + 1:02d}-{n % 28 + 1:02d}",
+        "series": "Main",
+        "voucher_no": f"INV-{n}",
+        "purchase_type": "Local-MultiRate",
+        "party_name": f"Party {n % 200}",
+        "grand_total": 1000.0,
+        "items": [{"item_name": f"Item {i}", "tax_category": "18", "hsn": "8481", "qty": 2, "unit": "PCS",
+                   "list_price": 50, "discount": 0, "price": 50, "amount": 100} for i in range(lines)],
+        "bill_sundry": [{"name": "CGST", "percentage": 9, "amount": 90, "nature": "Additive"},
+                        {"name": "SGST", "percentage": 9, "amount": 90, "nature": "Additive"}],
+    }
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def measure(n_vouchers, lines, repeat):
+    ids = random.sample(range(1, n_vouchers + 1), repeat)
+    voucher = sample_voucher(n_vouchers + 1, lines)
+    save_ms = timed(lambda: save_voucher(voucher), repeat)
+    it = iter(ids)
+    load_ms = timed(lambda: load_voucher(next(it)), repeat)
+    list_ms = timed(lambda: list_vouchers(party_name="Party 7", limit=50), repeat)
+    return save_ms, load_ms, list_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vouchers", type=int, default=10000)
+    parser.add_argument("--lines", type=int, default=30, help="items per voucher")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_NAME = os.path.join(tmp, "bench.db")
+        db.create_tables()
+
+        start = time.perf_counter()
+        for n in range(1, args.vouchers + 1):
+            save_voucher(sample_voucher(n, args.lines))
+        fill_s = time.perf_counter() - start
+        print(f"stored {args.vouchers} vouchers / {args.vouchers * args.lines} lines in {fill_s:.1f}s "
+              f"({args.vouchers / fill_s:.0f} vouchers/s)")
+
+        save_ms, load_ms, list_ms = measure(args.vouchers, args.lines, args.repeat)
+        print(f"indexed   : save {save_ms:7.2f} ms  load {load_ms:7.2f} ms  list by party {list_ms:7.2f} ms")
+
+        conn = db.get_connection()
+        for index in INDEXES:
+            conn.execute(f"DROP INDEX {index}")
+        conn.commit()
+        conn.close()
+        save_ms, load_ms, list_ms = measure(args.vouchers, args.lines, args.repeat)
+        print(f"no indexes: save {save_ms:7.2f} ms  load {load_ms:7.2f} ms  list by party {list_ms:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Local stand-in for the BUSY XML voucher endpoint used by the upload outbox
+(utils/upload_worker.py). Saves nothing; remembers idempotency keys so a
+re-sent voucher gets its original VchCode instead of a second voucher, and
+answers Action="Modify" with the VchCode being modified.
+
+Usage:
+    python -m tools.busy_stub_server --port 8766 --latency 0.05 --error-rate 0.2
+
+Then set Settings > BUSY Upload > XML Endpoint URL to http://127.0.0.1:8766/vouchers
+"""
+
+import argparse
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import quoteattr
+
+
+class BusyStubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+class BusyStubHandler(BaseHTTPRequestHandler):
+    """Answers POST <VoucherBatch> with a <VoucherBatchResult>."""
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/xml; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        with server.lock:
+            server.stats["requests"] += 1
+
+        if server.error_rate and random.random() < server.error_rate:
+            with server.lock:
+                server.stats["errors"] += 1
+            if server.drop_after_save and random.random() < 0.5:
+                # Fail after saving: the client must resend, and the keys must prevent duplicates
+                self._save_batch(body)
+            self._send(503, "<Error>stub injected failure</Error>")
+            return
+
+        if server.credentials and (self.headers.get("UserName"), self.headers.get("Pwd")) != server.credentials:
+            self._send(401, "<Error>invalid credentials</Error>")
+            return
+
+        try:
+            results = self._save_batch(body)
+        except ET.ParseError as e:
+            self._send(400, f"<Error>{e}</Error>")
+            return
+        parts = ["<VoucherBatchResult>"]
+        for key, code, message in results:
+            if code:
+                parts.append(f'<Voucher Key={quoteattr(key)} Status="Saved" VchCode="{code}"/>')
+            else:
+                parts.append(f'<Voucher Key={quoteattr(key)} Status="Error" Message={quoteattr(message)}/>')
+        parts.append("</VoucherBatchResult>")
+        self._send(200, "".join(parts))
+
+    def _save_batch(self, body):
+        server = self.server
+        root = ET.fromstring(body)
+        vouchers = root.findall("Voucher")
+        if server.latency or server.voucher_latency:
+            time.sleep(server.latency + server.voucher_latency * len(vouchers))
+        results = []
+        with server.lock:
+            for node in vouchers:
+                key = node.get("Key")
+                server.stats["received"] += 1
+                if key in server.saved:
+                    server.stats["duplicates"] += 1
+                    results.append((key, server.saved[key], ""))
+                    continue
+                purchase = node.find("Purchase")
+                party = purchase.findtext("MasterName1") if purchase is not None else None
+                if not party or (server.reject_rate and random.random() < server.reject_rate):
+                    results.append((key, None, "Party name is missing or unknown"))
+                    continue
+                if node.get("Action") == "Modify":
+                    code = node.get("VchCode")
+                    if code not in server.saved.values():
+                        results.append((key, None, f"Voucher {code} not found"))
+                        continue
+                    server.stats["modified"] += 1
+                    server.saved[key] = code
+                    results.append((key, code, ""))
+                    continue
+                server.next_code += 1
+                server.saved[key] = str(server.next_code)
+                results.append((key, server.saved[key], ""))
+        return results
+
+
+def start_busy_stub(port=0, latency=0.0, voucher_latency=0.0, error_rate=0.0, reject_rate=0.0,
+                    drop_after_save=False, credentials=None):
+    """
+    Start the stand-in endpoint on a background thread.
+
+    Args:
+        latency: Seconds per request
+        voucher_latency: Extra seconds per voucher in the batch
+        error_rate: Probability of answering a request with HTTP 503
+        reject_rate: Probability of rejecting an individual voucher (Status="Error")
+        drop_after_save: With error_rate, sometimes save the batch before answering 503
+        credentials: (username, password) to require, or None
+
+    Returns:
+        (server, url) - server.saved maps idempotency keys to VchCodes; server.stats has
+        'requests', 'errors', 'received', 'duplicates' and 'modified' counters.
+    """
+    server = BusyStubServer(("127.0.0.1", port), BusyStubHandler)
+    server.latency = latency
+    server.voucher_latency = voucher_latency
+    server.error_rate = error_rate
+    server.reject_rate = reject_rate
+    server.drop_after_save = drop_after_save
+    server.credentials = credentials
+    server.saved = {}
+    server.next_code = 1000
+    server.stats = {"requests": 0, "errors": 0, "received": 0, "duplicates": 0, "modified": 0}
+    server.lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/vouchers"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local BUSY XML voucher endpoint for offline testing")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per request")
+    parser.add_argument("--voucher-latency", type=float, default=0.0, help="extra seconds per voucher")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an HTTP 503")
+    parser.add_argument("--reject-rate", type=float, default=0.0, help="probability of rejecting a voucher")
+    args = parser.parse_args()
+
+    server, url = start_busy_stub(args.port, args.latency, args.voucher_latency, args.error_rate,
+                                  args.reject_rate, drop_after_save=True)
+    print(f"Stub BUSY voucher endpoint at {url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
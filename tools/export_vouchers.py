@@ -0,0 +1,54 @@
+"""
+Export stored voucher lines to CSV or Parquet (for audits), streamed in chunks
+so years of lines never sit in memory. Prints rows/s and peak memory.
+
+Usage:
+    python -m tools.export_vouchers purchases.csv --from 2021-04-01 --to 2024-03-31
+    python -m tools.export_vouchers purchases.parquet
+    python -m tools.export_vouchers bill_sundries.csv --kind bill_sundry
+"""
+
+import argparse
+import sys
+
+from database.db import create_tables
+from database.voucher_export import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, EXPORT_ITEMS, EXPORT_KINDS, export_vouchers
+from utils.invoice_templates import normalize_date
+
+
+def peak_rss_mb():
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KB on Linux
+    except ImportError:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", help="output file (.csv or .parquet)")
+    parser.add_argument("--format", dest="fmt", choices=EXPORT_FORMATS, help="default: from the file extension")
+    parser.add_argument("--kind", choices=EXPORT_KINDS, default=EXPORT_ITEMS)
+    parser.add_argument("--from", dest="date_from", help="first day (default: everything)")
+    parser.add_argument("--to", dest="date_to", help="last day (default: everything)")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE, help="rows fetched and written at a time")
+    args = parser.parse_args()
+
+    date_from = normalize_date(args.date_from) if args.date_from else None
+    date_to = normalize_date(args.date_to) if args.date_to else None
+    if (args.date_from and not date_from) or (args.date_to and not date_to):
+        parser.error("--from and --to must be dates")
+
+    create_tables()
+    ok, message, stats = export_vouchers(args.path, args.fmt, args.kind, date_from, date_to, args.chunk_size)
+    print(message)
+    if not ok:
+        sys.exit(1)
+    seconds = max(stats["seconds"], 1e-9)
+    print(f"{stats['rows'] / seconds:,.0f} rows/s, {stats['bytes'] / (1024 * 1024):.1f} MB written "
+          f"in {stats['seconds']:.2f}s, peak RSS {peak_rss_mb():.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
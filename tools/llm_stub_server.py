@@ -0,0 +1,258 @@
+"""
+Local stand-in for the OpenRouter chat-completions endpoint.
+Used to benchmark and exercise the AI parsing code offline (no network, no API key).
+
+Usage:
+    python -m tools.llm_stub_server --port 8765 --latency 0.2
+
+Then point the client at base_url="http://127.0.0.1:8765/v1" with any api_key.
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_INVOICE = {
+    "party_name": "Acme Traders",
+    "date": "2024-04-05",
+    "voucher_no": "INV-101",
+    "purchase_type": "Local-MultiRate",
+    "items": [
+        {"item_name": "Philips 9W Bulb", "tax_category": "18", "hsn": "8539", "qty": 10, "unit": "PCS",
+         "list_price": 50, "discount": 0, "price": 50, "amount": 500},
+        {"item_name": "Havells Fan", "tax_category": "18", "hsn": "8414", "qty": 2, "unit": "NOS",
+         "list_price": 1200, "discount": 0, "price": 1200, "amount": 2400},
+    ],
+    "bill_sundry": [{"name": "Freight", "percentage": 0, "amount": 100}],
+    "grand_total": 3000,
+}
+
+
+def _bad_invoice(invoice):
+    """Same invoice with line amounts that no longer match qty x price (fails validation)."""
+    bad = dict(invoice)
+    bad["items"] = [dict(item, amount=round(float(item["amount"]) * 1.5, 2)) for item in invoice["items"]]
+    return bad
+
+
+BATCH_BLOCK = re.compile(r"=== INVOICE (\S+) ===\n(.*?)\n=== END \1 ===", re.DOTALL)
+VOUCHER_NO = re.compile(r"Invoice No:\s*(\S+)")
+
+
+def _batch_content(prompt, invoice):
+    """Answer a multi-invoice prompt: one copy of the invoice per marked block, tagged with its id."""
+    invoices = []
+    for invoice_id, text in BATCH_BLOCK.findall(prompt):
+        match = VOUCHER_NO.search(text)
+        voucher_no = match.group(1) if match else invoice["voucher_no"]
+        invoices.append(dict(invoice, invoice_id=invoice_id, voucher_no=voucher_no))
+    return {"invoices": invoices} if invoices else None
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        pass  # Clients dropping keep-alive connections on exit is expected
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers POST .../chat/completions with a canned invoice JSON, or with
+    {"invoices": [...]} when the prompt holds several marked invoices.
+    """
+
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real endpoint
+
+    def setup(self):
+        super().setup()
+        with self.server.stats_lock:
+            self.server.stats["connections"] += 1
+
+    def log_message(self, format, *args):
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_stream(self, request, content):
+        """Send the content as server-sent events, chunk_size characters at a time."""
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        size = self.server.chunk_size
+        for i in range(0, len(content), size):
+            event = {
+                "id": "stub-completion",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": content[i:i + size]}, "finish_reason": None}],
+            }
+            self._write_chunk(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            if self.server.chunk_delay:
+                time.sleep(self.server.chunk_delay)
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+
+    def _injected_error(self):
+        """Return an HTTP status to fail this request with, or None."""
+        server = self.server
+        if server.rate_limit:
+            now = time.monotonic()
+            with server.stats_lock:
+                server.recent = [t for t in server.recent if now - t < 1.0]
+                if len(server.recent) >= server.rate_limit:
+                    return 429
+                server.recent.append(now)
+        if server.error_rate and random.random() < server.error_rate:
+            return random.choice(server.error_statuses)
+        return None
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.server.stats_lock:
+            self.server.stats["requests"] += 1
+
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._send_json(404, {"error": {"message": "not found"}})
+            return
+
+        status = self._injected_error()
+        if status:
+            with self.server.stats_lock:
+                self.server.stats["errors"] += 1
+            self.send_response(status)
+            body = json.dumps({"error": {"message": f"stub injected {status}", "code": status}}).encode("utf-8")
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            if status == 429:
+                self.send_header("Retry-After", "1")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+
+        # Per-model behaviour (e.g. a fast model that is sometimes wrong)
+        profile = self.server.model_profiles.get(request.get("model"), {})
+        delay = profile.get("latency", self.server.latency)
+        if self.server.latency_jitter:
+            delay += random.uniform(0, self.server.latency_jitter)
+        if self.server.slow_rate and random.random() < self.server.slow_rate:
+            delay = self.server.slow_latency  # occasional slow provider response (tail latency)
+
+        invoice = self.server.invoice
+        if profile.get("bad_rate") and random.random() < profile["bad_rate"]:
+            invoice = _bad_invoice(invoice)
+        prompt = "\n".join(str(m.get("content", "")) for m in request.get("messages", []))
+        content = json.dumps(_batch_content(prompt, invoice) or invoice, indent=2)
+        if not request.get("stream"):
+            delay += len(content) * self.server.char_latency  # output generation time
+        if delay:
+            time.sleep(delay)
+
+        if request.get("stream"):
+            self._send_stream(request, content)
+            return
+
+        self._send_json(200, {
+            "id": "stub-completion",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": request.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": len(content) // 4, "total_tokens": len(content) // 4},
+        })
+
+
+def start_stub_server(port=0, latency=0.0, invoice=None, chunk_size=16, chunk_delay=0.0,
+                      latency_jitter=0.0, error_rate=0.0, error_statuses=(429, 500, 503), rate_limit=0,
+                      model_profiles=None, slow_rate=0.0, slow_latency=5.0, char_latency=0.0):
+    """
+    Start the stub server on a background thread.
+
+    Args:
+        port: TCP port (0 picks a free port)
+        latency: Seconds to wait before answering each request
+        invoice: dict returned as the model's JSON content (default SAMPLE_INVOICE)
+        chunk_size: Characters per streamed delta when the request has stream=true
+        chunk_delay: Seconds between streamed deltas (simulated token generation)
+        latency_jitter: Extra random latency, uniform in [0, latency_jitter] seconds
+        error_rate: Probability of failing a request with one of error_statuses
+        error_statuses: HTTP statuses used for injected failures
+        rate_limit: Max requests per second before answering 429 (0 = unlimited)
+        model_profiles: {model: {'latency': s, 'bad_rate': p}} overrides per requested model;
+            bad_rate is the probability of an answer that fails invoice validation
+        slow_rate: Probability that a request takes slow_latency seconds instead (tail latency)
+        slow_latency: Seconds for those slow requests
+        char_latency: Seconds per character of non-streamed content (simulated generation time)
+
+    Returns:
+        (server, base_url) - call server.shutdown() when done; server.stats has
+        'connections', 'requests' and 'errors' counters.
+    """
+    server = StubServer(("127.0.0.1", port), StubHandler)
+    server.latency = latency
+    server.invoice = invoice or SAMPLE_INVOICE
+    server.chunk_size = chunk_size
+    server.chunk_delay = chunk_delay
+    server.latency_jitter = latency_jitter
+    server.error_rate = error_rate
+    server.error_statuses = tuple(error_statuses)
+    server.rate_limit = rate_limit
+    server.recent = []
+    server.model_profiles = model_profiles or {}
+    server.slow_rate = slow_rate
+    server.slow_latency = slow_latency
+    server.char_latency = char_latency
+    server.stats = {"connections": 0, "requests": 0, "errors": 0}
+    server.stats_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local chat-completions stand-in for offline benchmarks")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of simulated model latency")
+    parser.add_argument("--chunk-size", type=int, default=16, help="characters per streamed delta")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="seconds between streamed deltas")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="extra random latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="probability of an injected 429/5xx")
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before 429")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="probability of a slow response")
+    parser.add_argument("--slow-latency", type=float, default=5.0, help="seconds for slow responses")
+    args = parser.parse_args()
+
+    server, base_url = start_stub_server(args.port, args.latency, chunk_size=args.chunk_size,
+                                         chunk_delay=args.chunk_delay, latency_jitter=args.latency_jitter,
+                                         error_rate=args.error_rate, rate_limit=args.rate_limit,
+                                         slow_rate=args.slow_rate, slow_latency=args.slow_latency)
+    print(f"Stub chat-completions endpoint at {base_url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
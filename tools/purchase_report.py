@@ -0,0 +1,54 @@
+"""
+Print a purchase summary by tax rate from the purchase rollups (the same
+figures as the Purchase Reports window).
+
+Usage:
+    python -m tools.purchase_report --grain monthly --from 2024-04-01 --to 2025-03-31
+    python -m tools.purchase_report --grain party --party "Gupta Traders"
+    python -m tools.purchase_report --rebuild
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from database.db import create_tables
+from database.purchase_rollups import GRAINS, ensure_purchase_rollups, purchase_report, rebuild_purchase_rollups
+from utils.invoice_templates import normalize_date
+
+
+def main():
+    today = date.today()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--grain", choices=GRAINS, default="daily")
+    parser.add_argument("--from", dest="date_from", default=today.replace(day=1).isoformat(),
+                        help="first day (default: start of this month)")
+    parser.add_argument("--to", dest="date_to", default=today.isoformat(), help="last day (default: today)")
+    parser.add_argument("--party", help="party-wise report for one party")
+    parser.add_argument("--rebuild", action="store_true", help="recompute the rollups from all saved vouchers first")
+    args = parser.parse_args()
+
+    date_from, date_to = normalize_date(args.date_from), normalize_date(args.date_to)
+    if not date_from or not date_to:
+        parser.error("--from and --to must be dates")
+
+    create_tables()
+    if args.rebuild:
+        if rebuild_purchase_rollups() is None:
+            sys.exit(1)
+    else:
+        ensure_purchase_rollups()
+
+    rows = purchase_report(args.grain, date_from, date_to, args.party)
+    print(f"{'Period':<30} {'Rate':>6} {'Vouchers':>8} {'Taxable':>14} {'Tax':>12} {'Total':>14}")
+    taxable = tax = 0.0
+    for row in rows:
+        print(f"{row['period'] or '(no date)':<30.30} {row['tax_rate']:>5g}% {row['vouchers']:>8} "
+              f"{row['taxable']:>14.2f} {row['tax']:>12.2f} {row['taxable'] + row['tax']:>14.2f}")
+        taxable += row["taxable"]
+        tax += row["tax"]
+    print(f"{'Total':<30} {'':>6} {'':>8} {taxable:>14.2f} {tax:>12.2f} {taxable + tax:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
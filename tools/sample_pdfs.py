@@ -0,0 +1,141 @@
+"""
+Generate synthetic invoice PDFs for the offline PDF benchmarks.
+
+Writes plain PDF 1.4 by hand (Helvetica text only), so no PDF writer library is needed.
+"""
+
+ITEMS = [
+    ("Philips 9W Bulb", "8539", 10, "PCS", 50.0),
+    ("Havells Fan", "8414", 2, "NOS", 1200.0),
+    ("Anchor Switch 6A", "8536", 25, "PCS", 32.5),
+    ("Finolex Wire 1.5mm", "8544", 4, "ROLL", 1450.0),
+    ("Syska LED Batten", "9405", 6, "PCS", 310.0),
+]
+
+
+def invoice_lines(voucher_no, party="Acme Traders", gstin="27ABCDE1234F1Z5", n_items=20, date="05/04/2024"):
+    """Text lines of one invoice: header, item table, totals."""
+    lines = [
+        party,
+        f"GSTIN: {gstin}",
+        "TAX INVOICE",
+        f"Invoice No: {voucher_no}    Date: {date}",
+        "S.No  Description  HSN  Qty  Unit  Rate  Amount",
+    ]
+    total = 0.0
+    for i in range(n_items):
+        name, hsn, qty, unit, rate = ITEMS[i % len(ITEMS)]
+        amount = qty * rate
+        total += amount
+        lines.append(f"{i + 1}  {name}  {hsn}  {qty}  {unit}  {rate:.2f}  {amount:.2f}")
+    lines.append("Freight  100.00")
+    lines.append(f"Total  {total + 100:.2f}")
+    return lines
+
+
+def _escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _line_ops(lines, font_size):
+    """Content stream drawing the lines top to bottom, one after another."""
+    ops = [f"BT /F1 {font_size} Tf {font_size + 3} TL 40 800 Td"]
+    ops += [f"({_escape(line)}) Tj T*" for line in lines]
+    ops.append("ET")
+    return ops
+
+
+def _column_ops(lines, font_size):
+    """
+    Content stream drawing the table column by column (cells split on double
+    spaces), as many invoicing tools do; rows only exist by position.
+    """
+    rows = [line.split("  ") for line in lines]
+    ops = [f"BT /F1 {font_size} Tf"]
+    for col in range(max(len(row) for row in rows)):
+        for r, row in enumerate(rows):
+            if col < len(row):
+                x = 40 + (col * 90 if len(row) > 1 else 0)
+                ops.append(f"1 0 0 1 {x} {800 - r * (font_size + 3)} Tm ({_escape(row[col])}) Tj")
+    ops.append("ET")
+    return ops
+
+
+def write_pdf(path, pages, font_size=9, columns=False):
+    """
+    Write a text-only PDF.
+
+    Args:
+        path: Output file path
+        pages: list of pages, each a list of text lines
+        columns: Draw each page column by column (a "complex" layout) instead of line by line
+    """
+    objects = [None, None]  # 1: catalog, 2: page tree (filled in below)
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")  # 3: font
+    page_ids = []
+    for lines in pages:
+        ops = _column_ops(lines, font_size) if columns else _line_ops(lines, font_size)
+        stream = "\n".join(ops).encode("latin-1", "replace")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        content_id = len(objects)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 3 0 R >> >> "
+            f"/Contents {content_id} 0 R >>".encode("ascii")
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{i} 0 R" for i in page_ids)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def write_statement_pdf(path, n_pages, items_per_page=60):
+    """A long consolidated statement: one invoice-like page after another."""
+    write_pdf(path, [invoice_lines(f"ST-{i + 1}", n_items=items_per_page) for i in range(n_pages)])
+
+
+def write_scanned_pdf(path, pages, dpi=150, repeat=1):
+    """
+    An image-only PDF that looks like a scan: each text page is rendered to a
+    grayscale bitmap and placed as the page's only content.
+
+    Args:
+        repeat: Include every page this many times (identical scans exercise the OCR cache)
+    """
+    import os
+    import tempfile
+
+    import pypdfium2
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source_path = os.path.join(tmp, "source.pdf")
+        write_pdf(source_path, pages)
+        source = pypdfium2.PdfDocument(source_path)
+        scanned = pypdfium2.PdfDocument.new()
+        for _ in range(repeat):
+            for index in range(len(source)):
+                page = source[index]
+                width, height = page.get_size()
+                bitmap = page.render(scale=dpi / 72, grayscale=True)
+                new_page = scanned.new_page(width, height)
+                image = pypdfium2.PdfImage.new(scanned)
+                image.set_bitmap(bitmap)
+                image.set_matrix(pypdfium2.PdfMatrix().scale(width, height))
+                new_page.insert_obj(image)
+                new_page.gen_content()
+                new_page.close()
+                page.close()
+        scanned.save(path)
+        scanned.close()
+        source.close()
@@ -0,0 +1,37 @@
+"""
+Write locally saved vouchers to the SQL Server staging tables (the end-of-day
+job). Uses the SQL connection and staging schema from Settings; re-running
+for the same dates replaces the earlier rows of those vouchers.
+
+Usage:
+    python -m tools.stage_vouchers --from 2024-04-05 [--to 2024-04-05]
+"""
+
+import argparse
+import sys
+from datetime import date
+
+from database.db import create_tables
+from database.sql_server import write_vouchers_to_staging
+from database.vouchers import load_vouchers
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--from", dest="date_from", default=date.today().isoformat(), help="YYYY-MM-DD (default today)")
+    parser.add_argument("--to", dest="date_to", help="YYYY-MM-DD (default --from)")
+    args = parser.parse_args()
+
+    create_tables()
+    vouchers = load_vouchers(date_from=args.date_from, date_to=args.date_to or args.date_from)
+    if not vouchers:
+        print("No saved vouchers in that range.")
+        return
+    ok, message, _ = write_vouchers_to_staging(vouchers)
+    print(message)
+    if not ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
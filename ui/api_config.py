@@ -121,6 +121,10 @@ def open_api_config():
         conn.commit()
         conn.close()
 
+        # Drop the cached AI client/key so the new key is used on the next import
+        from utils.ai_utils import reset_ai_client
+        reset_ai_client()
+
         messagebox.showinfo("Saved", "API configuration saved successfully")
         win.destroy()
 
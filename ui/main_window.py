@@ -5,14 +5,20 @@ from ui.purchase_voucher import open_purchase_voucher, set_main_window as set_ma
 from ui.api_config import open_api_config, set_main_window as set_main_window_api
 from ui.secret_window import open_secret_window
 from ui.settings_window import open_settings_window
+from ui.voucher_history import open_voucher_history
+from ui.purchase_reports import open_purchase_reports
 from utils.license_utils import verify_serial_no
+from database.draft_journal import list_drafts, load_draft, discard_draft, discard_all_drafts
+from utils.upload_worker import get_upload_worker
+from database.invoice_fingerprints import backfill_invoice_fingerprints
+from database.purchase_rollups import ensure_purchase_rollups
 from tkinter import messagebox
 
 class MainWindow:
     def __init__(self, root):
         self.root = root
         self.root.title("MiNI b - Accounting")
-        self.root.geometry("500x300")
+        self.root.geometry("500x340")
         
         # Set main window reference for child windows
         set_main_window(root)
@@ -77,12 +83,31 @@ class MainWindow:
         )
         self.btn_settings.grid(row=1, column=1, padx=10, pady=10)
 
+        self.btn_history = tk.Button(
+            self.btn_frame,
+            text="Voucher History",
+            width=20,
+            command=lambda: open_voucher_history(root)
+        )
+        self.btn_history.grid(row=2, column=0, padx=10)
+
+        self.btn_reports = tk.Button(
+            self.btn_frame,
+            text="Purchase Reports",
+            width=20,
+            command=lambda: open_purchase_reports(root)
+        )
+        self.btn_reports.grid(row=2, column=1, padx=10)
+
         # Secret Window Shortcut (Ctrl+Shift+I)
         # Use bind_all to ensure it works regardless of focus
         root.bind_all('<Control-I>', lambda e: open_secret_window(root)) # Ctrl+Shift+I maps to Control-I in some contexts?
         root.bind_all('<Control-Shift-I>', lambda e: open_secret_window(root))
         root.bind_all('<Control-Shift-i>', lambda e: open_secret_window(root))
 
+        # Drafts left behind by a normal exit would be offered as crash recoveries
+        root.protocol("WM_DELETE_WINDOW", self.on_exit)
+
         # Perform License Check
         self.check_license()
 
@@ -102,9 +127,13 @@ class MainWindow:
         if not enabled:
              self.btn_purchase.config(state="disabled")
              self.btn_api.config(state="disabled")
+             self.btn_history.config(state="disabled")
+             self.btn_reports.config(state="disabled")
         else:
              self.btn_purchase.config(state="normal")
              self.btn_api.config(state="normal")
+             self.btn_history.config(state="normal")
+             self.btn_reports.config(state="normal")
         
 
     def check_license(self):
@@ -114,3 +143,45 @@ class MainWindow:
             messagebox.showerror("License Error", f"License Verification Failed:\n{msg}\n\nPlease contact support or press Ctrl+Shift+I to configure.")
         else:
             self.set_app_state(True)
+            # Deliver vouchers still queued from the last session
+            get_upload_worker()
+            # Vouchers saved before duplicate checks existed
+            backfill_invoice_fingerprints()
+            ensure_purchase_rollups()
+            self.root.after(200, self.restore_drafts)
+
+    def unsaved_drafts(self):
+        """Drafts with something worth keeping; empty ones are discarded."""
+        drafts = []
+        for draft in list_drafts():
+            state = load_draft(draft['draft_id'])
+            if state and (state["items"] or state["bill_sundry"] or state.get("voucher_no") or state.get("party_name")):
+                drafts.append((draft['draft_id'], state))
+            else:
+                discard_draft(draft['draft_id'])
+        return drafts
+
+    def restore_drafts(self):
+        """Offer to reopen voucher windows that were open when the app last crashed."""
+        drafts = self.unsaved_drafts()
+        if not drafts:
+            return
+
+        if messagebox.askyesno("Restore Drafts",
+                               f"{len(drafts)} unsaved purchase voucher(s) from the last session were found.\n\n"
+                               "Restore them?"):
+            for draft_id, state in drafts:
+                open_purchase_voucher(initial_data=state, draft_id=draft_id)
+        else:
+            for draft_id, _ in drafts:
+                discard_draft(draft_id)
+
+    def on_exit(self):
+        """Normal exit: only a crash should leave drafts to restore."""
+        drafts = self.unsaved_drafts()
+        if drafts and not messagebox.askyesno("Exit",
+                                              f"{len(drafts)} purchase voucher(s) have unsaved changes.\n\n"
+                                              "Exit anyway?"):
+            return
+        discard_all_drafts()
+        self.root.destroy()
@@ -0,0 +1,84 @@
+import tkinter as tk
+from tkinter import ttk, messagebox
+from datetime import date
+from database.purchase_rollups import GRAIN_DAILY, GRAIN_MONTHLY, GRAIN_PARTY, purchase_report
+from utils.invoice_templates import normalize_date
+
+REPORT_GRAINS = {"Daily": GRAIN_DAILY, "Monthly": GRAIN_MONTHLY, "Party-wise": GRAIN_PARTY}
+PERIOD_HEADINGS = {GRAIN_DAILY: "Date", GRAIN_MONTHLY: "Month", GRAIN_PARTY: "Party"}
+
+
+def open_purchase_reports(parent=None):
+    """Daily / monthly / party-wise purchase summary by tax rate (read from the purchase rollups)."""
+    win = tk.Toplevel(parent)
+    win.title("Purchase Reports")
+    win.geometry("760x520")
+
+    top = ttk.Frame(win, padding=5)
+    top.pack(fill="x")
+    ttk.Label(top, text="Report").grid(row=0, column=0, padx=5, sticky="w")
+    grain_combo = ttk.Combobox(top, values=list(REPORT_GRAINS), state="readonly", width=12)
+    grain_combo.current(0)
+    grain_combo.grid(row=0, column=1, padx=5)
+
+    today = date.today()
+    ttk.Label(top, text="From").grid(row=0, column=2, padx=5, sticky="w")
+    from_entry = ttk.Entry(top, width=12)
+    from_entry.insert(0, today.replace(day=1).strftime("%d-%m-%Y"))
+    from_entry.grid(row=0, column=3, padx=5)
+    ttk.Label(top, text="To").grid(row=0, column=4, padx=5, sticky="w")
+    to_entry = ttk.Entry(top, width=12)
+    to_entry.insert(0, today.strftime("%d-%m-%Y"))
+    to_entry.grid(row=0, column=5, padx=5)
+    ttk.Label(top, text="Party").grid(row=0, column=6, padx=5, sticky="w")
+    party_entry = ttk.Entry(top, width=18)
+    party_entry.grid(row=0, column=7, padx=5)
+
+    cols = ("Period", "Tax Rate", "Vouchers", "Taxable", "Tax", "Total")
+    body = ttk.Frame(win)
+    body.pack(fill="both", expand=True, padx=5, pady=5)
+    tree = ttk.Treeview(body, columns=cols, show="headings")
+    for col, width in zip(cols, (200, 80, 80, 120, 110, 120)):
+        tree.heading(col, text=col)
+        tree.column(col, width=width, anchor="w" if col == "Period" else "e")
+    scroll = ttk.Scrollbar(body, orient="vertical", command=tree.yview)
+    tree.configure(yscrollcommand=scroll.set)
+    tree.pack(side="left", fill="both", expand=True)
+    scroll.pack(side="right", fill="y")
+    tree.tag_configure("total", font=("Arial", 9, "bold"))
+
+    def show_report(event=None):
+        date_from = normalize_date(from_entry.get())
+        date_to = normalize_date(to_entry.get())
+        if not date_from or not date_to:
+            messagebox.showerror("Error", "Enter valid From and To dates.", parent=win)
+            return
+        grain = REPORT_GRAINS[grain_combo.get()]
+        rows = purchase_report(grain, date_from, date_to, party_entry.get().strip() or None)
+        tree.heading("Period", text=PERIOD_HEADINGS[grain])
+        tree.delete(*tree.get_children())
+        by_rate = {}
+        for row in rows:
+            tree.insert("", "end", values=(row["period"] or "(no date)", f"{row['tax_rate']:g}%", row["vouchers"],
+                                           f"{row['taxable']:.2f}", f"{row['tax']:.2f}",
+                                           f"{row['taxable'] + row['tax']:.2f}"))
+            totals = by_rate.setdefault(row["tax_rate"], [0.0, 0.0])
+            totals[0] += row["taxable"]
+            totals[1] += row["tax"]
+        # Totals per rate, then overall (voucher counts can't be added across rates)
+        for rate, (taxable, tax) in sorted(by_rate.items()):
+            tree.insert("", "end", tags=("total",), values=("Total", f"{rate:g}%", "", f"{taxable:.2f}",
+                                                            f"{tax:.2f}", f"{taxable + tax:.2f}"))
+        if by_rate:
+            taxable = sum(t[0] for t in by_rate.values())
+            tax = sum(t[1] for t in by_rate.values())
+            tree.insert("", "end", tags=("total",), values=("Grand Total", "", "", f"{taxable:.2f}",
+                                                            f"{tax:.2f}", f"{taxable + tax:.2f}"))
+
+    ttk.Button(top, text="Show", command=show_report).grid(row=0, column=8, padx=5)
+    grain_combo.bind("<<ComboboxSelected>>", show_report)
+    win.bind("<Return>", show_report)
+    win.bind("<Escape>", lambda e: win.destroy())
+
+    show_report()
+    return win
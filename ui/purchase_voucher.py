@@ -5,7 +5,9 @@ try:
 except ImportError:
     process = None
     fuzz = None
-from database.db import get_connection, create_tables
+from database.db import get_connection, create_tables, get_setting
+import os
+import copy
 import threading
 from tkinter import filedialog
 import json
@@ -14,12 +16,30 @@ import re
 from utils.autocomplete import create_item_autocomplete
 from database.sql_server import get_item_autofill_data, get_all_item_names
 from datetime import datetime
-from utils.pdf_utils import extract_text_from_pdf
-from utils.ai_utils import parse_with_openai
+from utils.pdf_utils import extract_pages_from_pdf
+from utils.text_compaction import compact_invoice_text
+from utils.ai_utils import parse_with_openai, parse_with_openai_stream, parse_with_cascade, parse_invoices_batched, AIRequestScheduler
+from utils.invoice_splitter import split_invoice_pages
+from utils.einvoice import read_einvoice_qr, einvoice_header_fields, apply_einvoice_header, load_einvoice_json
+from utils.sheet_import import ITEM_FIELDS, SheetImportError, read_sheet_items, read_sheet_header, match_master_items
+from utils.invoice_templates import normalize_party_key
+from database.column_mappings import get_column_mapping, save_column_mapping
+from database.vouchers import save_voucher, load_voucher, list_vouchers, load_vouchers
+from database.draft_journal import DraftJournal
+from database.invoice_fingerprints import (
+    file_fingerprint, segment_fingerprint, invoice_fingerprint, voucher_fingerprint, find_duplicates,
+    record_fingerprints,
+)
+from utils.invoice_templates import parse_with_template, save_learned_template
 from ui.add_item import open_add_item, set_parent_window as set_add_item_parent
 from ui.add_party import open_add_party, set_parent_window as set_add_party_parent
 from utils.calculation import calculate_amount, calculate_price, calculate_total_amount, calculate_amount_with_tax, calculate_multirate_tax
-from utils.busy_utils import upload_purchase_voucher_to_busy
+from utils.busy_utils import build_purchase_voucher_xml
+from utils.upload_worker import get_upload_worker
+from utils.item_info_cache import get_item_info_cache
+from database.upload_outbox import enqueue_voucher, get_upload_statuses, retry_failed_uploads
+from utils.setting_keys import SETTING_BUSY_UPLOAD_URL
+from utils.setting_keys import SETTING_AI_STREAMING, SETTING_AI_CASCADE, SETTING_AI_HEDGING, SETTING_ACTIVE_DISCOUNT_STRUCT
 
 
 create_tables()
@@ -32,7 +52,18 @@ def set_main_window(root):
     global _main_window
     _main_window = root
 
-def open_purchase_voucher():
+def open_purchase_voucher(initial_data=None, source_text=None, draft_id=None, source_file=None, source_segment=None):
+    """
+    Open a Purchase Voucher window.
+
+    Args:
+        initial_data: Parsed invoice dict to pre-fill the window with (batch import drafts),
+                      or a stored voucher from database.vouchers.load_voucher (has an 'id')
+        source_text: Extracted PDF text behind initial_data, used for template learning on save
+        draft_id: Autosave draft to continue (restoring after a crash; initial_data is the replayed draft)
+        source_file: Path of the PDF behind initial_data, fingerprinted on save for duplicate detection
+        source_segment: Place (1-based) of initial_data's invoice in a PDF holding several invoices
+    """
     if _main_window is None:
         # Fallback: try to get root from any existing window
         root = tk._default_root
@@ -237,6 +268,8 @@ def open_purchase_voucher():
     def autofill_item_fields(item_name):
         """Auto-fill Unit and Tax Category fields when item is selected."""
         from database.sql_server import parse_smart_date
+
+        show_item_info(item_name)
         
         # Get voucher date from header, default to today if not set
         voucher_date_str = header_entries["Date"].get().strip()
@@ -270,6 +303,43 @@ def open_purchase_voucher():
     # Set up autofill callback for item autocomplete
     if item_autocomplete:
         item_autocomplete.set_on_select_callback(autofill_item_fields)
+
+    # ---------------- ITEM INFO (last purchase, stock) ----------------
+    item_info_cache = get_item_info_cache()
+    shown_item = {"name": None}
+
+    def show_item_info(item_name):
+        """Fill the Item Info panel from the cache; a miss is fetched in the background."""
+        shown_item["name"] = item_name
+        found, info = item_info_cache.get(item_name)
+        if not found:
+            item_info_label.config(text="Loading..." if item_name else "")
+            if item_name:
+                item_info_cache.prefetch_items(
+                    [item_name], callback=lambda: pv.after(0, refresh_item_info, item_name))
+            return
+        if info is None:
+            item_info_label.config(text="Not found in BUSY")
+            return
+        lines = []
+        if info["last_rate"] is not None:
+            lines.append(f"Last Rate: {info['last_rate']:.2f} ({info['last_date']})")
+            lines.append(f"Supplier: {info['last_supplier']}")
+        else:
+            lines.append("Not purchased before")
+        lines.append(f"Stock: {info['stock']:g}")
+        item_info_label.config(text="\n".join(lines))
+
+    def refresh_item_info(item_name):
+        # Only if the user hasn't moved on to another item meanwhile
+        if shown_item["name"] == item_name and pv.winfo_exists():
+            show_item_info(item_name)
+
+    def prefetch_party_items(event=None):
+        item_info_cache.prefetch_party(header_entries["Party Name"].get().strip())
+
+    party_autocomplete.set_on_select_callback(lambda name: prefetch_party_items())
+    header_entries["Party Name"].bind("<FocusOut>", prefetch_party_items, add="+")
     
     # ================= ADD ITEM/PARTY BUTTONS (created after entries are defined) =================
     def open_add_item_with_data():
@@ -318,10 +388,21 @@ def open_purchase_voucher():
                command=open_add_item_with_data).pack(pady=5, padx=5)
     ttk.Button(create_frame, text="Add Party", width=15, 
                command=open_add_party_with_data).pack(pady=5, padx=5)
+    ttk.Button(create_frame, text="Open Saved", width=15,
+               command=lambda: open_saved_voucher()).pack(pady=5, padx=5)
+    ttk.Button(create_frame, text="Open from BUSY", width=15,
+               command=lambda: open_busy_voucher()).pack(pady=5, padx=5)
+
+    # Upload status of the saved voucher (delivered by the background outbox worker)
+    upload_frame = ttk.LabelFrame(right_frame, text="BUSY Upload", width=200)
+    upload_frame.pack(pady=5, fill="x")
+    upload_status_label = ttk.Label(upload_frame, text="Not saved", wraplength=180, justify="left")
+    upload_status_label.pack(pady=5, padx=5, anchor="w")
+    retry_upload_btn = ttk.Button(upload_frame, text="Retry Upload", width=15, command=lambda: retry_upload())
 
     
     # Item Info Frame
-    item_info_frame = ttk.LabelFrame(right_frame, text="Item Info", width=200, height=200)
+    item_info_frame = ttk.LabelFrame(right_frame, text="Item Info", width=200, height=230)
     item_info_frame.pack(pady=5)
     item_info_frame.pack_propagate(False) # Enforce size
     
@@ -330,6 +411,8 @@ def open_purchase_voucher():
     hsn_entry = ttk.Entry(item_info_frame, width=20)
     hsn_entry.pack(pady=5, padx=5)
     entries["HSN"] = hsn_entry
+    item_info_label = ttk.Label(item_info_frame, text="", wraplength=180, justify="left")
+    item_info_label.pack(pady=5, padx=5, anchor="w")
 
     # ================= BUTTONS (TOP) =================
     btn_frame = ttk.Frame(left_frame)
@@ -567,7 +650,7 @@ def open_purchase_voucher():
         tax_text = entries["Tax Category"].get()
         amount = calculate_amount_with_tax(qty, price, tax_text, purchase_type)
         
-        table.insert("", "end", values=(
+        row_id = table.insert("", "end", values=(
             next_sno(),
             entries["Item Name"].get(),
             entries["Tax Category"].get(),
@@ -579,6 +662,7 @@ def open_purchase_voucher():
             price,
             amount
         ))
+        journal.record("item_add", row=item_from_values(table.item(row_id)["values"]))
         clear_entries()
         update_total_amount()
 
@@ -621,6 +705,7 @@ def open_purchase_voucher():
         selected = table.selection()
         if selected:
             populate_entries_from_row(selected[0])
+            show_item_info(str(table.item(selected[0])["values"][1]))
     
     # Bind table selection event
     table.bind("<<TreeviewSelect>>", on_table_select)
@@ -666,6 +751,8 @@ def open_purchase_voucher():
             price,
             amount
         ))
+        journal.record("item_set", index=table.index(selected_row_id),
+                       row=item_from_values(table.item(selected_row_id)["values"]))
         
         # Clear selection and entries
         table.selection_remove(selected_row_id)
@@ -677,6 +764,7 @@ def open_purchase_voucher():
         selected = table.selection()
         if not selected:
             return
+        journal.record("item_delete", index=table.index(selected[0]))
         table.delete(selected[0])
         resequence()
         update_total_amount()
@@ -695,7 +783,7 @@ def open_purchase_voucher():
         tax_text = entries["Tax Category"].get()
         amount = calculate_amount_with_tax(qty, price, tax_text, purchase_type)
         
-        table.insert("", idx, values=(
+        row_id = table.insert("", idx, values=(
             0,
             entries["Item Name"].get(),
             entries["Tax Category"].get(),
@@ -707,6 +795,7 @@ def open_purchase_voucher():
             price,
             amount
         ))
+        journal.record("item_insert", index=table.index(row_id), row=item_from_values(table.item(row_id)["values"]))
         clear_entries()
         resequence()
         update_total_amount()
@@ -725,13 +814,14 @@ def open_purchase_voucher():
              if info:
                  nature = "Subtractive" if info['i1'] == 0 else "Additive"
         
-        bs_table.insert("", "end", values=(
+        row_id = bs_table.insert("", "end", values=(
             sno,
             name,
             bs_entries["Percentage"].get(),
             bs_entries["Amount"].get(),
             nature
         ))
+        journal.record("bs_add", row=bs_from_values(bs_table.item(row_id)["values"]))
         for e in bs_entries.values():
             e.delete(0, tk.END)
         bs_nature_store["current"] = None # Reset
@@ -755,6 +845,7 @@ def open_purchase_voucher():
         if len(values) > 4:
             bs_nature_store["current"] = values[4]
 
+        journal.record("bs_delete", index=bs_table.index(selected[0]))
         bs_table.delete(selected[0])
         
         # Resequence Bill Sundry SNo
@@ -768,6 +859,7 @@ def open_purchase_voucher():
         selected = bs_table.selection()
         if not selected:
             return
+        journal.record("bs_delete", index=bs_table.index(selected[0]))
         bs_table.delete(selected[0])
         
         # Resequence
@@ -795,13 +887,14 @@ def open_purchase_voucher():
                  nature = "Subtractive" if info['i1'] == 0 else "Additive"
 
         # Temporary SNo (will be fixed by resequence)
-        bs_table.insert("", idx, values=(
+        row_id = bs_table.insert("", idx, values=(
             0,
             name,
             bs_entries["Percentage"].get(),
             bs_entries["Amount"].get(),
             nature
         ))
+        journal.record("bs_insert", index=bs_table.index(row_id), row=bs_from_values(bs_table.item(row_id)["values"]))
         for e in bs_entries.values():
             e.delete(0, tk.END)
         bs_nature_store["current"] = None
@@ -911,6 +1004,7 @@ def open_purchase_voucher():
             
         calculate_grand_total()
         calculate_grand_total()
+        journal.snapshot(collect_voucher_state())
         if not silent:
             messagebox.showinfo("Success", "Tax applied successfully.")
 
@@ -954,6 +1048,7 @@ def open_purchase_voucher():
         
         # Update Item Total
         update_total_amount()
+        journal.snapshot(collect_voucher_state())
         
         # Apply Tax (if MultiRate)
         # We call apply_tax() but suppress "Info" messages if possible?
@@ -974,7 +1069,138 @@ def open_purchase_voucher():
 
 
 
-    def fill_voucher_data(data):
+    # Header mapping: JSON key -> Entry Widget
+    header_map = {
+        "party_name": "Party Name",
+        "date": "Date",
+        "series": "Series",
+        "voucher_no": "Voucher No",
+        "purchase_type": "Purchase Type"
+    }
+
+    def set_header_field(key, value):
+        """Set one imported header field (JSON key) on its widget."""
+        if key not in header_map or not value:
+            return
+        widget = header_entries[header_map[key]]
+        value = str(value)
+        # Handle Combobox differently from Entry
+        if isinstance(widget, ttk.Combobox):
+            # For Combobox, set the value even if it's not in the list
+            widget.set(value)
+        else:
+            # For Entry widgets
+            widget.delete(0, tk.END)
+            widget.insert(0, value)
+
+    def append_voucher_item(item, sno=None, tags=()):
+        """Append one imported item (JSON object) to the item table."""
+        # Ensure all fields exist
+        i_name = item.get("item_name", "")
+        tax_cat = item.get("tax_category", "")
+        hsn = item.get("hsn", "")
+        qty = item.get("qty", 0)
+        unit = item.get("unit", "")
+        l_price = item.get("list_price", 0)
+        disc = item.get("discount", 0)
+        price = item.get("price", 0)
+        amt = item.get("amount", 0)
+
+        # Recalculate if some missing?
+        if not amt and qty and price:
+            try:
+                amt = float(qty) * float(price)
+            except (ValueError, TypeError):
+                pass
+
+        table.insert("", "end", tags=tags, values=(
+            sno or next_sno(),
+            i_name,
+            tax_cat,
+            hsn,
+            qty,
+            unit,
+            l_price,
+            disc,
+            price,
+            amt
+        ))
+
+    def append_voucher_items(items, unknown=()):
+        """Bulk-append imported items; rows listed in unknown (indexes) are marked as missing from the master."""
+        start = len(table.get_children()) + 1
+        unknown = set(unknown)
+        for i, item in enumerate(items):
+            append_voucher_item(item, sno=start + i, tags=("unknown",) if i in unknown else ())
+
+    def append_voucher_bill_sundry(bs):
+        """Append one imported bill sundry (JSON object) to the bill sundry table."""
+        name = bs.get("name", "")
+        pct = bs.get("percentage", 0)
+        amt = bs.get("amount", 0)
+
+        # Try to fetch nature (stored vouchers already carry it)
+        nature = bs.get("nature") or "Additive"
+        if name and not bs.get("nature"):
+            try:
+                from database.sql_server import get_bill_sundry_info
+                info = get_bill_sundry_info(name)
+                if info and info['i1'] == 0:
+                    nature = "Subtractive"
+            except:
+                pass
+
+        bs_table.insert("", "end", values=(
+            len(bs_table.get_children()) + 1,
+            name,
+            pct,
+            amt,
+            nature
+        ))
+
+    def clear_voucher_rows():
+        """Remove all items and bill sundries (before a fresh import)."""
+        for item in table.get_children():
+            table.delete(item)
+        for item in bs_table.get_children():
+            bs_table.delete(item)
+
+    # The voucher as it was before a streaming import replaced it (put back if the parse fails)
+    pre_stream = {"voucher": None}
+
+    def apply_stream_event(kind, key, value):
+        """Show one streamed header field / row as soon as it arrives (Tk thread)."""
+        if kind == "header":
+            set_header_field(key, value)
+        elif kind == "items":
+            append_voucher_item(value)
+            update_total_amount()
+        elif kind == "bill_sundry":
+            append_voucher_bill_sundry(value)
+            calculate_grand_total()
+
+    def start_stream():
+        pre_stream["voucher"] = collect_voucher_state()
+        clear_voucher_rows()
+
+    def restore_pre_stream():
+        """The streamed parse failed: put back the header and rows shown before it started."""
+        previous = pre_stream["voucher"]
+        pre_stream["voucher"] = None
+        if previous is None:
+            return
+        clear_voucher_rows()
+        for k in header_map:
+            set_header_field(k, previous.get(k))
+        append_voucher_items(previous.get("items") or [])
+        for bs in previous.get("bill_sundry") or []:
+            append_voucher_bill_sundry(bs)
+        update_total_amount()
+
+    def fill_voucher_data(data, streamed=False, notify=True):
+        if not isinstance(data, dict) or not data:
+            if streamed:
+                restore_pre_stream()
         if isinstance(data, str):
             messagebox.showerror("Import Error", data)
             return
@@ -982,127 +1208,661 @@ def open_purchase_voucher():
         if not data:
              messagebox.showerror("Import Error", "No data returned.")
              return
+        pre_stream["voucher"] = None
+
+        # The parse as read from the PDF, before Match Items / party matching swap in master
+        # names that the PDF text doesn't contain: the layout template is learned from this
+        last_import["parsed"] = copy.deepcopy(data) if last_import["text"] else None
 
         # Header
-        # Mapping: JSON key -> Entry Widget
-        header_map = {
-            "party_name": "Party Name",
-            "date": "Date",
-            "voucher_no": "Voucher No",
-            "purchase_type": "Purchase Type"
-        }
-        
-        for k, v in header_map.items():
-            if k in data and data[k]:
-                value = str(data[k])
-                # Handle Combobox differently from Entry
-                if isinstance(header_entries[v], ttk.Combobox):
-                    # For Combobox, try to set the value
-                    if value in purchase_type_values:
-                        header_entries[v].set(value)
-                    else:
-                        # If value not in list, set it anyway (may not work but try)
-                        header_entries[v].set(value)
-                else:
-                    # For Entry widgets
-                    header_entries[v].delete(0, tk.END)
-                    header_entries[v].insert(0, value)
+        for k in header_map:
+            set_header_field(k, data.get(k))
 
-        # Items
+        # Items: streamed rows are replaced too, they show values as streamed, before the
+        # final decode's coercion and normalisation
         if "items" in data:
-            # Clear existing items? Let's append actually, or clear? User usually wants to fill a blank voucher.
-            # Let's clear to be safe if it's a fresh import.
-            for item in table.get_children():
-                table.delete(item)
-                
-            for item in data["items"]:
-                # Ensure all fields exist
-                i_name = item.get("item_name", "")
-                tax_cat = item.get("tax_category", "")
-                hsn = item.get("hsn", "")
-                qty = item.get("qty", 0)
-                unit = item.get("unit", "")
-                l_price = item.get("list_price", 0)
-                disc = item.get("discount", 0)
-                price = item.get("price", 0)
-                amt = item.get("amount", 0)
-                
-                # Recalculate if some missing?
-                if not amt and qty and price:
-                    amt = float(qty) * float(price)
-
-                table.insert("", "end", values=(
-                    next_sno(),
-                    i_name,
-                    tax_cat,
-                    hsn,
-                    qty,
-                    unit,
-                    l_price,
-                    disc,
-                    price,
-                    amt
-                ))
+            # Clear existing items to be safe, it's a fresh import.
+            table.delete(*table.get_children())
+            append_voucher_items(data["items"])
             resequence()
 
         # Bill Sundry
         if "bill_sundry" in data:
             for item in bs_table.get_children():
                 bs_table.delete(item)
-                
             for bs in data["bill_sundry"]:
-                name = bs.get("name", "")
-                pct = bs.get("percentage", 0)
-                amt = bs.get("amount", 0)
-                
-                # Try to fetch nature
-                nature = "Additive"
-                if name:
-                     try:
-                         from database.sql_server import get_bill_sundry_info
-                         info = get_bill_sundry_info(name)
-                         if info and info['i1'] == 0:
-                             nature = "Subtractive"
-                     except:
-                         pass
-
-                bs_table.insert("", "end", values=(
-                    len(bs_table.get_children()) + 1,
-                    name,
-                    pct,
-                    amt,
-                    nature
-                ))
-        
+                append_voucher_bill_sundry(bs)
+
         # Update totals after filling data
         update_total_amount()
+        journal.snapshot(collect_voucher_state())
+
+        # Item Info for the imported lines, in one background query
+        prefetch_party_items()
+        item_info_cache.prefetch_items([str(table.item(row)["values"][1]) for row in table.get_children()])
+
+        if notify:
+            messagebox.showinfo("Success", "Invoice data imported successfully!")
+
+    # Text of the last imported PDF and its parse, used to learn the supplier's layout template
+    # on save; its path and hash are recorded on save for duplicate detection
+    last_import = {"text": None, "parsed": None, "file": None, "segment": None, "file_hash": None}
+    # Local id of this voucher once saved (re-saving replaces the stored copy)
+    saved_voucher = {"id": initial_data.get("id") if isinstance(initial_data, dict) else None}
+    # VchCode of the BUSY voucher this window was opened from (Open from BUSY): saving modifies it
+    busy_voucher = {"vch_code": initial_data.get("busy_vch_code") if isinstance(initial_data, dict) else None}
+    # Autosave: every edit is journaled so the draft can be restored after a crash
+    journal = DraftJournal(draft_id)
+
+    def item_from_values(vals):
+        # (SNo, Item, Tax Category, HSN, Qty, Unit, List, Disc, Price, Amount)
+        return {
+            "item_name": str(vals[1]),
+            "tax_category": str(vals[2]),
+            "hsn": str(vals[3]),
+            "qty": vals[4],
+            "unit": str(vals[5]),
+            "list_price": vals[6],
+            "discount": vals[7],
+            "price": vals[8],
+            "amount": vals[9]
+        }
+
+    def bs_from_values(vals):
+        # (SNo, Name, Percentage, Amount, Nature)
+        return {
+            "name": str(vals[1]),
+            "percentage": vals[2],
+            "amount": vals[3],
+            "nature": str(vals[4])
+        }
+
+    def collect_import_data():
+        """Return the current voucher in the parse_with_openai schema."""
+        data = {
+            "party_name": header_entries["Party Name"].get(),
+            "date": header_entries["Date"].get(),
+            "voucher_no": header_entries["Voucher No"].get(),
+            "purchase_type": header_entries["Purchase Type"].get(),
+            "items": [],
+            "bill_sundry": []
+        }
+        for row in table.get_children():
+            data["items"].append(item_from_values(table.item(row)["values"]))
+        for row in bs_table.get_children():
+            data["bill_sundry"].append(bs_from_values(bs_table.item(row)["values"]))
+        return data
+
+    def collect_voucher_state():
+        """The whole voucher as the autosave journal stores it."""
+        data = collect_import_data()
+        data["series"] = header_entries["Series"].get()
+        if saved_voucher["id"] is not None:
+            data["id"] = saved_voucher["id"]
+        if busy_voucher["vch_code"]:
+            data["busy_vch_code"] = busy_voucher["vch_code"]
+        return data
+
+    def journal_header_field(key):
+        """Journal a header field when it has changed (on focus out / selection)."""
+        value = header_entries[header_map[key]].get()
+        if journal.state.get(key) != value:
+            journal.record("header", key=key, value=value)
+
+    for key, field in header_map.items():
+        header_entries[field].bind("<FocusOut>", lambda e, k=key: journal_header_field(k), add="+")
+    header_entries["Purchase Type"].bind("<<ComboboxSelected>>", lambda e: journal_header_field("purchase_type"), add="+")
+
+    def on_close():
+        # Closed on purpose: the draft is no longer needed
+        journal.discard()
+        get_upload_worker().remove_listener(on_upload_update)
+        pv.destroy()
+
+    pv.protocol("WM_DELETE_WINDOW", on_close)
+
+    def collect_local_voucher():
+        """The voucher as save_voucher stores it."""
+        data = collect_import_data()
+        data["series"] = header_entries["Series"].get() or "Main"
+        try:
+            data["grand_total"] = float(grand_total_label.cget("text"))
+        except ValueError:
+            data["grand_total"] = 0.0
+        return data
+
+    def source_file_hash():
+        if last_import["file_hash"] is None and last_import["file"]:
+            file_hash = file_fingerprint(last_import["file"])
+            # One invoice of a split PDF: the file's other invoices aren't saved with it
+            if last_import["segment"]:
+                file_hash = segment_fingerprint(file_hash, last_import["segment"])
+            last_import["file_hash"] = file_hash
+        return last_import["file_hash"]
+
+    def save_local_voucher(data=None):
+        """Store the voucher in the local database; returns its id or None."""
+        data = data or collect_local_voucher()
+        voucher_id = save_voucher(data, saved_voucher["id"])
+        if voucher_id is not None:
+            saved_voucher["id"] = voucher_id
+            pv.title(f"Purchase Voucher - #{voucher_id}")
+            # Nothing left to recover until the next edit
+            journal.mark_saved(collect_voucher_state())
+            source_name = os.path.basename(last_import["file"]) if last_import["file"] else ""
+            if source_name and last_import["segment"]:
+                source_name += f" #{last_import['segment']}"
+            record_fingerprints(voucher_id, voucher_fingerprint(data), source_file_hash(), source_name)
+        return voucher_id
+
+    def confirm_not_duplicate(matches, question):
+        """Ask before going on with an invoice that matches saved vouchers; True to continue."""
+        if not matches:
+            return True
+        # One line per voucher (the same-file match is listed when both kinds match)
+        matches = list({m["voucher_id"]: m for m in reversed(matches)}.values())[::-1]
+        lines = []
+        for m in matches[:5]:
+            reason = f"same file {m['source_name']}".strip() if m["kind"] == "file" else "same party, number, date and total"
+            lines.append(f"#{m['voucher_id']}  {m['date']}  {m['voucher_no']}  {m['party_name']}  "
+                         f"{m['grand_total']:.2f}  ({reason})")
+        if len(matches) > 5:
+            lines.append(f"... and {len(matches) - 5} more")
+        return messagebox.askyesno("Possible Duplicate",
+                                   "This invoice looks like one that is already saved:\n\n" + "\n".join(lines) +
+                                   f"\n\n{question}", icon="warning", parent=pv)
+
+    def show_upload_status(entry):
+        status = entry["status"] if entry else None
+        if status is None:
+            if busy_voucher["vch_code"] and saved_voucher["id"] is None:
+                text = f"Opened from BUSY (VchCode {busy_voucher['vch_code']}): saving modifies it"
+            else:
+                text = "Not queued" if saved_voucher["id"] is not None else "Not saved"
+            color = "black"
+        elif status == "sent":
+            text, color = f"Uploaded (VchCode {entry['vch_code'] or 'N/A'})", "green"
+        elif status == "failed":
+            text, color = f"Failed: {entry['last_error']}", "red"
+        elif status == "sending":
+            text, color = "Sending...", "blue"
+        elif entry["attempts"]:
+            text, color = f"Retrying (attempt {entry['attempts'] + 1}): {entry['last_error']}", "orange"
+        else:
+            text, color = "Queued", "blue"
+        upload_status_label.config(text=text, foreground=color)
+        if status == "failed":
+            retry_upload_btn.pack(pady=(0, 5), padx=5)
+        else:
+            retry_upload_btn.pack_forget()
+
+    def refresh_upload_status():
+        voucher_id = saved_voucher["id"]
+        show_upload_status(get_upload_statuses([voucher_id]).get(voucher_id) if voucher_id is not None else None)
+
+    def retry_upload():
+        retry_failed_uploads(saved_voucher["id"])
+        get_upload_worker().notify()
+        refresh_upload_status()
+
+    def on_upload_update(update):
+        # Called on the upload worker thread
+        if update["voucher_id"] == saved_voucher["id"]:
+            pv.after(0, lambda: show_upload_status(update))
+
+    get_upload_worker().add_listener(on_upload_update)
+
+    def open_saved_voucher():
+        """Pick a voucher from the local database and open it in a new window."""
+        dlg = tk.Toplevel(pv)
+        dlg.title("Saved Vouchers")
+        dlg.geometry("660x400")
+        dlg.transient(pv)
+
+        cols = ("Date", "Voucher No", "Party", "Total", "Upload")
+        btns = ttk.Frame(dlg)
+        btns.pack(side="bottom", fill="x", padx=5, pady=(0, 5))
+        tree = ttk.Treeview(dlg, columns=cols, show="headings", selectmode="extended")
+        for col, w in zip(cols, (90, 110, 240, 90, 90)):
+            tree.heading(col, text=col)
+            tree.column(col, width=w, anchor="center")
+        scroll = ttk.Scrollbar(dlg, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scroll.set)
+        tree.pack(side="left", fill="both", expand=True, padx=(5, 0), pady=5)
+        scroll.pack(side="right", fill="y", pady=5)
+
+        vouchers = list_vouchers(limit=200)
+        statuses = get_upload_statuses([v["id"] for v in vouchers])
+        for v in vouchers:
+            upload = statuses.get(v["id"], {}).get("status", "")
+            tree.insert("", "end", iid=str(v["id"]),
+                        values=(v["date"], v["voucher_no"], v["party_name"], f"{v['grand_total']:.2f}", upload))
+
+        def on_open(event=None):
+            selected = tree.selection()
+            if not selected:
+                return
+            voucher = load_voucher(int(selected[0]))
+            if voucher is None:
+                messagebox.showerror("Error", "Voucher not found.", parent=dlg)
+                return
+            dlg.destroy()
+            open_purchase_voucher(initial_data=voucher)
+
+        def on_stage():
+            selected = [int(iid) for iid in tree.selection()]
+            if not selected:
+                messagebox.showwarning("No Selection", "Select the vouchers to stage (Ctrl+A selects all).", parent=dlg)
+                return
 
-        messagebox.showinfo("Success", "Invoice data imported successfully!")
+            def task():
+                from database.sql_server import write_vouchers_to_staging
+                ok, message, _ = write_vouchers_to_staging(load_vouchers(voucher_ids=selected))
+                pv.after(0, lambda: (messagebox.showinfo if ok else messagebox.showerror)("SQL Staging", message, parent=dlg))
+
+            threading.Thread(target=task, daemon=True).start()
+
+        tree.bind("<Double-1>", on_open)
+        tree.bind("<Return>", on_open)
+        tree.bind("<Control-a>", lambda e: tree.selection_set(tree.get_children()))
+        ttk.Button(btns, text="Open", command=on_open).pack(side="right", padx=2)
+        ttk.Button(btns, text="Stage to SQL", command=on_stage).pack(side="right", padx=2)
+
+    def open_busy_voucher():
+        """Load a purchase voucher already in BUSY into this window (header, items and bill sundries)."""
+        dlg = tk.Toplevel(pv)
+        dlg.title("Open from BUSY")
+        dlg.transient(pv)
+        dlg.resizable(False, False)
+
+        fields = {}
+        for row, label in enumerate(("Voucher No", "Date (optional)", "Series (optional)")):
+            ttk.Label(dlg, text=label).grid(row=row, column=0, padx=5, pady=3, sticky="w")
+            fields[label] = ttk.Entry(dlg, width=20)
+            fields[label].grid(row=row, column=1, padx=5, pady=3)
+        fields["Voucher No"].focus_set()
+        status = ttk.Label(dlg, text="")
+        status.grid(row=3, column=0, columnspan=2, padx=5, sticky="w")
+
+        def on_loaded(data):
+            if not dlg.winfo_exists():
+                return
+            if isinstance(data, str):
+                status.config(text="")
+                messagebox.showerror("Open from BUSY", data, parent=dlg)
+                return
+            if (table.get_children() or bs_table.get_children()) and not messagebox.askyesno(
+                    "Open from BUSY", "Replace the items and bill sundries in this window?", parent=dlg):
+                status.config(text="")
+                return
+            dlg.destroy()
+            last_import.update(text=None, file=None, segment=None, file_hash=None)
+            # Saved as a new local voucher whose upload modifies this BUSY voucher (no second add)
+            saved_voucher["id"] = None
+            busy_voucher["vch_code"] = data.get("busy_vch_code")
+            fill_voucher_data(data, notify=False)
+            pv.title(f"Purchase Voucher - BUSY {data['voucher_no']}")
+            refresh_upload_status()
+
+        def on_load(event=None):
+            voucher_no = fields["Voucher No"].get().strip()
+            date_text = fields["Date (optional)"].get().strip()
+            series = fields["Series (optional)"].get().strip() or None
+            voucher_date = None
+            if date_text:
+                from database.sql_server import parse_smart_date
+                voucher_date, _ = parse_smart_date(date_text)
+                if not voucher_date:
+                    messagebox.showerror("Open from BUSY", "Enter a valid date.", parent=dlg)
+                    return
+            status.config(text="Loading...")
+
+            def task():
+                from database.sql_server import load_busy_purchase_voucher
+                data = load_busy_purchase_voucher(voucher_no, voucher_date, series)
+                pv.after(0, lambda: on_loaded(data))
+
+            threading.Thread(target=task, daemon=True).start()
+
+        btns = ttk.Frame(dlg)
+        btns.grid(row=4, column=0, columnspan=2, pady=5)
+        ttk.Button(btns, text="Load", command=on_load).pack(side="left", padx=5)
+        ttk.Button(btns, text="Cancel", command=dlg.destroy).pack(side="left", padx=5)
+        dlg.bind("<Return>", on_load)
+        dlg.bind("<Escape>", lambda e: dlg.destroy())
 
     def import_pdf_invoice():
         pdf_path = filedialog.askopenfilename(filetypes=[("PDF Files", "*.pdf")])
         if not pdf_path:
             return
 
+        # Same file imported before: ask before reading it or spending an AI call on it
+        file_hash = file_fingerprint(pdf_path)
+        matches = find_duplicates(file_hash=file_hash, exclude_voucher_id=saved_voucher["id"])
+        if not confirm_not_duplicate(matches, "Import it again?"):
+            return
+
         def task():
-            text = extract_text_from_pdf(pdf_path)
-            if not text:
+            pages = extract_pages_from_pdf(pdf_path)
+            if isinstance(pages, str):
+                pv.after(0, lambda: messagebox.showerror("Import Error", pages))
+                return
+            text = "\n".join(pages) if pages else ""
+            if not text.strip():
                 pv.after(0, lambda: messagebox.showwarning(
-                    "Warning", "PDF read failed"
+                    "Warning", "PDF read failed (no text found - scanned PDFs need Tesseract OCR installed)"
                 ))
                 return
 
-            # ✅ ONLY ONE AI CALL
-            data = parse_with_openai(text)
+            # One PDF with several invoices: each becomes its own draft voucher
+            invoices = split_invoice_pages(pages)
+            if len(invoices) > 1:
+                print(f"PDF contains {len(invoices)} invoices; parsing them separately.")
+                results = parse_split_invoices(os.path.basename(pdf_path), invoices, file_hash)
+                sources = {name: (pdf_path, n) for n, (name, _, _) in enumerate(results, start=1)}
+                pv.after(0, lambda: open_batch_drafts(results, title="Split Import", source_files=sources))
+                return
+
+            last_import.update(text=text, file=pdf_path, segment=None, file_hash=file_hash)
+
+            # Signed e-invoice QR: the header is known before any parsing
+            qr = read_einvoice_qr(pdf_path)
+            qr_header = einvoice_header_fields(qr) if qr else {}
+            if qr_header:
+                pv.after(0, prefill_header, qr_header)
+                fingerprint = invoice_fingerprint(qr_header.get("party_name"), qr_header.get("voucher_no"),
+                                                  qr_header.get("date"), qr_header.get("grand_total"))
+                matches = find_duplicates(invoice_fp=fingerprint, exclude_voucher_id=saved_voucher["id"])
+                if matches:
+                    def confirm():
+                        if confirm_not_duplicate(matches, "Import it anyway?"):
+                            threading.Thread(target=parse, args=(pages, text, qr, qr_header), daemon=True).start()
+                    pv.after(0, confirm)
+                    return
+
+            parse(pages, text, qr, qr_header)
+
+        def parse(pages, text, qr, qr_header):
+            # Regular suppliers: parse locally with the learned layout template
+            data = parse_with_template(text)
+
+            # ✅ ONLY ONE AI CALL (when no template applies or it failed validation)
+            streamed = False
+            if data is None:
+                # Drop repeated headers/footers, boilerplate and non-item pages to save tokens
+                text, stats = compact_invoice_text(pages)
+                print(f"Compacted invoice text: {stats['tokens_in']} -> {stats['tokens_out']} tokens, "
+                      f"{stats['pages_in']} -> {stats['pages_out']} pages")
+                if get_setting(SETTING_AI_CASCADE, "0") == "1":
+                    # Fast model first, escalate only if the result fails validation
+                    data = parse_with_cascade(text)
+                elif get_setting(SETTING_AI_HEDGING, "0") == "1":
+                    # Race a duplicate request against unusually slow responses
+                    data = parse_with_openai(text, hedge=True)
+                elif get_setting(SETTING_AI_STREAMING, "1") == "1":
+                    # Rows appear progressively; events are queued onto the Tk thread
+                    streamed = True
+                    pv.after(0, start_stream)
+                    def on_stream_event(kind, key, value):
+                        if kind == "header" and key in qr_header:
+                            return  # the signed QR value is already shown
+                        pv.after(0, apply_stream_event, kind, key, value)
+
+                    data = parse_with_openai_stream(text, on_stream_event)
+                else:
+                    data = parse_with_openai(text)
+
+            if qr and isinstance(data, dict):
+                apply_einvoice_header(data, qr, qr_header)
 
             # ✅ Fill UI on main thread
-            pv.after(0, lambda: fill_voucher_data(data))
+            pv.after(0, lambda: fill_voucher_data(data, streamed))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def prefill_header(fields):
+        for key, value in fields.items():
+            set_header_field(key, value)
+
+    def import_einvoice_json():
+        """Import GST e-invoice JSON directly (no AI); extra invoices in the file open as drafts."""
+        json_path = filedialog.askopenfilename(filetypes=[("E-Invoice JSON", "*.json"), ("All Files", "*.*")])
+        if not json_path:
+            return
+
+        def task():
+            invoices = load_einvoice_json(json_path)
+            if isinstance(invoices, str):
+                pv.after(0, lambda: messagebox.showerror("Import Error", invoices))
+                return
+            last_import.update(text=None, file=None, segment=None, file_hash=None)
+            pv.after(0, lambda: fill_voucher_data(invoices[0]))
+            if len(invoices) > 1:
+                label = os.path.basename(json_path)
+                drafts = [(f"{label} #{n}", data, None) for n, data in enumerate(invoices[1:], start=2)]
+                pv.after(0, lambda: open_batch_drafts(drafts, title="E-Invoice Import"))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    # ---------------- EXCEL / CSV IMPORT ----------------
+    table.tag_configure("unknown", foreground="red")
+    item_field_labels = {
+        "item_name": "Item Name", "tax_category": "Tax Category", "hsn": "HSN", "qty": "Qty", "unit": "Unit",
+        "list_price": "List Price", "discount": "Discount", "price": "Price", "amount": "Amount"
+    }
+
+    def import_sheet_invoice():
+        """Import line items from a supplier Excel/CSV file into the current voucher (header is kept)."""
+        path = filedialog.askopenfilename(filetypes=[("Excel / CSV", "*.xlsx *.xlsm *.csv"), ("All Files", "*.*")])
+        if not path:
+            return
+
+        party_name = header_entries["Party Name"].get().strip()
+        party_key = normalize_party_key(party_name)
+        mapping = get_column_mapping(party_key)
+        if mapping is None:
+            # First file from this party: confirm the detected columns once, then it's remembered
+            ask_column_mapping(path, party_key, party_name)
+        else:
+            run_sheet_import(path, party_key, party_name, mapping)
+
+    def run_sheet_import(path, party_key, party_name, mapping, save=False):
+        is_simple = "Simple" in get_setting(SETTING_ACTIVE_DISCOUNT_STRUCT, "Simple Discount")
+
+        def task():
+            try:
+                items, info = read_sheet_items(path, mapping, is_simple)
+            except SheetImportError as e:
+                reason = str(e)
+                pv.after(0, lambda: ask_column_mapping(path, party_key, party_name, reason))
+                return
+            except Exception as e:
+                error = f"Could not read {os.path.basename(path)}: {e}"
+                pv.after(0, lambda: messagebox.showerror("Import Error", error))
+                return
+
+            if save and party_key:
+                save_column_mapping(party_key, party_name, info["mapping"])
+
+            # Master validation: one query for the whole file, not one per row
+            master_names = get_all_item_names()
+            unknown = match_master_items(items, master_names) if master_names else []
+            pv.after(0, lambda: load_sheet_items(items, unknown, info))
 
         threading.Thread(target=task, daemon=True).start()
 
+    def load_sheet_items(items, unknown, info):
+        table.delete(*table.get_children())
+        append_voucher_items(items, unknown)
+        update_total_amount()
+        calculate_grand_total()
+        journal.snapshot(collect_voucher_state())
+        message = f"Imported {len(items)} items ({info['skipped']} rows skipped)."
+        if unknown:
+            message += f"\n{len(unknown)} item(s) not found in the Busy item master are shown in red."
+        messagebox.showinfo("Import", message)
+
+    def ask_column_mapping(path, party_key, party_name, reason=None):
+        """Let the operator map the file's columns to voucher fields; the mapping is saved for the party."""
+        try:
+            header, columns = read_sheet_header(path, get_column_mapping(party_key))
+        except Exception as e:
+            messagebox.showerror("Import Error", f"Could not read {os.path.basename(path)}: {e}")
+            return
+        headers = [str(cell).strip() for cell in header if cell not in (None, "")]
+        if not headers:
+            messagebox.showerror("Import Error", "No column headers found in the file.")
+            return
+
+        dlg = tk.Toplevel(pv)
+        dlg.title("Map Columns")
+        dlg.transient(pv)
+        dlg.grab_set()
+        frame = ttk.Frame(dlg, padding=10)
+        frame.pack(fill="both", expand=True)
+        if reason:
+            ttk.Label(frame, text=reason, foreground="red").grid(row=0, column=0, columnspan=2, sticky="w", pady=(0, 5))
+        ttk.Label(frame, text=f"Columns for {party_name or 'this file'}:").grid(row=1, column=0, columnspan=2, sticky="w")
+
+        combos = {}
+        for r, field in enumerate(ITEM_FIELDS, start=2):
+            ttk.Label(frame, text=item_field_labels[field]).grid(row=r, column=0, sticky="w", padx=(0, 10), pady=2)
+            combo = ttk.Combobox(frame, values=[""] + headers, state="readonly", width=30)
+            if field in columns and columns[field] < len(header) and header[columns[field]] not in (None, ""):
+                combo.set(str(header[columns[field]]).strip())
+            combo.grid(row=r, column=1, pady=2)
+            combos[field] = combo
+
+        def on_ok():
+            chosen = {field: combo.get() for field, combo in combos.items() if combo.get()}
+            if "item_name" not in chosen or "qty" not in chosen:
+                messagebox.showerror("Error", "Item Name and Qty columns are required.", parent=dlg)
+                return
+            dlg.destroy()
+            run_sheet_import(path, party_key, party_name, chosen, save=True)
+
+        btns = ttk.Frame(frame)
+        btns.grid(row=len(ITEM_FIELDS) + 2, column=0, columnspan=2, pady=(10, 0))
+        ttk.Button(btns, text="Import", command=on_ok).pack(side="left", padx=5)
+        ttk.Button(btns, text="Cancel", command=dlg.destroy).pack(side="left", padx=5)
+
+    def parse_split_invoices(label, invoices, file_hash=None):
+        """
+        Parse the invoices of one split PDF concurrently.
+
+        Args:
+            label: Name shown for the PDF in messages
+            invoices: list of page-text lists (see split_invoice_pages)
+            file_hash: the PDF's file_fingerprint; invoices of it saved before are skipped
+
+        Returns:
+            list of (label, data or error, raw text), one per invoice in order
+        """
+        results = []
+        pending = []   # (index into results, compacted text)
+        for n, pages in enumerate(invoices, start=1):
+            matches = find_duplicates(file_hash=segment_fingerprint(file_hash, n))
+            if matches:
+                results.append((f"{label} #{n}", f"already imported as voucher #{matches[0]['voucher_id']} (skipped)",
+                                None))
+                continue
+            text = "\n".join(pages)
+            data = parse_with_template(text)
+            results.append((f"{label} #{n}", data, text))
+            if data is None:
+                pending.append((len(results) - 1, compact_invoice_text(pages)[0]))
+
+        if pending:
+            scheduler = AIRequestScheduler()
+            try:
+                parsed = scheduler.run_batch([compacted for _, compacted in pending])
+            finally:
+                scheduler.shutdown()
+            for (i, _), result in zip(pending, parsed):
+                name, _, text = results[i]
+                results[i] = (name, result["data"] if result["data"] is not None else result["error"], text)
+        return results
+
+    def batch_import_pdf_invoices():
+        """Import several PDFs at once; short invoices share one AI request. Each opens as its own draft."""
+        pdf_paths = filedialog.askopenfilenames(filetypes=[("PDF Files", "*.pdf")])
+        if not pdf_paths:
+            return
+
+        def task():
+            results = []   # (path, data or error, raw text)
+            pending = []   # (index into results, compacted text)
+            sources = {}
+            for path in pdf_paths:
+                # Files imported before are skipped before any parsing or AI call
+                file_hash = file_fingerprint(path)
+                matches = find_duplicates(file_hash=file_hash)
+                if matches:
+                    results.append((path, f"already imported as voucher #{matches[0]['voucher_id']} (skipped)", None))
+                    continue
+                pages = extract_pages_from_pdf(path)
+                if isinstance(pages, str):
+                    results.append((path, pages, None))
+                    continue
+                text = "\n".join(pages) if pages else ""
+                if not text.strip():
+                    results.append((path, "PDF read failed", None))
+                    continue
+                invoices = split_invoice_pages(pages)
+                for n, invoice_pages in enumerate(invoices, start=1):
+                    name = path if len(invoices) == 1 else f"{path} #{n}"
+                    segment = n if len(invoices) > 1 else None
+                    if segment:
+                        # Each invoice of a split PDF is fingerprinted on its own
+                        matches = find_duplicates(file_hash=segment_fingerprint(file_hash, segment))
+                        if matches:
+                            results.append((name, f"already imported as voucher #{matches[0]['voucher_id']} (skipped)",
+                                            None))
+                            continue
+                    invoice_text = "\n".join(invoice_pages)
+                    data = parse_with_template(invoice_text)
+                    results.append((name, data, invoice_text))
+                    sources[name] = (path, segment)
+                    if data is None:
+                        pending.append((len(results) - 1, compact_invoice_text(invoice_pages)[0]))
+
+            if pending:
+                parsed = parse_invoices_batched([compacted for _, compacted in pending])
+                for (i, _), data in zip(pending, parsed):
+                    path, _, text = results[i]
+                    results[i] = (path, data, text)
+
+            pv.after(0, lambda: open_batch_drafts(results, source_files=sources))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def open_batch_drafts(results, title="Batch Import", source_files=None):
+        errors = []
+        opened = 0
+        for path, data, text in results:
+            if isinstance(data, dict):
+                source_file, segment = (source_files or {}).get(path, (None, None))
+                open_purchase_voucher(initial_data=data, source_text=text, source_file=source_file,
+                                      source_segment=segment)
+                opened += 1
+            else:
+                errors.append(f"{os.path.basename(path)}: {data or 'No data returned.'}")
+        summary = f"Opened {opened} draft voucher(s)."
+        if errors:
+            messagebox.showwarning(title, summary + "\n\nFailed:\n" + "\n".join(errors))
+        else:
+            messagebox.showinfo(title, summary)
+
 
     def save_items():
         try:
+            # Warn before anything is saved or queued for BUSY
+            local_voucher = collect_local_voucher()
+            matches = find_duplicates(voucher_fingerprint(local_voucher), source_file_hash(),
+                                      exclude_voucher_id=saved_voucher["id"])
+            if not confirm_not_duplicate(matches, "Save and upload it anyway?"):
+                return
+
             # Format date to DD-MM-YYYY for BUSY
             date_str = header_entries["Date"].get().strip()
             if date_str:
@@ -1185,16 +1945,38 @@ def open_purchase_voucher():
                     'amount': str(data[3] or "0")
                 })
 
-            # Upload to BUSY ERP via XML
-            busy_success, busy_message, voucher_code = upload_purchase_voucher_to_busy(voucher_data)
-            
-            if busy_success:
-                messagebox.showinfo("Success", 
-                    f"Voucher uploaded to BUSY successfully!\n"
-                    f"BUSY Voucher Code: {voucher_code if voucher_code else 'N/A'}")
+            # Learn the supplier's layout from the confirmed import
+            if last_import["text"] and last_import["parsed"]:
+                try:
+                    if save_learned_template(last_import["text"], last_import["parsed"]):
+                        print("Invoice layout template saved for party.")
+                except Exception as e:
+                    print(f"Template learning failed: {e}")
+                last_import["text"] = last_import["parsed"] = None
+
+            # Keep a local copy first; the outbox then delivers it to BUSY in the background
+            voucher_id = save_local_voucher(local_voucher)
+            if voucher_id is None:
+                messagebox.showerror("Error", "Voucher could not be saved locally (see console).")
+                return
+
+            xml_data = build_purchase_voucher_xml(voucher_data)
+            if enqueue_voucher(voucher_id, voucher_data['voucher_no'], voucher_data['party_name'], xml_data,
+                               modify_vch_code=busy_voucher["vch_code"]) is None:
+                messagebox.showerror("Error", "Voucher was saved but could not be queued for upload (see console).")
+                return
+            get_upload_worker().notify()
+            refresh_upload_status()
+
+            if get_setting(SETTING_BUSY_UPLOAD_URL, "") and busy_voucher["vch_code"]:
+                messagebox.showinfo("Success", f"Voucher #{voucher_id} saved and queued to update BUSY voucher "
+                                               f"{voucher_data['voucher_no']} (VchCode {busy_voucher['vch_code']}).")
+            elif get_setting(SETTING_BUSY_UPLOAD_URL, ""):
+                messagebox.showinfo("Success", f"Voucher #{voucher_id} saved and queued for upload to BUSY.")
             else:
-                messagebox.showerror("Upload Failed", 
-                    f"Failed to upload voucher to BUSY:\n{busy_message}")
+                messagebox.showinfo("Success",
+                    f"Voucher #{voucher_id} saved.\n\n"
+                    "It will be uploaded once the BUSY Upload endpoint is set in Settings.")
                     
         except Exception as e:
             import traceback
@@ -1289,6 +2071,9 @@ def open_purchase_voucher():
     ttk.Button(btn_frame, text="Edit", width=10, command=edit_item).pack(side="left", padx=5)
     ttk.Button(btn_frame, text="Delete", width=10, command=delete_item).pack(side="left", padx=5)
     ttk.Button(btn_frame, text="Import PDF", width=12, command=lambda: import_pdf_invoice()).pack(side="left", padx=5)
+    ttk.Button(btn_frame, text="Batch Import", width=12, command=batch_import_pdf_invoices).pack(side="left", padx=5)
+    ttk.Button(btn_frame, text="Import JSON", width=12, command=import_einvoice_json).pack(side="left", padx=5)
+    ttk.Button(btn_frame, text="Import Excel", width=12, command=import_sheet_invoice).pack(side="left", padx=5)
     ttk.Button(btn_frame, text="Match Items", width=12, command=match_items).pack(side="left", padx=5)
     ttk.Button(btn_frame, text="Save", width=10, command=save_items).pack(side="left", padx=5)
 
@@ -1356,4 +2141,17 @@ def open_purchase_voucher():
     # Set initial focus (delayed to ensure window is ready)
     pv.after(100, lambda: header_entries["Date"].focus_set())
 
+    if initial_data:
+        last_import.update(text=source_text, file=source_file, segment=source_segment)
+        if saved_voucher["id"] is not None:
+            pv.title(f"Purchase Voucher - #{saved_voucher['id']}")
+            refresh_upload_status()
+        def fill_initial_data():
+            fill_voucher_data(initial_data, notify=False)
+            if saved_voucher["id"] is not None and draft_id is None:
+                # A stored voucher opened as saved: no draft until it is edited
+                journal.mark_saved(collect_voucher_state())
+
+        pv.after(150, fill_initial_data)
+
     return pv
@@ -85,6 +85,9 @@ class SecretWindow:
         }
         
         if save_app_config(new_config):
+            # Drop the cached AI client/key so the new key is used on the next import
+            from utils.ai_utils import reset_ai_client
+            reset_ai_client()
             valid, msg = verify_serial_no()
             color = "green" if valid else "red"
             self.status_label.config(text=f"Saved. Status: {msg}", fg=color)
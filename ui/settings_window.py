@@ -1,20 +1,31 @@
+import re
 import tkinter as tk
 from tkinter import ttk, messagebox
 from database.db import get_connection
-from utils.setting_keys import SETTING_MRP_WISE, SETTING_SRNO_WISE, SETTING_ACTIVE_DISCOUNT_STRUCT
+from utils.setting_keys import SETTING_MRP_WISE, SETTING_SRNO_WISE, SETTING_ACTIVE_DISCOUNT_STRUCT, SETTING_AI_STREAMING, SETTING_AI_CASCADE, SETTING_AI_HEDGING, SETTING_PDF_MEMORY_LIMIT
+from utils.setting_keys import SETTING_BUSY_UPLOAD_URL, SETTING_BUSY_UPLOAD_USER, SETTING_BUSY_UPLOAD_PASSWORD, SETTING_SQL_STAGING_SCHEMA
+from utils.pdf_utils import PDF_MEMORY_LIMIT_MB
 
 class SettingsWindow:
     def __init__(self, parent):
         self.parent = parent
         self.window = tk.Toplevel(parent)
         self.window.title("Settings")
-        self.window.geometry("400x400")
+        self.window.geometry("400x670")
         self.window.transient(parent)
         self.window.grab_set()
         
         # UI Variables
         self.var_mrp_wise = tk.BooleanVar()
         self.var_srno_wise = tk.BooleanVar()
+        self.var_ai_streaming = tk.BooleanVar()
+        self.var_ai_cascade = tk.BooleanVar()
+        self.var_ai_hedging = tk.BooleanVar()
+        self.var_pdf_memory_limit = tk.StringVar()
+        self.var_busy_url = tk.StringVar()
+        self.var_busy_user = tk.StringVar()
+        self.var_busy_password = tk.StringVar()
+        self.var_staging_schema = tk.StringVar()
         
         # Fixed Structures
         self.structures = ["Simple Discount", "Compound Discount(P+P+A)"]
@@ -33,6 +44,24 @@ class SettingsWindow:
 
         ttk.Checkbutton(options_frame, text="Enable MRP Wise", variable=self.var_mrp_wise).pack(anchor="w", pady=2)
         ttk.Checkbutton(options_frame, text="Enable SrNo Wise", variable=self.var_srno_wise).pack(anchor="w", pady=2)
+        ttk.Checkbutton(options_frame, text="Stream AI Import (show rows as they arrive)", variable=self.var_ai_streaming).pack(anchor="w", pady=2)
+        ttk.Checkbutton(options_frame, text="AI Model Cascade (fast model first)", variable=self.var_ai_cascade).pack(anchor="w", pady=2)
+        ttk.Checkbutton(options_frame, text="AI Request Hedging (retry slow responses early)", variable=self.var_ai_hedging).pack(anchor="w", pady=2)
+
+        limit_frame = ttk.Frame(options_frame)
+        limit_frame.pack(anchor="w", pady=2)
+        ttk.Label(limit_frame, text="PDF Import Memory Limit (MB, 0 = none):").pack(side="left")
+        ttk.Entry(limit_frame, textvariable=self.var_pdf_memory_limit, width=8).pack(side="left", padx=5)
+
+        # --- BUSY Upload (voucher outbox endpoint) ---
+        busy_frame = ttk.LabelFrame(main_frame, text="BUSY Upload", padding=10)
+        busy_frame.pack(fill="x", pady=(0, 10))
+        for row, (label, var, show) in enumerate([("XML Endpoint URL:", self.var_busy_url, ""),
+                                                  ("Username:", self.var_busy_user, ""),
+                                                  ("Password:", self.var_busy_password, "*"),
+                                                  ("SQL Staging Schema:", self.var_staging_schema, "")]):
+            ttk.Label(busy_frame, text=label).grid(row=row, column=0, sticky="w", pady=2)
+            ttk.Entry(busy_frame, textvariable=var, show=show, width=30).grid(row=row, column=1, sticky="w", padx=5, pady=2)
 
         # --- Discount Structures ---
         disc_frame = ttk.LabelFrame(main_frame, text="Discount Structure Selection", padding=10)
@@ -68,6 +97,36 @@ class SettingsWindow:
         row = cur.fetchone()
         self.var_srno_wise.set(row[0] == "1" if row else False)
 
+        # Load AI Streaming (on by default)
+        cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_AI_STREAMING,))
+        row = cur.fetchone()
+        self.var_ai_streaming.set(row[0] == "1" if row else True)
+
+        # Load AI Cascade
+        cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_AI_CASCADE,))
+        row = cur.fetchone()
+        self.var_ai_cascade.set(row[0] == "1" if row else False)
+
+        # Load AI Hedging
+        cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_AI_HEDGING,))
+        row = cur.fetchone()
+        self.var_ai_hedging.set(row[0] == "1" if row else False)
+
+        # Load PDF Memory Limit
+        cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_PDF_MEMORY_LIMIT,))
+        row = cur.fetchone()
+        self.var_pdf_memory_limit.set(row[0] if row else str(PDF_MEMORY_LIMIT_MB))
+
+        # Load BUSY Upload endpoint
+        for key, var in ((SETTING_BUSY_UPLOAD_URL, self.var_busy_url), (SETTING_BUSY_UPLOAD_USER, self.var_busy_user),
+                         (SETTING_BUSY_UPLOAD_PASSWORD, self.var_busy_password)):
+            cur.execute("SELECT value FROM settings WHERE key=?", (key,))
+            row = cur.fetchone()
+            var.set(row[0] if row else "")
+        cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_SQL_STAGING_SCHEMA,))
+        row = cur.fetchone()
+        self.var_staging_schema.set(row[0] if row else "staging")
+
         # Load Active Structure
         cur.execute("SELECT value FROM settings WHERE key=?", (SETTING_ACTIVE_DISCOUNT_STRUCT,))
         row = cur.fetchone()
@@ -85,6 +144,19 @@ class SettingsWindow:
         conn.close()
 
     def _save_settings(self):
+        limit = self.var_pdf_memory_limit.get().strip()
+        if not limit.isdigit():
+            messagebox.showerror("Error", "PDF memory limit must be a whole number of MB", parent=self.window)
+            return
+        busy_url = self.var_busy_url.get().strip()
+        if busy_url and not busy_url.startswith(("http://", "https://")):
+            messagebox.showerror("Error", "BUSY endpoint URL must start with http:// or https://", parent=self.window)
+            return
+        staging_schema = self.var_staging_schema.get().strip() or "staging"
+        if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", staging_schema):
+            messagebox.showerror("Error", "SQL staging schema must be a plain name (letters, digits, _)", parent=self.window)
+            return
+
         conn = get_connection()
         cur = conn.cursor()
 
@@ -95,6 +167,28 @@ class SettingsWindow:
         # Save SrNo Wise
         cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", 
                    (SETTING_SRNO_WISE, "1" if self.var_srno_wise.get() else "0"))
+
+        # Save AI Streaming
+        cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", 
+                   (SETTING_AI_STREAMING, "1" if self.var_ai_streaming.get() else "0"))
+
+        # Save AI Cascade
+        cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", 
+                   (SETTING_AI_CASCADE, "1" if self.var_ai_cascade.get() else "0"))
+
+        # Save AI Hedging
+        cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", 
+                   (SETTING_AI_HEDGING, "1" if self.var_ai_hedging.get() else "0"))
+        
+        # Save PDF Memory Limit
+        cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", 
+                   (SETTING_PDF_MEMORY_LIMIT, limit))
+        
+        # Save BUSY Upload endpoint
+        for key, value in ((SETTING_BUSY_UPLOAD_URL, busy_url), (SETTING_BUSY_UPLOAD_USER, self.var_busy_user.get().strip()),
+                           (SETTING_BUSY_UPLOAD_PASSWORD, self.var_busy_password.get())):
+            cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", (key, value))
+        cur.execute("REPLACE INTO settings (key, value) VALUES (?, ?)", (SETTING_SQL_STAGING_SCHEMA, staging_schema))
         
         # Save Active Structure
         sel = self.disc_listbox.curselection()
@@ -105,6 +199,9 @@ class SettingsWindow:
         
         conn.commit()
         conn.close()
+        # Deliver anything queued while the endpoint wasn't configured
+        from utils.upload_worker import get_upload_worker
+        get_upload_worker().notify()
         messagebox.showinfo("Saved", "Settings saved successfully", parent=self.window)
         self.window.destroy()
 
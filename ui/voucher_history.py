@@ -0,0 +1,160 @@
+import threading
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+from database.vouchers import load_voucher
+from database.voucher_search import SEARCH_PAGE_SIZE, search_available, search_purchase_lines
+from ui.purchase_voucher import open_purchase_voucher
+
+# Rows kept in the list; pages scrolled past beyond this are dropped and fetched again when scrolled back
+HISTORY_MAX_ROWS = SEARCH_PAGE_SIZE * 5
+# Wait this long after the last keystroke before searching
+HISTORY_SEARCH_DELAY_MS = 250
+
+HISTORY_COLUMNS = (
+    ("date", "Date", 85), ("voucher_no", "Voucher No", 100), ("party_name", "Party", 200),
+    ("item_name", "Item", 260), ("hsn", "HSN", 70), ("qty", "Qty", 60), ("unit", "Unit", 50),
+    ("price", "Price", 80), ("amount", "Amount", 90),
+)
+
+
+def open_voucher_history(parent=None):
+    """
+    Searchable history of saved purchase lines (item, party, HSN or voucher no).
+
+    The list is a window over the results: pages are fetched (keyset, see
+    database/voucher_search.py) as it is scrolled towards either end, and pages
+    far from the view are dropped, so the Treeview stays small however many
+    lines match.
+    """
+    win = tk.Toplevel(parent)
+    win.title("Voucher History")
+    win.geometry("1050x560")
+
+    top = ttk.Frame(win, padding=5)
+    top.pack(fill="x")
+    ttk.Label(top, text="Search:").pack(side="left")
+    query_var = tk.StringVar()
+    query_entry = ttk.Entry(top, textvariable=query_var, width=50)
+    query_entry.pack(side="left", padx=5)
+    status_label = ttk.Label(top, text="")
+    status_label.pack(side="left", padx=10)
+
+    body = ttk.Frame(win)
+    body.pack(fill="both", expand=True, padx=5, pady=(0, 5))
+    columns = [c[0] for c in HISTORY_COLUMNS]
+    tree = ttk.Treeview(body, columns=columns + ["voucher_id"], displaycolumns=columns, show="headings",
+                        selectmode="browse")
+    for key, title, width in HISTORY_COLUMNS:
+        tree.heading(key, text=title)
+        tree.column(key, width=width, anchor="w" if key in ("party_name", "item_name") else "center")
+    scroll = ttk.Scrollbar(body, orient="vertical", command=tree.yview)
+    tree.pack(side="left", fill="both", expand=True)
+    scroll.pack(side="right", fill="y")
+
+    if not search_available():
+        status_label.config(text="Search is unavailable: this SQLite build has no FTS5.")
+
+    # generation: bumped per search so pages of an older search are ignored
+    state = {"text": "", "generation": 0, "loading": False, "at_top": True, "at_end": True, "pending": None}
+
+    def row_values(row):
+        return tuple("" if row[key] is None else row[key] for key, _, _ in HISTORY_COLUMNS) + (row["voucher_id"],)
+
+    def fetch(direction):
+        """Fetch the page after the last row ('older') or before the first row ('newer')."""
+        if state["loading"]:
+            return
+        children = tree.get_children()
+        if direction == "older":
+            if state["at_end"]:
+                return
+            kwargs = {"before_id": int(children[-1])} if children else {}
+        else:
+            if state["at_top"] or not children:
+                return
+            kwargs = {"after_id": int(children[0])}
+        state["loading"] = True
+        generation = state["generation"]
+        text = state["text"]
+
+        def task():
+            start = time.perf_counter()
+            rows = search_purchase_lines(text, **kwargs)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            win.after(0, lambda: show_page(generation, direction, rows, elapsed_ms))
+
+        threading.Thread(target=task, daemon=True).start()
+
+    def show_page(generation, direction, rows, elapsed_ms):
+        if generation != state["generation"] or not win.winfo_exists():
+            return
+        state["loading"] = False
+        complete = len(rows) < SEARCH_PAGE_SIZE
+        if direction == "older":
+            for row in rows:
+                tree.insert("", "end", iid=str(row["line_id"]), values=row_values(row))
+            state["at_end"] = complete
+            children = tree.get_children()
+            excess = len(children) - HISTORY_MAX_ROWS
+            if excess > 0:
+                tree.delete(*children[:excess])
+                # Keep the same rows in view after removing rows above them
+                tree.yview_scroll(-excess, "units")
+                state["at_top"] = False
+        else:
+            for row in reversed(rows):
+                tree.insert("", 0, iid=str(row["line_id"]), values=row_values(row))
+            tree.yview_scroll(len(rows), "units")
+            state["at_top"] = complete
+            children = tree.get_children()
+            excess = len(children) - HISTORY_MAX_ROWS
+            if excess > 0:
+                tree.delete(*children[-excess:])
+                state["at_end"] = False
+
+        shown = len(tree.get_children())
+        more = "" if state["at_top"] and state["at_end"] else "+"
+        status_label.config(text=f"{shown}{more} line(s), newest first  ({elapsed_ms:.1f} ms)")
+
+    def run_search():
+        state["pending"] = None
+        state["text"] = query_var.get().strip()
+        state["generation"] += 1
+        state.update(loading=False, at_top=True, at_end=False)
+        tree.delete(*tree.get_children())
+        fetch("older")
+
+    def on_query_change(*args):
+        if state["pending"] is not None:
+            win.after_cancel(state["pending"])
+        state["pending"] = win.after(HISTORY_SEARCH_DELAY_MS, run_search)
+
+    def on_scroll(first, last):
+        scroll.set(first, last)
+        if float(last) > 0.9:
+            fetch("older")
+        elif float(first) < 0.1:
+            fetch("newer")
+
+    def open_selected(event=None):
+        selected = tree.selection()
+        if not selected:
+            return
+        voucher = load_voucher(int(tree.set(selected[0], "voucher_id")))
+        if voucher is None:
+            messagebox.showerror("Error", "Voucher not found.", parent=win)
+            return
+        open_purchase_voucher(initial_data=voucher)
+
+    tree.configure(yscrollcommand=on_scroll)
+    query_var.trace_add("write", on_query_change)
+    query_entry.bind("<Return>", lambda e: run_search())
+    query_entry.bind("<Down>", lambda e: tree.focus_set())
+    tree.bind("<Double-1>", open_selected)
+    tree.bind("<Return>", open_selected)
+    win.bind("<Escape>", lambda e: win.destroy())
+
+    query_entry.focus_set()
+    run_search()
+    return win
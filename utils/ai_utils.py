@@ -1,20 +1,92 @@
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+import asyncio
 import json
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from ui.api_config import get_api_key
+from utils.text_compaction import estimate_tokens
+from utils.json_repair import (
+    InvoiceDecodeError, coerce_invoice, decode_invoice_json, decode_stats, get_repair_rate,
+    repair_json, validate_invoice_schema,
+)
+from utils.invoice_validation import validate_invoice
 
-def parse_with_openai(text):
-        api_key = get_api_key()
-        if not api_key or api_key.strip() in ('0', ''):
-            return "Error: API Key not configured. Please go to API Config and enter a valid OpenRouter API key in the Password field."
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "openai/gpt-4o-mini"  # OpenRouter model ID
+EXTRA_HEADERS = {
+    "HTTP-Referer": "https://minib_app.com",  # Required by OpenRouter for ranking
+    "X-Title": "MiniB ERP",
+}
+SYSTEM_PROMPT = "You are a data extraction assistant. Output only JSON."
+REQUEST_TIMEOUT = 120  # seconds
+API_KEY_ERROR = "Error: API Key not configured. Please go to API Config and enter a valid OpenRouter API key in the Password field."
 
-        try:
-            # Use OpenRouter configuration
-            client = OpenAI(
-                base_url="https://openrouter.ai/api/v1",
-                api_key=api_key,
-            )
-            
-            prompt = f"""
+# Long-lived clients keyed by (base_url, api_key). Each client keeps its own
+# HTTP connection pool, so TLS/connection setup is paid once and reused (keep-alive).
+_clients = {}
+_async_clients = {}
+_client_lock = threading.Lock()
+_cached_api_key = {"value": None}
+
+
+def get_cached_api_key(refresh=False):
+    """
+    Return the API key, resolving it through get_api_key() only once.
+    (get_api_key reads two SQLite tables and config.json.)
+    """
+    if refresh or not _cached_api_key["value"]:
+        _cached_api_key["value"] = get_api_key()
+    return _cached_api_key["value"]
+
+
+def reset_ai_client():
+    """Forget the cached API key and clients (call after the API key is changed)."""
+    with _client_lock:
+        for client in _clients.values():
+            try:
+                client.close()
+            except Exception:
+                pass
+        _clients.clear()
+        _async_clients.clear()
+        _cached_api_key["value"] = None
+
+
+def get_ai_client(api_key, base_url=None):
+    """Return the shared synchronous client for this endpoint/key, creating it on first use."""
+    key = (base_url or OPENROUTER_BASE_URL, api_key)
+    with _client_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = OpenAI(base_url=key[0], api_key=api_key, timeout=REQUEST_TIMEOUT)
+            _clients[key] = client
+        return client
+
+
+def get_async_ai_client(api_key, base_url=None):
+    """
+    Return the shared asyncio client for this endpoint/key on the running event loop.
+    Async connection pools are bound to their loop, so each loop gets its own client.
+    """
+    loop = asyncio.get_running_loop()
+    key = (base_url or OPENROUTER_BASE_URL, api_key, loop)
+    with _client_lock:
+        # Drop clients whose event loop has finished (e.g. a previous asyncio.run batch)
+        for stale in [k for k in _async_clients if k[2].is_closed()]:
+            del _async_clients[stale]
+        client = _async_clients.get(key)
+        if client is None:
+            client = AsyncOpenAI(base_url=key[0], api_key=api_key, timeout=REQUEST_TIMEOUT)
+            _async_clients[key] = client
+        return client
+
+
+def build_invoice_prompt(text):
+    """Build the extraction prompt for an invoice text."""
+    return f"""
             Extract invoice details from the text below and return strictly valid JSON.
             Fields:
             - party_name (string)
@@ -23,42 +95,796 @@ def parse_with_openai(text):
             - purchase_type (string, guess if not clear)
             - items: list of objects with keys: item_name, tax_category (string), hsn (string), qty (number), unit, list_price (number), discount (number), price (number), amount (number)
             - bill_sundry: list of objects with keys: name, percentage (number), amount (number)
+            - grand_total (number, the final invoice total as printed)
 
             Text:
-            {text[:10000]} 
+            {text[:10000]}
             """
 
-            response = client.chat.completions.create(
-                model="openai/gpt-4o-mini", # OpenRouter model ID
-                messages=[
-                    {"role": "system", "content": "You are a data extraction assistant. Output only JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                # response_format={"type": "json_object"}, # OpenRouter/some providers might not support strict json_object enforcement yet with all models, but gpt-4o-mini usually does. keeping it for now.
-                extra_headers={
-                    "HTTP-Referer": "https://minib_app.com", # Required by OpenRouter for ranking
-                    "X-Title": "MiniB ERP",
-                }
-            )
-            content = response.choices[0].message.content
-            # Cleanup code blocks if present (OpenRouter models sometimes return markdown)
-            if content.startswith("```json"):
-                content = content.replace("```json", "").replace("```", "")
-            elif content.startswith("```"):
-                content = content.replace("```", "")
-                
-            print(f"OpenAI Response: {content}")
-            return json.loads(content)
-        except json.JSONDecodeError as e:
-            error_msg = f"Error: Failed to parse JSON response - {str(e)}"
+
+def build_messages(text):
+    """Chat messages for an invoice extraction request."""
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": build_invoice_prompt(text)}
+    ]
+
+
+def decode_ai_content(content):
+    """
+    Decode a model response into the invoice dict.
+    Code fences, stray prose, trailing commas and truncation are repaired locally
+    and numeric fields coerced (see utils/json_repair.py). Raises InvoiceDecodeError
+    only when the response can't be repaired.
+    """
+    print(f"OpenAI Response: {content}")
+    data, repaired = decode_invoice_json(content or "")
+    if repaired:
+        print(f"Repaired model JSON locally (repair rate {get_repair_rate():.0%}, {decode_stats})")
+    return data
+
+
+def format_ai_error(e):
+    """Turn an exception from the AI request into the user-facing error string."""
+    if isinstance(e, (json.JSONDecodeError, InvoiceDecodeError)):
+        return f"Error: Failed to parse JSON response - {str(e)}"
+    error_str = str(e)
+    # Check if it's an authentication error
+    if "401" in error_str or "auth" in error_str.lower():
+        # Key may have been changed in API Config; re-resolve on next call
+        _cached_api_key["value"] = None
+        return f"Error: Authentication failed. Please check your API key in API Config. Details: {error_str}"
+    return f"Error: {error_str}"
+
+
+def _resolve_key(api_key):
+    api_key = api_key or get_cached_api_key()
+    if not api_key or api_key.strip() in ('0', ''):
+        return None
+    return api_key
+
+
+def request_invoice(client, text, model=DEFAULT_MODEL):
+    """
+    Send one extraction request and decode the JSON. Raises on any failure.
+
+    Returns:
+        (data, usage) - usage is the response's token usage object (may be None)
+    """
+    response = client.chat.completions.create(
+        model=model,
+        messages=build_messages(text),
+        # response_format={"type": "json_object"}, # OpenRouter/some providers might not support strict json_object enforcement yet with all models, but gpt-4o-mini usually does. keeping it for now.
+        extra_headers=EXTRA_HEADERS
+    )
+    return decode_ai_content(response.choices[0].message.content), getattr(response, "usage", None)
+
+
+def request_invoice_json(client, text, model=DEFAULT_MODEL):
+    """Send one extraction request and return the decoded invoice. Raises on any failure."""
+    return request_invoice(client, text, model)[0]
+
+
+def parse_with_openai(text, api_key=None, base_url=None, model=DEFAULT_MODEL, hedge=False, hedge_model=None):
+        """
+        Parse invoice text with the AI model. Returns the invoice dict or an error string.
+        With hedge=True a duplicate request is raced against slow responses
+        (see parse_with_openai_hedged).
+        """
+        if hedge:
+            return parse_with_openai_hedged(text, api_key, base_url, model, hedge_model)
+
+        api_key = _resolve_key(api_key)
+        if not api_key:
+            return API_KEY_ERROR
+
+        try:
+            client = get_ai_client(api_key, base_url)
+            try:
+                start = time.perf_counter()
+                data = request_invoice_json(client, text, model)
+                latency_histograms["primary"].record(time.perf_counter() - start)
+                return data
+            except InvoiceDecodeError as e:
+                # Local repair failed - only now pay for another round trip
+                print(f"Model JSON could not be repaired ({e}); re-requesting once.")
+                return request_invoice_json(client, text, model)
+        except Exception as e:
+            error_msg = format_ai_error(e)
             print(f"OpenAI/JSON Error: {error_msg}")
             return error_msg
+
+
+async def parse_with_openai_async(text, api_key=None, base_url=None, model=DEFAULT_MODEL):
+    """
+    Async variant of parse_with_openai for batch imports.
+    Run many of these concurrently with asyncio.gather() on one shared client.
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return API_KEY_ERROR
+
+    try:
+        client = get_async_ai_client(api_key, base_url)
+        response = await client.chat.completions.create(
+            model=model,
+            messages=build_messages(text),
+            extra_headers=EXTRA_HEADERS
+        )
+        return decode_ai_content(response.choices[0].message.content)
+    except Exception as e:
+        error_msg = format_ai_error(e)
+        print(f"OpenAI/JSON Error: {error_msg}")
+        return error_msg
+
+
+# ---------------------------------------------------------------------------
+# Streaming
+# ---------------------------------------------------------------------------
+
+class IncrementalInvoiceParser:
+    """
+    Incremental JSON scanner for the invoice response.
+
+    feed() accepts raw chunks of the model output and returns the events that
+    became complete in that chunk:
+        ("header", key, value)     - a top-level scalar field (party_name, date, ...)
+        ("items", None, obj)       - one complete object of the items list
+        ("bill_sundry", None, obj) - one complete object of the bill_sundry list
+    Anything before the first '{' (e.g. a ```json fence) is ignored.
+    """
+
+    LIST_KEYS = ("items", "bill_sundry")
+
+    def __init__(self):
+        self.buffer = ""
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._expect_key = False
+        self._top_key = None
+        self._value_start = None
+        self._element_start = None
+
+    def feed(self, chunk):
+        events = []
+        self.buffer += chunk
+        buf = self.buffer
+        for i in range(self._pos, len(buf)):
+            ch = buf[i]
+            depth = len(self._stack)
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if depth == 1:
+                        value = json.loads(buf[self._string_start:i + 1])
+                        if self._expect_key:
+                            self._top_key = value
+                        else:
+                            events.append(("header", self._top_key, value))
+                continue
+
+            if depth == 0:
+                if ch == "{":
+                    self._stack.append(ch)
+                    self._expect_key = True
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if depth == 1 and not self._expect_key:
+                    self._value_start = None
+            elif ch in "{[":
+                if depth == 1:
+                    self._value_start = None
+                self._stack.append(ch)
+                if ch == "{" and len(self._stack) == 3 and self._stack[1] == "[" and self._top_key in self.LIST_KEYS:
+                    self._element_start = i
+            elif ch in "}]":
+                if depth == 1:
+                    self._flush_scalar(buf, i, events)
+                self._stack.pop()
+                if ch == "}" and len(self._stack) == 2 and self._element_start is not None:
+                    try:
+                        events.append((self._top_key, None, json.loads(buf[self._element_start:i + 1])))
+                    except json.JSONDecodeError:
+                        pass  # Left to the final decode
+                    self._element_start = None
+            elif depth == 1 and ch == ",":
+                self._flush_scalar(buf, i, events)
+                self._expect_key = True
+            elif depth == 1 and ch == ":":
+                self._expect_key = False
+                self._value_start = i + 1
+
+        self._pos = len(buf)
+        return events
+
+    def _flush_scalar(self, buf, end, events):
+        """Emit a pending top-level number/true/false/null value."""
+        if self._value_start is None:
+            return
+        raw = buf[self._value_start:end].strip()
+        self._value_start = None
+        if raw:
+            try:
+                events.append(("header", self._top_key, json.loads(raw)))
+            except json.JSONDecodeError:
+                pass
+
+
+def parse_with_openai_stream(text, on_event, api_key=None, base_url=None, model=DEFAULT_MODEL):
+    """
+    Streaming variant of parse_with_openai.
+
+    on_event(kind, key, value) is called from the calling thread as soon as a
+    header field or a complete item / bill sundry object arrives (see
+    IncrementalInvoiceParser). Returns the full decoded dict at the end, or an
+    error string like parse_with_openai (which re-requests once, unstreamed,
+    when the streamed JSON can't be repaired).
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return API_KEY_ERROR
+
+    try:
+        client = get_ai_client(api_key, base_url)
+        start = time.perf_counter()
+        first_row_at = None
+        parser = IncrementalInvoiceParser()
+        stream = client.chat.completions.create(
+            model=model,
+            messages=build_messages(text),
+            extra_headers=EXTRA_HEADERS,
+            stream=True
+        )
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+            for kind, key, value in parser.feed(delta):
+                if kind == "items" and first_row_at is None:
+                    first_row_at = time.perf_counter() - start
+                on_event(kind, key, value)
+
+        total = time.perf_counter() - start
+        if first_row_at is not None:
+            print(f"AI stream: first row after {first_row_at:.2f}s, complete after {total:.2f}s")
+        try:
+            return decode_ai_content(parser.buffer.strip())
+        except InvoiceDecodeError as e:
+            # As in parse_with_openai: local repair failed, so pay for one more (unstreamed) request;
+            # the caller replaces the streamed rows with its result
+            print(f"Model JSON could not be repaired ({e}); re-requesting once.")
+            return request_invoice_json(client, text, model)
+    except Exception as e:
+        error_msg = format_ai_error(e)
+        print(f"OpenAI/JSON Error: {error_msg}")
+        return error_msg
+
+
+# ---------------------------------------------------------------------------
+# Batch request scheduler
+# ---------------------------------------------------------------------------
+
+RETRYABLE_STATUS_CODES = (408, 409, 429, 500, 502, 503, 504)
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `rate` tokens per second, bursts up to `capacity`.
+    acquire() blocks until the requested amount is available.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount=1):
+        """Take `amount` tokens, waiting if needed. Returns seconds waited."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                wait = (amount - self._tokens) / self.rate
+            time.sleep(wait)
+            waited += wait
+
+
+def is_retryable_error(e):
+    """True for transient failures where re-sending the same request is safe."""
+    if isinstance(e, (APITimeoutError, APIConnectionError, InvoiceDecodeError)):
+        return True
+    if isinstance(e, APIStatusError):
+        return e.status_code in RETRYABLE_STATUS_CODES
+    return False
+
+
+def _retry_after_seconds(e):
+    """Server-requested delay from a Retry-After header, if any."""
+    try:
+        value = e.response.headers.get("retry-after")
+        return float(value) if value else None
+    except Exception:
+        return None
+
+
+class AIRequestScheduler:
+    """
+    Drives the chat-completions endpoint for batch imports at its allowed throughput.
+
+    - requests_per_minute / tokens_per_minute: two token buckets (requests and prompt tokens)
+    - max_concurrency: cap on in-flight requests
+    - retries with exponential backoff and full jitter for transient (idempotent) failures
+      such as 429, 5xx, timeouts and dropped connections; Retry-After is honoured
+
+    Each request returns a result dict:
+        {'data': dict|None, 'error': str|None, 'attempts': int,
+         'wait_s': float, 'elapsed_s': float, 'request_s': [float, ...]}
+
+    Usage:
+        scheduler = AIRequestScheduler(requests_per_minute=60)
+        results = scheduler.run_batch(texts)
+        scheduler.shutdown()
+    """
+
+    def __init__(self, api_key=None, base_url=None, model=DEFAULT_MODEL,
+                 requests_per_minute=60, tokens_per_minute=200000, max_concurrency=4,
+                 max_retries=4, base_delay=1.0, max_delay=30.0):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.model = model
+        self.request_bucket = TokenBucket(requests_per_minute / 60.0, max(1, max_concurrency))
+        self.token_bucket = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="ai-request")
+
+    def _backoff(self, attempt, e):
+        retry_after = _retry_after_seconds(e)
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        # Full jitter: uniform in [0, base * 2^attempt], capped
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _run(self, text, submitted_at):
+        result = {'data': None, 'error': None, 'attempts': 0, 'wait_s': 0.0, 'elapsed_s': 0.0, 'request_s': []}
+        api_key = _resolve_key(self.api_key)
+        if not api_key:
+            result['error'] = API_KEY_ERROR
+            return result
+
+        # Retries are driven here, not inside the HTTP client
+        client = get_ai_client(api_key, self.base_url).with_options(max_retries=0)
+        tokens = estimate_tokens(build_invoice_prompt(text))
+
+        for attempt in range(self.max_retries + 1):
+            result['attempts'] = attempt + 1
+            result['wait_s'] += self.request_bucket.acquire(1)
+            result['wait_s'] += self.token_bucket.acquire(tokens)
+            start = time.perf_counter()
+            try:
+                result['data'] = request_invoice_json(client, text, self.model)
+                result['error'] = None
+                result['request_s'].append(time.perf_counter() - start)
+                break
+            except Exception as e:
+                result['request_s'].append(time.perf_counter() - start)
+                result['error'] = format_ai_error(e)
+                if attempt >= self.max_retries or not is_retryable_error(e):
+                    break
+                delay = self._backoff(attempt, e)
+                print(f"AI request failed ({result['error']}); retry {attempt + 1} in {delay:.1f}s")
+                time.sleep(delay)
+                result['wait_s'] += delay
+
+        result['elapsed_s'] = time.perf_counter() - submitted_at
+        return result
+
+    def submit(self, text):
+        """Queue one invoice text. Returns a concurrent.futures.Future of the result dict."""
+        return self._executor.submit(self._run, text, time.perf_counter())
+
+    def run_batch(self, texts):
+        """Parse a list of invoice texts; results are returned in the same order."""
+        futures = [self.submit(text) for text in texts]
+        return [f.result() for f in futures]
+
+    def shutdown(self):
+        self._executor.shutdown(wait=True)
+
+
+# ---------------------------------------------------------------------------
+# Model cascade
+# ---------------------------------------------------------------------------
+
+# Cheapest/fastest first. Prices are USD per 1M tokens (input, output) from the
+# OpenRouter model list - update them here when the provider changes pricing.
+MODEL_TIERS = [
+    {"model": "google/gemini-2.0-flash-lite-001", "input_cost": 0.075, "output_cost": 0.30},
+    {"model": "openai/gpt-4o-mini", "input_cost": 0.15, "output_cost": 0.60},
+    {"model": "openai/gpt-4o", "input_cost": 2.50, "output_cost": 10.00},
+]
+
+# Per-model counters: calls, accepted (passed validation), errors, latency_s, cost
+cascade_stats = {}
+_cascade_lock = threading.Lock()
+
+
+def _record_tier(model, latency, cost, accepted, error):
+    with _cascade_lock:
+        stats = cascade_stats.setdefault(model, {"calls": 0, "accepted": 0, "errors": 0, "latency_s": 0.0, "cost": 0.0})
+        stats["calls"] += 1
+        stats["accepted"] += int(accepted)
+        stats["errors"] += int(error)
+        stats["latency_s"] += latency
+        stats["cost"] += cost
+
+
+def get_cascade_report():
+    """One line per tier: calls, hit rate (accepted/calls), mean latency and total cost."""
+    lines = []
+    with _cascade_lock:
+        for model, s in cascade_stats.items():
+            calls = s["calls"] or 1
+            lines.append(
+                f"{model}: calls={s['calls']} hit_rate={s['accepted'] / calls:.0%} "
+                f"mean_latency={s['latency_s'] / calls:.2f}s errors={s['errors']} cost=${s['cost']:.4f}"
+            )
+    return "\n".join(lines)
+
+
+def _usage_cost(tier, usage, text):
+    """Cost of one request from reported usage (estimated from the prompt if missing)."""
+    prompt_tokens = getattr(usage, "prompt_tokens", None) or estimate_tokens(build_invoice_prompt(text))
+    completion_tokens = getattr(usage, "completion_tokens", None) or 0
+    return (prompt_tokens * tier["input_cost"] + completion_tokens * tier["output_cost"]) / 1_000_000
+
+
+def parse_with_cascade(text, tiers=None, api_key=None, base_url=None):
+    """
+    Parse with the cheapest model first and escalate only when the result fails
+    validate_invoice (totals, qty x price, required fields).
+
+    Returns the first accepted invoice dict. If every tier fails validation the
+    result of the strongest tier that answered is returned, else the last error string.
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return API_KEY_ERROR
+
+    tiers = tiers or MODEL_TIERS
+    client = get_ai_client(api_key, base_url)
+    best, last_error = None, None
+    for i, tier in enumerate(tiers):
+        start = time.perf_counter()
+        try:
+            data, usage = request_invoice(client, text, tier["model"])
+            error = None
         except Exception as e:
-            error_str = str(e)
-            # Check if it's an authentication error
-            if "401" in error_str or "auth" in error_str.lower():
-                error_msg = f"Error: Authentication failed. Please check your API key in API Config. Details: {error_str}"
+            data, usage, error = None, None, format_ai_error(e)
+        latency = time.perf_counter() - start
+
+        problems = validate_invoice(data) if data is not None else [error]
+        accepted = not problems
+        _record_tier(tier["model"], latency, _usage_cost(tier, usage, text) if data else 0.0, accepted, error is not None)
+        print(f"Cascade tier {i + 1} {tier['model']}: {latency:.2f}s, "
+              f"{'accepted' if accepted else 'rejected: ' + '; '.join(problems)}")
+
+        if data is not None:
+            best = data
+        else:
+            last_error = error
+        if accepted:
+            return data
+    return best if best is not None else last_error
+
+
+# ---------------------------------------------------------------------------
+# Hedged requests
+# ---------------------------------------------------------------------------
+
+HEDGE_PERCENTILE = 0.90      # fire the hedge when the primary is slower than this share of past requests
+HEDGE_MIN_SAMPLES = 20       # until then use HEDGE_DEFAULT_DELAY
+HEDGE_DEFAULT_DELAY = 8.0    # seconds
+LATENCY_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+
+class LatencyHistogram:
+    """
+    Live latency histogram: fixed buckets for display plus a window of recent
+    samples for percentiles. Thread-safe.
+    """
+
+    def __init__(self, window=500, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self._recent = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+            self.counts[index] += 1
+
+    def __len__(self):
+        return len(self._recent)
+
+    def percentile(self, p):
+        """Latency below which a share p of recent samples fall, or None if empty."""
+        with self._lock:
+            samples = sorted(self._recent)
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(p * len(samples)))]
+
+    def format(self):
+        """Text rendering, one line per bucket."""
+        with self._lock:
+            counts = list(self.counts)
+        total = sum(counts) or 1
+        labels = [f"<= {b}s" for b in self.buckets] + [f"> {self.buckets[-1]}s"]
+        return "\n".join(
+            f"{label:>9} {count:6d} {'#' * int(40 * count / total)}" for label, count in zip(labels, counts)
+        )
+
+
+latency_histograms = {
+    "primary": LatencyHistogram(),   # un-hedged / primary request latencies
+    "hedged": LatencyHistogram(),    # end-to-end latency of hedged calls
+}
+hedge_stats = {"calls": 0, "hedges_fired": 0, "hedge_wins": 0}
+
+_loop_lock = threading.Lock()
+_background = {"loop": None}
+
+
+def _background_loop():
+    """A long-lived event loop thread, so async clients (and their connections) are reused."""
+    with _loop_lock:
+        if _background["loop"] is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, daemon=True, name="ai-async-loop").start()
+            _background["loop"] = loop
+        return _background["loop"]
+
+
+def run_async(coro):
+    """Run a coroutine on the background loop from any thread and wait for its result."""
+    return asyncio.run_coroutine_threadsafe(coro, _background_loop()).result()
+
+
+def hedge_delay():
+    """Seconds to wait for the primary request before firing the hedge."""
+    primary = latency_histograms["primary"]
+    if len(primary) < HEDGE_MIN_SAMPLES:
+        return HEDGE_DEFAULT_DELAY
+    return primary.percentile(HEDGE_PERCENTILE)
+
+
+async def _request_invoice_async(client, text, model):
+    start = time.perf_counter()
+    response = await client.chat.completions.create(
+        model=model,
+        messages=build_messages(text),
+        extra_headers=EXTRA_HEADERS
+    )
+    data = decode_ai_content(response.choices[0].message.content)
+    return data, time.perf_counter() - start
+
+
+async def _hedged(text, api_key, base_url, model, hedge_model, delay):
+    # Runs on the single background loop thread, so hedge_stats needs no lock
+    hedge_stats["calls"] += 1
+    client = get_async_ai_client(api_key, base_url)
+    primary_start = time.perf_counter()
+    primary = asyncio.ensure_future(_request_invoice_async(client, text, model))
+    done, _ = await asyncio.wait({primary}, timeout=delay)
+    if done:
+        data, latency = primary.result()
+        latency_histograms["primary"].record(latency)
+        return data
+
+    hedge_stats["hedges_fired"] += 1
+    hedge = asyncio.ensure_future(_request_invoice_async(client, text, hedge_model or model))
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is not None:
+                error = task.exception()
+                continue
+            # Winner found: cancel the loser (closes its connection)
+            for other in pending:
+                other.cancel()
+            data, latency = task.result()
+            if task is hedge:
+                hedge_stats["hedge_wins"] += 1
+                if not primary.done() or primary.cancelled():
+                    # The primary's latency is at least what it has taken so far (the delay plus
+                    # the hedge's latency); dropping it would leave only fast samples, and the
+                    # hedge delay would keep falling
+                    latency_histograms["primary"].record(time.perf_counter() - primary_start)
             else:
-                error_msg = f"Error: {error_str}"
-            print(f"OpenAI/JSON Error: {error_msg}")
-            return error_msg
\ No newline at end of file
+                latency_histograms["primary"].record(latency)
+            return data
+    raise error
+
+
+def parse_with_openai_hedged(text, api_key=None, base_url=None, model=DEFAULT_MODEL, hedge_model=None, delay=None):
+    """
+    Tail-latency hedging: if the primary request hasn't answered within the
+    HEDGE_PERCENTILE latency of recent requests, fire an identical request
+    (optionally to hedge_model), keep whichever finishes first and cancel the other.
+
+    Returns the invoice dict or an error string like parse_with_openai.
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return API_KEY_ERROR
+
+    start = time.perf_counter()
+    try:
+        data = run_async(_hedged(text, api_key, base_url, model, hedge_model,
+                                 hedge_delay() if delay is None else delay))
+        latency_histograms["hedged"].record(time.perf_counter() - start)
+        return data
+    except Exception as e:
+        error_msg = format_ai_error(e)
+        print(f"OpenAI/JSON Error: {error_msg}")
+        return error_msg
+
+
+# ---------------------------------------------------------------------------
+# Multi-invoice batching
+# ---------------------------------------------------------------------------
+
+BATCH_TEXT_LIMIT = 2500     # only invoices shorter than this (characters) are packed together
+BATCH_MAX_CHARS = 10000     # same prompt budget as a single invoice
+BATCH_MAX_INVOICES = 6
+
+
+def build_batch_prompt(entries):
+    """Prompt for several invoices at once; entries is a list of (invoice_id, text)."""
+    blocks = "\n".join(f"=== INVOICE {invoice_id} ===\n{text}\n=== END {invoice_id} ===" for invoice_id, text in entries)
+    return f"""
+            The text below contains {len(entries)} separate invoices, each between
+            "=== INVOICE <id> ===" and "=== END <id> ===" markers. Extract each one
+            independently - never mix lines between invoices - and return strictly valid JSON:
+            {{"invoices": [ {{"invoice_id": "<id exactly as in the marker>", ...fields}} ]}}
+            Fields per invoice:
+            - party_name (string)
+            - date (YYYY-MM-DD)
+            - voucher_no (string)
+            - purchase_type (string, guess if not clear)
+            - items: list of objects with keys: item_name, tax_category (string), hsn (string), qty (number), unit, list_price (number), discount (number), price (number), amount (number)
+            - bill_sundry: list of objects with keys: name, percentage (number), amount (number)
+            - grand_total (number, the final invoice total as printed)
+
+            {blocks}
+            """
+
+
+def pack_batches(texts, limit=BATCH_TEXT_LIMIT, max_chars=BATCH_MAX_CHARS, max_invoices=BATCH_MAX_INVOICES):
+    """
+    Group indexes of short texts into batches; long texts get a batch of their own.
+
+    Returns:
+        list of lists of indexes into texts
+    """
+    batches, current, size = [], [], 0
+    for i, text in enumerate(texts):
+        if len(text) > limit:
+            batches.append([i])
+            continue
+        if current and (size + len(text) > max_chars or len(current) >= max_invoices):
+            batches.append(current)
+            current, size = [], 0
+        current.append(i)
+        size += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _belongs_to(data, text):
+    """Guard against swapped results: the voucher number must appear in the invoice's own text."""
+    voucher_no = str(data.get("voucher_no") or "").strip()
+    return not voucher_no or voucher_no in text
+
+
+def request_invoice_batch(client, entries, model=DEFAULT_MODEL):
+    """
+    Send one request for several invoices and split the response per invoice_id.
+
+    Returns:
+        {invoice_id: invoice dict} for every invoice that came back valid and matched its id
+    """
+    response = client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": build_batch_prompt(entries)}
+        ],
+        extra_headers=EXTRA_HEADERS
+    )
+    content = response.choices[0].message.content or ""
+    print(f"OpenAI Batch Response: {content}")
+    payload, _ = repair_json(content)
+    invoices = payload.get("invoices", []) if isinstance(payload, dict) else payload
+
+    texts = dict(entries)
+    results, seen = {}, set()
+    for invoice in invoices if isinstance(invoices, list) else []:
+        if not isinstance(invoice, dict):
+            continue
+        invoice_id = str(invoice.pop("invoice_id", "")).strip()
+        if invoice_id not in texts or invoice_id in seen:
+            # Unknown or duplicated id - can't tell which invoice this is; drop all copies
+            results.pop(invoice_id, None)
+            seen.add(invoice_id)
+            continue
+        seen.add(invoice_id)
+        coerce_invoice(invoice)
+        if validate_invoice_schema(invoice) or not _belongs_to(invoice, texts[invoice_id]):
+            continue
+        results[invoice_id] = invoice
+    return results
+
+
+def parse_invoices_batched(texts, api_key=None, base_url=None, model=DEFAULT_MODEL):
+    """
+    Parse many invoice texts, packing short ones several to a request.
+    Invoices missing from a batch response (or failing the id/voucher checks)
+    are re-parsed individually, so a bad batch never merges invoices.
+
+    Returns:
+        list of results aligned with texts (invoice dict or error string)
+    """
+    api_key = _resolve_key(api_key)
+    if not api_key:
+        return [API_KEY_ERROR] * len(texts)
+
+    client = get_ai_client(api_key, base_url)
+    results = [None] * len(texts)
+    for batch in pack_batches(texts):
+        if len(batch) == 1:
+            continue
+        entries = [(f"INV{i + 1}", texts[i]) for i in batch]
+        try:
+            parsed = request_invoice_batch(client, entries, model)
+        except Exception as e:
+            print(f"Batch request failed ({format_ai_error(e)}); parsing invoices individually.")
+            parsed = {}
+        for i in batch:
+            results[i] = parsed.get(f"INV{i + 1}")
+
+    for i, text in enumerate(texts):
+        if results[i] is None:
+            results[i] = parse_with_openai(text, api_key=api_key, base_url=base_url, model=model)
+    return results
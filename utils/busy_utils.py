@@ -41,13 +41,9 @@ def upload_party_to_busy(party_name=None):
 # Purchase Voucher upload
 # ---------------------------------------------------------------------------
 
-def upload_purchase_voucher_to_busy(voucher_data):
+def build_purchase_voucher_xml(voucher_data):
     """
-    Build XML for a Purchase Voucher and attempt to save it to BUSY ERP.
-
-    In SQL Server mode the COM upload is disabled. The function builds and
-    logs the XML for debugging, then returns a success=False with a clear
-    message so the UI can report it gracefully.
+    Build the BUSY <Purchase> XML for a Purchase Voucher.
 
     Args:
         voucher_data: dict with keys:
@@ -55,7 +51,7 @@ def upload_purchase_voucher_to_busy(voucher_data):
             narration (optional), items (list), bill_sundries (list)
 
     Returns:
-        (success: bool, message: str, voucher_code: str|None)
+        str: the voucher XML
     """
     purchase_type = voucher_data.get('purchase_type', 'Central-ItemWise')
 
@@ -159,6 +155,25 @@ def upload_purchase_voucher_to_busy(voucher_data):
         xml_data += "</BillSundries>"
 
     xml_data += "</Purchase>"
+    return xml_data
+
+
+def upload_purchase_voucher_to_busy(voucher_data):
+    """
+    Build XML for a Purchase Voucher and attempt to save it to BUSY ERP.
+
+    In SQL Server mode the COM upload is disabled. The function builds and
+    logs the XML for debugging, then returns a success=False with a clear
+    message so the UI can report it gracefully. Saved vouchers are delivered
+    over HTTP by the upload outbox instead (utils/upload_worker.py).
+
+    Args:
+        voucher_data: see build_purchase_voucher_xml
+
+    Returns:
+        (success: bool, message: str, voucher_code: str|None)
+    """
+    xml_data = build_purchase_voucher_xml(voucher_data)
 
     # ── Log XML (for debugging) ────────────────────────────────────────────
     print("=== Generated Purchase Voucher XML ===")
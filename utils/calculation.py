@@ -2,6 +2,7 @@
 Calculation functions for Purchase Voucher.
 All calculations are centralized here and can be extended based on purchase type.
 """
+import re
 
 def calculate_amount(qty, price):
     """
@@ -196,38 +197,14 @@ def calculate_multirate_tax(items, bill_sundries, purchase_type):
     Returns:
         List of dicts [{'name': str, 'rate': float, 'amount': float}, ...] representing calculated tax BS entries.
     """
-    total_item_value = sum(item['amount'] for item in items)
-    
-    if total_item_value == 0:
+    tax_groups = taxable_by_rate(items, bill_sundries)
+    if not tax_groups:
         return []
 
-    # Calculate net bill sundry amount
-    # But as per formula, we need to distribute EACH bill sundry or net total?
-    # User formula: "ratio = item.value / total_value ... taxable = item.value + freight_share"
-    # This implies we distribute the net bill sundry amount.
-    
-    total_bs_additive = sum(bs['amount'] for bs in bill_sundries if bs['nature'] == 'Additive')
-    total_bs_subtractive = sum(bs['amount'] for bs in bill_sundries if bs['nature'] == 'Subtractive')
-    net_bs_amount = total_bs_additive - total_bs_subtractive
-    
-    # Group taxes
-    # Key: Rate, Value: {'taxable': float}
-    tax_groups = {}
-    
-    is_local = "local" in purchase_type.lower()
-    
-    for item in items:
-        ratio = item['amount'] / total_item_value
-        bs_share = net_bs_amount * ratio
-        taxable_value = item['amount'] + bs_share
-        
-        rate = item['tax_rate']
-        if rate not in tax_groups:
-            tax_groups[rate] = 0.0
-        tax_groups[rate] += taxable_value
-        
     generated_bs = []
     
+    is_local = "local" in purchase_type.lower()
+
     # Process each rate group
     for rate, taxable in tax_groups.items():
         if rate <= 0:
@@ -259,4 +236,72 @@ def calculate_multirate_tax(items, bill_sundries, purchase_type):
                 'amount': round(tax_amt, 2)
             })
             
-    return generated_bs
\ No newline at end of file
+    return generated_bs
+
+
+def taxable_by_rate(items, bill_sundries):
+    """
+    Taxable value per tax rate: each item's amount plus its share (by value) of the
+    net Additive/Subtractive bill sundries.
+
+    Args:
+        items: List of dicts [{'amount': float, 'tax_rate': float}, ...]
+        bill_sundries: List of dicts [{'amount': float, 'nature': 'Additive'/'Subtractive'}, ...]
+
+    Returns:
+        dict {rate: taxable value} ({} when the items add up to zero)
+    """
+    total_item_value = sum(item['amount'] for item in items)
+    
+    if total_item_value == 0:
+        return {}
+
+    # Calculate net bill sundry amount
+    # But as per formula, we need to distribute EACH bill sundry or net total?
+    # User formula: "ratio = item.value / total_value ... taxable = item.value + freight_share"
+    # This implies we distribute the net bill sundry amount.
+    
+    total_bs_additive = sum(bs['amount'] for bs in bill_sundries if bs['nature'] == 'Additive')
+    total_bs_subtractive = sum(bs['amount'] for bs in bill_sundries if bs['nature'] == 'Subtractive')
+    net_bs_amount = total_bs_additive - total_bs_subtractive
+    
+    # Group taxes
+    # Key: Rate, Value: taxable value
+    tax_groups = {}
+    
+    for item in items:
+        ratio = item['amount'] / total_item_value
+        bs_share = net_bs_amount * ratio
+        taxable_value = item['amount'] + bs_share
+        
+        rate = item['tax_rate']
+        if rate not in tax_groups:
+            tax_groups[rate] = 0.0
+        tax_groups[rate] += taxable_value
+
+    return tax_groups
+
+
+def tax_rate_summary(items, bill_sundries, purchase_type):
+    """
+    Taxable value and tax per rate, grouped and rounded as calculate_multirate_tax does
+    (rate 0 groups are listed with no tax). Used for purchase reports.
+
+    Returns:
+        List of dicts [{'rate': float, 'taxable': float, 'tax': float}, ...] sorted by rate
+    """
+    tax_by_rate = {}
+    is_local = "local" in purchase_type.lower()
+    for tax in calculate_multirate_tax(items, bill_sundries, purchase_type):
+        rate = tax['rate'] * 2 if is_local else tax['rate']
+        tax_by_rate[rate] = tax_by_rate.get(rate, 0.0) + tax['amount']
+    return [
+        {'rate': rate, 'taxable': round(taxable, 2), 'tax': round(tax_by_rate.get(rate, 0.0), 2)}
+        for rate, taxable in sorted(taxable_by_rate(items, bill_sundries).items())
+    ]
+
+
+def tax_rate_from_category(tax_category):
+    """Tax rate in a tax category name ('GST 18%', '18%', '18' -> 18.0; 0.0 if none)."""
+    match = re.search(r'(\d+(\.\d+)?)', str(tax_category or ""))
+    return float(match.group(1)) if match else 0.0
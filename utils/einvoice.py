@@ -0,0 +1,305 @@
+"""
+GST e-invoice fast path.
+
+B2B invoices registered with the IRP carry a signed QR code. Its payload is a
+JWT whose "data" claim holds the seller/buyer GSTIN, document number and date,
+total invoice value and item count - enough for the voucher header without
+any AI call. Full e-invoice JSON (the NIC schema, or the IRP response with a
+SignedInvoice) maps to a complete voucher.
+
+The JWT signature is not verified here (that needs the IRP public
+certificate); the payload is only used to prefill fields the operator sees.
+"""
+
+import base64
+import json
+
+from utils.invoice_templates import normalize_date
+
+try:
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pypdfium2 = None
+
+# QR decoders, fastest first; any one of them is enough
+try:
+    import zxingcpp
+except ImportError:
+    zxingcpp = None
+try:
+    from pyzbar import pyzbar
+except ImportError:
+    pyzbar = None
+try:
+    import cv2
+    import numpy
+except ImportError:
+    cv2 = None
+
+# The e-invoice QR is printed on the first page; look no further than this
+EINVOICE_QR_MAX_PAGES = 2
+# Resolution for rendering a page whose QR is drawn as vector graphics
+QR_RENDER_DPI = 200
+TAX_SUNDRIES = (("CgstVal", "CGST"), ("SgstVal", "SGST"), ("IgstVal", "IGST"), ("CesVal", "Cess"), ("StCesVal", "Cess"))
+
+
+def qr_decoding_available():
+    return pypdfium2 is not None and (zxingcpp is not None or pyzbar is not None or cv2 is not None)
+
+
+def decode_jwt_payload(token):
+    """Decode the (unverified) payload of a JWT. Returns a dict, or None if it isn't one."""
+    parts = (token or "").strip().split(".")
+    if len(parts) != 3:
+        return None
+    payload = parts[1] + "=" * (-len(parts[1]) % 4)
+    try:
+        data = json.loads(base64.urlsafe_b64decode(payload.encode("ascii")))
+    except (ValueError, UnicodeDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _jwt_data(token):
+    """The 'data' claim of an IRP-signed JWT, parsed into a dict."""
+    payload = decode_jwt_payload(token)
+    if not payload:
+        return None
+    data = payload.get("data", payload)
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except json.JSONDecodeError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def _number(value):
+    try:
+        return float(str(value).replace(",", "")) if value not in (None, "") else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _purchase_type(seller_gstin, buyer_state):
+    """Local when seller and buyer are in the same state (first two GSTIN digits), else Central."""
+    seller_state = (seller_gstin or "")[:2]
+    if not seller_state or not buyer_state:
+        return None
+    return "Local-MultiRate" if seller_state == str(buyer_state)[:2].zfill(2) else "Central-MultiRate"
+
+
+def resolve_party_name(gstin, default=""):
+    """Party name for a GSTIN: Busy master first, then parties of learned templates."""
+    if not gstin:
+        return default
+    from database.sql_server import get_party_name_by_gstin
+    name = get_party_name_by_gstin(gstin)
+    if name:
+        return name
+    from database.invoice_templates import get_invoice_templates
+    for template in get_invoice_templates():
+        if template["gstin"] == gstin and template["party_name"]:
+            return template["party_name"]
+    return default
+
+
+def parse_einvoice_qr(content):
+    """
+    Decode a signed e-invoice QR payload.
+
+    Returns:
+        dict with 'seller_gstin', 'buyer_gstin', 'voucher_no', 'date' (YYYY-MM-DD),
+        'grand_total', 'item_count', 'main_hsn', 'irn' - or None if it isn't an e-invoice QR
+    """
+    data = _jwt_data(content)
+    if not data or not (data.get("Irn") or data.get("SellerGstin")):
+        return None
+    return {
+        "seller_gstin": data.get("SellerGstin", ""),
+        "buyer_gstin": data.get("BuyerGstin", ""),
+        "voucher_no": str(data.get("DocNo", "")),
+        "date": normalize_date(data.get("DocDt")) or "",
+        "grand_total": _number(data.get("TotInvVal")),
+        "item_count": int(_number(data.get("ItemCnt"))),
+        "main_hsn": str(data.get("MainHsnCode", "")),
+        "irn": data.get("Irn", ""),
+    }
+
+
+def einvoice_header_fields(qr):
+    """Voucher header fields (parse_with_openai schema) from a decoded QR."""
+    fields = {"voucher_no": qr["voucher_no"], "date": qr["date"], "grand_total": qr["grand_total"]}
+    party_name = resolve_party_name(qr["seller_gstin"])
+    if party_name:
+        fields["party_name"] = party_name
+    purchase_type = _purchase_type(qr["seller_gstin"], qr["buyer_gstin"][:2])
+    if purchase_type:
+        fields["purchase_type"] = purchase_type
+    return {k: v for k, v in fields.items() if v not in ("", None)}
+
+
+def apply_einvoice_header(data, qr, fields=None):
+    """
+    Overwrite header fields of a parsed invoice with the signed QR values (in place).
+    Keeps the parser's purchase type variant (ItemWise/MultiRate/...) and only fixes Local vs Central.
+
+    Args:
+        fields: einvoice_header_fields(qr) if already computed
+    """
+    fields = dict(fields or einvoice_header_fields(qr))
+    parsed_type = data.get("purchase_type") or ""
+    if "purchase_type" in fields and "-" in parsed_type:
+        fields["purchase_type"] = fields["purchase_type"].split("-")[0] + "-" + parsed_type.split("-", 1)[1]
+    item_count = len(data.get("items") or [])
+    if qr["item_count"] and item_count and item_count != qr["item_count"]:
+        print(f"E-invoice QR lists {qr['item_count']} items but {item_count} were parsed.")
+    data.update(fields)
+    return data
+
+
+def _decode_qr_image(image):
+    """Decode all QR codes in a PIL image with whichever decoder is installed."""
+    if zxingcpp is not None:
+        return [r.text for r in zxingcpp.read_barcodes(image)]
+    if pyzbar is not None:
+        return [r.data.decode("utf-8", "replace") for r in pyzbar.decode(image)]
+    if cv2 is not None:
+        ok, texts, _, _ = cv2.QRCodeDetector().detectAndDecodeMulti(numpy.array(image.convert("L")))
+        return [t for t in texts if t] if ok else []
+    return []
+
+
+def _page_qr_texts(page):
+    """QR texts on a page: embedded images first, then a rendering of the page (vector QR codes)."""
+    for obj in page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]):
+        try:
+            texts = _decode_qr_image(obj.get_bitmap().to_pil())
+        except Exception:
+            continue
+        if texts:
+            return texts
+    return _decode_qr_image(page.render(scale=QR_RENDER_DPI / 72, grayscale=True).to_pil())
+
+
+def read_einvoice_qr(pdf_path):
+    """
+    Find and decode the e-invoice QR code in a PDF.
+
+    Returns:
+        decoded QR dict (see parse_einvoice_qr), or None if there is none or no decoder is installed
+    """
+    if not qr_decoding_available():
+        return None
+    try:
+        pdf = pypdfium2.PdfDocument(pdf_path)
+    except Exception as e:
+        print(f"E-invoice QR: could not open PDF: {e}")
+        return None
+    try:
+        for index in range(min(len(pdf), EINVOICE_QR_MAX_PAGES)):
+            page = pdf[index]
+            try:
+                for text in _page_qr_texts(page):
+                    qr = parse_einvoice_qr(text)
+                    if qr:
+                        print(f"E-invoice QR found: {qr['voucher_no']} dated {qr['date']}, IRN {qr['irn'][:12]}...")
+                        return qr
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+    return None
+
+
+def einvoice_to_invoice(doc):
+    """
+    Map one NIC e-invoice JSON document to the voucher schema used by parse_with_openai.
+    Taxes, cess, other charges, invoice discount and round off become bill sundries.
+    """
+    doc_dtls = doc.get("DocDtls") or {}
+    seller = doc.get("SellerDtls") or {}
+    buyer = doc.get("BuyerDtls") or {}
+    values = doc.get("ValDtls") or {}
+
+    items = []
+    for line in doc.get("ItemList") or []:
+        qty = _number(line.get("Qty"))
+        gross = _number(line.get("TotAmt"))
+        discount = _number(line.get("Discount"))
+        taxable = _number(line.get("AssAmt")) or gross - discount
+        items.append({
+            "item_name": line.get("PrdDesc", ""),
+            "tax_category": f"{_number(line.get('GstRt')):g}",
+            "hsn": str(line.get("HsnCd", "")),
+            "qty": qty,
+            "unit": line.get("Unit", ""),
+            "list_price": _number(line.get("UnitPrice")),
+            "discount": round(discount / gross * 100, 2) if gross else 0.0,
+            "price": round(taxable / qty, 2) if qty else _number(line.get("UnitPrice")),
+            "amount": round(taxable, 2),
+        })
+
+    sundries = {}
+    for field, name in TAX_SUNDRIES:
+        if _number(values.get(field)):
+            sundries[name] = sundries.get(name, 0.0) + _number(values.get(field))
+    bill_sundry = [{"name": name, "percentage": 0, "amount": round(amount, 2)} for name, amount in sundries.items()]
+    for field, name in (("OthChrg", "Other Charges"), ("Discount", "Discount"), ("RndOffAmt", "Round Off")):
+        if _number(values.get(field)):
+            bill_sundry.append({"name": name, "percentage": 0, "amount": _number(values.get(field))})
+
+    seller_gstin = seller.get("Gstin", "")
+    return {
+        "party_name": resolve_party_name(seller_gstin, seller.get("TrdNm") or seller.get("LglNm") or ""),
+        "date": normalize_date(doc_dtls.get("Dt")) or "",
+        "voucher_no": str(doc_dtls.get("No", "")),
+        "purchase_type": _purchase_type(seller_gstin, buyer.get("Pos") or buyer.get("Stcd") or buyer.get("Gstin", "")[:2])
+                         or "Local-MultiRate",
+        "items": items,
+        "bill_sundry": bill_sundry,
+        "grand_total": _number(values.get("TotInvVal")),
+    }
+
+
+def _einvoice_documents(obj):
+    """Yield NIC invoice documents from any of the usual wrappers (list, IRP response, signed invoice)."""
+    if isinstance(obj, list):
+        for entry in obj:
+            yield from _einvoice_documents(entry)
+    elif isinstance(obj, dict):
+        if "ItemList" in obj:
+            yield obj
+        elif obj.get("SignedInvoice"):
+            document = _jwt_data(obj["SignedInvoice"])
+            if document:
+                yield document
+        else:
+            for key in ("Data", "data"):
+                inner = obj.get(key)
+                if isinstance(inner, str):
+                    try:
+                        inner = json.loads(inner)
+                    except json.JSONDecodeError:
+                        continue
+                if inner is not None:
+                    yield from _einvoice_documents(inner)
+
+
+def load_einvoice_json(path):
+    """
+    Read an e-invoice JSON file (one invoice, a list, or IRP responses with SignedInvoice).
+
+    Returns:
+        list of invoice dicts, or an error string
+    """
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            obj = json.load(f)
+    except (OSError, ValueError) as e:
+        return f"Could not read e-invoice JSON: {e}"
+    invoices = [einvoice_to_invoice(doc) for doc in _einvoice_documents(obj)]
+    if not invoices:
+        return "No e-invoice found in the file (expected the GST e-invoice JSON schema)."
+    return invoices
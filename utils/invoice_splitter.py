@@ -0,0 +1,114 @@
+"""
+Split a PDF that holds several invoices into one page group per invoice.
+
+A page starts a new invoice when:
+    - it carries an invoice number different from the current invoice's, or
+    - it says "Page 1 of N", or
+    - the previous page ended with the invoice total and this page repeats
+      the supplier header the current invoice started with.
+
+Extra copies of an invoice (Original / Duplicate / Triplicate) come out as
+segments whose text, copy markers aside, matches an earlier segment with the
+same invoice number, and are dropped. A segment with a number already seen
+but different text is kept: right after that invoice it is a continuation
+and joins it, elsewhere it stays a separate invoice.
+"""
+
+import re
+
+from utils.text_compaction import AMOUNT_TOKEN, collapse_whitespace
+
+INVOICE_NO = re.compile(
+    r"\b(?:invoice|inv|bill)\s*(?:no|num|number|#)\.?\s*[:#\-]?\s*([A-Za-z0-9][A-Za-z0-9/\-]{0,30})",
+    re.IGNORECASE,
+)
+FIRST_PAGE_MARKER = re.compile(r"\bpage\s*1\s*(?:of|/)\s*\d+\b", re.IGNORECASE)
+TOTAL_LINE = re.compile(r"\b(grand\s*total|invoice\s*total|total\s*amount|net\s*amount|total)\b", re.IGNORECASE)
+COPY_MARKER = re.compile(r"\b(original|duplicate|triplicate|quadruplicate)\b|\bcopy\b", re.IGNORECASE)
+HEADER_LINES = 3
+# Only the last lines of a page are checked for the closing total
+TOTAL_TAIL_LINES = 6
+
+
+def page_invoice_number(page_text):
+    """The invoice number printed on the page (must contain a digit), or None."""
+    for match in INVOICE_NO.finditer(page_text or ""):
+        number = match.group(1).strip("-/")
+        if any(ch.isdigit() for ch in number):
+            return number.upper()
+    return None
+
+
+def _header_signature(page_text):
+    """First few non-empty lines with digits removed (dates and numbers change per invoice)."""
+    lines = [collapse_whitespace(line) for line in (page_text or "").splitlines() if line.strip()]
+    return tuple(re.sub(r"\d", "", line).lower() for line in lines[:HEADER_LINES])
+
+
+def _copy_signature(pages):
+    """Segment text without the lines naming the copy (Original for Recipient, Duplicate...)."""
+    return tuple(
+        collapse_whitespace(line).lower()
+        for page in pages for line in page.splitlines()
+        if line.strip() and not COPY_MARKER.search(line)
+    )
+
+
+def page_ends_with_total(page_text):
+    lines = [line for line in (page_text or "").splitlines() if line.strip()]
+    return any(
+        TOTAL_LINE.search(line) and any(AMOUNT_TOKEN.match(token) for token in line.split())
+        for line in lines[-TOTAL_TAIL_LINES:]
+    )
+
+
+def split_invoice_pages(pages):
+    """
+    Group page texts into invoices.
+
+    Args:
+        pages: list of page texts (see utils.pdf_utils.extract_pages_from_pdf)
+
+    Returns:
+        list of page-text lists, one per invoice (a single-invoice PDF gives one group)
+    """
+    groups = []
+    current_no = None
+    header = None
+    for i, page in enumerate(pages):
+        number = page_invoice_number(page)
+        starts_new = i == 0
+        if i > 0:
+            if number and current_no and number != current_no:
+                starts_new = True
+            elif FIRST_PAGE_MARKER.search(page):
+                starts_new = True
+            elif page_ends_with_total(pages[i - 1]) and _header_signature(page) == header:
+                # With the current invoice's number this is a copy or a page after a
+                # "Total c/f" subtotal; the text decides below
+                starts_new = True
+
+        if starts_new:
+            groups.append({"number": number, "pages": [page]})
+            current_no = number
+            header = _header_signature(page)
+        else:
+            groups[-1]["pages"].append(page)
+            if current_no is None and number:
+                current_no = groups[-1]["number"] = number
+
+    invoices = []
+    seen = {}  # invoice number -> copy signatures of its segments
+    for group in groups:
+        number = group["number"]
+        signature = _copy_signature(group["pages"])
+        if number and signature in seen.get(number, ()):
+            print(f"Skipping repeated copy of invoice {number}.")
+            continue
+        if number and number in seen and invoices and invoices[-1]["number"] == number:
+            # Same invoice, different text: its next pages, never a copy
+            invoices[-1]["pages"].extend(group["pages"])
+        else:
+            invoices.append(group)
+        seen.setdefault(number, set()).add(signature)
+    return [group["pages"] for group in invoices]
@@ -0,0 +1,477 @@
+"""
+Per-party invoice layout templates.
+
+A template is learned from a confirmed import (the extracted PDF text plus the
+voucher the operator saved). It records regex anchors for the header fields and
+the column positions of the item table, so the next PDF from the same supplier
+can be parsed locally without an AI round trip.
+"""
+
+import re
+from collections import Counter
+from datetime import datetime
+from database.invoice_templates import get_invoice_templates, save_invoice_template, record_template_result
+from utils.invoice_validation import validate_invoice
+
+GSTIN_PATTERN = re.compile(r"\b\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]\b")
+DATE_PATTERN = re.compile(
+    r"\b(\d{4}-\d{2}-\d{2}|\d{1,2}[-/.]\d{1,2}[-/.]\d{2,4}|\d{1,2}[- ][A-Za-z]{3}[- ]\d{2,4})\b"
+)
+DATE_FORMATS = [
+    "%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d.%m.%Y", "%d-%m-%y", "%d/%m/%y", "%d.%m.%y",
+    "%d-%b-%Y", "%d-%b-%y", "%d %b %Y", "%d %b %y",
+]
+NUMERIC_ITEM_FIELDS = ["qty", "list_price", "discount", "price", "amount"]
+TOTAL_LINE_PREFIXES = ("total", "sub total", "subtotal", "grand total", "net amount", "taxable")
+SUBTRACTIVE_WORDS = ("discount", "less", "rebate", "tds")
+# Lines that start the buyer's block: a GSTIN after them is not the supplier's
+BUYER_BLOCK_WORDS = ("buyer", "bill to", "billed to", "ship to", "shipped to", "consignee", "customer")
+
+
+def normalize_party_key(name):
+    """Lower-case a party name and collapse punctuation/whitespace for lookups."""
+    return re.sub(r"[^a-z0-9]+", " ", (name or "").lower()).strip()
+
+
+def normalize_date(value):
+    """Convert a date string in any common invoice format to YYYY-MM-DD, or None."""
+    value = (value or "").strip()
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def to_number(token):
+    """Parse an invoice number token ('1,234.50', '18%') into a float, or None."""
+    cleaned = str(token).replace(",", "").replace("%", "").strip()
+    try:
+        return float(cleaned)
+    except (ValueError, TypeError):
+        return None
+
+
+def numbers_match(a, b):
+    """True if two amounts are equal within rounding tolerance."""
+    if a is None or b is None:
+        return False
+    return abs(a - b) <= max(0.01, abs(b) * 0.001)
+
+
+def _split_lines(text):
+    return [line.strip() for line in (text or "").splitlines() if line.strip()]
+
+
+def _anchor_before(line, value):
+    """Return the label text preceding value on a line (e.g. 'Invoice No:'), or None."""
+    pos = line.find(value)
+    if pos <= 0:
+        return None
+    label = line[:pos].rstrip()
+    # Keep only the trailing label part so unrelated text earlier on the line doesn't matter
+    label = re.split(r"\s{2,}", label)[-1][-30:].strip()
+    if not re.search(r"[A-Za-z]", label):
+        return None
+    return label
+
+
+def _find_supplier_gstin(lines, party_name):
+    """
+    The GSTIN printed in the party's own block (within a few lines of its name), or None.
+    There is no fallback to other GSTINs: the buyer's own GSTIN is on every invoice.
+    """
+    key = normalize_party_key(party_name)
+    if not key:
+        return None
+    for idx, line in enumerate(lines):
+        if key not in normalize_party_key(line):
+            continue
+        for offset, near in enumerate(lines[idx:idx + 4]):
+            if offset and any(word in near.lower() for word in BUYER_BLOCK_WORDS):
+                break
+            found = GSTIN_PATTERN.search(near)
+            if found:
+                return found.group(0)
+    return None
+
+
+def _leading_words(line, limit=2):
+    """Return up to `limit` leading alphabetic words of a line (e.g. 'Sub Total')."""
+    words = []
+    for token in line.split()[:limit]:
+        if not re.search(r"[A-Za-z]", token):
+            break
+        words.append(token)
+    return " ".join(words)
+
+
+def _last_number(line):
+    numbers = [to_number(t) for t in line.split() if to_number(t) is not None]
+    return numbers[-1] if numbers else None
+
+
+def _bill_sundry_total(bill_sundry):
+    total = 0.0
+    for bs in bill_sundry or []:
+        amount = to_number(bs.get("amount")) or 0.0
+        name = str(bs.get("name") or "").lower()
+        total += -amount if any(word in name for word in SUBTRACTIVE_WORDS) else amount
+    return total
+
+
+def _mode(values, min_count):
+    """Most common value if it occurs at least min_count times, else None."""
+    if not values:
+        return None
+    value, count = Counter(values).most_common(1)[0]
+    return value if count >= min_count else None
+
+
+# ---------------------------------------------------------------------------
+# Learning
+# ---------------------------------------------------------------------------
+
+def learn_template(text, data):
+    """
+    Derive a layout template from extracted text and the confirmed voucher data.
+
+    Args:
+        text: Raw text extracted from the supplier PDF
+        data: dict in the parse_with_openai schema (party_name, date, voucher_no,
+              purchase_type, items, bill_sundry)
+
+    Returns:
+        dict template, or None if the layout could not be recognised
+    """
+    lines = _split_lines(text)
+    items = data.get("items") or []
+    if not lines or not items or not data.get("party_name"):
+        return None
+
+    template = {
+        "version": 1,
+        "party_name": data.get("party_name", ""),
+        "purchase_type": data.get("purchase_type", ""),
+        "header": {},
+        "items": {},
+        "bill_sundry": [],
+    }
+
+    # ---- Header anchors ----
+    voucher_no = str(data.get("voucher_no") or "").strip()
+    if voucher_no:
+        for line in lines:
+            if voucher_no in line.split():
+                anchor = _anchor_before(line, voucher_no)
+                if anchor:
+                    template["header"]["voucher_no"] = anchor
+                    break
+
+    confirmed_date = normalize_date(str(data.get("date") or ""))
+    if confirmed_date:
+        for line in lines:
+            match = next((m for m in DATE_PATTERN.finditer(line) if normalize_date(m.group(1)) == confirmed_date), None)
+            if match:
+                anchor = _anchor_before(line, match.group(1))
+                if anchor:
+                    template["header"]["date"] = anchor
+                    break
+
+    # ---- Item table column positions (counted from the end of the line) ----
+    offsets = {field: [] for field in NUMERIC_ITEM_FIELDS + ["unit", "hsn"]}
+    lead_tokens = []
+    item_line_indexes = []
+
+    for item in items:
+        name = str(item.get("item_name") or "").strip()
+        if not name:
+            continue
+        name_lower = name.lower()
+        for idx, line in enumerate(lines):
+            if name_lower not in line.lower() or idx in item_line_indexes:
+                continue
+            tokens = line.split()
+            name_tokens = name.split()
+            start = next(
+                (i for i in range(len(tokens)) if tokens[i].lower() == name_tokens[0].lower()),
+                None,
+            )
+            if start is None:
+                continue
+            name_end = start + len(name_tokens)
+            for field in NUMERIC_ITEM_FIELDS:
+                expected = to_number(item.get(field))
+                if not expected:
+                    continue
+                for i in range(name_end, len(tokens)):
+                    if numbers_match(to_number(tokens[i]), expected):
+                        offsets[field].append(i - len(tokens))
+                        break
+            for field in ("unit", "hsn"):
+                expected = str(item.get(field) or "").strip().lower()
+                if not expected:
+                    continue
+                for i in range(name_end, len(tokens)):
+                    if tokens[i].lower() == expected:
+                        offsets[field].append(i - len(tokens))
+                        break
+            lead_tokens.append(start)
+            item_line_indexes.append(idx)
+            break
+
+    matched = len(item_line_indexes)
+    if matched == 0:
+        return None
+
+    needed = max(1, (matched + 1) // 2)
+    columns = {}
+    for field, values in offsets.items():
+        offset = _mode(values, needed)
+        if offset is not None:
+            columns[field] = offset
+
+    # Need at least a quantity and a price or amount to rebuild items
+    if "qty" not in columns or not ("price" in columns or "amount" in columns):
+        return None
+
+    first_line, last_line = min(item_line_indexes), max(item_line_indexes)
+    template["items"] = {
+        "columns": columns,
+        "lead_tokens": _mode(lead_tokens, 1) or 0,
+        "start_anchor": lines[first_line - 1] if first_line > 0 else "",
+        "end_anchor": _leading_words(lines[last_line + 1]) if last_line + 1 < len(lines) else "",
+    }
+
+    # ---- Total anchor: a line below the table whose last number is the item or invoice total ----
+    # Without it a dropped row would go unnoticed, so no total means no template
+    item_total = sum(to_number(item.get("amount")) or 0.0 for item in items)
+    candidates = []
+    if to_number(data.get("grand_total")):
+        candidates.append(("grand_total", to_number(data.get("grand_total"))))
+    if data.get("bill_sundry"):
+        candidates.append(("grand_total", item_total + _bill_sundry_total(data.get("bill_sundry"))))
+    candidates.append(("sub_total", item_total))
+    for line in lines[last_line + 1:]:
+        label, number = _leading_words(line), _last_number(line)
+        if not label or number is None:
+            continue
+        kind = next((kind for kind, total in candidates if numbers_match(number, total)), None)
+        if kind:
+            template["total"] = {"kind": kind, "anchor": label.lower()}
+            break
+    if "total" not in template:
+        return None
+
+    # ---- Bill sundry anchors (name found on a line whose last number is the amount) ----
+    for bs in data.get("bill_sundry") or []:
+        name = str(bs.get("name") or "").strip()
+        amount = to_number(bs.get("amount"))
+        if not name or amount is None:
+            continue
+        for line in lines[last_line + 1:]:
+            numbers = [to_number(t) for t in line.split() if to_number(t) is not None]
+            if name.lower() in line.lower() and numbers and numbers_match(numbers[-1], amount):
+                template["bill_sundry"].append({"name": name, "anchor": name.lower()})
+                break
+
+    template["gstin"] = _find_supplier_gstin(lines, data.get("party_name"))
+    return template
+
+
+def save_learned_template(text, data):
+    """Learn a template from a confirmed import and store it. Returns True if stored."""
+    template = learn_template(text, data)
+    if not template:
+        return False
+    party_name = data.get("party_name", "")
+    return save_invoice_template(normalize_party_key(party_name), party_name, template.get("gstin"), template)
+
+
+# ---------------------------------------------------------------------------
+# Applying
+# ---------------------------------------------------------------------------
+
+def find_template(text):
+    """
+    Find the stored template for the supplier of this invoice text.
+    Supplier GSTIN matches take priority over party name matches.
+
+    Returns:
+        template record dict (see get_invoice_templates) or None
+    """
+    templates = get_invoice_templates()
+    if not templates:
+        return None
+
+    gstins = set(GSTIN_PATTERN.findall(text or ""))
+    # A GSTIN stored on several templates is not one supplier's (e.g. the buyer's own,
+    # learned by older versions), so it identifies nothing
+    stored = Counter(record["gstin"] for record in templates if record["gstin"])
+    for record in templates:
+        if record["gstin"] in gstins and stored[record["gstin"]] == 1:
+            return record
+
+    normalized_text = " " + normalize_party_key(text) + " "
+    for record in templates:
+        if record["party_key"] and f" {record['party_key']} " in normalized_text:
+            return record
+    return None
+
+
+def apply_template(template, text):
+    """
+    Parse invoice text with a learned template.
+
+    Returns:
+        dict in the parse_with_openai schema (may be incomplete; see validate_template_result)
+    """
+    lines = _split_lines(text)
+    data = {
+        "party_name": template.get("party_name", ""),
+        "purchase_type": template.get("purchase_type", ""),
+        "voucher_no": "",
+        "date": "",
+        "items": [],
+        "bill_sundry": [],
+    }
+
+    header = template.get("header", {})
+    for line in lines:
+        if "voucher_no" in header and not data["voucher_no"] and header["voucher_no"] in line:
+            rest = line.split(header["voucher_no"], 1)[1].split()
+            if rest:
+                data["voucher_no"] = rest[0].strip(":")
+        if "date" in header and not data["date"] and header["date"] in line:
+            rest = line.split(header["date"], 1)[1]
+            match = DATE_PATTERN.search(rest)
+            if match:
+                data["date"] = normalize_date(match.group(1)) or ""
+
+    spec = template.get("items", {})
+    columns = spec.get("columns", {})
+    start_anchor = spec.get("start_anchor", "")
+    end_anchor = spec.get("end_anchor", "").lower()
+    first_column = min(columns.values()) if columns else -1
+
+    in_table = not start_anchor
+    last_item_line = -1
+    for idx, line in enumerate(lines):
+        if not in_table:
+            in_table = line == start_anchor
+            continue
+        if end_anchor and line.lower().startswith(end_anchor):
+            break
+
+        tokens = line.split()
+        # The numeric tail plus at least one name token: short item names are still rows
+        if len(tokens) < 1 - first_column:
+            continue
+        name_start = spec.get("lead_tokens", 0)
+        name_end = len(tokens) + first_column
+        name = " ".join(tokens[name_start:name_end])
+        if not name or name.lower().startswith(TOTAL_LINE_PREFIXES):
+            continue
+
+        item = {"item_name": name, "tax_category": "", "hsn": "", "unit": ""}
+        valid = True
+        for field in NUMERIC_ITEM_FIELDS:
+            if field not in columns:
+                continue
+            value = to_number(tokens[columns[field]])
+            if value is None:
+                valid = False
+                break
+            item[field] = value
+        if not valid:
+            continue
+        for field in ("unit", "hsn"):
+            if field in columns:
+                item[field] = tokens[columns[field]]
+
+        item.setdefault("discount", 0)
+        if "price" not in item:
+            item["price"] = round(item["amount"] / item["qty"], 2) if item.get("qty") else 0
+        item.setdefault("list_price", item["price"])
+        item.setdefault("amount", round(item["qty"] * item["price"], 2))
+        data["items"].append(item)
+        last_item_line = idx
+
+    total = template.get("total")
+    if total:
+        for line in lines[last_item_line + 1:]:
+            if _leading_words(line).lower() == total["anchor"]:
+                number = _last_number(line)
+                if number is not None:
+                    data[total["kind"]] = number
+                break
+
+    for bs in template.get("bill_sundry", []):
+        for line in lines[last_item_line + 1:]:
+            if bs["anchor"] not in line.lower():
+                continue
+            numbers = [to_number(t) for t in line.split() if to_number(t) is not None]
+            if numbers:
+                pct = re.search(r"(\d+(?:\.\d+)?)\s*%", line)
+                data["bill_sundry"].append({
+                    "name": bs["name"],
+                    "percentage": float(pct.group(1)) if pct else 0,
+                    "amount": numbers[-1],
+                })
+                break
+
+    return data
+
+
+def validate_template_result(data):
+    """
+    Sanity-check a template parse before trusting it over the AI parser.
+    The items must add up to the total read from the invoice, so a row the
+    template missed fails the parse instead of being dropped.
+
+    Returns:
+        (ok: bool, reason: str)
+    """
+    problems = validate_invoice(data)
+    for item in data.get("items") or []:
+        if not item.get("price"):
+            problems.append(f"no price for '{item.get('item_name')}'")
+    # validate_invoice checks grand_total; a sub total is checked against the items alone
+    if not to_number(data.get("grand_total")):
+        sub_total = to_number(data.get("sub_total"))
+        item_total = sum(to_number(item.get("amount")) or 0.0 for item in data.get("items") or [])
+        if not sub_total:
+            problems.append("no invoice total to check the items against")
+        elif abs(item_total - sub_total) > max(1.0, abs(sub_total) * 0.005):
+            problems.append(f"items ({item_total:.2f}) do not add up to sub total ({sub_total:.2f})")
+    if problems:
+        return False, "; ".join(problems)
+    return True, "ok"
+
+
+def parse_with_template(text):
+    """
+    Try to parse invoice text with the supplier's learned template.
+
+    Returns:
+        dict in the parse_with_openai schema, or None if no template applies or
+        validation failed (caller should fall back to the AI parser).
+    """
+    record = find_template(text)
+    if not record:
+        return None
+
+    try:
+        data = apply_template(record["template"], text)
+        ok, reason = validate_template_result(data)
+    except Exception as e:
+        ok, reason = False, str(e)
+
+    record_template_result(record["id"], ok)
+    if not ok:
+        print(f"Template for '{record['party_name']}' rejected: {reason}. Falling back to AI.")
+        return None
+
+    print(f"Parsed invoice locally with template for '{record['party_name']}' ({len(data['items'])} items).")
+    return data
@@ -0,0 +1,81 @@
+"""
+Consistency checks for a parsed invoice (AI, template or any other source).
+"""
+
+import re
+
+SUBTRACTIVE_WORDS = ("discount", "less", "rebate", "tds")
+
+
+def _num(value):
+    try:
+        return float(str(value).replace(",", "")) if value not in (None, "") else 0.0
+    except (ValueError, TypeError):
+        return 0.0
+
+
+def _close(a, b, pct=0.02, minimum=1.0):
+    return abs(a - b) <= max(minimum, abs(b) * pct)
+
+
+def _line_matches(qty, price, amount, tax_category):
+    """qty x price matches amount, either before or after the line's tax rate."""
+    base = qty * price
+    if _close(base, amount):
+        return True
+    match = re.search(r"(\d+(?:\.\d+)?)", str(tax_category or ""))
+    if match:
+        return _close(base * (1 + float(match.group(1)) / 100), amount)
+    return False
+
+
+def validate_invoice(data, require_header=True):
+    """
+    Check that a parsed invoice is internally consistent.
+
+    Checks:
+        - required header fields (party_name, voucher_no, date) are present
+        - every item has a name, positive qty, and qty x price ~ amount
+        - item amounts plus bill sundries ~ the stated grand_total (when given)
+
+    Returns:
+        list of problem strings (empty if the invoice looks right)
+    """
+    if not isinstance(data, dict):
+        return ["not an invoice object"]
+
+    problems = []
+    if require_header:
+        for field in ("party_name", "voucher_no", "date"):
+            if not str(data.get(field) or "").strip():
+                problems.append(f"missing {field}")
+
+    items = data.get("items") or []
+    if not items:
+        problems.append("no items")
+
+    item_total = 0.0
+    for i, item in enumerate(items, start=1):
+        name = item.get("item_name") or f"item {i}"
+        qty, price, amount = _num(item.get("qty")), _num(item.get("price")), _num(item.get("amount"))
+        item_total += amount
+        if not item.get("item_name"):
+            problems.append(f"item {i} has no name")
+        if qty <= 0:
+            problems.append(f"'{name}': qty must be positive")
+        elif price > 0 and not _line_matches(qty, price, amount, item.get("tax_category")):
+            problems.append(f"'{name}': qty x price ({qty * price:.2f}) does not match amount ({amount:.2f})")
+
+    stated_total = _num(data.get("grand_total"))
+    if stated_total and items:
+        bs_total = 0.0
+        for bs in data.get("bill_sundry") or []:
+            amount = _num(bs.get("amount"))
+            name = str(bs.get("name") or "").lower()
+            bs_total += -amount if any(word in name for word in SUBTRACTIVE_WORDS) else amount
+        if not _close(item_total + bs_total, stated_total, pct=0.005):
+            problems.append(
+                f"items + bill sundries ({item_total + bs_total:.2f}) do not add up to total ({stated_total:.2f})"
+            )
+
+    return problems
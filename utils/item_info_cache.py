@@ -0,0 +1,124 @@
+"""
+In-memory cache of item purchase info (last rate, last supplier, stock) read
+from BUSY, for the Item Info panel of the purchase voucher window.
+
+Selecting an item reads the cache only. It is filled in the background:
+when a party is chosen, the party's most frequently bought items are
+fetched in one query; the items of an imported invoice are fetched together
+in one query; an item that is still missing is fetched on its own and the
+panel is updated when it arrives. Entries expire after ITEM_INFO_TTL_S so
+stock figures don't go stale for long.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from database.sql_server import get_item_purchase_info, get_party_item_purchase_info
+
+ITEM_INFO_TTL_S = 600.0
+ITEM_INFO_MAX_ITEMS = 5000
+PARTY_PREFETCH_ITEMS = 50
+
+
+def _key(name):
+    return (name or "").strip().casefold()
+
+
+class ItemInfoCache:
+    """Thread-safe LRU of {item name: info}; loads run on daemon threads."""
+
+    def __init__(self, item_loader=None, party_loader=None, ttl=ITEM_INFO_TTL_S, max_items=ITEM_INFO_MAX_ITEMS):
+        self.item_loader = item_loader or get_item_purchase_info
+        self.party_loader = party_loader or (lambda party: get_party_item_purchase_info(party, PARTY_PREFETCH_ITEMS))
+        self.ttl = ttl
+        self.max_items = max_items
+        self.entries = OrderedDict()   # key -> (loaded_at, info or None when BUSY has no such item)
+        self.parties = {}              # party key -> loaded_at
+        self.in_flight = set()         # item / party keys being loaded
+        self.lock = threading.Lock()
+
+    def get(self, item_name):
+        """
+        Cached info for an item, without querying.
+
+        Returns:
+            (found, info): found is False on a miss; info is None when BUSY doesn't know the item
+        """
+        key = _key(item_name)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl:
+                return False, None
+            self.entries.move_to_end(key)
+            return True, entry[1]
+
+    def _store(self, names, info):
+        now = time.monotonic()
+        found = {_key(name): value for name, value in info.items()}
+        with self.lock:
+            for name in names:
+                key = _key(name)
+                self.entries[key] = (now, found.pop(key, None))
+                self.entries.move_to_end(key)
+            for key, value in found.items():
+                self.entries[key] = (now, value)
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_items:
+                self.entries.popitem(last=False)
+
+    def _run(self, keys, load, callback):
+        try:
+            load()
+        except Exception as e:
+            print(f"Item info prefetch failed: {e}")
+        finally:
+            with self.lock:
+                self.in_flight.difference_update(keys)
+        if callback:
+            callback()
+
+    def prefetch_items(self, item_names, callback=None):
+        """Load the items not cached (or expired) in one background query; callback() runs afterwards."""
+        missing = [name for name in {n.strip() for n in item_names if n and n.strip()} if not self.get(name)[0]]
+        with self.lock:
+            missing = [name for name in missing if ("item", _key(name)) not in self.in_flight]
+            keys = {("item", _key(name)) for name in missing}
+            self.in_flight.update(keys)
+        if not missing:
+            return False
+        threading.Thread(target=self._run, daemon=True,
+                         args=(keys, lambda: self._store(missing, self.item_loader(missing)), callback)).start()
+        return True
+
+    def prefetch_party(self, party_name, callback=None):
+        """Load the party's frequently bought items in the background (at most once per TTL)."""
+        key = _key(party_name)
+        if not key:
+            return False
+        with self.lock:
+            loaded_at = self.parties.get(key)
+            if ("party", key) in self.in_flight or (loaded_at is not None and time.monotonic() - loaded_at <= self.ttl):
+                return False
+            self.in_flight.add(("party", key))
+
+        def load():
+            self._store([], self.party_loader(party_name))
+            with self.lock:
+                self.parties[key] = time.monotonic()
+
+        threading.Thread(target=self._run, args=({("party", key)}, load, callback), daemon=True).start()
+        return True
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_item_info_cache():
+    """The application's item info cache."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ItemInfoCache()
+        return _cache
@@ -0,0 +1,261 @@
+"""
+Tolerant decoding of the model's invoice JSON.
+
+Repairs the usual failure modes locally (markdown fences, stray prose around
+the object, trailing commas, output truncated mid-array), coerces numeric
+fields of items and bill sundries, and validates the expected schema, so an
+import only needs another model round trip when repair is impossible.
+"""
+
+import json
+import re
+import threading
+
+ITEM_NUMERIC_FIELDS = ("qty", "list_price", "price", "amount")
+ITEM_TEXT_FIELDS = ("item_name", "tax_category", "hsn", "unit")
+BS_NUMERIC_FIELDS = ("percentage", "amount")
+HEADER_TEXT_FIELDS = ("party_name", "date", "voucher_no", "purchase_type")
+MAX_TRUNCATION_CUTS = 50
+# Opening fence at the start of the response, closing fence at the end (absent if truncated)
+FENCE = re.compile(r"^```(?:json)?[ \t]*\n?|\n?```$", re.IGNORECASE)
+
+# Decode outcome counters: 'clean' parsed as-is, 'repaired' needed local repair, 'failed' unrecoverable
+decode_stats = {"clean": 0, "repaired": 0, "failed": 0}
+_stats_lock = threading.Lock()
+
+
+class InvoiceDecodeError(ValueError):
+    """The model response could not be repaired into a valid invoice."""
+
+
+def _count(outcome):
+    with _stats_lock:
+        decode_stats[outcome] += 1
+
+
+def get_repair_rate():
+    """Share of decoded responses that needed repair (0.0 if none decoded yet)."""
+    with _stats_lock:
+        total = sum(decode_stats.values())
+        return decode_stats["repaired"] / total if total else 0.0
+
+
+def _scan(text):
+    """
+    Walk the text outside of strings.
+
+    Returns:
+        (stack, in_string, last_comma) - open containers as (char, start index),
+        whether the text ends inside a string, and the index of the last comma
+        outside strings (-1 if none)
+    """
+    stack = []
+    in_string = False
+    escape = False
+    last_comma = -1
+    for i, ch in enumerate(text):
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "{[":
+            stack.append((ch, i))
+        elif ch in "}]":
+            if stack:
+                stack.pop()
+        elif ch == ",":
+            last_comma = i
+    return stack, in_string, last_comma
+
+
+def _remove_trailing_commas(text):
+    """Drop commas directly before a closing brace/bracket (outside strings)."""
+    out = []
+    in_string = False
+    escape = False
+    for ch in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif ch == "\\":
+                escape = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in "}]":
+            # Remove a comma (and whitespace) emitted just before this closer
+            j = len(out) - 1
+            while j >= 0 and out[j].isspace():
+                j -= 1
+            if j >= 0 and out[j] == ",":
+                del out[j]
+        out.append(ch)
+    return "".join(out)
+
+
+def _close_truncated(text):
+    """
+    Close a truncated JSON object. A half-written element of a list (e.g. the
+    last item) is dropped rather than guessed; if the result still doesn't
+    parse, cut back to the previous comma and retry.
+    """
+    stack, in_string, last_comma = _scan(text)
+    if len(stack) >= 2 and stack[-1][0] == "{" and stack[-2][0] == "[":
+        text = text[:stack[-1][1]]
+
+    for _ in range(MAX_TRUNCATION_CUTS):
+        stack, in_string, last_comma = _scan(text)
+        candidate = text + ('"' if in_string else "")
+        candidate = candidate.rstrip().rstrip(",")
+        candidate += "".join("}" if c == "{" else "]" for c, _ in reversed(stack))
+        try:
+            return json.loads(_remove_trailing_commas(candidate))
+        except json.JSONDecodeError:
+            if last_comma < 0:
+                break
+            text = text[:last_comma]
+    raise InvoiceDecodeError("response is truncated beyond repair")
+
+
+def repair_json(content):
+    """
+    Decode model output, repairing it if needed.
+
+    Returns:
+        (value, repaired: bool)
+
+    Raises:
+        InvoiceDecodeError if no JSON object can be recovered
+    """
+    # A ```json fence around the whole answer is the normal output format, not a repair
+    text = FENCE.sub("", (content or "").strip()).strip()
+    try:
+        return json.loads(text), False
+    except json.JSONDecodeError:
+        pass
+
+    # Fences and prose around the object
+    text = re.sub(r"```(?:json)?", "", text)
+    start = text.find("{")
+    if start < 0:
+        raise InvoiceDecodeError("no JSON object in response")
+    end = text.rfind("}")
+    body = text[start:end + 1] if end > start else text[start:]
+
+    for candidate in (body, _remove_trailing_commas(body)):
+        try:
+            return json.loads(candidate), True
+        except json.JSONDecodeError:
+            pass
+
+    # Truncated output: everything after the first '{' may be incomplete
+    return _close_truncated(text[start:]), True
+
+
+def to_float(value):
+    """Coerce '1,234.50', '₹ 500', '18%', None into a float (0.0 if not numeric)."""
+    if isinstance(value, bool):
+        return float(value)
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.search(r"-?\d+(?:\.\d+)?", str(value or "").replace(",", ""))
+    return float(match.group(0)) if match else 0.0
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [value]
+    return list(value) if isinstance(value, (list, tuple)) else []
+
+
+def coerce_invoice(data):
+    """Normalise types in place: header strings, numeric item/bill sundry fields, list shapes."""
+    for field in HEADER_TEXT_FIELDS:
+        if data.get(field) is not None and not isinstance(data[field], str):
+            data[field] = str(data[field])
+
+    items = []
+    for item in _as_list(data.get("items")):
+        if not isinstance(item, dict):
+            continue
+        if item.get("list_price") in (None, ""):
+            item["list_price"] = item.get("price")
+        for field in ITEM_NUMERIC_FIELDS:
+            item[field] = to_float(item.get(field))
+        # Discount may legitimately be a compound text like "5+2"
+        discount = item.get("discount")
+        if discount is None or discount == "":
+            item["discount"] = 0.0
+        elif not isinstance(discount, (int, float)):
+            text = str(discount).replace("%", "").strip()
+            item["discount"] = to_float(text) if re.fullmatch(r"-?\d+(\.\d+)?", text) else text
+        for field in ITEM_TEXT_FIELDS:
+            value = item.get(field)
+            item[field] = "" if value is None else str(value)
+        items.append(item)
+    data["items"] = items
+
+    sundries = []
+    for bs in _as_list(data.get("bill_sundry")):
+        if not isinstance(bs, dict):
+            continue
+        for field in BS_NUMERIC_FIELDS:
+            bs[field] = to_float(bs.get(field))
+        bs["name"] = str(bs.get("name") or "")
+        sundries.append(bs)
+    data["bill_sundry"] = sundries
+    return data
+
+
+def validate_invoice_schema(data):
+    """
+    Check the decoded invoice against the expected schema.
+
+    Returns:
+        list of problem strings (empty if valid)
+    """
+    problems = []
+    if not isinstance(data, dict):
+        return ["response is not a JSON object"]
+    if not data.get("items"):
+        problems.append("no items")
+    for i, item in enumerate(data.get("items", []), start=1):
+        if not item.get("item_name"):
+            problems.append(f"item {i} has no item_name")
+    for i, bs in enumerate(data.get("bill_sundry", []), start=1):
+        if not bs.get("name"):
+            problems.append(f"bill sundry {i} has no name")
+    return problems
+
+
+def decode_invoice_json(content):
+    """
+    Repair, coerce and validate a model response.
+
+    Returns:
+        (data: dict, repaired: bool)
+
+    Raises:
+        InvoiceDecodeError when the response can't be turned into a valid invoice
+    """
+    try:
+        data, repaired = repair_json(content)
+        if not isinstance(data, dict):
+            raise InvoiceDecodeError("response is not a JSON object")
+        coerce_invoice(data)
+        problems = validate_invoice_schema(data)
+        if problems:
+            raise InvoiceDecodeError("; ".join(problems))
+    except InvoiceDecodeError:
+        _count("failed")
+        raise
+    _count("repaired" if repaired else "clean")
+    return data, repaired
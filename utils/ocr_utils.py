@@ -0,0 +1,196 @@
+"""
+Local OCR for scanned invoice pages.
+
+Pages whose text layer is empty but which are covered by an image are
+rasterized with PDFium and read by Tesseract (pytesseract) in worker
+processes. Results are cached in mini_b.db by a hash of the page's image
+data, so importing the same scan again costs nothing.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from database.ocr_cache import get_cached_ocr_text, save_ocr_text
+
+try:
+    import pypdfium2
+    import pypdfium2.raw as pdfium_c
+except ImportError:
+    pypdfium2 = None
+try:
+    import pytesseract
+except ImportError:
+    pytesseract = None
+
+OCR_DPI = 300
+OCR_LANG = "eng"
+# psm 6: treat the page as one uniform block, which keeps table rows on one line
+OCR_CONFIG = "--psm 6"
+OCR_MAX_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+
+# A page is "scanned" if it has almost no text layer and images cover most of it
+SCANNED_MAX_TEXT_CHARS = 20
+SCANNED_MIN_IMAGE_COVERAGE = 0.5
+
+_pool = None
+_pool_lock = threading.Lock()
+_tesseract_ok = None
+
+
+def ocr_available():
+    """True if PDFium, pytesseract and the tesseract executable are all present."""
+    global _tesseract_ok
+    if pypdfium2 is None or pytesseract is None:
+        return False
+    if _tesseract_ok is None:
+        try:
+            pytesseract.get_tesseract_version()
+            _tesseract_ok = True
+        except Exception as e:
+            print(f"Tesseract not available: {e}")
+            _tesseract_ok = False
+    return _tesseract_ok
+
+
+def get_ocr_pool():
+    """Process pool shared by all OCR jobs (workers are slow to start, so keep them)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_MAX_WORKERS)
+        return _pool
+
+
+def shutdown_ocr_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _image_objects(page):
+    return list(page.get_objects(filter=[pdfium_c.FPDF_PAGEOBJ_IMAGE]))
+
+
+def is_scanned_page(page, text, images=None):
+    """Heuristic: (almost) no extractable text and images covering most of the page."""
+    if len((text or "").strip()) >= SCANNED_MAX_TEXT_CHARS:
+        return False
+    images = _image_objects(page) if images is None else images
+    if not images:
+        return False
+    width, height = page.get_size()
+    covered = 0.0
+    for image in images:
+        left, bottom, right, top = image.get_bounds()
+        covered += (right - left) * (top - bottom)
+    return covered >= width * height * SCANNED_MIN_IMAGE_COVERAGE
+
+
+def page_hash(page, images):
+    """Hash of the page's embedded image data (the scan itself), independent of the file around it."""
+    digest = hashlib.sha256()
+    for image in images:
+        digest.update(bytes(image.get_data(decode_simple=False)))
+        digest.update(repr(image.get_px_size()).encode("ascii"))
+    return digest.hexdigest()
+
+
+def find_scanned_pages(pdf_path, pages):
+    """
+    Detect scanned pages among already-extracted page texts.
+
+    Returns:
+        list of (page_index, page_hash)
+    """
+    if pypdfium2 is None:
+        return []
+    scanned = []
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        for index, text in enumerate(pages):
+            if len((text or "").strip()) >= SCANNED_MAX_TEXT_CHARS:
+                continue
+            page = pdf[index]
+            try:
+                images = _image_objects(page)
+                if is_scanned_page(page, text, images):
+                    scanned.append((index, page_hash(page, images)))
+            finally:
+                page.close()
+    finally:
+        pdf.close()
+    return scanned
+
+
+def _ocr_page(pdf_path, index, dpi=OCR_DPI, lang=OCR_LANG, config=OCR_CONFIG):
+    """Worker process: rasterize one page and OCR it."""
+    pdf = pypdfium2.PdfDocument(pdf_path)
+    try:
+        page = pdf[index]
+        image = page.render(scale=dpi / 72, grayscale=True).to_pil()
+        page.close()
+    finally:
+        pdf.close()
+    return pytesseract.image_to_string(image, lang=lang, config=config)
+
+
+def ocr_scanned_pages(pdf_path, pages):
+    """
+    Replace the empty text of scanned pages with OCR text.
+
+    Cached pages are filled from mini_b.db; the rest are OCR'd in parallel
+    worker processes and added to the cache. Identical scans are OCR'd once.
+
+    Args:
+        pdf_path: Path of the PDF
+        pages: list of page texts (from utils.pdf_utils.extract_pages_from_pdf)
+
+    Returns:
+        (pages, stats) - a new list of page texts; stats: {'scanned', 'cached', 'ocr', 'failed', 'seconds', 'pages_per_s'}
+    """
+    pages = list(pages)
+    stats = {'scanned': 0, 'cached': 0, 'ocr': 0, 'failed': 0, 'seconds': 0.0, 'pages_per_s': 0.0}
+    scanned = find_scanned_pages(pdf_path, pages)
+    stats['scanned'] = len(scanned)
+    if not scanned:
+        return pages, stats
+    if not ocr_available():
+        print(f"{len(scanned)} scanned page(s) found but OCR is not available (install Tesseract and pytesseract).")
+        return pages, stats
+
+    start = time.perf_counter()
+    cached = get_cached_ocr_text({h for _, h in scanned})
+    todo = {}  # page_hash -> first page index with that scan
+    for index, h in scanned:
+        if h in cached:
+            pages[index] = cached[h]
+            stats['cached'] += 1
+        else:
+            todo.setdefault(h, index)
+
+    results = {}
+    if todo:
+        pool = get_ocr_pool()
+        futures = {pool.submit(_ocr_page, pdf_path, index): h for h, index in todo.items()}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except Exception as e:
+                print(f"OCR failed for page {todo[futures[future]] + 1}: {e}")
+                stats['failed'] += 1
+        save_ocr_text(results)
+        for index, h in scanned:
+            if h in results:
+                pages[index] = results[h]
+                stats['ocr'] += 1
+
+    stats['seconds'] = time.perf_counter() - start
+    stats['pages_per_s'] = len(scanned) / stats['seconds'] if stats['seconds'] else 0.0
+    print(f"OCR: {len(scanned)} scanned pages ({stats['cached']} cached, {len(results)} OCR'd) "
+          f"in {stats['seconds']:.1f}s - {stats['pages_per_s']:.2f} pages/s")
+    return pages, stats
@@ -1,14 +1,261 @@
+import gc
+import os
 import pdfplumber
+from utils.text_compaction import page_rows_intact
+try:
+    import psutil
+except ImportError:
+    psutil = None
+try:
+    import pypdfium2
+except ImportError:
+    pypdfium2 = None
+try:
+    from pdfminer.high_level import extract_pages as pdfminer_extract_pages
+    from pdfminer.layout import LAParams, LTTextContainer, LTTextLine
+except ImportError:
+    pdfminer_extract_pages = None
+
+# Default ceiling for the extraction process' resident memory (MB, 0 = no limit)
+PDF_MEMORY_LIMIT_MB = 1024
+
+# Pages with less text than this are not trusted to the fast backend
+MIN_FAST_PAGE_CHARS = 20
+
+DEFAULT_PDF_BACKEND = "auto"
+
+
+class PdfMemoryLimitError(MemoryError):
+    """Extraction stayed above the memory ceiling even after releasing the document."""
+
+
+def current_rss_mb():
+        """Resident memory of this process in MB, or None if it can't be measured here."""
+        if psutil is not None:
+            return psutil.Process().memory_info().rss / (1024 * 1024)
+        try:
+            with open("/proc/self/statm") as f:
+                resident_pages = int(f.read().split()[1])
+            return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+        except (OSError, ValueError, IndexError, AttributeError):
+            return None
+
+
+def get_pdf_memory_limit():
+        """Memory ceiling from settings (falls back to PDF_MEMORY_LIMIT_MB)."""
+        from database.db import get_setting
+        from utils.setting_keys import SETTING_PDF_MEMORY_LIMIT
+        try:
+            return int(get_setting(SETTING_PDF_MEMORY_LIMIT, PDF_MEMORY_LIMIT_MB))
+        except (TypeError, ValueError):
+            return PDF_MEMORY_LIMIT_MB
+
+
+def _enforce_memory_limit(memory_limit_mb, index, total, release=None):
+        """
+        Check RSS after a page. Over the limit, call release() (close cached
+        documents) and collect; raise PdfMemoryLimitError if still over.
+
+        Returns:
+            True if release() was called (the caller must reopen what it closed)
+        """
+        rss = current_rss_mb() if memory_limit_mb else None
+        if rss is None or rss <= memory_limit_mb or index >= total:
+            return False
+        if release:
+            release()
+        gc.collect()
+        rss = current_rss_mb()
+        if rss > memory_limit_mb:
+            raise PdfMemoryLimitError(
+                f"PDF extraction needs {rss:.0f} MB, over the {memory_limit_mb} MB limit (page {index} of {total})"
+            )
+        return True
+
+
+    # ================= PDF BACKENDS =================
+    # Each backend yields the text of one page at a time.
+
+def _plumber_page_text(pdf, index):
+        page = pdf.pages[index]
+        text = page.extract_text() or ""
+        page.close()  # drop the page's layout cache
+        return text
+
+
+def _iter_pdfplumber(pdf_path, memory_limit_mb):
+        """Slowest, best layout fidelity: rebuilds table rows from character positions."""
+        pdf = pdfplumber.open(pdf_path)
+        try:
+            index = 0
+            total = len(pdf.pages)
+            while index < total:
+                text = _plumber_page_text(pdf, index)
+                index += 1
+                yield text
+                if _enforce_memory_limit(memory_limit_mb, index, total, pdf.close):
+                    # Reopening drops pdfminer's document-level object caches
+                    pdf = pdfplumber.open(pdf_path)
+        finally:
+            pdf.close()
+
+
+# Tuned for invoices: no box hierarchy analysis (boxes_flow=None is much
+# cheaper and keeps reading order top-down) and no vertical text detection
+PDFMINER_LAPARAMS = dict(line_overlap=0.5, char_margin=2.0, word_margin=0.1, line_margin=0.3,
+                         boxes_flow=None, detect_vertical=False, all_texts=False)
+
+
+def _pdfminer_page_text(layout):
+        """Join the page's text lines into rows by vertical position, left to right."""
+        lines = []
+        for box in layout:
+            if isinstance(box, LTTextContainer):
+                lines.extend(line for line in box if isinstance(line, LTTextLine) and line.get_text().strip())
+        rows = []
+        for line in sorted(lines, key=lambda l: (-l.y1, l.x0)):
+            middle = (line.y0 + line.y1) / 2
+            if rows and abs(rows[-1][0] - middle) <= line.height / 2:
+                rows[-1][1].append(line)
+            else:
+                rows.append([middle, [line]])
+        return "\n".join(
+            " ".join(line.get_text().strip() for line in sorted(row, key=lambda l: l.x0)) for _, row in rows
+        )
+
+
+def _iter_pdfminer(pdf_path, memory_limit_mb):
+        """pdfminer layout analysis with tuned LAParams; pages are parsed lazily one at a time."""
+        laparams = LAParams(**PDFMINER_LAPARAMS)
+        for index, layout in enumerate(pdfminer_extract_pages(pdf_path, laparams=laparams), start=1):
+            yield _pdfminer_page_text(layout)
+            _enforce_memory_limit(memory_limit_mb, index, float("inf"))
+
+
+def _pdfium_page_text(pdf, index):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        try:
+            return textpage.get_text_range().replace("\r\n", "\n")
+        finally:
+            textpage.close()
+            page.close()
+
+
+def _iter_pypdfium2(pdf_path, memory_limit_mb):
+        """Fastest (PDFium, native code); text follows the drawing order, so column-drawn tables come out split."""
+        pdf = pypdfium2.PdfDocument(pdf_path)
+        try:
+            total = len(pdf)
+            for index in range(total):
+                yield _pdfium_page_text(pdf, index)
+                _enforce_memory_limit(memory_limit_mb, index + 1, total)
+        finally:
+            pdf.close()
+
+
+def _iter_auto(pdf_path, memory_limit_mb):
+        """
+        Fast path: PDFium text for every page whose rows come out intact; pages
+        with little text or a column-drawn layout are re-read with pdfplumber.
+        """
+        if pypdfium2 is None:
+            yield from _iter_pdfplumber(pdf_path, memory_limit_mb)
+            return
+
+        fast = pypdfium2.PdfDocument(pdf_path)
+        plumber = {"pdf": None}
+
+        def release():
+            if plumber["pdf"] is not None:
+                plumber["pdf"].close()
+                plumber["pdf"] = None
+
+        fallbacks = 0
+        try:
+            total = len(fast)
+            for index in range(total):
+                text = _pdfium_page_text(fast, index)
+                if len(text.strip()) < MIN_FAST_PAGE_CHARS or not page_rows_intact(text):
+                    if plumber["pdf"] is None:
+                        plumber["pdf"] = pdfplumber.open(pdf_path)
+                    text = _plumber_page_text(plumber["pdf"], index)
+                    fallbacks += 1
+                yield text
+                _enforce_memory_limit(memory_limit_mb, index + 1, total, release)
+            print(f"PDF backend: pypdfium2 for {total - fallbacks} pages, pdfplumber for {fallbacks}.")
+        finally:
+            release()
+            fast.close()
+
+
+PDF_BACKENDS = {
+    "auto": _iter_auto,
+    "pdfplumber": _iter_pdfplumber,
+    "pdfminer": _iter_pdfminer,
+    "pypdfium2": _iter_pypdfium2,
+}
+
+
+def available_pdf_backends():
+        """Backend names usable in this install ('auto' and pdfplumber always are)."""
+        names = ["auto", "pdfplumber"]
+        if pdfminer_extract_pages is not None:
+            names.append("pdfminer")
+        if pypdfium2 is not None:
+            names.append("pypdfium2")
+        return names
+
 
     # ================= PDF IMPORT LOGIC =================
-def extract_text_from_pdf(pdf_path):
-        text = ""
+def iter_pdf_pages(pdf_path, memory_limit_mb=None, backend=DEFAULT_PDF_BACKEND):
+        """
+        Yield the text of each page, one page at a time.
+
+        Each page's parsed layout is released as soon as its text is taken. If
+        the process goes over memory_limit_mb, cached documents are closed and
+        reopened at the next page; if memory is still over the limit after
+        that, PdfMemoryLimitError is raised.
+
+        Args:
+            pdf_path: Path of the PDF
+            memory_limit_mb: Ceiling in MB (None = setting/default, 0 = no limit)
+            backend: One of PDF_BACKENDS ('auto' picks the cheapest usable one per page)
+        """
+        if backend not in available_pdf_backends():
+            raise ValueError(f"PDF backend '{backend}' is not available (have: {', '.join(available_pdf_backends())})")
+        if memory_limit_mb is None:
+            memory_limit_mb = get_pdf_memory_limit()
+        yield from PDF_BACKENDS[backend](pdf_path, memory_limit_mb)
+
+
+def extract_pages_from_pdf(pdf_path, memory_limit_mb=None, backend=DEFAULT_PDF_BACKEND, ocr=True):
+        """
+        Return the text of each page as a list, or None if the PDF can't be read.
+        With ocr=True, scanned pages (no text layer) are read with local OCR.
+        If extraction goes over the memory ceiling, returns an error string
+        instead (the PDF is readable, the limit is too low for it).
+        """
+        pages = []
         try:
-            with pdfplumber.open(pdf_path) as pdf:
-                for page in pdf.pages:
-                    text += (page.extract_text() or "") + "\n"
-            print(f"Extracted {len(text)} characters from PDF.")
+            for text in iter_pdf_pages(pdf_path, memory_limit_mb, backend):
+                pages.append(text)
+            if ocr and any(len(p.strip()) < MIN_FAST_PAGE_CHARS for p in pages):
+                from utils.ocr_utils import ocr_scanned_pages
+                pages, _ = ocr_scanned_pages(pdf_path, pages)
+            print(f"Extracted {sum(len(p) for p in pages)} characters from {len(pages)} PDF pages.")
+        except PdfMemoryLimitError as e:
+            print(f"Error reading PDF: {e}")
+            return (f"PDF read stopped at the memory limit: {e}. "
+                    "Raise 'PDF Import Memory Limit' in Settings (0 = none) to import it.")
         except Exception as e:
             print(f"Error reading PDF: {e}")
             return None
-        return text
+        return pages
+
+
+def extract_text_from_pdf(pdf_path, memory_limit_mb=None, backend=DEFAULT_PDF_BACKEND, ocr=True):
+        pages = extract_pages_from_pdf(pdf_path, memory_limit_mb, backend, ocr)
+        if pages is None or isinstance(pages, str):
+            return None
+        return "".join(page + "\n" for page in pages)
@@ -2,3 +2,12 @@
 SETTING_MRP_WISE = "mrp_wise"
 SETTING_SRNO_WISE = "srno_wise"
 SETTING_ACTIVE_DISCOUNT_STRUCT = "active_discount_struct"
+SETTING_AI_STREAMING = "ai_streaming"
+SETTING_AI_CASCADE = "ai_cascade"
+SETTING_AI_HEDGING = "ai_hedging"
+SETTING_PDF_MEMORY_LIMIT = "pdf_memory_limit_mb"
+SETTING_BUSY_UPLOAD_URL = "busy_upload_url"
+SETTING_BUSY_UPLOAD_USER = "busy_upload_user"
+SETTING_BUSY_UPLOAD_PASSWORD = "busy_upload_password"
+SETTING_SQL_STAGING_SCHEMA = "sql_staging_schema"
+SETTING_ROLLUP_VERSION = "purchase_rollup_version"
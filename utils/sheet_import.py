@@ -0,0 +1,249 @@
+"""
+Line-item import from supplier Excel (.xlsx) and CSV files.
+
+Rows are streamed (openpyxl read-only mode / csv reader), so a sheet with
+thousands of lines is never loaded as a whole workbook. Columns are mapped to
+the voucher item schema by header text: a saved per-party mapping when there
+is one (database/column_mappings.py), otherwise by recognising common header
+names.
+"""
+
+import csv
+import re
+
+from utils.calculation import calculate_price
+from utils.json_repair import to_float
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# Voucher item fields in Treeview column order, with the header names suppliers use for them
+ITEM_FIELDS = ["item_name", "tax_category", "hsn", "qty", "unit", "list_price", "discount", "price", "amount"]
+FIELD_SYNONYMS = {
+    "item_name": ["item", "item name", "item description", "description", "particulars", "product", "product name",
+                  "material", "material description", "name of item"],
+    "tax_category": ["gst", "gst %", "gst rate", "tax", "tax %", "tax rate", "igst %", "tax category"],
+    "hsn": ["hsn", "hsn code", "hsn/sac", "hsn sac", "sac"],
+    "qty": ["qty", "quantity", "qty.", "billed qty", "pcs", "nos"],
+    "unit": ["unit", "uom", "units", "per"],
+    "list_price": ["rate", "mrp", "list price", "unit price", "price/unit", "rate/unit", "basic rate"],
+    "discount": ["disc", "disc %", "disc.", "discount", "discount %", "scheme %"],
+    "price": ["net rate", "net price", "rate after discount", "landing price"],
+    "amount": ["amount", "value", "net amount", "taxable value", "taxable amount", "total", "line total"],
+}
+REQUIRED_FIELDS = ("item_name", "qty")
+# Title/address lines above the column header
+HEADER_SCAN_ROWS = 30
+SKIP_ITEM_NAMES = ("total", "sub total", "subtotal", "grand total", "round off", "net total")
+
+
+class SheetImportError(ValueError):
+    """The file can't be read or its item columns can't be mapped."""
+
+
+def normalize_header(value):
+    return re.sub(r"\s+", " ", str(value or "").strip().lower())
+
+
+def iter_sheet_rows(path):
+    """Yield rows of the first sheet (xlsx) or the CSV file as tuples of cell values."""
+    if path.lower().endswith((".xlsx", ".xlsm")):
+        if openpyxl is None:
+            raise SheetImportError("openpyxl is not installed; Excel files can't be imported (CSV still works).")
+        workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+        try:
+            for row in workbook.worksheets[0].iter_rows(values_only=True):
+                yield row
+        finally:
+            workbook.close()
+    elif path.lower().endswith((".csv", ".txt")):
+        with open(path, newline="", encoding="utf-8-sig", errors="replace") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            try:
+                dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|")
+            except csv.Error:
+                dialect = csv.excel
+            for row in csv.reader(f, dialect):
+                yield tuple(row)
+    else:
+        raise SheetImportError("Unsupported file type (use .xlsx or .csv).")
+
+
+def detect_columns(header):
+    """
+    Map item fields to column indexes by recognising header names.
+
+    Returns:
+        {field: column index}
+    """
+    names = [normalize_header(cell) for cell in header]
+    columns = {}
+    for field, synonyms in FIELD_SYNONYMS.items():
+        for i, name in enumerate(names):
+            if name and i not in columns.values() and (name in synonyms or name.rstrip(" .:%") in synonyms):
+                columns[field] = i
+                break
+    return columns
+
+
+def resolve_mapping(header, mapping):
+    """
+    Turn a saved mapping {field: header text} into column indexes for this file.
+
+    Returns:
+        {field: column index}, or None if a mapped header is missing from the file
+    """
+    names = [normalize_header(cell) for cell in header]
+    columns = {}
+    for field, header_text in mapping.items():
+        if not header_text:
+            continue
+        try:
+            columns[field] = names.index(normalize_header(header_text))
+        except ValueError:
+            return None
+    return columns
+
+
+def find_header(rows, mapping=None):
+    """
+    Consume rows up to and including the column header.
+
+    Returns:
+        (header cells, {field: column index}); the columns are empty/incomplete
+        if nothing matched, so the caller can ask the operator
+    """
+    best = None
+    for _, row in zip(range(HEADER_SCAN_ROWS), rows):
+        cells = [cell for cell in row if cell not in (None, "")]
+        if len(cells) < 2:
+            continue
+        if mapping:
+            columns = resolve_mapping(row, mapping)
+            if columns:
+                return list(row), columns
+        columns = detect_columns(row)
+        if all(field in columns for field in REQUIRED_FIELDS):
+            return list(row), columns
+        if best is None or len(columns) > len(best[1]):
+            best = (list(row), columns)
+    return best if best else ([], {})
+
+
+def columns_to_mapping(header, columns):
+    """{field: column index} -> {field: header text}, the form saved per party."""
+    return {field: str(header[i]).strip() for field, i in columns.items() if i < len(header) and header[i] is not None}
+
+
+def row_to_item(row, columns, is_simple_discount=True):
+    """Build one voucher item from a sheet row, or None for blank/total rows."""
+    def cell(field):
+        i = columns.get(field)
+        return row[i] if i is not None and i < len(row) else None
+
+    name = str(cell("item_name") or "").strip()
+    qty = to_float(cell("qty"))
+    if not name or normalize_header(name).rstrip(" :") in SKIP_ITEM_NAMES or qty == 0:
+        return None
+
+    list_price = to_float(cell("list_price"))
+    discount = cell("discount")
+    discount = "" if discount in (None, "") else str(discount).replace("%", "").strip()
+    if "price" in columns:
+        price = to_float(cell("price"))
+    elif "list_price" not in columns and "amount" in columns:
+        price = round(to_float(cell("amount")) / qty, 2) if qty else 0.0
+    else:
+        price = calculate_price(list_price, discount, qty, is_simple_discount=is_simple_discount)
+    amount = to_float(cell("amount")) if "amount" in columns else round(qty * price, 2)
+    if not list_price:
+        list_price = price
+    tax = cell("tax_category")
+    return {
+        "item_name": name,
+        "tax_category": "" if tax in (None, "") else str(tax).replace("%", "").strip(),
+        "hsn": str(cell("hsn") or "").strip(),
+        "qty": qty,
+        "unit": str(cell("unit") or "").strip(),
+        "list_price": list_price,
+        "discount": discount or 0,
+        "price": price,
+        "amount": amount,
+    }
+
+
+def read_sheet_items(path, mapping=None, is_simple_discount=True):
+    """
+    Stream a supplier sheet into voucher items.
+
+    Args:
+        path: .xlsx or .csv file
+        mapping: {field: header text} - the party's saved mapping or the operator's choice (tried first)
+
+    Returns:
+        (items, info) - info: {'header', 'columns', 'mapping', 'rows', 'skipped'}
+
+    Raises:
+        SheetImportError if the file can't be read or the required columns aren't mapped
+        (use read_sheet_header() to offer the operator the header cells)
+    """
+    rows = iter_sheet_rows(path)
+    try:
+        header, columns = find_header(rows, mapping)
+        missing = [field for field in REQUIRED_FIELDS if field not in columns]
+        if missing:
+            raise SheetImportError(f"Could not find the {', '.join(missing)} column(s) in the file.")
+
+        items = []
+        skipped = 0
+        for row in rows:
+            item = row_to_item(row, columns, is_simple_discount)
+            if item is None:
+                skipped += 1
+            else:
+                items.append(item)
+    finally:
+        rows.close()
+
+    info = {
+        'header': header,
+        'columns': columns,
+        'mapping': columns_to_mapping(header, columns),
+        'rows': len(items) + skipped,
+        'skipped': skipped,
+    }
+    return items, info
+
+
+def read_sheet_header(path, mapping=None):
+    """Header cells and detected/mapped columns of a sheet (for the column mapping dialog)."""
+    rows = iter_sheet_rows(path)
+    try:
+        return find_header(rows, mapping)
+    finally:
+        rows.close()
+
+
+def match_master_items(items, master_names):
+    """
+    Validate item names against the Busy item master in one pass.
+    Names are replaced by the master's spelling when they match case-insensitively.
+
+    Args:
+        master_names: all item names from the master (one query, see get_all_item_names)
+
+    Returns:
+        list of indexes of items not found in the master
+    """
+    canonical = {normalize_header(name): name for name in master_names}
+    unknown = []
+    for i, item in enumerate(items):
+        name = canonical.get(normalize_header(item["item_name"]))
+        if name:
+            item["item_name"] = name
+        else:
+            unknown.append(i)
+    return unknown
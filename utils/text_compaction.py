@@ -0,0 +1,156 @@
+"""
+Pre-processing stage that shrinks extracted invoice text before AI parsing.
+
+The raw pdfplumber output repeats page headers/footers on every page and
+carries terms-and-conditions, bank details and whitespace runs that cost
+tokens and latency without helping extraction.
+"""
+
+import re
+from itertools import combinations
+
+# Numbers with or without decimals (many invoices print whole-rupee rates and amounts)
+AMOUNT_TOKEN = re.compile(r"^\(?-?\d[\d,]*(?:\.\d{1,3})?\)?$")
+ITEM_HEADER_WORDS = ("qty", "quantity", "rate", "amount", "hsn", "price", "description", "particulars")
+SUMMARY_WORDS = ("total", "cgst", "sgst", "igst", "freight", "round off", "discount", "taxable")
+PAGE_MARKER = re.compile(r"^(page\s*\d+(\s*(of|/)\s*\d+)?|\d+\s*/\s*\d+|continued.*)$", re.IGNORECASE)
+BOILERPLATE_LINE = re.compile(
+    r"^(bank\s*(name|details)|a/?c\.?\s*(no|number|name)|account\s*(no|number|name)|ifsc|branch\b|swift"
+    r"|e\.?\s*&\s*o\.?\s*e|subject to .* jurisdiction|this is a computer generated|authori[sz]ed signatory"
+    r"|for\s+and\s+on\s+behalf|receiver'?s? signature|customer'?s? signature)",
+    re.IGNORECASE,
+)
+BLOCK_START = re.compile(r"^(terms\s*(&|and)\s*conditions|terms of (sale|payment)|declaration)\b", re.IGNORECASE)
+LIST_MARKER = re.compile(r"^(\d{1,2}[.)]|[-*•])\s+")
+
+
+def estimate_tokens(text):
+    """Rough token estimate (about 4 characters per token)."""
+    return max(1, len(text or "") // 4)
+
+
+def collapse_whitespace(line):
+    return " ".join(line.split())
+
+
+def _amount_count(line):
+    return sum(1 for token in line.split() if AMOUNT_TOKEN.match(token))
+
+
+def _is_item_row(line):
+    """
+    A priced row: a decimal amount, or whole numbers where two of them multiply
+    to the last (qty x rate = amount). Pin codes and phone numbers are neither.
+    """
+    amounts = [token for token in line.split() if AMOUNT_TOKEN.match(token)]
+    if any("." in token for token in amounts):
+        return True
+    values = [float(token.strip("()").replace(",", "")) for token in amounts]
+    if len(values) < 3:
+        return False
+    return any(abs(a * b - values[-1]) <= max(1.0, abs(values[-1]) * 0.01) for a, b in combinations(values[:-1], 2))
+
+
+def page_has_item_table(page_text):
+    """Heuristic: a page with a column header and priced rows, or several priced rows."""
+    lines = [line for line in page_text.splitlines() if line.strip()]
+    lower = page_text.lower()
+    header_hits = sum(1 for word in ITEM_HEADER_WORDS if word in lower)
+    priced_rows = sum(1 for line in lines if _amount_count(line) >= 2)
+    return (priced_rows >= 1 and header_hits >= 2) or priced_rows >= 3
+
+
+def page_has_summary(page_text):
+    """True if the page carries totals/tax lines that the bill sundry extraction needs."""
+    for line in page_text.splitlines():
+        lower = line.lower()
+        if _amount_count(line) and any(word in lower for word in SUMMARY_WORDS):
+            return True
+    return False
+
+
+def page_rows_intact(page_text):
+    """
+    False when a page's amounts come out one per line (the extractor followed
+    the drawing order column by column instead of rebuilding table rows).
+    """
+    lines = [line for line in page_text.splitlines() if line.strip()]
+    amount_lines = sum(1 for line in lines if _amount_count(line))
+    priced_rows = sum(1 for line in lines if _amount_count(line) >= 2)
+    return amount_lines < 3 or priced_rows > 0
+
+
+def _strip_boilerplate(lines):
+    """Drop bank details, signatures and terms/declaration blocks."""
+    kept = []
+    in_block = False
+    for line in lines:
+        if BLOCK_START.match(line):
+            in_block = True
+            continue
+        if in_block:
+            # Terms blocks are numbered/bulleted lines or plain prose without amounts
+            if LIST_MARKER.match(line) or not _amount_count(line):
+                continue
+            in_block = False
+        if BOILERPLATE_LINE.match(line):
+            continue
+        kept.append(line)
+    return kept
+
+
+def compact_invoice_text(pages):
+    """
+    Compact extracted PDF pages for the AI prompt.
+
+    Steps:
+        1. drop pages without an item table (the first page and pages with totals are kept)
+        2. drop page markers and lines repeated across pages (headers/footers)
+        3. drop boilerplate (terms & conditions, bank details, signatures)
+        4. collapse whitespace
+
+    Args:
+        pages: list of page texts (see utils.pdf_utils.extract_pages_from_pdf)
+
+    Returns:
+        (text, stats) - stats: {'pages_in', 'pages_out', 'chars_in', 'chars_out',
+                                'tokens_in', 'tokens_out'}
+    """
+    raw = "\n".join(pages)
+    kept_pages = [
+        page for i, page in enumerate(pages)
+        if i == 0 or page_has_item_table(page) or page_has_summary(page)
+    ]
+
+    # Lines that appear on more than one page are headers/footers unless they are item rows
+    # (the same item can be bought on two pages)
+    page_lines = [[collapse_whitespace(line) for line in page.splitlines() if line.strip()] for page in kept_pages]
+    pages_with_line = {}
+    for lines in page_lines:
+        for line in set(lines):
+            key = line.lower()
+            pages_with_line[key] = pages_with_line.get(key, 0) + 1
+
+    seen = set()
+    out_lines = []
+    for lines in page_lines:
+        for line in _strip_boilerplate(lines):
+            key = line.lower()
+            if PAGE_MARKER.match(line):
+                continue
+            if pages_with_line[key] > 1 and not _is_item_row(line):
+                if key in seen:
+                    continue
+                seen.add(key)
+            out_lines.append(line)
+
+    text = "\n".join(out_lines)
+    stats = {
+        'pages_in': len(pages),
+        'pages_out': len(kept_pages),
+        'chars_in': len(raw),
+        'chars_out': len(text),
+        'tokens_in': estimate_tokens(raw),
+        'tokens_out': estimate_tokens(text),
+    }
+    return text, stats
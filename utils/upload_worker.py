@@ -0,0 +1,282 @@
+"""
+Background delivery of the voucher upload outbox to the BUSY XML endpoint.
+
+One daemon thread takes due outbox entries in batches and POSTs them to the
+endpoint configured in Settings (BUSY Upload) over a kept-alive connection:
+
+    POST <url>
+    UserName: <username>    Pwd: <password>
+    <VoucherBatch>
+      <Voucher Key="<idempotency key>"><Purchase>...</Purchase></Voucher>
+      <Voucher Key="..." Action="Modify" VchCode="1234"><Purchase>...</Purchase></Voucher>
+      ...
+    </VoucherBatch>
+
+(Action="Modify" replaces the BUSY voucher VchCode - a later revision of a
+voucher that was already sent - instead of adding a new one.)
+
+and expects one result per key:
+
+    <VoucherBatchResult>
+      <Voucher Key="..." Status="Saved" VchCode="1234"/>
+      <Voucher Key="..." Status="Error" Message="Party not found"/>
+    </VoucherBatchResult>
+
+The endpoint must treat a key it has already saved as saved (returning the
+same VchCode). Transport errors and non-200 answers retry the whole batch
+with exponential backoff; a voucher the endpoint rejects is marked failed
+straight away, since sending it again won't change the answer.
+
+tools/busy_stub_server.py implements this endpoint for offline testing.
+"""
+
+import http.client
+import random
+import threading
+import time
+import xml.etree.ElementTree as ET
+from urllib.parse import urlsplit
+from xml.sax.saxutils import quoteattr
+
+from database.db import get_setting
+from database.upload_outbox import (
+    STATUS_FAILED, STATUS_PENDING, STATUS_SENT, claim_outbox_batch, next_outbox_due, recover_outbox,
+    update_outbox_entries,
+)
+from utils.setting_keys import SETTING_BUSY_UPLOAD_URL, SETTING_BUSY_UPLOAD_USER, SETTING_BUSY_UPLOAD_PASSWORD
+
+OUTBOX_BATCH_SIZE = 20
+OUTBOX_MAX_ATTEMPTS = 8
+OUTBOX_BASE_BACKOFF_S = 2.0
+OUTBOX_MAX_BACKOFF_S = 300.0
+# How long the worker sleeps when the queue is empty (it is also woken on enqueue)
+OUTBOX_IDLE_WAIT_S = 60.0
+UPLOAD_TIMEOUT_S = 30
+
+
+class UploadError(Exception):
+    """The batch could not be delivered (network error or non-200 answer); it will be retried."""
+
+
+def build_batch_xml(entries):
+    parts = ["<VoucherBatch>"]
+    for entry in entries:
+        if entry.get("modify_vch_code"):
+            parts.append(f'<Voucher Key="{entry["idem_key"]}" Action="Modify" '
+                         f'VchCode={quoteattr(str(entry["modify_vch_code"]))}>{entry["xml"]}</Voucher>')
+        else:
+            parts.append(f'<Voucher Key="{entry["idem_key"]}">{entry["xml"]}</Voucher>')
+    parts.append("</VoucherBatch>")
+    return "".join(parts)
+
+
+def parse_batch_result(body):
+    """
+    Parse a <VoucherBatchResult> answer.
+
+    Returns:
+        {key: (saved: bool, vch_code or None, message)}
+    """
+    try:
+        root = ET.fromstring(body)
+    except ET.ParseError as e:
+        raise UploadError(f"Unreadable answer from BUSY endpoint: {e}")
+    results = {}
+    for node in root.iter("Voucher"):
+        key = node.get("Key")
+        if key:
+            saved = (node.get("Status") or "").lower() == "saved"
+            results[key] = (saved, node.get("VchCode"), node.get("Message") or "")
+    return results
+
+
+def backoff_delay(attempts):
+    """Seconds before retry number `attempts` (exponential, with jitter so clients don't retry in step)."""
+    delay = min(OUTBOX_MAX_BACKOFF_S, OUTBOX_BASE_BACKOFF_S * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+class BusyXmlClient:
+    """POSTs voucher batches over one kept-alive HTTP(S) connection."""
+
+    def __init__(self, url, username="", password="", timeout=UPLOAD_TIMEOUT_S):
+        parts = urlsplit(url)
+        if parts.scheme not in ("http", "https") or not parts.hostname:
+            raise ValueError(f"Invalid BUSY endpoint URL: {url}")
+        self.url = url
+        self.scheme = parts.scheme
+        self.host = parts.hostname
+        self.port = parts.port
+        self.path = parts.path or "/"
+        if parts.query:
+            self.path += "?" + parts.query
+        self.headers = {"Content-Type": "application/xml; charset=utf-8", "UserName": username or "", "Pwd": password or ""}
+        self.timeout = timeout
+        self.conn = None
+
+    def _connection(self):
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+            self.conn = cls(self.host, self.port, timeout=self.timeout)
+        return self.conn
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def send_batch(self, entries):
+        """Deliver entries; returns parse_batch_result() of the answer. Raises UploadError."""
+        body = build_batch_xml(entries).encode("utf-8")
+        try:
+            conn = self._connection()
+            conn.request("POST", self.path, body=body, headers=self.headers)
+            response = conn.getresponse()
+            answer = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            self.close()  # The kept-alive connection may be broken; reconnect next time
+            raise UploadError(f"Could not reach BUSY endpoint: {e}")
+        if response.status != 200:
+            raise UploadError(f"BUSY endpoint answered HTTP {response.status}: {answer[:200].decode('utf-8', 'replace')}")
+        return parse_batch_result(answer)
+
+
+def _outcome(entry, status, error=None, vch_code=None, retry=False):
+    attempts = (entry["attempts"] or 0) + 1
+    next_attempt_at = 0
+    if retry:
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            status = STATUS_FAILED
+        else:
+            status = STATUS_PENDING
+            next_attempt_at = time.time() + backoff_delay(attempts)
+    return {"id": entry["id"], "voucher_id": entry["voucher_id"], "status": status, "attempts": attempts,
+            "next_attempt_at": next_attempt_at, "last_error": error, "vch_code": vch_code}
+
+
+def deliver_batch(client, entries):
+    """
+    Send one claimed batch and work out each entry's new state.
+
+    Returns:
+        list of update dicts for update_outbox_entries (with 'voucher_id' for listeners)
+    """
+    try:
+        results = client.send_batch(entries)
+    except UploadError as e:
+        return [_outcome(entry, STATUS_PENDING, str(e), retry=True) for entry in entries]
+
+    updates = []
+    for entry in entries:
+        result = results.get(entry["idem_key"])
+        if result is None:
+            updates.append(_outcome(entry, STATUS_PENDING, "No result returned for this voucher", retry=True))
+        elif result[0]:
+            updates.append(_outcome(entry, STATUS_SENT, None, vch_code=result[1]))
+        else:
+            updates.append(_outcome(entry, STATUS_FAILED, result[2] or "Rejected by BUSY"))
+    return updates
+
+
+class UploadWorker:
+    """
+    Daemon thread draining the outbox. Listeners are called (from the worker
+    thread) with each update dict after it is stored; UI code must hand them
+    over to the Tk thread.
+    """
+
+    def __init__(self, config_loader=None, batch_size=OUTBOX_BATCH_SIZE):
+        self.config_loader = config_loader or _endpoint_config
+        self.batch_size = batch_size
+        self.listeners = []
+        self.wake = threading.Event()
+        self.stopping = False
+        self.client = None
+        self.client_config = None
+        self.thread = threading.Thread(target=self._run, name="busy-upload", daemon=True)
+
+    def start(self):
+        recover_outbox()
+        self.thread.start()
+
+    def stop(self, timeout=5):
+        self.stopping = True
+        self.wake.set()
+        self.thread.join(timeout)
+
+    def notify(self):
+        """Wake the worker (something was queued)."""
+        self.wake.set()
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self.listeners:
+            self.listeners.remove(listener)
+
+    def _client(self):
+        config = self.config_loader()
+        if not config[0]:
+            return None
+        if self.client is None or self.client_config != config:
+            if self.client is not None:
+                self.client.close()
+            self.client = BusyXmlClient(*config)
+            self.client_config = config
+        return self.client
+
+    def _publish(self, updates):
+        for listener in list(self.listeners):
+            for update in updates:
+                try:
+                    listener(update)
+                except Exception as e:
+                    print(f"Upload listener error: {e}")
+
+    def _run(self):
+        while not self.stopping:
+            # Cleared before looking at the queue so an enqueue during a send isn't missed
+            self.wake.clear()
+            try:
+                client = self._client()
+            except ValueError as e:
+                client = None
+                print(f"Upload worker: {e}")
+            batch = claim_outbox_batch(self.batch_size) if client else []
+            if batch:
+                updates = deliver_batch(client, batch)
+                update_outbox_entries(updates)
+                self._publish(updates)
+                sent = sum(1 for u in updates if u["status"] == STATUS_SENT)
+                print(f"Upload worker: {sent}/{len(updates)} voucher(s) delivered to BUSY.")
+                continue
+
+            due = next_outbox_due() if client else None
+            wait = OUTBOX_IDLE_WAIT_S if due is None else min(due, OUTBOX_IDLE_WAIT_S)
+            self.wake.wait(wait)
+        if self.client is not None:
+            self.client.close()
+
+
+def _endpoint_config():
+    """(url, username, password) from Settings; url is empty while uploads aren't configured."""
+    return (
+        (get_setting(SETTING_BUSY_UPLOAD_URL, "") or "").strip(),
+        get_setting(SETTING_BUSY_UPLOAD_USER, ""),
+        get_setting(SETTING_BUSY_UPLOAD_PASSWORD, ""),
+    )
+
+
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def get_upload_worker():
+    """The application's upload worker, started on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = UploadWorker()
+            _worker.start()
+        return _worker